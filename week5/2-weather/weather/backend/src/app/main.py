@@ -13,6 +13,7 @@ import requests
 from strands.models import BedrockModel
 from mcp import stdio_client, StdioServerParameters
 from strands.tools.mcp import MCPClient
+from accounting import TurnAccounting
 
 model_id = os.environ.get("MODEL_ID", "global.anthropic.claude-haiku-4-5-20251001-v1:0")
 bedrock_model = BedrockModel(
@@ -185,11 +186,15 @@ Description: [Brief 2-3 sentence summary]
         tools.extend(mcp_tools)
 
     session_manager = S3SessionManager(**session_manager_kwargs)
+    # Per-turn token, latency and tool accounting
+    accounting = TurnAccounting(endpoint="chat", session_id=session_id)
     agent = Agent(
         model=bedrock_model,
         session_manager=session_manager,
         tools=tools,
-        system_prompt=system_prompt
+        system_prompt=system_prompt,
+        hooks=[accounting],
+        callback_handler=accounting,
     )
     logger.info("Job search agent initialized for session %s with %d tools", session_id, len(tools))
     return agent
@@ -6,6 +6,7 @@ from strands import Agent, tool
 from strands.agent.conversation_manager import SlidingWindowConversationManager
 from trip import FullTrip, Trip
 from flight import Flight, PaymentStatus, TicketType
+from accounting import TurnAccounting
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 import boto3
@@ -195,6 +196,8 @@ def LoadHistory(session_id: str) -> Agent:
     global current_user_id
     current_user_id = session_id
     s3_key = f"sessions/{session_id}.json"
+    # Per-turn token, latency and tool accounting
+    accounting = TurnAccounting(endpoint="chat", session_id=session_id)
     try:
         response = s3_client.get_object(Bucket=state_bucket, Key=s3_key)
         state_json = response['Body'].read().decode('utf-8')
@@ -206,6 +209,8 @@ def LoadHistory(session_id: str) -> Agent:
             system_prompt=state.get("system_prompt"),
             conversation_manager=conversation_manager,
             tools=[t_list_trips, t_flights_for_trip, t_refund_flight],
+            hooks=[accounting],
+            callback_handler=accounting,
         )
     except ClientError as e:
         if e.response['Error']['Code'] == 'NoSuchKey':
@@ -216,6 +221,8 @@ def LoadHistory(session_id: str) -> Agent:
                 system_prompt=system_prompt,
                 conversation_manager=conversation_manager,
                 tools=[t_list_trips, t_flights_for_trip, t_refund_flight],
+                hooks=[accounting],
+                callback_handler=accounting,
             )
             SaveHistory(agent, session_id)
             return agent
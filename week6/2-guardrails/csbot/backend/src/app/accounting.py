@@ -0,0 +1,339 @@
+"""
+Per-turn LLM accounting for Strands agents.
+
+TurnAccounting hooks into an Agent and records, for every invocation (turn), the input,
+output and cached tokens, the number of model calls, time to first token, total latency
+and each tool that ran with its duration. Every turn is written to stdout as a CloudWatch
+Embedded Metric Format (EMF) line, so the metrics show up in CloudWatch without any
+extra API calls, and optionally appended to a local JSONL file (ACCOUNTING_JSONL_PATH)
+for tests and local runs. Running totals per session and per user are kept for the life
+of the execution environment.
+
+This app's lockfile pins strands-agents 0.2.x, whose Agent takes no hooks argument and
+only emits the request start and end events (as experimental hooks). There the hooks are
+attached after the agent is built, and model calls and tool timings are taken from the
+messages passed to the callback handler instead.
+
+Usage:
+    accounting = TurnAccounting(endpoint="chat", session_id=session_id, user_id=user_id)
+    agent = Agent(..., callback_handler=accounting)
+    accounting.attach(agent)
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    from strands.hooks import AfterInvocationEvent, BeforeInvocationEvent, HookProvider, HookRegistry
+except ImportError:
+    # strands-agents 0.2.x ships only the request events, as experimental hooks
+    from strands.experimental.hooks import (
+        EndRequestEvent as AfterInvocationEvent,
+        HookProvider,
+        HookRegistry,
+        StartRequestEvent as BeforeInvocationEvent,
+    )
+
+try:
+    from strands.hooks import AfterToolCallEvent, BeforeModelCallEvent, BeforeToolCallEvent
+except ImportError:
+    try:
+        # Older strands-agents releases ship the tool and model events as experimental
+        from strands.experimental.hooks import (
+            AfterToolInvocationEvent as AfterToolCallEvent,
+            BeforeModelInvocationEvent as BeforeModelCallEvent,
+            BeforeToolInvocationEvent as BeforeToolCallEvent,
+        )
+    except ImportError:
+        # strands-agents 0.2.x: counted from the callback handler's messages instead
+        AfterToolCallEvent = BeforeModelCallEvent = BeforeToolCallEvent = None
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTING_NAMESPACE = os.environ.get("ACCOUNTING_NAMESPACE", "StrandsAgents")
+ACCOUNTING_SERVICE = os.environ.get("ACCOUNTING_SERVICE") or os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+ACCOUNTING_EMF_ENABLED = os.environ.get("ACCOUNTING_EMF", "true").lower() == "true"
+ACCOUNTING_JSONL_PATH = os.environ.get("ACCOUNTING_JSONL_PATH", "")
+
+# (record field, EMF metric name, unit)
+TURN_METRICS = [
+    ("input_tokens", "InputTokens", "Count"),
+    ("output_tokens", "OutputTokens", "Count"),
+    ("cache_read_input_tokens", "CacheReadInputTokens", "Count"),
+    ("cache_write_input_tokens", "CacheWriteInputTokens", "Count"),
+    ("model_calls", "ModelCalls", "Count"),
+    ("tool_calls", "ToolCalls", "Count"),
+    ("time_to_first_token_ms", "TimeToFirstTokenMs", "Milliseconds"),
+    ("latency_ms", "LatencyMs", "Milliseconds"),
+    ("model_latency_ms", "ModelLatencyMs", "Milliseconds"),
+]
+
+_sink_lock = threading.Lock()
+
+
+class UsageTotals:
+    """
+    Running token and latency totals per session and per user.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, Dict[str, float]]] = {"session": {}, "user": {}}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Add a turn record to the totals of its session and user."""
+        with self._lock:
+            for scope, key in (("session", record.get("session_id")), ("user", record.get("user_id"))):
+                if not key:
+                    continue
+                totals = self._totals[scope].setdefault(key, {
+                    "turns": 0, "input_tokens": 0, "output_tokens": 0,
+                    "cache_read_input_tokens": 0, "cache_write_input_tokens": 0,
+                    "tool_calls": 0, "latency_ms": 0.0,
+                })
+                totals["turns"] += 1
+                for field in ("input_tokens", "output_tokens", "cache_read_input_tokens",
+                              "cache_write_input_tokens", "tool_calls", "latency_ms"):
+                    totals[field] += record.get(field) or 0
+
+    def get(self, scope: str, key: str) -> Dict[str, float]:
+        """
+        Return the totals for a session or user.
+
+        Args:
+            scope: "session" or "user"
+            key: Session ID or user ID
+
+        Returns:
+            Copy of the totals (empty if nothing was recorded)
+        """
+        with self._lock:
+            return dict(self._totals[scope].get(key, {}))
+
+
+# Totals for this execution environment
+usage_totals = UsageTotals()
+
+
+def emit(record: Dict[str, Any]) -> None:
+    """
+    Write a turn record as EMF log lines and to the JSONL sink if configured.
+
+    Args:
+        record: Turn record built by TurnAccounting
+    """
+    lines = []
+    if ACCOUNTING_EMF_ENABLED:
+        timestamp = int(record["timestamp"] * 1000)
+        metrics = {name: record[field] for field, name, _ in TURN_METRICS if record.get(field) is not None}
+        lines.append({
+            "_aws": {
+                "Timestamp": timestamp,
+                "CloudWatchMetrics": [{
+                    "Namespace": ACCOUNTING_NAMESPACE,
+                    "Dimensions": [["Service", "Endpoint"], ["Service", "Endpoint", "Model"]],
+                    "Metrics": [{"Name": name, "Unit": unit} for field, name, unit in TURN_METRICS
+                                if record.get(field) is not None],
+                }],
+            },
+            "Service": ACCOUNTING_SERVICE,
+            "Endpoint": record["endpoint"],
+            "Model": record.get("model_id") or "unknown",
+            **metrics,
+            # Properties for Logs Insights queries (not dimensions, to keep metric cardinality low)
+            "session_id": record.get("session_id"),
+            "user_id": record.get("user_id"),
+            "tools": record["tools"],
+            "stop_reason": record.get("stop_reason"),
+            "session_totals": record.get("session_totals"),
+            "user_totals": record.get("user_totals"),
+        })
+        for tool in record["tools"]:
+            if tool["duration_ms"] is None:
+                continue
+            lines.append({
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": ACCOUNTING_NAMESPACE,
+                        "Dimensions": [["Service", "Tool"]],
+                        "Metrics": [{"Name": "ToolDurationMs", "Unit": "Milliseconds"}],
+                    }],
+                },
+                "Service": ACCOUNTING_SERVICE,
+                "Tool": tool["name"],
+                "ToolDurationMs": tool["duration_ms"],
+                "status": tool["status"],
+                "endpoint": record["endpoint"],
+                "session_id": record.get("session_id"),
+            })
+
+    with _sink_lock:
+        if lines:
+            # EMF lines must be bare JSON, so they bypass the logging formatter
+            sys.stdout.write("".join(json.dumps(line, default=str) + "\n" for line in lines))
+            sys.stdout.flush()
+        if ACCOUNTING_JSONL_PATH:
+            with open(ACCOUNTING_JSONL_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+class TurnAccounting(HookProvider):
+    """
+    Records per-turn token usage, latency and tool timings of an Agent.
+
+    Register it both as a hook provider (attach) and as the agent's callback handler; the
+    callback handler times the first streamed token and, on strands-agents 0.2.x, counts
+    model calls and times tools from the messages it is passed.
+    """
+
+    def __init__(self, endpoint: str, session_id: Optional[str] = None, user_id: Optional[str] = None):
+        """
+        Args:
+            endpoint: Name of the endpoint or job the agent serves (EMF dimension)
+            session_id: Chat session ID, if any
+            user_id: Authenticated user ID, if any
+        """
+        self.endpoint = endpoint
+        self.session_id = session_id
+        self.user_id = user_id
+        self._lock = threading.Lock()
+        self._reset()
+        self.last_record: Optional[Dict[str, Any]] = None
+
+    def _reset(self) -> None:
+        self._started_at: Optional[float] = None
+        self._first_token_at: Optional[float] = None
+        self._usage_before: Dict[str, int] = {}
+        self._model_latency_before = 0
+        self._model_calls = 0
+        self._tool_starts: Dict[str, float] = {}
+        self._tool_names: Dict[str, str] = {}
+        self._tools: List[Dict[str, Any]] = []
+
+    def attach(self, agent: Any) -> None:
+        """Register the hooks on an agent (strands-agents 0.2.x has no Agent(hooks=...))."""
+        registry = getattr(agent, "hooks", None) or agent._hooks
+        registry.add_hook(self)
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: Any) -> None:
+        registry.add_callback(BeforeInvocationEvent, self._start_turn)
+        if BeforeToolCallEvent is not None:
+            registry.add_callback(BeforeModelCallEvent, self._count_model_call)
+            registry.add_callback(BeforeToolCallEvent, self._start_tool)
+            registry.add_callback(AfterToolCallEvent, self._finish_tool)
+        registry.add_callback(AfterInvocationEvent, self._finish_turn)
+
+    def __call__(self, **kwargs: Any) -> None:
+        """Callback handler: marks the time of the first streamed text chunk."""
+        if "data" in kwargs and self._first_token_at is None and self._started_at is not None:
+            self._first_token_at = time.perf_counter()
+        if "message" in kwargs and BeforeToolCallEvent is None and self._started_at is not None:
+            self._track_message(kwargs["message"])
+
+    def _track_message(self, message: Dict[str, Any]) -> None:
+        # An assistant message ends a model call and requests its tools; the next
+        # user message carries their results
+        now = time.perf_counter()
+        with self._lock:
+            if message.get("role") == "assistant":
+                self._model_calls += 1
+                for block in message.get("content", []):
+                    if "toolUse" in block:
+                        tool_use = block["toolUse"]
+                        self._tool_starts[tool_use["toolUseId"]] = now
+                        self._tool_names[tool_use["toolUseId"]] = tool_use["name"]
+                return
+            for block in message.get("content", []):
+                result = block.get("toolResult")
+                if result is None:
+                    continue
+                started_at = self._tool_starts.pop(result["toolUseId"], None)
+                self._tools.append({
+                    "name": self._tool_names.get(result["toolUseId"], "unknown"),
+                    "duration_ms": round((now - started_at) * 1000, 2) if started_at else None,
+                    "status": result.get("status", "success"),
+                })
+
+    def _start_turn(self, event: BeforeInvocationEvent) -> None:
+        self._reset()
+        metrics = event.agent.event_loop_metrics
+        self._usage_before = dict(metrics.accumulated_usage)
+        self._model_latency_before = metrics.accumulated_metrics.get("latencyMs", 0)
+        self._started_at = time.perf_counter()
+
+    def _count_model_call(self, event: BeforeModelCallEvent) -> None:
+        self._model_calls += 1
+
+    def _start_tool(self, event: BeforeToolCallEvent) -> None:
+        with self._lock:
+            self._tool_starts[event.tool_use["toolUseId"]] = time.perf_counter()
+
+    def _finish_tool(self, event: AfterToolCallEvent) -> None:
+        tool_use = event.tool_use
+        with self._lock:
+            started_at = self._tool_starts.pop(tool_use["toolUseId"], None)
+            duration_ms = round((time.perf_counter() - started_at) * 1000, 2) if started_at else None
+            self._tools.append({
+                "name": tool_use["name"],
+                "duration_ms": duration_ms,
+                "status": "error" if event.exception else event.result.get("status", "success"),
+            })
+
+    def _finish_turn(self, event: AfterInvocationEvent) -> None:
+        if self._started_at is None:
+            return
+        finished_at = time.perf_counter()
+        metrics = event.agent.event_loop_metrics
+        usage = metrics.accumulated_usage
+
+        def delta(field: str) -> int:
+            return usage.get(field, 0) - self._usage_before.get(field, 0)
+
+        record = {
+            "timestamp": time.time(),
+            "endpoint": self.endpoint,
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "model_id": _model_id(event.agent),
+            "input_tokens": delta("inputTokens"),
+            "output_tokens": delta("outputTokens"),
+            "cache_read_input_tokens": delta("cacheReadInputTokens"),
+            "cache_write_input_tokens": delta("cacheWriteInputTokens"),
+            "model_calls": self._model_calls,
+            "tool_calls": len(self._tools),
+            "tools": list(self._tools),
+            "time_to_first_token_ms": (
+                round((self._first_token_at - self._started_at) * 1000, 2) if self._first_token_at else None
+            ),
+            "latency_ms": round((finished_at - self._started_at) * 1000, 2),
+            "model_latency_ms": metrics.accumulated_metrics.get("latencyMs", 0) - self._model_latency_before,
+            # None when the invocation failed or was interrupted
+            "stop_reason": getattr(getattr(event, "result", None), "stop_reason", None),
+        }
+        usage_totals.add(record)
+        if self.session_id:
+            record["session_totals"] = usage_totals.get("session", self.session_id)
+        if self.user_id:
+            record["user_totals"] = usage_totals.get("user", self.user_id)
+        self.last_record = record
+        self._started_at = None
+
+        try:
+            emit(record)
+        except Exception as e:
+            # Accounting must never break the response
+            logger.error(f"Failed to emit accounting record: {str(e)}")
+
+
+def _model_id(agent: Any) -> Optional[str]:
+    """Model ID configured on the agent's model, if it exposes one."""
+    try:
+        return agent.model.config.get("model_id")
+    except Exception:
+        return None
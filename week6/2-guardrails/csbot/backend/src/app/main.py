@@ -7,6 +7,7 @@ from strands.agent.conversation_manager import SlidingWindowConversationManager
 from strands.models import BedrockModel
 from trip import FullTrip, Trip
 from flight import Flight, PaymentStatus, TicketType
+from accounting import TurnAccounting
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 import boto3
@@ -202,18 +203,23 @@ def LoadHistory(session_id: str) -> Agent:
     global current_user_id
     current_user_id = session_id
     s3_key = f"sessions/{session_id}.json"
+    # Per-turn token, latency and tool accounting
+    accounting = TurnAccounting(endpoint="chat", session_id=session_id)
     try:
         response = s3_client.get_object(Bucket=state_bucket, Key=s3_key)
         state_json = response['Body'].read().decode('utf-8')
         state = json.loads(state_json)
         logger.info(f"Successfully loaded session {session_id} from S3")
-        return Agent(
+        agent = Agent(
             model=bedrock_model,
             messages=state.get("messages"),
             system_prompt=state.get("system_prompt"),
             conversation_manager=conversation_manager,
             tools=[t_list_trips, t_flights_for_trip, t_refund_flight],
+            callback_handler=accounting,
         )
+        accounting.attach(agent)
+        return agent
     except ClientError as e:
         if e.response['Error']['Code'] == 'NoSuchKey':
             logger.info(f"Session {session_id} does not exist, creating new agent")
@@ -223,7 +229,9 @@ def LoadHistory(session_id: str) -> Agent:
                 system_prompt=system_prompt,
                 conversation_manager=conversation_manager,
                 tools=[t_list_trips, t_flights_for_trip, t_refund_flight],
+                callback_handler=accounting,
             )
+            accounting.attach(agent)
             SaveHistory(agent, session_id)
             return agent
         else:
@@ -16,6 +16,7 @@ import uvicorn
 import re
 from questions import Question, QuestionManager, Visitor
 from rag_enhancements import RAGEnhancer
+from accounting import TurnAccounting
 
 name="Kinjal Shah"
 # Re-use boto session across invocations
@@ -266,12 +267,16 @@ def session(id: str) -> Agent:
         bucket=state_bucket_name,
         session_id=id,
     )
+    # Per-turn token, latency and tool accounting
+    accounting = TurnAccounting(endpoint="chat", session_id=id)
     return Agent(
         conversation_manager=conversation_manager,
         model=bedrock_model,
         session_manager=session_manager,
         system_prompt=SYSTEM_PROMPT,
         tools=tools,
+        hooks=[accounting],
+        callback_handler=accounting,
     )
 
 class ChatRequest(BaseModel):
@@ -382,11 +387,13 @@ Return ONLY the 4 questions as a JSON array, nothing else. Format: ["question 1"
     
     try:
         # Create a temporary agent for generating suggestions
+        accounting = TurnAccounting(endpoint="suggestions", session_id=session_id)
         suggestion_agent = Agent(
             model=bedrock_model,
-            cache_prompt="default",
             system_prompt = "You are a helpful assistant that generates concise career-related questions. Always respond with valid JSON only.",
-            tools=[]
+            tools=[],
+            hooks=[accounting],
+            callback_handler=accounting,
         )
         
         response_text = ""
@@ -29,6 +29,8 @@ class Admin(Construct):
                                           sort_key=dynamodb.Attribute(name='SK', type=dynamodb.AttributeType.STRING),
                                           removal_policy=RemovalPolicy.DESTROY,
                                           time_to_live_attribute='ttl',  # Enable TTL for automatic property expiration
+                                          # Change events for cached properties drive price history and price-drop alerts
+                                          dynamo_stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
                                         )
 
         cognito = Cognito(self, 'Cognito')
@@ -2,9 +2,12 @@ import os
 from aws_cdk.aws_dynamodb import TableV2
 from aws_cdk import Duration, BundlingOptions, Fn, Stack
 from constructs import Construct
+import aws_cdk.aws_events as events
+import aws_cdk.aws_events_targets as targets
 import aws_cdk.aws_iam as iam
 import aws_cdk.aws_lambda as _lambda
 import aws_cdk.aws_s3 as s3
+import aws_cdk.aws_s3_notifications as s3n
 import aws_cdk.aws_sns as sns
 from dotenv import load_dotenv
 
@@ -51,23 +54,24 @@ class Backend(Construct):
 
         state_bucket = s3.Bucket(self, 'StateBucket')
         notification_topic = sns.Topic(self, 'StateNotificationTopic')
+        code = _lambda.Code.from_asset('virtual_realtor/backend/src',
+                    bundling=BundlingOptions(
+                        image=_lambda.Runtime.PYTHON_3_13.bundling_image,
+                        command=[
+                            'bash', '-c',
+                            'pip install -r requirements.txt -t /asset-output && rm -rf /asset-output/aws_cdk* /asset-output/constructs* && cp -r app/* /asset-output/'
+                        ],
+                        user='root',
+                        platform='linux/amd64',
+                    ),
+              )
         fn = _lambda.Function(self, 'StateFunction',
                               function_name='VirtualRealtor',
                               timeout=Duration.seconds(300),
                               architecture=_lambda.Architecture.X86_64,
                               runtime=_lambda.Runtime.PYTHON_3_13,
                               handler='run.sh',
-                              code=_lambda.Code.from_asset('virtual_realtor/backend/src',
-                                    bundling=BundlingOptions(
-                                        image=_lambda.Runtime.PYTHON_3_13.bundling_image,
-                                        command=[
-                                            'bash', '-c',
-                                            'pip install -r requirements.txt -t /asset-output && rm -rf /asset-output/aws_cdk* /asset-output/constructs* && cp -r app/* /asset-output/'
-                                        ],
-                                        user='root',
-                                        platform='linux/amd64',
-                                    ),
-                              ),
+                              code=code,
                               layers=[
                                     _lambda.LayerVersion.from_layer_version_arn(
                                         self,
@@ -93,6 +97,10 @@ class Backend(Construct):
                                     "RENTCAST_API_KEY": rentcast_api_key,
                                     "RENTAL_CAST_API_KEY": rental_cast_api_key,
                                     "PROPERTY_TTL_HOURS": os.environ.get("PROPERTY_TTL_HOURS", "12"),
+                                    "PROPERTY_SOFT_TTL_HOURS": os.environ.get("PROPERTY_SOFT_TTL_HOURS", "6"),
+                                    "PREFERENCES_CACHE_TTL_SECONDS": os.environ.get("PREFERENCES_CACHE_TTL_SECONDS", "30"),
+                                    # Property changes are processed by PropertyChangesFunction from the table's stream
+                                    "PROPERTY_CHANGES_PROCESSING": "stream",
                                     "SERPER_API_KEY": serper_api_key,
                                     "SERPER_URL": serper_url,
                                     "USER_POOL_ID": user_pool_id or "",
@@ -127,6 +135,85 @@ class Backend(Construct):
             )
         )
 
+        # Price history, price-drop fan-out and market statistics, driven by changes to cached properties
+        changes_fn = _lambda.Function(self, 'PropertyChangesFunction',
+                                      timeout=Duration.seconds(60),
+                                      architecture=_lambda.Architecture.X86_64,
+                                      runtime=_lambda.Runtime.PYTHON_3_13,
+                                      handler='changes.handler',
+                                      code=code,
+                                      environment={
+                                          "DDB_TABLE": dynamo_db_table.table_name,
+                                          "PRICE_DROP_MIN_PERCENT": os.environ.get("PRICE_DROP_MIN_PERCENT", "0"),
+                                      },
+                                      memory_size=256,
+                                     )
+        _ = dynamo_db_table.grant_read_write_data(changes_fn)
+        _ = dynamo_db_table.grant_stream_read(changes_fn)
+        changes_fn.add_event_source_mapping('PropertyInfoChanges',
+            event_source_arn=dynamo_db_table.table_stream_arn,
+            starting_position=_lambda.StartingPosition.LATEST,
+            batch_size=100,
+            max_batching_window=Duration.seconds(5),
+            retry_attempts=5,
+            report_batch_item_failures=True,
+            filters=[_lambda.FilterCriteria.filter({
+                # REMOVE covers TTL expiry, which takes a listing out of the market statistics
+                "eventName": _lambda.FilterRule.or_("INSERT", "MODIFY", "REMOVE"),
+                "dynamodb": {"Keys": {"PK": {"S": _lambda.FilterRule.is_equal("PROPERTY_INFO")}}},
+            })],
+        )
+
+        # Nightly pre-fetch of the listings in the most requested zip codes
+        warmer_fn = _lambda.Function(self, 'CacheWarmerFunction',
+                                     timeout=Duration.minutes(10),
+                                     architecture=_lambda.Architecture.X86_64,
+                                     runtime=_lambda.Runtime.PYTHON_3_13,
+                                     handler='cachewarmer.handler',
+                                     code=code,
+                                     environment={
+                                         "DDB_TABLE": dynamo_db_table.table_name,
+                                         "USE_MOCK_RENTCAST_API": use_mock_rentcast,
+                                         "RENTCAST_API_KEY": rentcast_api_key,
+                                         "RENTAL_CAST_API_KEY": rental_cast_api_key,
+                                         "PROPERTY_TTL_HOURS": os.environ.get("PROPERTY_TTL_HOURS", "12"),
+                                         "PROPERTY_SOFT_TTL_HOURS": os.environ.get("PROPERTY_SOFT_TTL_HOURS", "6"),
+                                         "PROPERTY_CHANGES_PROCESSING": "stream",
+                                         "CACHE_WARMER_REQUEST_BUDGET": os.environ.get("CACHE_WARMER_REQUEST_BUDGET", "50"),
+                                         "CACHE_WARMER_MAX_ZIPS": os.environ.get("CACHE_WARMER_MAX_ZIPS", "25"),
+                                     },
+                                     memory_size=512,
+                                    )
+        _ = dynamo_db_table.grant_read_write_data(warmer_fn)
+        # 10:00 UTC, before the US morning
+        events.Rule(self, 'CacheWarmerSchedule',
+                    schedule=events.Schedule.cron(minute="0", hour="10"),
+                    targets=[targets.LambdaFunction(warmer_fn)],
+                   )
+
+        # Bulk listing feeds (CSV / JSON Lines) dropped under feeds/ in the state bucket
+        ingest_fn = _lambda.Function(self, 'FeedIngestFunction',
+                                     timeout=Duration.minutes(15),
+                                     architecture=_lambda.Architecture.X86_64,
+                                     runtime=_lambda.Runtime.PYTHON_3_13,
+                                     handler='ingest.handler',
+                                     code=code,
+                                     environment={
+                                         "DDB_TABLE": dynamo_db_table.table_name,
+                                         "PROPERTY_CHANGES_PROCESSING": "stream",
+                                         "PROPERTY_SOFT_TTL_HOURS": os.environ.get("PROPERTY_SOFT_TTL_HOURS", "6"),
+                                         "INGEST_TTL_HOURS": os.environ.get("INGEST_TTL_HOURS", "24"),
+                                         "INGEST_WRITE_WORKERS": os.environ.get("INGEST_WRITE_WORKERS", "8"),
+                                     },
+                                     memory_size=1024,
+                                    )
+        _ = dynamo_db_table.grant_read_write_data(ingest_fn)
+        _ = state_bucket.grant_read(ingest_fn, 'feeds/*')
+        for suffix in ('.csv', '.csv.gz', '.jsonl', '.jsonl.gz', '.ndjson', '.ndjson.gz'):
+            state_bucket.add_event_notification(s3.EventType.OBJECT_CREATED,
+                                                s3n.LambdaDestination(ingest_fn),
+                                                s3.NotificationKeyFilter(prefix='feeds/', suffix=suffix))
+
         fn_url = fn.add_function_url(
                 auth_type=_lambda.FunctionUrlAuthType.NONE,
                 invoke_mode=_lambda.InvokeMode.RESPONSE_STREAM,
@@ -2,8 +2,6 @@ import os
 import time
 import requests
 import logging
-from jose import jwk, jwt
-from jose.utils import base64url_decode
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +33,10 @@ def verify_cognito_token(token: str) -> dict | None:
     Verifies the Cognito token and returns the claims if valid.
     Returns None if invalid.
     """
+    # Deferred so that python-jose is only loaded by routes that authenticate
+    from jose import jwk, jwt
+    from jose.utils import base64url_decode
+
     try:
         if not token:
             logger.warning("Token is empty or None")
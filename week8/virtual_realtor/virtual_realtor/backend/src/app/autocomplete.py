@@ -0,0 +1,249 @@
+"""
+Prefix autocomplete over the cached listings' addresses, cities and zip codes.
+
+AutocompleteIndex keeps a sorted array of normalized keys (lowercase, punctuation and
+extra spaces removed) and answers a prefix with two binary searches, so a lookup costs
+O(log n + matches) without touching DynamoDB. Each entry is one of:
+
+- address: a cached listing, keyed by its full address and by the address without
+  the house number (typing "oak st" finds "123 Oak St, ..."); carries the property ID,
+  which resolves with a single cache GetItem
+- city: "Fremont, CA", ranked by the number of cached listings in it
+- zip: "94539", ranked the same way
+
+The index is built from one payload-free query of the PROPERTY_INFO items on first use,
+updated in place on every cache write made by this execution environment (it listens
+to QuestionManager writes), and rebuilt in the background every
+AUTOCOMPLETE_REFRESH_SECONDS to pick up expiries and other instances' writes.
+"""
+
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_REFRESH_SECONDS = int(os.environ.get("AUTOCOMPLETE_REFRESH_SECONDS", "900"))
+AUTOCOMPLETE_MIN_QUERY_LENGTH = int(os.environ.get("AUTOCOMPLETE_MIN_QUERY_LENGTH", "2"))
+# Matching keys examined per lookup before ranking
+AUTOCOMPLETE_MAX_CANDIDATES = int(os.environ.get("AUTOCOMPLETE_MAX_CANDIDATES", "200"))
+
+_SEPARATOR = "\x00"
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+# Areas before addresses when equally good
+_TYPE_ORDER = {"zip": 0, "city": 1, "address": 2}
+
+
+class Suggestion(BaseModel):
+    """One autocomplete completion"""
+    type: str
+    label: str
+    property_id: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    zipCode: Optional[str] = None
+    count: Optional[int] = None
+
+
+def normalize(text: str) -> str:
+    """Lowercase text and drop punctuation and extra spaces."""
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+def _city_id(city: str, state: Optional[str]) -> str:
+    return f"city:{(state or '').upper()}:{normalize(city)}"
+
+
+class AutocompleteIndex:
+    """In-memory sorted-array prefix index of the cached listings"""
+
+    def __init__(self, questions: Any, refresh_seconds: int = AUTOCOMPLETE_REFRESH_SECONDS):
+        """
+        Args:
+            questions: QuestionManager the listings are read from (and whose writes are followed)
+            refresh_seconds: Age after which the index is rebuilt in the background
+        """
+        self.questions = questions
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._keys: List[str] = []
+        self._entries: Dict[str, Suggestion] = {}
+        self._entry_keys: Dict[str, List[str]] = {}
+        # Listing -> (city entry ID, zip entry ID) it counts towards
+        self._areas: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._area_counts: Counter = Counter()
+        self._built_at: Optional[float] = None
+        self._rebuilding = False
+        questions.write_listeners.append(self.apply_writes)
+
+    # --- Maintenance ---
+
+    def _add_entry(self, entry_id: str, keys: Iterable[str], entry: Suggestion) -> None:
+        self._remove_entry(entry_id)
+        keys = sorted({key for key in keys if key})
+        for key in keys:
+            bisect.insort(self._keys, f"{key}{_SEPARATOR}{entry_id}")
+        self._entries[entry_id] = entry
+        self._entry_keys[entry_id] = keys
+
+    def _remove_entry(self, entry_id: str) -> None:
+        for key in self._entry_keys.pop(entry_id, []):
+            value = f"{key}{_SEPARATOR}{entry_id}"
+            position = bisect.bisect_left(self._keys, value)
+            if position < len(self._keys) and self._keys[position] == value:
+                del self._keys[position]
+        self._entries.pop(entry_id, None)
+
+    def _count_area(self, entry_id: Optional[str], delta: int, entry: Optional[Suggestion] = None) -> None:
+        if entry_id is None:
+            return
+        self._area_counts[entry_id] += delta
+        count = self._area_counts[entry_id]
+        if count <= 0:
+            del self._area_counts[entry_id]
+            self._remove_entry(entry_id)
+        elif entry_id in self._entries:
+            self._entries[entry_id].count = count
+        elif entry is not None:
+            entry.count = count
+            self._add_entry(entry_id, [normalize(entry.label), normalize(entry.city or "")], entry)
+
+    def add_listing(self, listing: Dict[str, Any]) -> None:
+        """
+        Add or update a cached listing's address, city and zip code.
+
+        Args:
+            listing: PROPERTY_INFO item (property_id, formattedAddress, city, state, zipCode)
+        """
+        property_id = listing.get('property_id') or listing.get('SK') or listing.get('id')
+        address = listing.get('formattedAddress')
+        if not property_id or not address:
+            return
+        city, state, zip_code = listing.get('city'), listing.get('state'), listing.get('zipCode')
+        with self._lock:
+            self.remove_listing(property_id)
+            full = normalize(address)
+            street = full.split(" ", 1)[1] if " " in full and full.split(" ", 1)[0].isdigit() else None
+            self._add_entry(f"address:{property_id}", [full, street],
+                            Suggestion(type="address", label=address, property_id=property_id,
+                                       city=city, state=state, zipCode=zip_code and str(zip_code)))
+            city_id = _city_id(city, state) if city else None
+            zip_id = f"zip:{zip_code}" if zip_code else None
+            self._areas[property_id] = (city_id, zip_id)
+            self._count_area(city_id, 1, Suggestion(type="city", label=f"{city}, {state}" if state else city,
+                                                    city=city, state=state) if city else None)
+            self._count_area(zip_id, 1, Suggestion(type="zip", label=str(zip_code), zipCode=str(zip_code),
+                                                   city=city, state=state) if zip_code else None)
+
+    def remove_listing(self, property_id: str) -> None:
+        """Remove a listing (e.g. after it expired) and its contribution to its areas."""
+        with self._lock:
+            self._remove_entry(f"address:{property_id}")
+            city_id, zip_id = self._areas.pop(property_id, (None, None))
+            self._count_area(city_id, -1)
+            self._count_area(zip_id, -1)
+
+    def apply_writes(self, items: List[Dict[str, Any]]) -> None:
+        """QuestionManager write listener: index newly cached listings (once the index is built)."""
+        if self._built_at is None:
+            return
+        for item in items:
+            self.add_listing(item)
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the index from the cached listings (one query, without the compressed payloads).
+
+        Returns:
+            Number of listings indexed
+        """
+        fresh = AutocompleteIndex.__new__(AutocompleteIndex)
+        fresh.__dict__.update(questions=self.questions, refresh_seconds=self.refresh_seconds,
+                              _lock=threading.RLock(), _keys=[], _entries={}, _entry_keys={},
+                              _areas={}, _area_counts=Counter(), _built_at=None, _rebuilding=False)
+        now = time.time()
+        count = 0
+        for item in self.questions.iter_property_items(['property_id', 'formattedAddress', 'city', 'state',
+                                                        'zipCode', 'ttl']):
+            if (item.get('ttl') or now) < now:
+                # Expired but not yet deleted by DynamoDB
+                continue
+            fresh.add_listing(item)
+            count += 1
+        with self._lock:
+            self._keys, self._entries, self._entry_keys = fresh._keys, fresh._entries, fresh._entry_keys
+            self._areas, self._area_counts = fresh._areas, fresh._area_counts
+            self._built_at = time.monotonic()
+        logger.info(f"Built autocomplete index of {count} listings ({len(self._keys)} keys)")
+        return count
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run() -> None:
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(f"Failed to rebuild autocomplete index: {str(e)}", exc_info=True)
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, name="autocomplete-rebuild", daemon=True).start()
+
+    # --- Lookup ---
+
+    def search(self, query: str, limit: int = 8, types: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Ranked completions of a prefix.
+
+        Args:
+            query: Text typed so far
+            limit: Maximum number of suggestions
+            types: Optional subset of "address", "city" and "zip"
+
+        Returns:
+            Suggestion dictionaries, best first
+        """
+        prefix = normalize(query)
+        if len(prefix) < AUTOCOMPLETE_MIN_QUERY_LENGTH:
+            return []
+        if self._built_at is None:
+            with self._lock:
+                # Concurrent first searches wait for one build
+                if self._built_at is None:
+                    self.rebuild()
+        elif time.monotonic() - self._built_at > self.refresh_seconds:
+            self._refresh_in_background()
+
+        wanted = set(types) if types else None
+        ranked: Dict[str, Tuple] = {}
+        with self._lock:
+            position = bisect.bisect_left(self._keys, prefix)
+            examined = 0
+            while position < len(self._keys) and examined < AUTOCOMPLETE_MAX_CANDIDATES:
+                value = self._keys[position]
+                if not value.startswith(prefix):
+                    break
+                key, entry_id = value.split(_SEPARATOR, 1)
+                entry = self._entries[entry_id]
+                position += 1
+                examined += 1
+                if wanted and entry.type not in wanted:
+                    continue
+                # Matches of the whole label first, then areas, then by listing count
+                rank = (0 if key == normalize(entry.label) else 1, _TYPE_ORDER[entry.type],
+                        -(entry.count or 0), len(key), entry.label)
+                if entry_id not in ranked or rank < ranked[entry_id][0]:
+                    ranked[entry_id] = (rank, entry.model_dump(exclude_none=True))
+        return [suggestion for _, suggestion in sorted(ranked.values(), key=lambda pair: pair[0])[:limit]]
@@ -0,0 +1,155 @@
+"""
+Scheduled warming of the PROPERTY_INFO cache.
+
+The cache otherwise only fills when a user asks about an area. Once a night the warmer:
+
+1. Aggregates the zipCodes of every saved profile (USER_PREF# items) into a demand count
+   per zip code.
+2. Ranks zip codes by demand (most users first).
+3. Pre-fetches active listings of the top zip codes from RentCast with paginated
+   limit/offset requests, spending at most CACHE_WARMER_REQUEST_BUDGET requests per run
+   (the RentCast plan is billed per request) and at most CACHE_WARMER_MAX_PAGES_PER_ZIP
+   pages per zip code, so the busiest area cannot use the whole budget.
+4. Loads each page into the cache with batched writes.
+
+handler() is the entry point of the scheduled Lambda (EventBridge rule); warm() can
+also be called directly, e.g. with a smaller budget.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from clients import get_dynamodb_client, get_question_manager
+
+logger = logging.getLogger(__name__)
+
+# RentCast requests per run
+CACHE_WARMER_REQUEST_BUDGET = int(os.environ.get("CACHE_WARMER_REQUEST_BUDGET", "50"))
+CACHE_WARMER_MAX_ZIPS = int(os.environ.get("CACHE_WARMER_MAX_ZIPS", "25"))
+CACHE_WARMER_MAX_PAGES_PER_ZIP = int(os.environ.get("CACHE_WARMER_MAX_PAGES_PER_ZIP", "3"))
+# Listings per request (RentCast allows up to 500)
+CACHE_WARMER_PAGE_SIZE = min(500, int(os.environ.get("CACHE_WARMER_PAGE_SIZE", "100")))
+
+
+class WarmingReport(BaseModel):
+    """Outcome of a cache warming run"""
+    zip_codes: List[str] = []
+    demand: Dict[str, int] = {}
+    requests: int = 0
+    listings: int = 0
+    written: int = 0
+    failed_zip_codes: List[str] = []
+    budget_exhausted: bool = False
+    duration_seconds: float = 0.0
+
+
+def zip_code_demand() -> Counter:
+    """
+    Count how many saved profiles include each zip code (one table scan).
+
+    Returns:
+        Counter of zip code -> number of users
+    """
+    client = get_dynamodb_client()
+    demand: Counter = Counter()
+    paginator = client.get_paginator('scan')
+    for page in paginator.paginate(
+        TableName=os.environ.get('DDB_TABLE'),
+        FilterExpression='begins_with(PK, :pk) AND SK = :sk',
+        ExpressionAttributeValues={':pk': {'S': 'USER_PREF#'}, ':sk': {'S': 'PROFILE'}},
+        ProjectionExpression='zipCodes',
+    ):
+        for item in page.get('Items', []):
+            zip_codes = {value['S'].strip() for value in item.get('zipCodes', {}).get('L', []) if value.get('S')}
+            demand.update(zip_codes)
+    return demand
+
+
+def rank_zip_codes(demand: Counter, max_zips: int = CACHE_WARMER_MAX_ZIPS) -> List[Tuple[str, int]]:
+    """Zip codes by descending demand (ties by zip code), at most max_zips."""
+    return sorted(demand.items(), key=lambda entry: (-entry[1], entry[0]))[:max_zips]
+
+
+def fetch_page(zip_code: str, offset: int, limit: int = CACHE_WARMER_PAGE_SIZE) -> Optional[List[Dict[str, Any]]]:
+    """
+    Fetch one page of active listings in a zip code.
+
+    Args:
+        zip_code: 5-digit zip code
+        offset: Index of the first listing
+        limit: Listings per page
+
+    Returns:
+        The listings, or None if the request failed
+    """
+    result = json.loads(get_question_manager().search_properties(
+        zipCode=zip_code, status="Active", limit=limit, offset=offset))
+    if isinstance(result, dict):
+        logger.error(f"Warming {zip_code} at offset {offset} failed: {result.get('error')}")
+        return None
+    return result
+
+
+def warm(budget: int = CACHE_WARMER_REQUEST_BUDGET, max_zips: int = CACHE_WARMER_MAX_ZIPS,
+         max_pages_per_zip: int = CACHE_WARMER_MAX_PAGES_PER_ZIP,
+         page_size: int = CACHE_WARMER_PAGE_SIZE) -> WarmingReport:
+    """
+    Pre-fetch the listings of the most requested zip codes into the cache.
+
+    Args:
+        budget: Maximum number of RentCast requests
+        max_zips: Maximum number of zip codes to warm
+        max_pages_per_zip: Maximum number of pages fetched per zip code
+        page_size: Listings per request
+
+    Returns:
+        WarmingReport of the run
+    """
+    started_at = time.perf_counter()
+    ranked = rank_zip_codes(zip_code_demand(), max_zips)
+    report = WarmingReport(demand=dict(ranked))
+    questions = get_question_manager()
+
+    for zip_code, _ in ranked:
+        if report.requests >= budget:
+            report.budget_exhausted = True
+            break
+        report.zip_codes.append(zip_code)
+        for page in range(max_pages_per_zip):
+            if report.requests >= budget:
+                report.budget_exhausted = True
+                break
+            listings = fetch_page(zip_code, offset=page * page_size, limit=page_size)
+            report.requests += 1
+            if listings is None:
+                report.failed_zip_codes.append(zip_code)
+                break
+            if listings:
+                result = questions.add_properties_to_db(listings)
+                report.listings += len(listings)
+                report.written += result.get('written', 0)
+            if len(listings) < page_size:
+                # Last page of this zip code
+                break
+
+    report.duration_seconds = round(time.perf_counter() - started_at, 2)
+    logger.info(f"Warmed {len(report.zip_codes)} zip codes: {report.written} listings cached "
+                f"with {report.requests}/{budget} RentCast requests in {report.duration_seconds}s")
+    return report
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Scheduled Lambda entry point.
+
+    The event may override the run's limits with "budget", "max_zips",
+    "max_pages_per_zip" and "page_size".
+    """
+    limits = {key: int(event[key]) for key in ("budget", "max_zips", "max_pages_per_zip", "page_size")
+              if isinstance(event, dict) and event.get(key) is not None}
+    return warm(**limits).model_dump()
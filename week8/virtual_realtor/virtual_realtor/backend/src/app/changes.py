@@ -0,0 +1,98 @@
+"""
+Processing of changes to cached properties (PROPERTY_INFO items).
+
+Every write, replacement or expiry of a cached listing is handled as a DynamoDB Streams
+record (NEW_AND_OLD_IMAGES) and fed to:
+
+- PriceHistoryManager: price history and price-drop alerts (pricehistory.py)
+- MarketStatsManager: per-zip and per-city market statistics (marketstats.py)
+- NewMatchesManager: new listings matched to saved preferences (newmatches.py)
+
+In AWS the records come from the table's stream and handler() is the Lambda entry
+point. Locally, and wherever no stream is configured, add_property_info_to_db builds an
+equivalent record with stream_record() and processes it right after the write
+(PROPERTY_CHANGES_PROCESSING=inline). The inline stand-in does not see TTL expiries,
+which the stream delivers as REMOVE records.
+"""
+
+import os
+import logging
+from typing import Any, Dict, List, Optional
+
+from clients import get_price_history_manager, get_market_stats_manager, get_new_matches_manager
+from serialization import deserialize_item, serialize_item
+
+logger = logging.getLogger(__name__)
+
+# inline: process in the writing request (local stand-in), stream: DynamoDB Streams handler, off
+PROPERTY_CHANGES_PROCESSING = os.environ.get("PROPERTY_CHANGES_PROCESSING", "inline").lower()
+
+
+def stream_record(new_item: Dict[str, Any], old_item: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Build a DynamoDB Streams record (NEW_AND_OLD_IMAGES) for a write.
+
+    Args:
+        new_item: Item as written, with native values
+        old_item: Item that was replaced, if any
+
+    Returns:
+        Record in the format delivered to a DynamoDB Streams Lambda
+    """
+    record = {
+        'eventName': 'MODIFY' if old_item else 'INSERT',
+        'eventSource': 'aws:dynamodb',
+        'dynamodb': {
+            'Keys': serialize_item({'PK': new_item['PK'], 'SK': new_item['SK']}),
+            'NewImage': serialize_item(new_item),
+            'StreamViewType': 'NEW_AND_OLD_IMAGES',
+        },
+    }
+    if old_item:
+        record['dynamodb']['OldImage'] = serialize_item(old_item)
+    return record
+
+
+def process_record(record: Dict[str, Any]) -> None:
+    """
+    Process one stream record; records of other items are ignored.
+
+    Args:
+        record: DynamoDB Streams record
+    """
+    event_name = record.get('eventName')
+    images = record.get('dynamodb', {})
+    if images.get('Keys', {}).get('PK', {}).get('S') != 'PROPERTY_INFO':
+        return
+    new_item = deserialize_item(images['NewImage']) if 'NewImage' in images else None
+    old_item = deserialize_item(images['OldImage']) if 'OldImage' in images else None
+
+    if event_name in ('INSERT', 'MODIFY') and new_item:
+        get_price_history_manager().process_change(new_item, old_item)
+    if event_name == 'INSERT' and new_item:
+        get_new_matches_manager().process_new_listing(new_item)
+    if event_name in ('INSERT', 'MODIFY', 'REMOVE'):
+        # Last, so a retried record does not add its statistics twice
+        get_market_stats_manager().apply_change(new_item if event_name != 'REMOVE' else None, old_item)
+
+
+def process_records(records: List[Dict[str, Any]]) -> None:
+    """Process stream records in order."""
+    for record in records:
+        process_record(record)
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    DynamoDB Streams Lambda entry point.
+
+    Failed records are reported individually (ReportBatchItemFailures) so only the
+    rest of the batch from the failed record on is retried.
+    """
+    for record in event.get('Records', []):
+        try:
+            process_record(record)
+        except Exception as e:
+            logger.error(f"Failed to process stream record {record.get('eventID')}: {str(e)}", exc_info=True)
+            return {'batchItemFailures': [{'itemIdentifier': record.get('dynamodb', {}).get('SequenceNumber')}]}
+    return {'batchItemFailures': []}
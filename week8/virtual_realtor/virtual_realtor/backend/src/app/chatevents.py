@@ -0,0 +1,190 @@
+"""
+Typed chat stream events for the realtor agent.
+
+Agent.stream_async only surfaces text deltas while a turn is running; nothing is
+streamed while a tool executes, and tool results only reach the client once the model
+has described them. ChatEventStream hooks into the agent's tool calls and merges them
+with the text deltas into one stream of typed events:
+
+- ("text", chunk): text delta from the model
+- ("tool_start", {"id", "name", "input"}): a tool started running
+- ("tool_end", {"id", "name", "status", "durationMs"}): a tool finished
+- ("listings", {"id", "tool", "properties"}): property cards returned by a listing tool,
+  sent as soon as the tool returns so the UI can render them before the narrative
+
+Usage:
+    events = ChatEventStream()
+    agent.hooks.add_hook(events)
+    async for name, payload in events.stream(agent, prompt):
+        ...
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from strands.hooks import HookProvider, HookRegistry
+
+try:
+    from strands.hooks import AfterToolCallEvent, BeforeToolCallEvent
+except ImportError:
+    # Older strands-agents releases ship the tool events as experimental
+    from strands.experimental.hooks import (
+        AfterToolInvocationEvent as AfterToolCallEvent,
+        BeforeToolInvocationEvent as BeforeToolCallEvent,
+    )
+
+from intents import parse_tool_result, properties_in, property_id_of
+
+logger = logging.getLogger(__name__)
+
+# Tools whose results are property records, sent to the client as "listings" events
+LISTING_TOOLS = {
+    name.strip()
+    for name in os.environ.get(
+        "CHAT_LISTING_TOOLS",
+        "search_properties,get_property_info_from_db,search_properties_by_location_from_db",
+    ).split(",")
+    if name.strip()
+}
+# Fields of a property record sent to the client for a card
+LISTING_CARD_FIELDS = (
+    "formattedAddress", "price", "bedrooms", "bathrooms", "squareFootage", "propertyType",
+    "city", "state", "zipCode", "daysOnMarket", "listingDate", "status",
+)
+# Tool inputs that are not shown to the client
+HIDDEN_TOOL_INPUTS = {"user_id"}
+
+_DONE = object()
+
+
+def listing_card(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Client card for a property record returned by a tool."""
+    card = {"id": property_id_of(record)}
+    card.update({field: record[field] for field in LISTING_CARD_FIELDS if record.get(field) is not None})
+    return card
+
+
+class ChatEventStream(HookProvider):
+    """
+    Merges an agent's tool calls with its text deltas into typed chat events.
+
+    Register it on the agent (hooks=[...] or agent.hooks.add_hook) and iterate
+    stream(); tool events of invocations that are not streamed are ignored.
+    """
+
+    def __init__(self, listing_tools: Optional[set] = None):
+        """
+        Args:
+            listing_tools: Names of the tools whose results are sent as listings
+        """
+        self.listing_tools = LISTING_TOOLS if listing_tools is None else set(listing_tools)
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tool_starts: Dict[str, float] = {}
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self._start_tool)
+        registry.add_callback(AfterToolCallEvent, self._finish_tool)
+
+    def _put(self, name: Any, payload: Any) -> None:
+        if self._queue is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._queue.put_nowait((name, payload))
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, (name, payload))
+
+    def _start_tool(self, event: BeforeToolCallEvent) -> None:
+        tool_use = event.tool_use
+        self._tool_starts[tool_use["toolUseId"]] = time.perf_counter()
+        tool_input = tool_use.get("input")
+        if isinstance(tool_input, dict):
+            tool_input = {key: value for key, value in tool_input.items() if key not in HIDDEN_TOOL_INPUTS}
+        self._put("tool_start", {"id": tool_use["toolUseId"], "name": tool_use["name"], "input": tool_input})
+
+    def _finish_tool(self, event: AfterToolCallEvent) -> None:
+        tool_use = event.tool_use
+        started_at = self._tool_starts.pop(tool_use["toolUseId"], None)
+        status = "error" if event.exception else (event.result or {}).get("status", "success")
+        self._put("tool_end", {
+            "id": tool_use["toolUseId"],
+            "name": tool_use["name"],
+            "status": status,
+            "durationMs": round((time.perf_counter() - started_at) * 1000, 2) if started_at else None,
+        })
+        if status != "success" or tool_use["name"] not in self.listing_tools:
+            return
+        try:
+            properties = self.listings(event.result)
+        except Exception as e:
+            logger.warning(f"Could not read listings from {tool_use['name']}: {str(e)}")
+            return
+        if properties:
+            self._put("listings", {"id": tool_use["toolUseId"], "tool": tool_use["name"], "properties": properties})
+
+    @staticmethod
+    def listings(tool_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Property cards in a tool result.
+
+        Args:
+            tool_result: Result of a listing tool
+
+        Returns:
+            One card per property record, in result order
+        """
+        cards = []
+        for value in parse_tool_result(tool_result):
+            cards.extend(listing_card(record) for record in properties_in(value))
+        return cards
+
+    async def stream(self, agent: Any, prompt: Any) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Invoke the agent and yield its typed events as they happen.
+
+        Args:
+            agent: Agent this provider is registered on
+            prompt: Prompt for the invocation
+
+        Yields:
+            (event name, payload) tuples; payload is the text chunk for "text" events
+
+        Raises:
+            Exception: Whatever the agent invocation raised
+        """
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._tool_starts = {}
+        queue = self._queue
+
+        async def pump() -> None:
+            try:
+                async for event in agent.stream_async(prompt):
+                    if "data" in event:
+                        queue.put_nowait(("text", event["data"]))
+                queue.put_nowait((_DONE, None))
+            except BaseException as e:
+                queue.put_nowait((_DONE, e))
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+
+        task = asyncio.create_task(pump())
+        try:
+            while True:
+                name, payload = await queue.get()
+                if name is _DONE:
+                    if isinstance(payload, Exception):
+                        raise payload
+                    break
+                yield name, payload
+        finally:
+            self._queue = None
+            if not task.done():
+                task.cancel()
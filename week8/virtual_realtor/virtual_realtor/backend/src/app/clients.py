@@ -0,0 +1,167 @@
+"""
+Shared, lazily-initialized client registry for the Virtual Realtor Lambda.
+
+boto3 resources, Bedrock models and the DynamoDB-backed managers are created on
+first use and re-used for the lifetime of the execution environment, so a cold start
+only pays for what the first request actually touches and every module shares the
+same connections.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+from startup import profiler
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_registry: Dict[str, Any] = {}
+
+
+def get_or_create(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Return the registered instance for name, creating it with factory on first use.
+
+    Args:
+        name: Registry key
+        factory: Zero-argument callable that builds the instance
+
+    Returns:
+        The shared instance
+    """
+    instance = _registry.get(name)
+    if instance is None:
+        with _lock:
+            instance = _registry.get(name)
+            if instance is None:
+                with profiler.span(f"init:{name}"):
+                    instance = factory()
+                _registry[name] = instance
+    return instance
+
+
+def get_boto_session():
+    """Shared boto3 session (re-used across invocations)."""
+    def _create():
+        import boto3
+        return boto3.Session()
+    return get_or_create("boto_session", _create)
+
+
+def get_dynamodb_resource():
+    """Shared DynamoDB resource."""
+    return get_or_create("dynamodb", lambda: get_boto_session().resource('dynamodb'))
+
+
+def get_dynamodb_client():
+    """
+    Shared low-level DynamoDB client.
+
+    This is a separate client rather than the resource's meta.client, which has the
+    resource's Decimal (de)serialization hooks attached.
+    """
+    return get_or_create("dynamodb_client", lambda: get_boto_session().client('dynamodb'))
+
+
+def get_sns_client():
+    """Shared SNS client."""
+    return get_or_create("sns", lambda: get_boto_session().client('sns'))
+
+
+def get_bedrock_model(model_id: str, **config: Any):
+    """
+    Shared BedrockModel for the given model ID and configuration.
+
+    Args:
+        model_id: Bedrock model ID
+        **config: Additional BedrockModel configuration (e.g. cache settings)
+
+    Returns:
+        BedrockModel instance
+    """
+    def _create():
+        from strands.models import BedrockModel
+        return BedrockModel(model_id=model_id, boto_session=get_boto_session(), **config)
+    key = f"bedrock_model:{model_id}:{sorted(config.items())}" if config else f"bedrock_model:{model_id}"
+    return get_or_create(key, _create)
+
+
+def get_question_manager():
+    """Shared QuestionManager."""
+    def _create():
+        from questions import QuestionManager
+        return QuestionManager()
+    return get_or_create("question_manager", _create)
+
+
+def get_preferences_manager():
+    """Shared PreferencesManager."""
+    def _create():
+        from preferences import PreferencesManager
+        return PreferencesManager()
+    return get_or_create("preferences_manager", _create)
+
+
+def get_favorites_manager():
+    """Shared FavoritesManager."""
+    def _create():
+        from favorites import FavoritesManager
+        return FavoritesManager()
+    return get_or_create("favorites_manager", _create)
+
+
+def get_price_history_manager():
+    """Shared PriceHistoryManager."""
+    def _create():
+        from pricehistory import PriceHistoryManager
+        return PriceHistoryManager()
+    return get_or_create("price_history_manager", _create)
+
+
+def get_market_stats_manager():
+    """Shared MarketStatsManager."""
+    def _create():
+        from marketstats import MarketStatsManager
+        return MarketStatsManager()
+    return get_or_create("market_stats_manager", _create)
+
+
+def get_property_cache():
+    """Shared stale-while-revalidate PropertyCache."""
+    def _create():
+        from propertycache import PropertyCache
+        return PropertyCache(get_question_manager())
+    return get_or_create("property_cache", _create)
+
+
+def get_autocomplete_index():
+    """Shared address, city and zip code autocomplete index of the cached listings."""
+    def _create():
+        from autocomplete import AutocompleteIndex
+        return AutocompleteIndex(get_question_manager())
+    return get_or_create("autocomplete_index", _create)
+
+
+def get_new_matches_manager():
+    """Shared NewMatchesManager."""
+    def _create():
+        from newmatches import NewMatchesManager
+        return NewMatchesManager()
+    return get_or_create("new_matches_manager", _create)
+
+
+def get_similarity_index():
+    """Shared similar-homes index of the cached listings."""
+    def _create():
+        from similar import SimilarityIndex
+        return SimilarityIndex(get_question_manager())
+    return get_or_create("similarity_index", _create)
+
+
+def get_map_index():
+    """Shared map clustering index of the cached listings."""
+    def _create():
+        from mapclusters import MapIndex
+        return MapIndex(get_question_manager())
+    return get_or_create("map_index", _create)
@@ -0,0 +1,353 @@
+"""
+Per-session conversation management for long realtor chats.
+
+RollingSummaryConversationManager keeps the model input of every turn roughly the
+same size, however long the conversation gets:
+
+- Only the last few turns are kept verbatim. Older turns are evicted into a rolling,
+  length-capped summary.
+- A structured facts block (search criteria discussed, properties viewed) is kept
+  next to the summary, so evicted details the agent still needs are not lost.
+- Tool results older than the last turn are collapsed to compact references
+  (addresses and property IDs), since the agent can look a property up again.
+
+The summary and facts are sent as the first user message (followed by a short
+assistant acknowledgement so roles keep alternating) and are stored in the session's
+conversation manager state, so they survive across requests and cold starts.
+
+Usage:
+    agent = Agent(..., conversation_manager=RollingSummaryConversationManager())
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+from strands.agent.conversation_manager import ConversationManager
+from strands.types.exceptions import ContextWindowOverflowException
+
+from intents import format_price, parse_tool_result, properties_in, property_id_of
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent turns (user message plus the agent's tool calls and answer) kept verbatim
+CONVERSATION_WINDOW_TURNS = int(os.environ.get("CONVERSATION_WINDOW_TURNS", "4"))
+CONVERSATION_SUMMARY_MAX_CHARS = int(os.environ.get("CONVERSATION_SUMMARY_MAX_CHARS", "2000"))
+CONVERSATION_FACTS_MAX_PROPERTIES = int(os.environ.get("CONVERSATION_FACTS_MAX_PROPERTIES", "15"))
+# Tool results shorter than this are already compact and are kept as they are
+COLLAPSE_MIN_CHARS = 300
+# Characters of a turn's user and assistant text kept in the summary
+SUMMARY_SNIPPET_CHARS = 200
+
+SUMMARY_HEADER = "Summary of the earlier conversation (older turns were removed to save context):"
+SUMMARY_ACK = "Understood. I'll keep this summary and these facts in mind."
+COLLAPSED_NOTE = "Earlier tool result collapsed to save context; use get_property_info_from_db for details"
+COLLAPSED_PREFIX = '{"collapsed": '
+# Properties listed in a collapsed property result
+COLLAPSED_MAX_PROPERTIES = 10
+
+# Tool input fields that record search criteria, by facts key
+CRITERIA_FIELDS = {
+    "city": "cities",
+    "zipCode": "zip_codes",
+    "propertyType": "property_types",
+    "bedrooms": "bedrooms",
+    "bathrooms": "bathrooms",
+    "price": "price",
+    "squareFootage": "square_footage",
+}
+CRITERIA_LABELS = {
+    "cities": "Cities",
+    "zip_codes": "Zip codes",
+    "property_types": "Property types",
+    "bedrooms": "Bedrooms",
+    "bathrooms": "Bathrooms",
+    "price": "Price",
+    "budget": "Budget mentioned",
+    "square_footage": "Square footage",
+}
+BUDGET = re.compile(r"\b((?:under|below|less than|up to|max(?:imum)?|over|above|at least|around|about)\s+)?"
+                    r"\$\s?\d+(?:[.,]\d+)?\s?(?:k|m|mm|million)?\b", re.IGNORECASE)
+BEDROOMS = re.compile(r"\b(\d+)\s*\+?\s*(?:bed|beds|bedroom|bedrooms|br|bd)\b", re.IGNORECASE)
+ZIP_CODE = re.compile(r"\b(9[0-6]\d{3})\b")
+
+
+class ConversationFacts(BaseModel):
+    """Facts gathered from the conversation, kept across evictions."""
+    # facts key -> distinct values, oldest first
+    criteria: Dict[str, List[str]] = Field(default_factory=dict)
+    # Viewed properties, most recently viewed last
+    properties: List[Dict[str, Any]] = Field(default_factory=list)
+
+    def add_criterion(self, key: str, value: Any) -> None:
+        value = str(value).strip()
+        if not value:
+            return
+        values = self.criteria.setdefault(key, [])
+        if value not in values:
+            values.append(value)
+
+    def add_property(self, record: Dict[str, Any]) -> None:
+        property_id = property_id_of(record)
+        self.properties = [p for p in self.properties if p["id"] != property_id]
+        self.properties.append({
+            "id": property_id,
+            "formattedAddress": record.get("formattedAddress"),
+            "price": record.get("price"),
+            "bedrooms": record.get("bedrooms"),
+            "bathrooms": record.get("bathrooms"),
+        })
+        del self.properties[:-CONVERSATION_FACTS_MAX_PROPERTIES]
+
+    def add_user_text(self, text: str) -> None:
+        """Pick search criteria out of something the user wrote."""
+        for match in BUDGET.finditer(text):
+            self.add_criterion("budget", re.sub(r"\s+", " ", match.group(0).lower()))
+        for match in BEDROOMS.finditer(text):
+            self.add_criterion("bedrooms", match.group(1))
+        for match in ZIP_CODE.finditer(text):
+            self.add_criterion("zip_codes", match.group(1))
+
+    def add_tool_input(self, tool_input: Dict[str, Any]) -> None:
+        for field, key in CRITERIA_FIELDS.items():
+            if tool_input.get(field) not in (None, ""):
+                self.add_criterion(key, tool_input[field])
+
+    def is_empty(self) -> bool:
+        return not self.criteria and not self.properties
+
+    def render(self) -> str:
+        lines = []
+        if self.criteria:
+            lines.append("Search criteria discussed:")
+            for key, values in self.criteria.items():
+                lines.append(f"- {CRITERIA_LABELS.get(key, key)}: {', '.join(values)}")
+        if self.properties:
+            lines.append("Properties viewed (most recent last):")
+            for prop in self.properties:
+                details = [format_price(prop.get("price"))]
+                if prop.get("bedrooms") is not None:
+                    details.append(f"{prop['bedrooms']} bd")
+                if prop.get("bathrooms") is not None:
+                    details.append(f"{prop['bathrooms']} ba")
+                lines.append(f"- {prop.get('formattedAddress')} (id: {prop['id']}, {', '.join(details)})")
+        return "\n".join(lines)
+
+
+def is_turn_start(message: Dict[str, Any]) -> bool:
+    """True for a user message carrying text (not a tool result), which starts a turn."""
+    content = message.get("content") or []
+    return (message.get("role") == "user"
+            and any("text" in block for block in content)
+            and not any("toolResult" in block for block in content))
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """Text blocks of a message, joined and with whitespace collapsed."""
+    text = " ".join(block["text"] for block in message.get("content") or [] if "text" in block)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def is_summary_message(message: Dict[str, Any]) -> bool:
+    """Whether a message is one of the synthetic summary messages (not part of the chat)."""
+    text = message_text(message)
+    if message.get("role") == "user":
+        return text.startswith(SUMMARY_HEADER)
+    return text == SUMMARY_ACK
+
+
+def snippet(text: str, limit: int = SUMMARY_SNIPPET_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+
+def collapse_tool_result(tool_result: Dict[str, Any], tool_name: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Compact reference replacing the content of an old tool result.
+
+    Property results keep the ID and address of each property (in order, so "the second
+    one" still resolves); anything else keeps a short preview.
+
+    Args:
+        tool_result: toolResult block
+        tool_name: Name of the tool that produced it
+
+    Returns:
+        New content blocks, or None if the result is already compact or collapsed
+    """
+    content = tool_result.get("content") or []
+    text = " ".join(block.get("text", "") if "text" in block else json.dumps(block.get("json"), default=str)
+                    for block in content)
+    if text.startswith(COLLAPSED_PREFIX) or len(text) < COLLAPSE_MIN_CHARS:
+        return None
+
+    reference: Dict[str, Any] = {"collapsed": COLLAPSED_NOTE, "tool": tool_name}
+    properties = [record for value in parse_tool_result(tool_result) for record in properties_in(value)]
+    if properties:
+        reference["count"] = len(properties)
+        reference["properties"] = [
+            {"id": property_id_of(record), "formattedAddress": record.get("formattedAddress"), "price": record.get("price")}
+            for record in properties[:COLLAPSED_MAX_PROPERTIES]
+        ]
+    else:
+        reference["preview"] = snippet(text)
+        reference["characters"] = len(text)
+    return [{"text": json.dumps(reference, default=str)}]
+
+
+class RollingSummaryConversationManager(ConversationManager):
+    """
+    Keeps the last turns verbatim, a rolling summary and facts for older turns, and
+    compact references for old tool results. Create one per session (per Agent).
+    """
+
+    def __init__(self, window_turns: int = CONVERSATION_WINDOW_TURNS,
+                 summary_max_chars: int = CONVERSATION_SUMMARY_MAX_CHARS):
+        """
+        Args:
+            window_turns: Number of most recent turns kept verbatim
+            summary_max_chars: Maximum length of the rolling summary (oldest lines are dropped first)
+        """
+        super().__init__()
+        self.window_turns = max(1, window_turns)
+        self.summary_max_chars = summary_max_chars
+        self.summary_lines: List[str] = []
+        self.summary_truncated = False
+        self.facts = ConversationFacts()
+
+    def restore_from_session(self, state: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Restore the summary and facts; returns the summary messages to prepend."""
+        super().restore_from_session(state)
+        self.summary_lines = list(state.get("summary_lines") or [])
+        self.summary_truncated = bool(state.get("summary_truncated"))
+        self.facts = ConversationFacts(**(state.get("facts") or {}))
+        return self._summary_messages() or None
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            **super().get_state(),
+            "summary_lines": list(self.summary_lines),
+            "summary_truncated": self.summary_truncated,
+            "facts": self.facts.model_dump(),
+        }
+
+    def visible_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Messages to show the user: the conversation without the summary and its acknowledgement."""
+        return [message for message in messages if not is_summary_message(message)]
+
+    def apply_management(self, agent: Any, **kwargs: Any) -> None:
+        """
+        Collapse tool results older than the last turn and evict turns beyond the window.
+
+        Called by the agent after every invocation; call it once after creating an agent
+        from a stored session as well, since the session store keeps full tool results.
+
+        Args:
+            agent: Agent whose messages are managed in place
+        """
+        self._manage(agent, self.window_turns)
+
+    def reduce_context(self, agent: Any, e: Optional[Exception] = None, **kwargs: Any) -> None:
+        """
+        Shrink the context after an overflow: keep only the last turn and collapse its
+        earlier tool results too.
+
+        Raises:
+            ContextWindowOverflowException: If there is nothing left to remove
+        """
+        before = json.dumps(agent.messages, default=str)
+        self._manage(agent, 1, collapse_last_turn=True)
+        if json.dumps(agent.messages, default=str) == before:
+            raise ContextWindowOverflowException("Unable to reduce conversation context further") from e
+
+    def _manage(self, agent: Any, window_turns: int, collapse_last_turn: bool = False) -> None:
+        messages = agent.messages
+        prefix = 2 if self._has_summary(messages) else 0
+        turn_starts = [i for i in range(prefix, len(messages)) if is_turn_start(messages[i])]
+        tool_names = {
+            block["toolUse"]["toolUseId"]: block["toolUse"]["name"]
+            for message in messages for block in message.get("content") or [] if "toolUse" in block
+        }
+
+        # Collapse tool results older than the last turn (or than the last message on overflow)
+        if collapse_last_turn:
+            collapse_end = len(messages) - 1
+        else:
+            collapse_end = turn_starts[-1] if turn_starts else prefix
+        for message in messages[prefix:collapse_end]:
+            for block in message.get("content") or []:
+                if "toolUse" in block:
+                    self.facts.add_tool_input(block["toolUse"].get("input") or {})
+                if "toolResult" not in block:
+                    continue
+                tool_result = block["toolResult"]
+                for value in parse_tool_result(tool_result):
+                    for record in properties_in(value):
+                        self.facts.add_property(record)
+                collapsed = collapse_tool_result(tool_result, tool_names.get(tool_result.get("toolUseId"), "tool"))
+                if collapsed:
+                    block["toolResult"] = {**tool_result, "content": collapsed}
+
+        # Evict whole turns beyond the window into the summary
+        if len(turn_starts) > window_turns:
+            split = turn_starts[-window_turns]
+            evicted = messages[prefix:split]
+            self._summarize(evicted, tool_names)
+            self.removed_message_count += len(evicted)
+            logger.info(f"Evicted {len(evicted)} messages ({len(turn_starts) - window_turns} turns) into the summary")
+            messages[:] = self._summary_messages() + messages[split:]
+        elif prefix:
+            # Refresh the facts shown in the existing summary
+            messages[:prefix] = self._summary_messages()
+
+    def _summarize(self, evicted: List[Dict[str, Any]], tool_names: Dict[str, str]) -> None:
+        """Append one summary line per evicted turn, dropping the oldest lines past the size cap."""
+        turn: Optional[Dict[str, Any]] = None
+        turns = []
+        for message in evicted:
+            if is_turn_start(message):
+                turn = {"user": message_text(message), "tools": [], "answer": ""}
+                turns.append(turn)
+                self.facts.add_user_text(turn["user"])
+                continue
+            if turn is None:
+                continue
+            for block in message.get("content") or []:
+                if "toolUse" in block:
+                    turn["tools"].append(block["toolUse"]["name"])
+            if message.get("role") == "assistant" and message_text(message):
+                turn["answer"] = message_text(message)
+
+        for turn in turns:
+            line = f"- User: \"{snippet(turn['user'])}\""
+            if turn["tools"]:
+                line += f" | Tools: {', '.join(dict.fromkeys(turn['tools']))}"
+            if turn["answer"]:
+                line += f" | Assistant: \"{snippet(turn['answer'])}\""
+            self.summary_lines.append(line)
+
+        while len(self.summary_lines) > 1 and sum(len(line) + 1 for line in self.summary_lines) > self.summary_max_chars:
+            self.summary_lines.pop(0)
+            self.summary_truncated = True
+
+    def _summary_messages(self) -> List[Dict[str, Any]]:
+        """Summary (user) and acknowledgement (assistant) messages, or [] before the first eviction."""
+        if not self.summary_lines:
+            return []
+        lines = [SUMMARY_HEADER]
+        if self.summary_truncated:
+            lines.append("- (earlier turns omitted)")
+        lines.extend(self.summary_lines)
+        if not self.facts.is_empty():
+            lines.extend(["", self.facts.render()])
+        return [
+            {"role": "user", "content": [{"text": "\n".join(lines)}]},
+            {"role": "assistant", "content": [{"text": SUMMARY_ACK}]},
+        ]
+
+    @staticmethod
+    def _has_summary(messages: List[Dict[str, Any]]) -> bool:
+        return (len(messages) >= 2 and messages[0].get("role") == "user"
+                and message_text(messages[0]).startswith(SUMMARY_HEADER))
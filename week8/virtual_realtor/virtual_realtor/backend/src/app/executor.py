@@ -0,0 +1,155 @@
+"""
+Concurrent tool execution for the realtor agent.
+
+When the model asks for several tools in one turn (say get_property_info_from_db for
+three addresses plus search_web), LimitedConcurrentToolExecutor runs them at the same
+time, so the turn takes about as long as its slowest tool instead of the sum:
+
+- At most TOOL_MAX_CONCURRENCY tools run at once, across all agents in the process.
+- Tools listed in TOOL_CONCURRENCY_LIMITS get a lower limit of their own, e.g. to keep
+  RentCast under its rate limit (format: "search_properties=2,search_web=4").
+- Tool results are handed back to the model in the order the tools were requested,
+  not in the order they finished, so the conversation history is deterministic.
+
+The blocking tools in tools.py run on the event loop's default thread pool; call
+install_tool_thread_pool() at startup to give them a dedicated, bounded pool.
+
+Usage:
+    agent = Agent(..., tool_executor=LimitedConcurrentToolExecutor())
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from strands.tools.executors import ConcurrentToolExecutor
+
+logger = logging.getLogger(__name__)
+
+TOOL_MAX_CONCURRENCY = int(os.environ.get("TOOL_MAX_CONCURRENCY", "8"))
+# Per-tool limits; search_properties calls the RentCast API
+DEFAULT_TOOL_CONCURRENCY_LIMITS = {"search_properties": 2}
+
+
+def parse_tool_limits(value: str) -> Dict[str, int]:
+    """
+    Parse per-tool limits from "name=limit,name=limit".
+
+    Args:
+        value: Comma separated name=limit pairs (invalid pairs are ignored)
+
+    Returns:
+        Tool name to concurrency limit
+    """
+    limits = {}
+    for pair in value.split(","):
+        name, _, limit = pair.partition("=")
+        try:
+            if name.strip() and int(limit) > 0:
+                limits[name.strip()] = int(limit)
+        except ValueError:
+            logger.warning(f"Ignoring invalid tool concurrency limit: {pair}")
+    return limits
+
+
+TOOL_CONCURRENCY_LIMITS = {
+    **DEFAULT_TOOL_CONCURRENCY_LIMITS,
+    **parse_tool_limits(os.environ.get("TOOL_CONCURRENCY_LIMITS", "")),
+}
+
+
+class ToolLimiter:
+    """
+    Global and per-tool concurrency limits shared by every agent in the process.
+
+    asyncio semaphores belong to one event loop, so one set is kept per running loop
+    (in the Lambda there is only uvicorn's loop; Agent.__call__ runs each call in a
+    fresh loop).
+    """
+
+    def __init__(self, max_concurrency: int = TOOL_MAX_CONCURRENCY,
+                 tool_limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            max_concurrency: Maximum number of tools running at once
+            tool_limits: Lower limits for specific tools, by tool name
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.tool_limits = dict(TOOL_CONCURRENCY_LIMITS if tool_limits is None else tool_limits)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _semaphore(self, name: str, limit: int) -> asyncio.Semaphore:
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if name not in semaphores:
+            semaphores[name] = asyncio.Semaphore(limit)
+        return semaphores[name]
+
+    @asynccontextmanager
+    async def slot(self, tool_name: str) -> AsyncIterator[None]:
+        """Hold a slot for one run of a tool, waiting for its own limit first."""
+        tool_limit = self.tool_limits.get(tool_name)
+        if tool_limit:
+            async with self._semaphore(f"tool:{tool_name}", tool_limit):
+                async with self._semaphore("*", self.max_concurrency):
+                    yield
+        else:
+            async with self._semaphore("*", self.max_concurrency):
+                yield
+
+
+# Limits for this execution environment
+tool_limiter = ToolLimiter()
+
+
+class LimitedConcurrentToolExecutor(ConcurrentToolExecutor):
+    """
+    Runs the tool uses of a turn concurrently within the limits of a ToolLimiter and
+    returns their results in request order.
+    """
+
+    def __init__(self, limiter: Optional[ToolLimiter] = None):
+        """
+        Args:
+            limiter: Concurrency limits to apply (defaults to the process-wide tool_limiter)
+        """
+        super().__init__()
+        self.limiter = limiter or tool_limiter
+
+    async def _execute(self, agent: Any, tool_uses: list, tool_results: list, *args: Any, **kwargs: Any):
+        finished: list = []
+        async for event in super()._execute(agent, tool_uses, finished, *args, **kwargs):
+            yield event
+
+        order = {tool_use["toolUseId"]: index for index, tool_use in enumerate(tool_uses)}
+        tool_results.extend(sorted(finished, key=lambda result: order.get(result["toolUseId"], len(order))))
+
+    async def _task(self, agent: Any, tool_use: Dict[str, Any], *args: Any, **kwargs: Any) -> None:
+        async with self.limiter.slot(tool_use["name"]):
+            await super()._task(agent, tool_use, *args, **kwargs)
+
+
+def install_tool_thread_pool(loop: Optional[asyncio.AbstractEventLoop] = None,
+                             max_workers: int = TOOL_MAX_CONCURRENCY) -> ThreadPoolExecutor:
+    """
+    Give the event loop a dedicated, bounded default thread pool for blocking tools.
+
+    Strands runs synchronous tools with asyncio.to_thread, which uses the loop's default
+    executor; its stock size depends on the CPU count (5 threads on a 1 vCPU Lambda).
+
+    Args:
+        loop: Event loop to configure (defaults to the running loop)
+        max_workers: Number of threads
+
+    Returns:
+        The installed thread pool
+    """
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+    (loop or asyncio.get_running_loop()).set_default_executor(pool)
+    logger.info(f"Installed tool thread pool with {max_workers} workers")
+    return pool
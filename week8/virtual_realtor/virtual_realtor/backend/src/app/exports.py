@@ -0,0 +1,254 @@
+"""
+Streaming exports of saved properties and visit lists.
+
+Favorites are read page by page from DynamoDB (FavoritesManager.iter_user_favorites)
+and encoded as they arrive, so memory stays bounded by one page (CSV) or one row group
+(Parquet) however long the list is:
+
+- export_chunks() yields the encoded file as byte chunks, for a StreamingResponse.
+- upload_export() sends the same chunks to S3 as a multipart upload (holding at most
+  one part in memory) and returns a presigned download URL, for lists too large to
+  download through the API.
+
+Parquet needs the optional pyarrow dependency (pip install ".[export]"); CSV always
+works.
+"""
+
+import csv
+import io
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+from clients import get_boto_session
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ModuleNotFoundError:
+    PYARROW_AVAILABLE = False
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "200"))
+EXPORT_ROW_GROUP_SIZE = int(os.environ.get("EXPORT_ROW_GROUP_SIZE", "5000"))
+# S3 multipart parts must be at least 5 MiB (except the last)
+EXPORT_PART_SIZE = max(5 * 1024 * 1024, int(os.environ.get("EXPORT_PART_SIZE", str(8 * 1024 * 1024))))
+EXPORT_URL_EXPIRES_SECONDS = int(os.environ.get("EXPORT_URL_EXPIRES_SECONDS", "3600"))
+
+# (column, parquet type) in export order
+EXPORT_COLUMNS = [
+    ("property_id", "string"),
+    ("formattedAddress", "string"),
+    ("city", "string"),
+    ("zipCode", "string"),
+    ("price", "int64"),
+    ("snapshot_price", "int64"),
+    ("bedrooms", "int64"),
+    ("bathrooms", "float64"),
+    ("squareFootage", "int64"),
+    ("propertyType", "string"),
+    ("daysOnMarket", "int64"),
+    ("listingDate", "string"),
+    ("sourceUrl", "string"),
+    ("is_visit_candidate", "bool"),
+    ("favorited_at", "string"),
+    ("last_refreshed_at", "string"),
+]
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def export_filename(fmt: str, visit_only: bool = False) -> str:
+    """Download file name for an export."""
+    name = "visit-list" if visit_only else "saved-properties"
+    return f"{name}-{datetime.utcnow().strftime('%Y%m%d')}.{fmt}"
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], rows_per_chunk: int = EXPORT_PAGE_SIZE) -> Iterator[bytes]:
+    """
+    Encode rows as CSV, yielding a chunk every rows_per_chunk rows.
+
+    Args:
+        rows: Favorite property dictionaries
+        rows_per_chunk: Number of rows per yielded chunk
+
+    Yields:
+        UTF-8 encoded CSV chunks, starting with the header
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[name for name, _ in EXPORT_COLUMNS], extrasaction='ignore')
+    writer.writeheader()
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back in chunks (keeps its offset for tell())."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._offset += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema():
+    types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_()}
+    return pa.schema([(name, types[type_name]) for name, type_name in EXPORT_COLUMNS])
+
+
+def _column_value(value: Any, type_name: str) -> Any:
+    if value is None or value == "":
+        return None
+    try:
+        if type_name == "int64":
+            return int(value)
+        if type_name == "float64":
+            return float(value)
+        if type_name == "bool":
+            return bool(value)
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def iter_parquet(rows: Iterable[Dict[str, Any]], row_group_size: int = EXPORT_ROW_GROUP_SIZE) -> Iterator[bytes]:
+    """
+    Encode rows as Parquet, writing and yielding one row group at a time.
+
+    Args:
+        rows: Favorite property dictionaries
+        row_group_size: Number of rows per row group
+
+    Yields:
+        Chunks of the Parquet file
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Parquet export requires pyarrow")
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    columns: Dict[str, list] = {name: [] for name, _ in EXPORT_COLUMNS}
+    pending = 0
+    try:
+        for row in rows:
+            for name, type_name in EXPORT_COLUMNS:
+                columns[name].append(_column_value(row.get(name), type_name))
+            pending += 1
+            if pending >= row_group_size:
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                columns = {name: [] for name, _ in EXPORT_COLUMNS}
+                pending = 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+    finally:
+        # Writes the footer
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(rows: Iterable[Dict[str, Any]], fmt: str) -> Iterator[bytes]:
+    """
+    Encode rows in an export format.
+
+    Args:
+        rows: Favorite property dictionaries
+        fmt: "csv" or "parquet"
+
+    Returns:
+        Iterator of file chunks
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if fmt == "csv":
+        return iter_csv(rows)
+    if fmt == "parquet":
+        if not PYARROW_AVAILABLE:
+            raise ValueError("Parquet export is not available (pyarrow is not installed)")
+        return iter_parquet(rows)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def upload_export(chunks: Iterable[bytes], bucket: str, key: str, content_type: str,
+                  part_size: int = EXPORT_PART_SIZE,
+                  expires_seconds: int = EXPORT_URL_EXPIRES_SECONDS) -> Dict[str, Any]:
+    """
+    Upload an export to S3 as a multipart upload and presign a download URL.
+
+    Args:
+        chunks: File chunks (e.g. from export_chunks)
+        bucket: S3 bucket name
+        key: Object key
+        content_type: Content type of the object
+        part_size: Size of each uploaded part in bytes (at least 5 MiB)
+        expires_seconds: Lifetime of the presigned URL
+
+    Returns:
+        Dictionary with the object key, its size in bytes and the presigned URL
+    """
+    s3 = get_boto_session().client('s3')
+    upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)['UploadId']
+    parts = []
+    size = 0
+
+    def upload_part(data: bytes) -> None:
+        response = s3.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                  PartNumber=len(parts) + 1, Body=data)
+        parts.append({'PartNumber': len(parts) + 1, 'ETag': response['ETag']})
+
+    try:
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer.extend(chunk)
+            size += len(chunk)
+            while len(buffer) >= part_size:
+                upload_part(bytes(buffer[:part_size]))
+                del buffer[:part_size]
+        if buffer or not parts:
+            upload_part(bytes(buffer))
+        s3.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id,
+                                     MultipartUpload={'Parts': parts})
+    except Exception:
+        s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+    url = s3.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': key},
+                                    ExpiresIn=expires_seconds)
+    logger.info(f"Uploaded export s3://{bucket}/{key} ({size} bytes in {len(parts)} parts)")
+    return {'key': key, 'size': size, 'url': url, 'expires_in': expires_seconds}
@@ -1,12 +1,12 @@
 import os
-import boto3
 import logging
 from datetime import datetime, timedelta
-from decimal import Decimal
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 from pydantic import BaseModel, Field, field_validator, model_validator
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Key, Attr
+from clients import get_dynamodb_resource, get_dynamodb_client
+from serialization import deserialize_item, serialize_item, to_dynamodb, from_dynamodb
+from pricehistory import watcher_item
 
 logger = logging.getLogger(__name__)
 
@@ -49,34 +49,16 @@ class FavoritesManager:
     """Manages user favorites and visit list in DynamoDB"""
 
     def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb')
+        self.dynamodb = get_dynamodb_resource()
         self.table_name = os.environ.get('DDB_TABLE')
         if not self.table_name:
             logger.error("DDB_TABLE environment variable is not set")
             raise ValueError("DDB_TABLE environment variable is required.")
         self.table = self.dynamodb.Table(self.table_name)
+        # Reads go through the low-level client so items decode straight to native types
+        self.client = get_dynamodb_client()
         logger.info(f"FavoritesManager initialized with table: {self.table_name}")
 
-    def _convert_floats_to_decimal(self, obj: Any) -> Any:
-        """Recursively convert float values to Decimal for DynamoDB compatibility."""
-        if isinstance(obj, dict):
-            return {k: self._convert_floats_to_decimal(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_floats_to_decimal(item) for item in obj]
-        elif isinstance(obj, float):
-            return Decimal(str(obj))
-        return obj
-
-    def _convert_decimals_to_float(self, obj: Any) -> Any:
-        """Recursively convert Decimal values to float for JSON serialization."""
-        if isinstance(obj, dict):
-            return {k: self._convert_decimals_to_float(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_decimals_to_float(item) for item in obj]
-        elif isinstance(obj, Decimal):
-            return float(obj)
-        return obj
-
     def _extract_property_snapshot(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
         """Extracts relevant fields from property API response"""
         fields = [
@@ -106,7 +88,7 @@ class FavoritesManager:
         )
         
         item_dict = favorite.model_dump(exclude_none=True)
-        item_dict = self._convert_floats_to_decimal(item_dict)
+        item_dict = to_dynamodb(item_dict)
         
         return {
             'PK': f'USER#{user_id}',
@@ -114,6 +96,13 @@ class FavoritesManager:
             **item_dict
         }
 
+    def _put_favorite(self, user_id: str, property_id: str, item: Dict[str, Any]) -> None:
+        """Write a favorite and its property -> users index item (used to fan out price drops) together"""
+        self.client.transact_write_items(TransactItems=[
+            {'Put': {'TableName': self.table_name, 'Item': serialize_item(item)}},
+            {'Put': {'TableName': self.table_name, 'Item': serialize_item(watcher_item(user_id, property_id))}},
+        ])
+
     def _should_refresh(self, last_refreshed_at: str) -> bool:
         """Check if >24 hours since last refresh"""
         if not last_refreshed_at:
@@ -129,9 +118,9 @@ class FavoritesManager:
             
             logger.info(f"Adding property {property_id} to favorites for user {user_id}")
             
-            self.table.put_item(Item=item)
+            self._put_favorite(user_id, property_id, item)
             
-            return self._convert_decimals_to_float(item)
+            return from_dynamodb(item)
         except ClientError as e:
             logger.error(f"DynamoDB error adding favorite: {e.response['Error']['Message']}")
             raise
@@ -139,23 +128,41 @@ class FavoritesManager:
             logger.error(f"Unexpected error adding favorite: {str(e)}", exc_info=True)
             raise
 
+    def iter_user_favorites(self, user_id: str, visit_only: bool = False, page_size: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream user's favorite properties page by page, in DynamoDB key order.
+
+        Args:
+            user_id: The user's Cognito sub (or anonymous session ID)
+            visit_only: If True, only yield properties in the visit list
+            page_size: Optional number of items to read per DynamoDB page
+
+        Yields:
+            Favorite property dictionaries with native Python values
+        """
+        query_kwargs = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': 'PK = :pk AND begins_with(SK, :sk)',
+            'ExpressionAttributeValues': {
+                ':pk': {'S': f'USER#{user_id}'},
+                ':sk': {'S': 'FAVORITE#'},
+            },
+        }
+        if visit_only:
+            query_kwargs['FilterExpression'] = 'is_visit_candidate = :visit'
+            query_kwargs['ExpressionAttributeValues'][':visit'] = {'BOOL': True}
+        if page_size:
+            query_kwargs['PaginationConfig'] = {'PageSize': page_size}
+
+        paginator = self.client.get_paginator('query')
+        for page in paginator.paginate(**query_kwargs):
+            for item in page.get('Items', []):
+                yield deserialize_item(item)
+
     def get_user_favorites(self, user_id: str, visit_only: bool = False) -> List[Dict[str, Any]]:
         """Retrieve user's favorite properties"""
         try:
-            key_condition = Key('PK').eq(f'USER#{user_id}') & Key('SK').begins_with('FAVORITE#')
-            
-            if visit_only:
-                response = self.table.query(
-                    KeyConditionExpression=key_condition,
-                    FilterExpression=Attr('is_visit_candidate').eq(True)
-                )
-            else:
-                response = self.table.query(
-                    KeyConditionExpression=key_condition
-                )
-                
-            items = response.get('Items', [])
-            items = [self._convert_decimals_to_float(item) for item in items]
+            items = list(self.iter_user_favorites(user_id, visit_only))
             
             # Sort by favorited_at desc
             items.sort(key=lambda x: x.get('favorited_at', ''), reverse=True)
@@ -168,15 +175,16 @@ class FavoritesManager:
     def get_favorite_by_id(self, user_id: str, property_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific favorite property"""
         try:
-            response = self.table.get_item(
+            response = self.client.get_item(
+                TableName=self.table_name,
                 Key={
-                    'PK': f'USER#{user_id}',
-                    'SK': f'FAVORITE#{property_id}'
+                    'PK': {'S': f'USER#{user_id}'},
+                    'SK': {'S': f'FAVORITE#{property_id}'}
                 }
             )
             item = response.get('Item')
             if item:
-                return self._convert_decimals_to_float(item)
+                return deserialize_item(item)
             return None
         except Exception as e:
             logger.error(f"Error getting favorite {property_id} for user {user_id}: {str(e)}")
@@ -186,12 +194,13 @@ class FavoritesManager:
         """Remove property from favorites"""
         try:
             logger.info(f"Removing property {property_id} from favorites for user {user_id}")
-            self.table.delete_item(
-                Key={
-                    'PK': f'USER#{user_id}',
-                    'SK': f'FAVORITE#{property_id}'
-                }
-            )
+            watcher = watcher_item(user_id, property_id)
+            self.client.transact_write_items(TransactItems=[
+                {'Delete': {'TableName': self.table_name,
+                            'Key': serialize_item({'PK': f'USER#{user_id}', 'SK': f'FAVORITE#{property_id}'})}},
+                {'Delete': {'TableName': self.table_name,
+                            'Key': serialize_item({'PK': watcher['PK'], 'SK': watcher['SK']})}},
+            ])
             return True
         except Exception as e:
             logger.error(f"Error removing favorite {property_id}: {str(e)}")
@@ -270,8 +279,7 @@ class FavoritesManager:
                     new_item['user_id'] = to_user_id
                     
                     # Store as new item
-                    new_item_decimal = self._convert_floats_to_decimal(new_item)
-                    self.table.put_item(Item=new_item_decimal)
+                    self._put_favorite(to_user_id, property_id, new_item)
                     merged_count += 1
                 
                 # Delete old session record
@@ -307,7 +315,7 @@ class FavoritesManager:
                 updated_model = FavoriteProperty(**existing)
                 
                 item_dict = updated_model.model_dump(exclude_none=True)
-                item_dict = self._convert_floats_to_decimal(item_dict)
+                item_dict = to_dynamodb(item_dict)
                 
                 item = {
                     'PK': f'USER#{user_id}',
@@ -316,7 +324,7 @@ class FavoritesManager:
                 }
                 
                 self.table.put_item(Item=item)
-                return self._convert_decimals_to_float(item)
+                return from_dynamodb(item)
             
             return existing
         except Exception as e:
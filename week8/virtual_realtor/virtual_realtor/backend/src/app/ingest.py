@@ -0,0 +1,430 @@
+"""
+Bulk ingestion of listing feeds (MLS exports, CSV or JSON Lines) into the property cache.
+
+Listings otherwise enter PROPERTY_INFO one RentCast search or one add_property_info_to_db
+call at a time. ingest() streams a feed from S3 and loads it in one pass:
+
+1. Rows are read as they are downloaded (CSV with a header row, or one JSON object per
+   line; gzip-compressed when the key ends in .gz), so memory use does not grow with
+   the size of the feed.
+2. Each chunk of INGEST_CHUNK_SIZE rows is normalized to the RentCast listing shape
+   (common MLS column names are mapped, numbers coerced) and validated; rows without
+   a usable address are counted as invalid, with the first few errors reported.
+3. Listings are deduplicated by canonical address (case, punctuation and street suffixes
+   normalized, units after the street as in RentCast's formattedAddress). The property
+   ID is derived from it in RentCast's format ("3821-Hargis-St,-Austin,-TX-78723"), so
+   a listing appearing twice in a feed, or already cached from RentCast, maps to one
+   item. The last row of a duplicate wins.
+4. Items are written with BatchWriteItem (25 per request) by INGEST_WRITE_WORKERS
+   threads; unprocessed items are retried with exponential backoff up to
+   INGEST_MAX_ATTEMPTS times. At most two chunks are in flight at a time.
+
+Written items go through the same follow-up as other cache writes (inline change
+processing where configured, write listeners). The report gives the counts and the
+rows per second.
+
+handler() is the Lambda entry point: it takes S3 event notifications (objects created
+under the feed prefix) or {"bucket": ..., "key": ...}. Locally:
+
+    python app/ingest.py s3://bucket/feeds/listings.csv
+"""
+
+import codecs
+import csv
+import gzip
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote_plus
+
+from pydantic import BaseModel
+from changes import PROPERTY_CHANGES_PROCESSING
+from clients import get_boto_session, get_dynamodb_client, get_question_manager
+from propertystore import pack_property_item
+from serialization import serialize_item
+
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", "1000"))
+INGEST_WRITE_WORKERS = int(os.environ.get("INGEST_WRITE_WORKERS", "8"))
+INGEST_MAX_ATTEMPTS = int(os.environ.get("INGEST_MAX_ATTEMPTS", "6"))
+INGEST_TTL_HOURS = int(os.environ.get("INGEST_TTL_HOURS", os.environ.get("PROPERTY_TTL_HOURS", "12")))
+# Invalid rows whose error is included in the report
+INGEST_MAX_ERRORS_REPORTED = 20
+BATCH_WRITE_SIZE = 25
+
+# Feed column (lowercase, without spaces, underscores or dashes) -> RentCast field
+FIELD_ALIASES = {
+    "formattedaddress": "formattedAddress", "fulladdress": "formattedAddress",
+    "addressline1": "addressLine1", "address": "addressLine1", "streetaddress": "addressLine1", "street": "addressLine1",
+    "addressline2": "addressLine2", "unit": "addressLine2", "unitnumber": "addressLine2",
+    "city": "city", "state": "state", "stateorprovince": "state",
+    "zipcode": "zipCode", "zip": "zipCode", "postalcode": "zipCode", "county": "county",
+    "latitude": "latitude", "lat": "latitude", "longitude": "longitude", "lng": "longitude", "lon": "longitude",
+    "propertytype": "propertyType", "type": "propertyType",
+    "bedrooms": "bedrooms", "beds": "bedrooms", "bedroomstotal": "bedrooms",
+    "bathrooms": "bathrooms", "baths": "bathrooms", "bathroomstotal": "bathrooms", "bathroomstotalinteger": "bathrooms",
+    "squarefootage": "squareFootage", "sqft": "squareFootage", "livingarea": "squareFootage",
+    "lotsize": "lotSize", "lotsizesquarefeet": "lotSize", "yearbuilt": "yearBuilt",
+    "status": "status", "standardstatus": "status", "mlsstatus": "status",
+    "price": "price", "listprice": "price", "listingprice": "price",
+    "daysonmarket": "daysOnMarket", "dom": "daysOnMarket",
+    "listeddate": "listedDate", "listingcontractdate": "listedDate", "listdate": "listedDate",
+    "mlsnumber": "mlsNumber", "listingid": "mlsNumber", "mlsid": "mlsNumber", "mlsname": "mlsName",
+}
+INTEGER_FIELDS = {"bedrooms", "squareFootage", "lotSize", "yearBuilt", "price", "daysOnMarket"}
+FLOAT_FIELDS = {"bathrooms", "latitude", "longitude"}
+
+STREET_SUFFIXES = {
+    "street": "St", "st": "St", "avenue": "Ave", "ave": "Ave", "av": "Ave", "boulevard": "Blvd", "blvd": "Blvd",
+    "drive": "Dr", "dr": "Dr", "road": "Rd", "rd": "Rd", "lane": "Ln", "ln": "Ln", "court": "Ct", "ct": "Ct",
+    "place": "Pl", "pl": "Pl", "terrace": "Ter", "ter": "Ter", "circle": "Cir", "cir": "Cir",
+    "parkway": "Pkwy", "pkwy": "Pkwy", "highway": "Hwy", "hwy": "Hwy", "way": "Way", "square": "Sq", "sq": "Sq",
+}
+DIRECTIONS = {"north": "N", "south": "S", "east": "E", "west": "W", "n": "N", "s": "S", "e": "E", "w": "W",
+              "northeast": "NE", "northwest": "NW", "southeast": "SE", "southwest": "SW",
+              "ne": "NE", "nw": "NW", "se": "SE", "sw": "SW"}
+_NON_WORD = re.compile(r"[^\w\s#]")
+
+
+class IngestReport(BaseModel):
+    """Outcome of a feed ingestion"""
+    source: str
+    rows: int = 0
+    valid: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    written: int = 0
+    failed: int = 0
+    retried_batches: int = 0
+    errors: List[str] = []
+    duration_seconds: float = 0.0
+    rows_per_second: float = 0.0
+
+
+def canonical_street(street: str) -> str:
+    """Street address with consistent case, spacing, directions and suffix abbreviations."""
+    words = _NON_WORD.sub(" ", street).split()
+    last = len(words) - 1
+    canonical = []
+    for position, word in enumerate(words):
+        lower = word.lower()
+        # "123 N Main St", "123 Main St W" (but not "123 West St")
+        is_direction = lower in DIRECTIONS and (position == last or (position == 1 and last > 2))
+        is_suffix = lower in STREET_SUFFIXES and position > 1 and (
+            position == last or (position == last - 1 and words[last].lower() in DIRECTIONS))
+        if is_direction:
+            canonical.append(DIRECTIONS[lower])
+        elif is_suffix:
+            canonical.append(STREET_SUFFIXES[lower])
+        elif word[:1].isdigit() or word.startswith("#"):
+            canonical.append(word.upper())
+        else:
+            canonical.append(word.capitalize())
+    return " ".join(canonical)
+
+
+def property_id_of(address: str) -> str:
+    """Property ID of a formatted address, as RentCast builds it ("123-Oak-St,-Fremont,-CA-94539")."""
+    return address.replace(" ", "-")
+
+
+def canonical_address(listing: Dict[str, Any]) -> Optional[str]:
+    """
+    Canonical formatted address of a normalized listing ("123 Oak St, Fremont, CA 94539",
+    "123 Oak St, Apt 2, Fremont, CA 94539").
+
+    Returns:
+        The address, or None if the street, city, state or zip code is missing
+    """
+    street, city, state, zip_code = (listing.get(field) for field in ("addressLine1", "city", "state", "zipCode"))
+    if not (street and city and state and zip_code):
+        return None
+    street = canonical_street(str(street))
+    if listing.get("addressLine2"):
+        unit = canonical_street(str(listing["addressLine2"]))
+        street = f"{street}, {unit if unit.startswith(('#', 'Apt', 'Unit', 'Ste')) else 'Unit ' + unit}"
+    city = " ".join(word.capitalize() for word in _NON_WORD.sub(" ", str(city)).split())
+    return f"{street}, {city}, {str(state).strip().upper()} {str(zip_code).strip()[:5]}"
+
+
+def _coerce(field: str, value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip().replace("$", "").replace(",", "") if field in INTEGER_FIELDS | FLOAT_FIELDS else value.strip()
+        if value == "":
+            return None
+    if field in INTEGER_FIELDS:
+        return int(float(value))
+    if field in FLOAT_FIELDS:
+        return float(value)
+    return value
+
+
+def normalize_row(row: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Convert a feed row to a RentCast-shaped listing.
+
+    Args:
+        row: CSV row or JSON object
+
+    Returns:
+        (listing, None) for a valid row, (None, error) otherwise
+    """
+    listing: Dict[str, Any] = {}
+    for column, value in row.items():
+        if column is None or value is None:
+            continue
+        field = FIELD_ALIASES.get(re.sub(r"[\s_\-]", "", str(column)).lower())
+        if field is None or field in listing:
+            continue
+        try:
+            value = _coerce(field, value)
+        except (TypeError, ValueError):
+            return None, f"invalid {field}: {value!r}"
+        if value is not None:
+            listing[field] = value
+
+    if "addressLine1" not in listing and listing.get("formattedAddress"):
+        # "123 Oak St, Fremont, CA 94539" or "123 Oak St, Apt 2, Fremont, CA 94539"
+        parts = [part.strip() for part in str(listing["formattedAddress"]).split(",")]
+        if len(parts) >= 3:
+            listing["addressLine1"] = parts[0]
+            if len(parts) >= 4:
+                listing.setdefault("addressLine2", parts[1])
+            listing.setdefault("city", parts[-2])
+            state_zip = parts[-1].split()
+            if len(state_zip) == 2:
+                listing.setdefault("state", state_zip[0])
+                listing.setdefault("zipCode", state_zip[1])
+    address = canonical_address(listing)
+    if address is None:
+        return None, "missing address (street, city, state and zip code are required)"
+    zip_code = str(listing["zipCode"]).strip()[:5]
+    if not zip_code.isdigit() or len(zip_code) != 5:
+        return None, f"invalid zipCode: {listing['zipCode']!r}"
+
+    listing.update(formattedAddress=address, addressLine1=canonical_street(str(listing["addressLine1"])), zipCode=zip_code, state=str(listing["state"]).strip().upper(),
+                   city=address.split(", ")[-2], id=property_id_of(address))
+    listing.setdefault("status", "Active")
+    return listing, None
+
+
+def iter_feed_rows(lines: Iterable[str], fmt: str) -> Iterator[Dict[str, Any]]:
+    """
+    Parse feed lines into rows.
+
+    Args:
+        lines: Text lines of the feed
+        fmt: "csv" or "jsonl"
+
+    Yields:
+        Row dictionaries (a JSON line that does not parse yields {"_error": ...})
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            yield row if isinstance(row, dict) else {"_error": "JSON line is not an object"}
+        except json.JSONDecodeError as e:
+            yield {"_error": f"invalid JSON: {e.msg}"}
+
+
+def feed_format(key: str) -> str:
+    """Feed format from an object key (.csv or .jsonl/.ndjson/.json, optionally .gz)."""
+    name = key.lower().removesuffix(".gz")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    raise ValueError(f"Unsupported feed format: {key}")
+
+
+def iter_s3_lines(bucket: str, key: str) -> Iterator[str]:
+    """Stream the decoded text lines of an S3 object (decompressing .gz objects)."""
+    body = get_boto_session().client('s3').get_object(Bucket=bucket, Key=key)['Body']
+    stream = gzip.GzipFile(fileobj=body) if key.lower().endswith(".gz") else body
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    for block in iter(lambda: stream.read(1024 * 1024), b""):
+        lines = (pending + decoder.decode(block)).split("\n")
+        # Keep the partial last line for the next block
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+class BatchWriter:
+    """Parallel BatchWriteItem writer retrying unprocessed items"""
+
+    def __init__(self, workers: int = INGEST_WRITE_WORKERS, max_attempts: int = INGEST_MAX_ATTEMPTS):
+        self.client = get_dynamodb_client()
+        self.table_name = os.environ.get('DDB_TABLE')
+        if not self.table_name:
+            logger.error("DDB_TABLE environment variable is not set")
+            raise ValueError("DDB_TABLE environment variable is required.")
+        self.max_attempts = max_attempts
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-writer")
+
+    def submit(self, items: List[Dict[str, Any]]) -> List[Future]:
+        """
+        Write items (low-level format) in batches of 25 on the worker threads.
+
+        Returns:
+            One future per batch, resolving to (failed item count, retried)
+        """
+        return [self.executor.submit(self._write_batch, items[start:start + BATCH_WRITE_SIZE])
+                for start in range(0, len(items), BATCH_WRITE_SIZE)]
+
+    def _write_batch(self, items: List[Dict[str, Any]]) -> Tuple[int, bool]:
+        request = {self.table_name: [{'PutRequest': {'Item': item}} for item in items]}
+        for attempt in range(self.max_attempts):
+            if attempt:
+                # Full-jitter exponential backoff, as for throttling
+                time.sleep(random.uniform(0, min(5.0, 0.05 * 2 ** attempt)))
+            response = self.client.batch_write_item(RequestItems=request)
+            unprocessed = response.get('UnprocessedItems') or {}
+            if not unprocessed.get(self.table_name):
+                return 0, attempt > 0
+            request = unprocessed
+        failed = len(request[self.table_name])
+        logger.error(f"{failed} items still unprocessed after {self.max_attempts} attempts")
+        return failed, True
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ingest_rows(rows: Iterable[Dict[str, Any]], source: str, ttl_hours: int = INGEST_TTL_HOURS,
+                chunk_size: int = INGEST_CHUNK_SIZE, workers: int = INGEST_WRITE_WORKERS) -> IngestReport:
+    """
+    Normalize, deduplicate and write feed rows to the property cache.
+
+    Args:
+        rows: Feed rows (CSV rows or JSON objects)
+        source: Feed name for the report
+        ttl_hours: Time-to-live of the cached listings
+        chunk_size: Rows validated and written together
+        workers: Parallel BatchWriteItem threads
+
+    Returns:
+        IngestReport
+    """
+    started = time.perf_counter()
+    report = IngestReport(source=source)
+    questions = get_question_manager()
+    writer = BatchWriter(workers=workers)
+    # Hashes of the property IDs written so far, to count duplicates across chunks
+    seen = set()
+    in_flight: List[Tuple[List[Future], Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]] = []
+
+    def finish(futures: List[Future], items: Dict[str, Dict[str, Any]], old_items: Dict[str, Dict[str, Any]]) -> None:
+        for future in futures:
+            failed, retried = future.result()
+            report.failed += failed
+            report.retried_batches += retried
+        questions.after_property_writes(items, old_items)
+
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            items: Dict[str, Dict[str, Any]] = {}
+            for row in chunk:
+                report.rows += 1
+                listing, error = (None, row["_error"]) if "_error" in row else normalize_row(row)
+                if listing is None:
+                    report.invalid += 1
+                    if len(report.errors) < INGEST_MAX_ERRORS_REPORTED:
+                        report.errors.append(f"row {report.rows}: {error}")
+                    continue
+                report.valid += 1
+                item_data = questions.property_item(listing, ttl_hours)
+                if item_data['SK'] in items or hash(item_data['SK']) in seen:
+                    report.duplicates += 1
+                items[item_data['SK']] = item_data
+            seen.update(hash(property_id) for property_id in items)
+
+            # A listing repeated in the chunk still being written: let that write land first
+            if in_flight and not in_flight[-1][1].keys().isdisjoint(items):
+                finish(*in_flight.pop(0))
+            old_items = questions.get_property_items(list(items)) if PROPERTY_CHANGES_PROCESSING == 'inline' else {}
+            futures = writer.submit([serialize_item(pack_property_item(item)) for item in items.values()])
+            in_flight.append((futures, items, old_items))
+            # Bound memory: at most this chunk and the previous one are in flight
+            while len(in_flight) > 1:
+                finish(*in_flight.pop(0))
+        while in_flight:
+            finish(*in_flight.pop(0))
+    finally:
+        writer.close()
+
+    report.written = len(seen) - report.failed
+    report.duration_seconds = round(time.perf_counter() - started, 3)
+    report.rows_per_second = round(report.rows / report.duration_seconds, 1) if report.duration_seconds else 0.0
+    logger.info(f"Ingested {source}: {report.rows} rows, {report.written} written, {report.invalid} invalid, "
+                f"{report.duplicates} duplicates, {report.failed} failed ({report.rows_per_second} rows/s)")
+    return report
+
+
+def ingest(bucket: str, key: str, ttl_hours: int = INGEST_TTL_HOURS) -> IngestReport:
+    """
+    Ingest a CSV or JSON Lines feed stored in S3.
+
+    Args:
+        bucket: S3 bucket
+        key: Object key (.csv, .jsonl, .ndjson or .json, optionally .gz)
+        ttl_hours: Time-to-live of the cached listings
+
+    Returns:
+        IngestReport
+    """
+    fmt = feed_format(key)
+    logger.info(f"Ingesting s3://{bucket}/{key} ({fmt})")
+    return ingest_rows(iter_feed_rows(iter_s3_lines(bucket, key), fmt), source=f"s3://{bucket}/{key}",
+                       ttl_hours=ttl_hours)
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda entry point.
+
+    Takes S3 event notifications (one ingestion per created object) or
+    {"bucket": ..., "key": ..., "ttl_hours": ...}.
+    """
+    if event.get('Records'):
+        objects = [(record['s3']['bucket']['name'], unquote_plus(record['s3']['object']['key']))
+                   for record in event['Records'] if 's3' in record]
+    else:
+        objects = [(event['bucket'], event['key'])]
+    ttl_hours = int(event.get('ttl_hours') or INGEST_TTL_HOURS)
+    return {'reports': [ingest(bucket, key, ttl_hours).model_dump() for bucket, key in objects]}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2 or not sys.argv[1].startswith("s3://"):
+        sys.exit("Usage: python app/ingest.py s3://bucket/path/to/feed.csv")
+    feed_bucket, _, feed_key = sys.argv[1][len("s3://"):].partition("/")
+    print(ingest(feed_bucket, feed_key).model_dump_json(indent=2))
@@ -0,0 +1,563 @@
+"""
+Deterministic routing of favorites and visit-list commands.
+
+Messages like "save this one", "show my visit list" or "remove 123 Main St from
+favorites" need no reasoning: the router classifies them with a few rules, scores
+its confidence with a small hand-weighted logistic model and, when confident,
+resolves the target property against the conversation's listings and the user's
+saved properties and answers directly through FavoritesManager, without a model
+call. Anything it is unsure about (low confidence, an ambiguous or unknown target,
+anonymous users) is left to the agent.
+
+Routed exchanges are recorded in the session as the equivalent tool call, so the
+history the agent sees later is the same as if it had handled the command itself.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import time
+import uuid
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+import toolmemo
+from clients import get_favorites_manager, get_question_manager
+
+logger = logging.getLogger(__name__)
+
+INTENT_ROUTER_ENABLED = os.environ.get("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+# Below this confidence the message goes to the agent
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.environ.get("INTENT_ROUTER_MIN_CONFIDENCE", "0.75"))
+# How many recent messages are searched for property listings
+INTENT_ROUTER_HISTORY_MESSAGES = int(os.environ.get("INTENT_ROUTER_HISTORY_MESSAGES", "20"))
+
+
+class Intent(str, Enum):
+    SAVE_FAVORITE = "save_favorite"
+    ADD_VISIT = "add_visit"
+    LIST_FAVORITES = "list_favorites"
+    LIST_VISITS = "list_visits"
+    REMOVE_FAVORITE = "remove_favorite"
+    REMOVE_VISIT = "remove_visit"
+
+
+LIST_INTENTS = {Intent.LIST_FAVORITES, Intent.LIST_VISITS}
+
+# Tool the router stands in for, recorded in the session history
+INTENT_TOOLS = {
+    Intent.SAVE_FAVORITE: "add_property_to_favorites",
+    Intent.ADD_VISIT: "add_property_to_visit_list",
+    Intent.LIST_FAVORITES: "get_user_saved_properties",
+    Intent.LIST_VISITS: "get_user_saved_properties",
+    Intent.REMOVE_FAVORITE: "remove_property_from_favorites",
+    Intent.REMOVE_VISIT: "remove_property_from_visit_list",
+}
+
+REMOVE_VERBS = re.compile(r"\b(remove|delete|drop|unsave|unfavorite|take\b.*\boff)\b")
+LIST_VERBS = re.compile(r"^(please |can you |could you )?(show|list|display|view|open|see|get|what|which|pull up)\b")
+SAVE_VERBS = re.compile(r"\b(save|favorite|favourite|bookmark)\b")
+# "add"/"keep"/"put" only save when their object is a list ("add it to my favorites"),
+# not in "add a pool to it" or "keep it under 1.2M"
+ADD_VERBS = re.compile(r"\b(add|keep|put)\b")
+LIST_ADD = re.compile(
+    r"\b(add|keep|put)\b.*\b(to|in|on|onto|into) (my |the |your )?"
+    r"(visit(ing)? list|tour list|favorites|favourites|favorite list|saved( homes| properties| list)?)\b"
+)
+VISIT_VERBS = re.compile(r"\b(tour|visit|see (it|this|that)( one| place| home| house)? in person|schedule a (visit|showing|tour))\b")
+VISIT_NOUN = re.compile(r"\b(visit(ing)? list|visits|tour list|showings?)\b")
+FAVORITES_NOUN = re.compile(r"\b(favorites|favourites|favorite list|saved( (homes|houses|properties|listings|list))?|have i saved)\b")
+NEGATION = re.compile(r"\b(don'?t|do not|never|not|no longer want to)\b")
+# Anything that needs the agent: details, comparisons, searches, explanations
+OTHER_TOPIC = re.compile(
+    r"\b(why|how|tell me|explain|school|schools|neighborhood|commute|mortgage|tax|taxes|hoa|crime|"
+    r"compare|versus|vs|difference|similar|search|find|look for|recommend|cheapest|cheaper|most|least|"
+    r"best|biggest|largest|smallest|newest|oldest|closest|price history|market)\b"
+)
+# Search criteria and features: the message is about what the home should be like
+CONSTRAINT = re.compile(
+    r"\b(under|over|below|above|more|less|fewer|at least|at most|max|min|budget|pool|garage|yard|view|"
+    r"bed|beds|bedrooms?|bath|baths|bathrooms?|sq ?ft|square feet|mind|going)\b"
+)
+# A second clause after the command ("..., keep going", "... and tell me more")
+TRAILING_CLAUSE = re.compile(r"(,|;| and | but | so | then | because | since | while )\s*\w")
+
+ORDINALS = {
+    "first": 0, "1st": 0, "second": 1, "2nd": 1, "third": 2, "3rd": 2, "fourth": 3, "4th": 3,
+    "fifth": 4, "5th": 4, "sixth": 5, "6th": 5, "seventh": 6, "7th": 6, "eighth": 7, "8th": 7,
+    "ninth": 8, "9th": 8, "tenth": 9, "10th": 9, "last": -1,
+}
+ORDINAL = re.compile(r"\b(?:the )?(" + "|".join(ORDINALS) + r")\b|(?:#|number |no\. ?)(\d{1,2})\b")
+ANAPHORA = re.compile(
+    r"\b(this|that|it)( one| home| house| property| listing| place| condo| townhouse| townhome)?\b"
+)
+
+STREET_SUFFIXES = {
+    "street": "st", "avenue": "ave", "road": "rd", "drive": "dr", "boulevard": "blvd",
+    "lane": "ln", "court": "ct", "place": "pl", "terrace": "ter", "circle": "cir",
+    "parkway": "pkwy", "highway": "hwy", "square": "sq", "trail": "trl",
+}
+ADDRESS = re.compile(
+    r"\b(\d+[a-z]?\s+(?:[a-z0-9'.-]+\s+){0,4}?(?:" + "|".join(sorted(set(STREET_SUFFIXES) | set(STREET_SUFFIXES.values())))
+    + r"|way)\b\.?(?:\s*(?:#|apt|unit)\s*[a-z0-9-]+)?)"
+)
+
+# Feature weights of the confidence scorer (logistic, bias included)
+SCORER_WEIGHTS = {
+    "bias": -1.0,
+    "verb_at_start": 1.5,
+    "list_noun": 1.5,
+    "target": 1.5,
+    "short": 0.8,
+    "long": -2.0,
+    "competing_intents": -1.5,
+    "other_topic": -3.5,
+    "question": -1.0,
+    "negation": -3.0,
+    "constraint": -3.0,
+    "trailing_clause": -1.5,
+}
+
+
+class Target(BaseModel):
+    """Property reference found in a message."""
+    kind: str  # "address", "ordinal" or "anaphora"
+    address: Optional[str] = None
+    index: Optional[int] = None
+
+
+class IntentMatch(BaseModel):
+    """Classified command with its confidence."""
+    intent: Intent
+    confidence: float
+    target: Optional[Target] = None
+    features: Dict[str, float] = {}
+
+
+class RoutedReply(BaseModel):
+    """Deterministic answer to a routed command."""
+    intent: Intent
+    confidence: float
+    reply: str
+    # Messages recording the exchange in the session (user, tool use, tool result, answer)
+    messages: List[Dict[str, Any]]
+    latency_ms: float
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, trim and collapse whitespace and trailing punctuation."""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return re.sub(r"[.!]+$", "", text).strip()
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical form of a street address for matching.
+
+    Args:
+        address: Address as typed or as formatted by the listings API
+
+    Returns:
+        Lowercase address without punctuation and with abbreviated street suffixes
+    """
+    words = re.sub(r"[^a-z0-9# ]", " ", address.lower()).split()
+    return " ".join(STREET_SUFFIXES.get(word, word) for word in words)
+
+
+def find_target(text: str) -> Optional[Target]:
+    """
+    Find the property a command refers to.
+
+    Args:
+        text: Normalized message text
+
+    Returns:
+        Address, ordinal or anaphoric reference, or None if the message names no property
+    """
+    address = ADDRESS.search(text)
+    if address:
+        return Target(kind="address", address=address.group(1))
+    ordinal = ORDINAL.search(text)
+    if ordinal:
+        index = ORDINALS[ordinal.group(1)] if ordinal.group(1) else int(ordinal.group(2)) - 1
+        if index >= -1:
+            return Target(kind="ordinal", index=index)
+    if ANAPHORA.search(text):
+        return Target(kind="anaphora")
+    return None
+
+
+def classify(prompt: str) -> Optional[IntentMatch]:
+    """
+    Classify a chat message as a favorites or visit-list command.
+
+    Args:
+        prompt: Chat message
+
+    Returns:
+        Intent with its confidence and target, or None if no rule matches
+    """
+    text = normalize_text(prompt)
+    if not text:
+        return None
+
+    remove = bool(REMOVE_VERBS.search(text))
+    list_verb = bool(LIST_VERBS.search(text))
+    list_add = bool(LIST_ADD.search(text))
+    save = bool(SAVE_VERBS.search(text)) or list_add
+    visit_noun = bool(VISIT_NOUN.search(text))
+    # "visit" in "visit list" names the list, it is not a request to visit
+    visit_verb = bool(VISIT_VERBS.search(VISIT_NOUN.sub(" ", text)))
+    favorites_noun = bool(FAVORITES_NOUN.search(text))
+    target = find_target(text)
+
+    if remove:
+        intent = Intent.REMOVE_VISIT if visit_noun else Intent.REMOVE_FAVORITE
+    elif list_verb and (visit_noun or favorites_noun) and (target is None or target.kind == "anaphora"):
+        # "what's on my visit list" has no target; "show me this one" is not a list request
+        intent = Intent.LIST_VISITS if visit_noun else Intent.LIST_FAVORITES
+        target = None
+    elif visit_noun or visit_verb:
+        intent = Intent.ADD_VISIT
+    elif save:
+        intent = Intent.SAVE_FAVORITE
+    else:
+        return None
+
+    words = text.split()
+    families = sum([remove, list_verb and not target, save and not visit_noun and not remove, visit_verb])
+    features = {
+        "bias": 1.0,
+        "verb_at_start": 1.0 if (REMOVE_VERBS.search(" ".join(words[:3])) or LIST_VERBS.search(text)
+                                 or SAVE_VERBS.search(" ".join(words[:3]))
+                                 or (list_add and ADD_VERBS.search(" ".join(words[:3])))
+                                 or VISIT_VERBS.search(" ".join(words[:4]))) else 0.0,
+        "list_noun": 1.0 if (visit_noun or favorites_noun) else 0.0,
+        "target": 1.0 if (target is not None) == (intent not in LIST_INTENTS) else 0.0,
+        "short": 1.0 if len(words) <= 10 else 0.0,
+        "long": 1.0 if len(words) > 20 else 0.0,
+        "competing_intents": 1.0 if families > 1 else 0.0,
+        "other_topic": 1.0 if OTHER_TOPIC.search(text) else 0.0,
+        "question": 1.0 if text.endswith("?") and intent not in LIST_INTENTS else 0.0,
+        "negation": 1.0 if NEGATION.search(text) else 0.0,
+        "constraint": 1.0 if CONSTRAINT.search(text) else 0.0,
+        "trailing_clause": 1.0 if TRAILING_CLAUSE.search(text) else 0.0,
+    }
+    score = sum(SCORER_WEIGHTS[name] * value for name, value in features.items())
+    confidence = 1.0 / (1.0 + math.exp(-score))
+    return IntentMatch(intent=intent, confidence=round(confidence, 3), target=target, features=features)
+
+
+def property_id_of(record: Dict[str, Any]) -> Optional[str]:
+    """Property ID of a listing or a saved-property record."""
+    return record.get("id") or record.get("property_id")
+
+
+def properties_in(value: Any) -> List[Dict[str, Any]]:
+    """Property records contained in a parsed tool result."""
+    if isinstance(value, dict):
+        if isinstance(value.get("items"), list):
+            return properties_in(value["items"])
+        if isinstance(value.get("properties"), list):
+            return properties_in(value["properties"])
+        return [value] if property_id_of(value) and value.get("formattedAddress") else []
+    if isinstance(value, list):
+        return [item for item in value
+                if isinstance(item, dict) and property_id_of(item) and item.get("formattedAddress")]
+    return []
+
+
+def parse_tool_result(tool_result: Dict[str, Any]) -> List[Any]:
+    """JSON values in the content blocks of a tool result (text blocks that are not JSON are skipped)."""
+    values = []
+    for content in tool_result.get("content") or []:
+        if "json" in content:
+            values.append(content["json"])
+        elif "text" in content:
+            try:
+                values.append(json.loads(content["text"]))
+            except (TypeError, ValueError):
+                continue
+    return values
+
+
+def conversation_listings(messages: List[Dict[str, Any]],
+                          max_messages: int = INTENT_ROUTER_HISTORY_MESSAGES) -> List[List[Dict[str, Any]]]:
+    """
+    Property listings returned by tools in the recent conversation.
+
+    Args:
+        messages: Agent messages
+        max_messages: Number of most recent messages to search
+
+    Returns:
+        One list of property records per tool result, most recent first
+    """
+    listings = []
+    for message in reversed(messages[-max_messages:]):
+        for block in reversed(message.get("content") or []):
+            if "toolResult" not in block:
+                continue
+            for parsed in parse_tool_result(block["toolResult"]):
+                properties = properties_in(parsed)
+                if properties:
+                    listings.append(properties)
+    return listings
+
+
+def match_address(address: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Records whose address starts with the given (street) address.
+
+    Args:
+        address: Address as typed by the user
+        records: Property records with a formattedAddress
+
+    Returns:
+        Matching records, one per property ID
+    """
+    wanted = normalize_address(address)
+    matches = {}
+    for record in records:
+        if normalize_address(record.get("formattedAddress", "")).startswith(wanted):
+            matches.setdefault(property_id_of(record), record)
+    return list(matches.values())
+
+
+def resolve_target(target: Optional[Target], listings: List[List[Dict[str, Any]]],
+                   favorites: List[Dict[str, Any]], prefer_favorites: bool = False,
+                   known_properties: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Resolve a property reference to exactly one property record.
+
+    Ordinals refer to the most recent listing, "this one" to the most recent listing
+    if it holds a single property, and addresses to any recent listing or saved property.
+
+    Args:
+        target: Reference found in the message
+        listings: Recent conversation listings, most recent first
+        favorites: The user's saved properties
+        prefer_favorites: Match addresses against saved properties first (removals)
+        known_properties: Older properties of the session, matched by address last
+
+    Returns:
+        The property record, or None if the reference is missing, unknown or ambiguous
+    """
+    if target is None:
+        return None
+    if target.kind == "ordinal":
+        if not listings:
+            return None
+        latest = listings[0]
+        if target.index >= len(latest):
+            return None
+        return latest[target.index]
+    if target.kind == "anaphora":
+        if listings and len(listings[0]) == 1:
+            return listings[0][0]
+        return None
+
+    listed = [record for listing in listings for record in listing]
+    sources = [favorites, listed] if prefer_favorites else [listed, favorites]
+    sources.append(known_properties or [])
+    for records in sources:
+        matches = match_address(target.address, records)
+        if len(matches) == 1:
+            return matches[0]
+        if len(matches) > 1:
+            return None
+    return None
+
+
+def format_price(price: Any) -> str:
+    try:
+        return f"${int(price):,}"
+    except (TypeError, ValueError):
+        return "Price n/a"
+
+
+def format_saved_properties(items: List[Dict[str, Any]], visit_only: bool) -> str:
+    """Markdown reply listing the user's saved properties."""
+    if not items:
+        return "Your visit list is empty." if visit_only else "You haven't saved any properties yet."
+    title = "Your visit list" if visit_only else "Your saved properties"
+    lines = [f"{title} ({len(items)}):", ""]
+    for number, item in enumerate(items, start=1):
+        details = [format_price(item.get("price"))]
+        if item.get("bedrooms") is not None:
+            details.append(f"{item['bedrooms']} bd")
+        if item.get("bathrooms") is not None:
+            details.append(f"{item['bathrooms']} ba")
+        if item.get("squareFootage"):
+            details.append(f"{int(item['squareFootage']):,} sqft")
+        line = f"{number}. **{item.get('formattedAddress', property_id_of(item))}** - {' · '.join(details)}"
+        if item.get("is_visit_candidate") and not visit_only:
+            line += " (visit list)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class IntentRouter:
+    """
+    Answers confident favorites and visit-list commands without the agent.
+    """
+
+    def __init__(self, min_confidence: float = INTENT_ROUTER_MIN_CONFIDENCE, favorites_manager=None):
+        """
+        Args:
+            min_confidence: Minimum scorer confidence to answer a command directly
+            favorites_manager: FavoritesManager to use (defaults to the shared one)
+        """
+        self.min_confidence = min_confidence
+        self._favorites_manager = favorites_manager
+
+    @property
+    def favorites_manager(self):
+        return self._favorites_manager or get_favorites_manager()
+
+    def route(self, prompt: str, messages: List[Dict[str, Any]], user_id: Optional[str],
+              known_properties: Optional[List[Dict[str, Any]]] = None) -> Optional[RoutedReply]:
+        """
+        Answer a chat message directly if it is a confident favorites command.
+
+        Args:
+            prompt: Chat message
+            messages: Agent messages of the session
+            user_id: Authenticated user ID (anonymous messages always go to the agent)
+            known_properties: Properties viewed earlier in the session that may no longer be
+                in messages (matched by address only)
+
+        Returns:
+            The routed reply, or None if the agent should handle the message
+        """
+        if not INTENT_ROUTER_ENABLED or not user_id:
+            return None
+        started_at = time.perf_counter()
+
+        match = classify(prompt)
+        if match is None:
+            return None
+        if match.confidence < self.min_confidence:
+            logger.info(f"Intent router deferring {match.intent.value} (confidence {match.confidence}) to agent")
+            return None
+
+        try:
+            result = self._execute(match, messages, user_id, known_properties or [])
+        except Exception as e:
+            logger.error(f"Intent router failed on {match.intent.value}, deferring to agent: {str(e)}")
+            return None
+        finally:
+            if match.intent not in LIST_INTENTS:
+                # Like the favorites tools' @invalidates: drop memoized saved-properties results
+                toolmemo.invalidate_tags(f"favorites:{user_id}")
+        if result is None:
+            logger.info(f"Intent router could not resolve target for {match.intent.value}, deferring to agent")
+            return None
+
+        tool_input, tool_output, reply = result
+        latency_ms = round((time.perf_counter() - started_at) * 1000, 2)
+        logger.info(f"Intent router handled {match.intent.value} (confidence {match.confidence}) in {latency_ms}ms")
+        return RoutedReply(
+            intent=match.intent,
+            confidence=match.confidence,
+            reply=reply,
+            messages=exchange_messages(prompt, INTENT_TOOLS[match.intent], tool_input, tool_output, reply),
+            latency_ms=latency_ms,
+        )
+
+    def _execute(self, match: IntentMatch, messages: List[Dict[str, Any]], user_id: str,
+                 known_properties: List[Dict[str, Any]]) -> Optional[Tuple[Dict[str, Any], str, str]]:
+        """Run a command; returns (tool input, tool output, reply) or None to defer."""
+        manager = self.favorites_manager
+
+        if match.intent in LIST_INTENTS:
+            visit_only = match.intent == Intent.LIST_VISITS
+            items = manager.get_user_favorites(user_id, visit_only)
+            tool_input = {"user_id": user_id, "visit_only": visit_only}
+            return tool_input, json.dumps({"items": items}, default=str), format_saved_properties(items, visit_only)
+
+        removing = match.intent in (Intent.REMOVE_FAVORITE, Intent.REMOVE_VISIT)
+        favorites = manager.get_user_favorites(user_id, visit_only=False)
+        record = resolve_target(match.target, conversation_listings(messages), favorites,
+                                prefer_favorites=removing, known_properties=known_properties)
+        if record is None:
+            return None
+
+        property_id = property_id_of(record)
+        saved = next((item for item in favorites if item.get("property_id") == property_id), None)
+        address = record.get("formattedAddress") or property_id
+        tool_input = {"user_id": user_id, "property_id": property_id}
+
+        if not saved and match.intent in (Intent.SAVE_FAVORITE, Intent.ADD_VISIT) and "bedrooms" not in record:
+            # Collapsed and summarized listings only keep the ID and address; prefer the cached record
+            record = get_question_manager().get_property_info_from_db(property_id=property_id) or record
+
+        if match.intent == Intent.SAVE_FAVORITE:
+            if saved:
+                reply = f"{address} is already in your favorites."
+            else:
+                manager.add_to_favorites(user_id, record, is_visit=False)
+                reply = f"Added {address} to your favorites!"
+        elif match.intent == Intent.ADD_VISIT:
+            if saved and saved.get("is_visit_candidate"):
+                reply = f"{address} is already on your visit list."
+            else:
+                manager.add_to_visit_list(user_id, property_id, None if saved else record)
+                reply = f"Added {address} to your visit list!"
+        elif match.intent == Intent.REMOVE_FAVORITE:
+            if not saved:
+                reply = f"{address} isn't in your favorites."
+            else:
+                manager.remove_from_favorites(user_id, property_id)
+                reply = f"Removed {address} from your favorites."
+        else:
+            if not saved or not saved.get("is_visit_candidate"):
+                reply = f"{address} isn't on your visit list."
+            else:
+                manager.remove_from_visit_list(user_id, property_id)
+                reply = f"Removed {address} from your visit list. It's still in your favorites."
+        return tool_input, reply, reply
+
+
+def exchange_messages(prompt: str, tool_name: str, tool_input: Dict[str, Any],
+                      tool_output: str, reply: str) -> List[Dict[str, Any]]:
+    """
+    Session messages for a routed exchange, shaped like an agent tool call.
+
+    Args:
+        prompt: User message
+        tool_name: Tool the router stood in for
+        tool_input: Tool input
+        tool_output: Tool result text
+        reply: Answer shown to the user
+
+    Returns:
+        User message, tool use, tool result and assistant answer
+    """
+    tool_use_id = f"tooluse_router_{uuid.uuid4().hex[:16]}"
+    return [
+        {"role": "user", "content": [{"text": prompt}]},
+        {"role": "assistant", "content": [{"toolUse": {"toolUseId": tool_use_id, "name": tool_name, "input": tool_input}}]},
+        {"role": "user", "content": [{"toolResult": {"toolUseId": tool_use_id, "status": "success",
+                                                     "content": [{"text": tool_output}]}}]},
+        {"role": "assistant", "content": [{"text": reply}]},
+    ]
+
+
+def record_exchange(agent: Any, messages: List[Dict[str, Any]]) -> None:
+    """
+    Append routed messages to an agent and persist them through its session manager.
+
+    Args:
+        agent: Strands Agent of the session
+        messages: Messages built by exchange_messages
+    """
+    from strands.hooks import MessageAddedEvent
+
+    for message in messages:
+        agent.messages.append(message)
+        agent.hooks.invoke_callbacks(MessageAddedEvent(agent=agent, message=message))
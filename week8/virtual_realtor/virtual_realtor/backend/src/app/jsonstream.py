@@ -0,0 +1,111 @@
+"""
+Incremental parsing of a JSON array streamed by a model.
+
+Models answer "return a JSON array" with text that arrives in small chunks and is
+often wrapped in prose or a code fence. JSONArrayStreamParser is fed those chunks and
+returns each top-level element of the first array as soon as the element is complete,
+so callers can forward it without waiting for the rest of the response. Brackets in the
+prose ("[searching 94539]") open an array without a valid element; such arrays are
+dropped and scanning continues with the next one.
+
+Usage:
+    parser = JSONArrayStreamParser()
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            ...
+"""
+
+import json
+import logging
+from typing import Any, List
+
+logger = logging.getLogger(__name__)
+
+
+class JSONArrayStreamParser:
+    """
+    Yields the elements of the first top-level JSON array with a valid element in a
+    stream of text chunks.
+
+    Text before the opening bracket is skipped. Elements that are not valid JSON are
+    logged and dropped; parsing continues with the next element. An array ending
+    without a valid element is discarded and the next one is looked for, so done is
+    only set once at least one element was returned.
+    """
+
+    def __init__(self):
+        self.skipped = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard the current array and look for the next one."""
+        self.started = False
+        self.done = False
+        self.parsed = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element: List[str] = []
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Consume a chunk of model output.
+
+        Args:
+            chunk: Next piece of the response text
+
+        Returns:
+            Array elements completed by this chunk, in order
+        """
+        items = []
+        for char in chunk:
+            if self.done:
+                break
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                continue
+
+            if self._in_string:
+                self._element.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self._depth == 0 and char in ",]":
+                # End of a top-level element
+                self._finish_element(items)
+                if char == "]":
+                    if self.parsed:
+                        self.done = True
+                    else:
+                        self.reset()
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+            self._element.append(char)
+            if self._depth == 0 and char == "}":
+                # Objects are complete at their closing brace; don't wait for the comma
+                self._finish_element(items)
+        return items
+
+    def _finish_element(self, items: List[Any]) -> None:
+        text = "".join(self._element).strip()
+        self._element = []
+        if not text:
+            return
+        try:
+            items.append(json.loads(text))
+            self.parsed += 1
+        except json.JSONDecodeError:
+            self.skipped += 1
+            logger.warning(f"Skipping invalid array element: {text[:200]}")
@@ -1,25 +1,36 @@
-from fastapi import FastAPI, Request, Response, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, ValidationError, Field, field_validator
+from startup import profiler
+
+with profiler.span("import:fastapi"):
+    from fastapi import FastAPI, Request, HTTPException, Query
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import StreamingResponse
+    from pydantic import BaseModel, ValidationError, Field, field_validator
 from typing import Optional, List
-from strands.agent.conversation_manager import SlidingWindowConversationManager
-from strands import Agent, tool
-from strands.models import BedrockModel
-from strands.session.s3_session_manager import S3SessionManager
-from strands_tools import retrieve
-import boto3
+from contextlib import asynccontextmanager
+with profiler.span("import:strands"):
+    from strands import Agent, tool
+    from strands.session.s3_session_manager import S3SessionManager
 import json
 import logging
 import asyncio
 import os
 import uuid
-import uvicorn
 import re
-from tools import ALL_TOOLS, search_properties, get_property_info_from_db, search_properties_by_location_from_db, get_user_preferences
-from auth import verify_cognito_token
-from preferences import PreferencesManager, UserPreferences, PriceRange, BedroomRange, BathroomRange, SqftRange
-from favorites import FavoritesManager
+with profiler.span("import:app"):
+    from tools import search_properties, get_property_info_from_db, search_properties_by_location_from_db, get_user_preferences, get_all_tools
+    from auth import verify_cognito_token
+    from preferences import UserPreferences, PriceRange, BedroomRange, BathroomRange, SqftRange
+    from serialization import FastJSONResponse, dumps
+    from clients import get_boto_session, get_bedrock_model, get_preferences_manager, get_favorites_manager, get_price_history_manager, get_market_stats_manager, get_property_cache, get_autocomplete_index, get_new_matches_manager, get_similarity_index, get_map_index
+    from suggestions import SuggestionService, SUGGESTIONS_STREAM_WAIT_SECONDS
+    from accounting import TurnAccounting
+    from intents import IntentRouter, record_exchange
+    from conversation import RollingSummaryConversationManager
+    from executor import LimitedConcurrentToolExecutor, install_tool_thread_pool
+    from jsonstream import JSONArrayStreamParser
+    from exports import EXPORT_FORMATS, EXPORT_PAGE_SIZE, PYARROW_AVAILABLE, export_chunks, export_filename, upload_export
+from chatevents import ChatEventStream
+import toolmemo
 
 
 
@@ -31,8 +42,6 @@ realtor_phone="510-468-2232"
 realltor_dre_number="206536433"
 realter_website="https://www.monikarealty.com"
 area_expertise="San Francisco Bay Area"
-# Re-use boto session across invocations
-boto_session = boto3.Session()
 state_bucket_name = os.environ.get("STATE_BUCKET", "")
 if state_bucket_name == "":
     raise ValueError("BUCKET_NAME environment variable is not set.")
@@ -44,38 +53,20 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Models are created lazily through the shared client registry (see clients.py)
 # Main chat model
 model_id = os.environ.get("MODEL_ID", "")
-bedrock_model = BedrockModel(
-    model_id=model_id,
-    # Add Guardrails here
-)
 
 # Property suggestions model (uses Google Gemma for faster responses)
 suggestions_model_id = os.environ.get("SUGGESTIONS_MODEL_ID", "google.gemma-3-4b-it")
-suggestions_bedrock_model = BedrockModel(
-    model_id=suggestions_model_id,
-)
 
 # Question generator model (uses Mistral for quick question generation)
 question_gen_model_id = os.environ.get("QUESTION_GEN_MODEL_ID", "mistral.magistral-small-2509")
-question_gen_bedrock_model = BedrockModel(
-    model_id=question_gen_model_id,
-)
-
-# Initialize managers
-preferences_manager = PreferencesManager()
-favorites_manager = FavoritesManager()
-question_gen_model_id = os.environ.get("QUESTION_GEN_MODEL_ID", "mistral.magistral-small-2509")
-question_gen_bedrock_model = BedrockModel(
-    model_id=question_gen_model_id,
-)
+suggestion_service = SuggestionService(model_id=question_gen_model_id)
+# Answers plain favorites / visit-list commands without a model call
+intent_router = IntentRouter()
 
 current_agent: Agent | None = None
-conversation_manager = SlidingWindowConversationManager(
-    window_size=10,  # Maximum number of messages to keep
-    should_truncate_results=True, # Enable truncating the tool result when a message is too large for the model's context window 
-)
 SYSTEM_PROMPT = f"""
 You are a knowledgeable realtor. 
 You  a digital representative of {realtor_name} their dre id is{realltor_dre_number}
@@ -99,6 +90,15 @@ You have access to following tools:
 11. get_user_saved_properties: Retrieve user's saved properties or visit list.
 12. remove_property_from_favorites: Remove property from favorites completely.
 13. remove_property_from_visit_list: Remove from visit list only (keeps in favorites).
+14. get_property_price_history: get the recorded price changes of a property (e.g. "has the price dropped?").
+15. get_market_stats: get listing count, median/percentile price, price per sq ft and days on market for a zip code or city.
+16. load_market_snapshot: load every active listing of a zip code or city into the database and return its market statistics.
+17. find_similar_properties: find cached listings similar to a property (e.g. "homes like this favorite").
+
+Use get_market_stats first for market questions such as median prices or days on market in an area;
+if it has no statistics for the area, use load_market_snapshot, and only fall back to search_web when that fails.
+When the user asks for homes like a listing or a saved property, use find_similar_properties with its property ID
+rather than guessing search ranges.
 
 Use search_web tool when you need current information about:
    - Neighborhoods and local amenities
@@ -143,7 +143,23 @@ No need to provide the whole story. Do not be verbose. Be brief and to the point
 
 When searching for information via a tool, tell the user you are "trying to get the information".
 """
-app = FastAPI()
+
+# Per-user context, sent after the cached static prompt
+USER_CONTEXT_PROMPT = """Current Context:
+Authenticated User ID: {user_id}
+Use this User ID for any tools that require it (like favorites or preferences)."""
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Imports and module-level setup are done by now; emit the cold start report
+    profiler.report()
+    # Blocking tools run on the loop's default thread pool; size it for concurrent tool calls
+    install_tool_thread_pool()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to allow Authorization header
 app.add_middleware(
@@ -159,23 +175,40 @@ app.add_middleware(
 def session(id: str, user_id: str = None) -> Agent:
     
     session_manager = S3SessionManager(
-        boto_session=boto_session,
+        boto_session=get_boto_session(),
         bucket=state_bucket_name,
         session_id=id,
     )
     
-    # Inject user_id into system prompt if available so agent knows who to save favorites for
-    prompt = SYSTEM_PROMPT
+    # The static prompt (and the tool specs ahead of it) end in a cache point so every
+    # session shares the cached prefix; per-user context goes after the cache point
+    system_prompt = [
+        {"text": SYSTEM_PROMPT},
+        {"cachePoint": {"type": "default"}},
+    ]
+    # Inject user_id if available so agent knows who to save favorites for
     if user_id:
-        prompt += f"\n\nCurrent Context:\nAuthenticated User ID: {user_id}\nUse this User ID for any tools that require it (like favorites or preferences)."
+        system_prompt.append({"text": USER_CONTEXT_PROMPT.format(user_id=user_id)})
     
-    return Agent(
-        conversation_manager=conversation_manager,
-        model=bedrock_model,
+    # Per-turn token, latency and tool accounting
+    accounting = TurnAccounting(endpoint="chat", session_id=id, user_id=user_id)
+    agent = Agent(
+        # One manager per session: it holds the session's rolling summary and facts
+        conversation_manager=RollingSummaryConversationManager(),
+        model=get_bedrock_model(model_id, cache_tools="default"),
         session_manager=session_manager,
-        system_prompt=prompt,
-        tools=ALL_TOOLS,
+        system_prompt=system_prompt,
+        tools=get_all_tools(),
+        # Independent tool calls of a turn run concurrently, within per-tool limits
+        tool_executor=LimitedConcurrentToolExecutor(),
+        # Repeated read-only tool calls of the session are served from memory
+        hooks=[accounting, toolmemo.ToolMemoScope(id)],
+        callback_handler=accounting,
     )
+    # The session store keeps full tool results; collapse old ones before the first model call
+    agent.conversation_manager.apply_management(agent)
+    return agent
+
 
 class ChatRequest(BaseModel):
     prompt: str
@@ -261,26 +294,64 @@ async def chat(chat_request: ChatRequest, request: Request):
     agent = session(session_id, user_id=user_id)
     global current_agent
     current_agent = agent  # Store the current agent for use in tools
-    response = StreamingResponse(
-        generate(agent, session_id, chat_request.prompt, request),
-        media_type="text/event-stream"
-    )
+
+    # Favorites and visit-list commands are answered directly when the router is confident
+    routed = intent_router.route(chat_request.prompt, agent.messages, user_id,
+                                 known_properties=agent.conversation_manager.facts.properties)
+    if routed:
+        stream = generate_routed(agent, session_id, routed)
+    else:
+        stream = generate(agent, session_id, chat_request.prompt, request)
+    response = StreamingResponse(stream, media_type="text/event-stream")
     response.set_cookie(key="session_id", value=session_id)
     return response
 
 async def generate(agent: Agent, session_id: str, prompt: str, request: Request):
     try:
-        async for event in agent.stream_async(prompt):
-            if "data" in event:
-                # The event['data'] is already a string, so we need to JSON stringify it
+        # Tool progress and listing cards are sent as typed events as soon as each
+        # tool returns, so the UI can render results before the model describes them
+        events = ChatEventStream()
+        agent.hooks.add_hook(events)
+        async for name, payload in events.stream(agent, prompt):
+            if name == "text":
+                # The text chunk is already a string, so we need to JSON stringify it
                 # to match the frontend's expectation of receiving JSON-encoded data
-                text_chunk = event['data']
-                yield f"data: {json.dumps(text_chunk)}\n\n"
+                yield f"data: {json.dumps(payload)}\n\n"
+            else:
+                yield f"event: {name}\ndata: {dumps(payload)}\n\n"
+
+        async for event in suggestions_event(agent, session_id):
+            yield event
     except Exception as e:
         logger.error(f"Error in generate: {str(e)}")
         error_message = json.dumps({"error": str(e)})
         yield f"event: error\ndata: {error_message}\n\n"
 
+async def generate_routed(agent: Agent, session_id: str, routed):
+    """Stream a reply produced by the intent router, in the same format as generate()."""
+    try:
+        yield f"data: {json.dumps(routed.reply)}\n\n"
+        # Record the exchange in the session so the agent sees it on the next turn
+        record_exchange(agent, routed.messages)
+
+        async for event in suggestions_event(agent, session_id):
+            yield event
+    except Exception as e:
+        logger.error(f"Error in generate_routed: {str(e)}")
+        error_message = json.dumps({"error": str(e)})
+        yield f"event: error\ndata: {error_message}\n\n"
+
+async def suggestions_event(agent: Agent, session_id: str):
+    """Yield the suggestions SSE event for the conversation, if ready in time."""
+    # Start follow-up suggestions as soon as the answer is complete and send them
+    # as a final event if they are ready in time; otherwise /api/suggestions picks
+    # up the cached (or still running) generation
+    suggestions = await suggestion_service.prefetch(
+        session_id, agent.messages, wait_seconds=SUGGESTIONS_STREAM_WAIT_SECONDS
+    )
+    if suggestions:
+        yield f"event: suggestions\ndata: {json.dumps({'suggestions': suggestions})}\n\n"
+
 @app.get('/api/chat')
 def chat_get(request: Request):
     # Check for authentication
@@ -294,9 +365,10 @@ def chat_get(request: Request):
     session_id = user_id if user_id else request.cookies.get("session_id", str(uuid.uuid4()))
     agent = session(session_id, user_id=user_id)
 
-    # Filter messages to only include first text content
+    # Filter messages to only include first text content; the rolling summary is
+    # model context, not part of the chat shown to the user
     filtered_messages = []
-    for message in agent.messages:
+    for message in agent.conversation_manager.visible_messages(agent.messages):
         if (message.get("content") and 
             len(message["content"]) > 0 and 
             "text" in message["content"][0]):
@@ -307,11 +379,10 @@ def chat_get(request: Request):
                 }]
             })
  
-    response = Response(
-        content=json.dumps({
+    response = FastJSONResponse(
+        content={
             "messages": filtered_messages,
-        }),
-        media_type="application/json",
+        }
     )
     response.set_cookie(key="session_id", value=session_id)
     return response
@@ -331,84 +402,35 @@ async def get_suggestions(request: Request):
             user_id = claims.get('sub')
             
     session_id = user_id if user_id else request.cookies.get("session_id", str(uuid.uuid4()))
-    agent = session(session_id, user_id=user_id)
-    
-    # Build context from conversation history
-    conversation_context = ""
-    if agent.messages:
-        # Get last few messages for context
-        recent_messages = agent.messages[-4:] if len(agent.messages) > 4 else agent.messages
-        for msg in recent_messages:
-            role = msg.get("role", "")
-            if msg.get("content") and len(msg["content"]) > 0 and "text" in msg["content"][0]:
-                text = msg["content"][0]["text"]
-                conversation_context += f"{role}: {text}\n"
-    
-    # Create a prompt to generate suggestions
-    if conversation_context:
-        suggestion_prompt = f"""Based on this conversation history:
-
-{conversation_context}
-
-Generate exactly 4 relevant and short follow-up questions that the user might want to ask about properties for sale. 
-These should be natural questions a potential home buyer would ask.
-Return ONLY the 4 questions as a JSON array, no other information necessary. Format: ["question 1", "question 2", "question 3", "question 4"]"""
-    else:
-        suggestion_prompt = """Generate exactly 4 relevant and short common questions that someone looking for properties might ask a realtor.
-Return ONLY the 4 questions as a JSON array, no other information necessary. Format: ["question 1", "question 2", "question 3", "question 4"]"""
-    
+
     try:
-        # Use an Agent with the Mistral model for fast question generation
-        suggestion_agent = Agent(
-            model=question_gen_bedrock_model,
-            system_prompt="You are a helpful real estate advising assistant that generates relevant real estate questions. Always respond with valid JSON only."
-        )
-        logger.info(f"Creating question generator agent with model: {question_gen_model_id}")
-        
-        response_text = ""
-        async for event in suggestion_agent.stream_async(suggestion_prompt):
-            if "data" in event:
-                response_text += event["data"]
-        
-        # Parse the JSON response
-        import re
-        # Extract JSON array from response
-        json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-        if json_match:
-            suggestions = json.loads(json_match.group())
-            # Ensure we have exactly 4 suggestions
-            suggestions = suggestions[:4]
-        else:
-            # Fallback suggestions if parsing fails
-            suggestions = [
-                "What properties are currently available in the area?",
-                "Can you tell me about the price range of homes?",
-                "What are the features of properties in this neighborhood?",
-                "How is the local school district?"
-            ]
-        
-        response = Response(
-            content=json.dumps({"suggestions": suggestions}),
-            media_type="application/json",
-        )
-        response.set_cookie(key="session_id", value=session_id)
-        return response
-        
+        # Empty conversations and repeated contexts are answered without a model call
+        agent = session(session_id, user_id=user_id)
+        suggestions = await suggestion_service.get_suggestions(session_id, agent.messages)
     except Exception as e:
         logger.error(f"Error generating suggestions: {str(e)}")
         # Return default suggestions on error
-        default_suggestions = [
+        suggestions = [
             "What properties are currently available?",
             "Can you tell me about pricing in the area?",
             "What amenities do the properties have?",
             "How are the local schools?"
         ]
-        response = Response(
-            content=json.dumps({"suggestions": default_suggestions}),
-            media_type="application/json",
-        )
-        response.set_cookie(key="session_id", value=session_id)
-        return response
+
+    response = FastJSONResponse(
+        content={"suggestions": suggestions}
+    )
+    response.set_cookie(key="session_id", value=session_id)
+    return response
+
+def preferences_min_version(request: Request) -> Optional[int]:
+    """
+    Version stamp of the preferences the client last saved (X-Preferences-Version header),
+    so reads never return an older copy cached by this container.
+    """
+    value = request.headers.get('X-Preferences-Version', '')
+    return int(value) if value.isdigit() else None
+
 
 @app.get('/api/user/preferences')
 def get_user_preferences(request: Request):
@@ -430,23 +452,21 @@ def get_user_preferences(request: Request):
         raise HTTPException(status_code=401, detail="Invalid token: missing sub claim")
     
     try:
-        prefs_manager = PreferencesManager()
-        preferences = prefs_manager.get_preferences(user_id)
+        prefs_manager = get_preferences_manager()
+        preferences = prefs_manager.get_preferences(user_id, min_version=preferences_min_version(request))
         
         if preferences:
-            return Response(
-                content=json.dumps(preferences),
-                media_type="application/json",
+            return FastJSONResponse(
+                content=preferences
             )
         else:
             # No preferences found
-            return Response(
-                content=json.dumps({
+            return FastJSONResponse(
+                content={
                     "error": "Preferences not found",
                     "userId": user_id,
                     "hasPreferences": False
-                }),
-                media_type="application/json",
+                },
                 status_code=404
             )
     
@@ -532,14 +552,14 @@ async def update_user_preferences(prefs_request: UserPreferencesRequest, request
         )
         
         # Save preferences
-        prefs_manager = PreferencesManager()
+        prefs_manager = get_preferences_manager()
         result = prefs_manager.save_preferences(preferences)
+        toolmemo.invalidate_tags(f"preferences:{user_id}")
         
         logger.info(f"Preferences saved successfully for user: {user_id}")
         
-        return Response(
-            content=json.dumps(result),
-            media_type="application/json",
+        return FastJSONResponse(
+            content=result
         )
     
     except ValidationError as e:
@@ -552,12 +572,11 @@ async def update_user_preferences(prefs_request: UserPreferencesRequest, request
         
         logger.warning(f"Validation failed for user {user_id}: {error_details}")
         
-        return Response(
-            content=json.dumps({
+        return FastJSONResponse(
+            content={
                 "error": "Validation failed",
                 "details": error_details
-            }),
-            media_type="application/json",
+            },
             status_code=400
         )
     except Exception as e:
@@ -565,13 +584,34 @@ async def update_user_preferences(prefs_request: UserPreferencesRequest, request
         raise HTTPException(status_code=500, detail=f"Failed to save preferences: {str(e)}")
 
 
-@app.get('/api/property-suggestions')
-async def get_property_suggestions(request: Request):
-    """
-    Generate personalized property suggestions based on user preferences.
-    Requires authentication.
-    """
-    # Check for authentication
+PROPERTY_SUGGESTIONS_SYSTEM_PROMPT = """You are a property search assistant.
+Your job: Use the search_properties tool to find properties, then return them as a JSON array.
+
+IMPORTANT: 
+1. Call search_properties with the user's criteria
+2. Take the results and return them as a JSON array
+3. Return ONLY the JSON array, nothing else
+
+JSON format:
+[
+  {
+    "id": "property-id",
+    "address": "Full address",
+    "price": 750000,
+    "beds": 3,
+    "baths": 2.5,
+    "sqft": 1800,
+    "daysOnMarket": 15,
+    "source": "RentCast",
+    "sourceUrl": "https://www.zillow.com/homes/..."
+  }
+]"""
+
+PROPERTY_SUGGESTIONS_TIMEOUT_SECONDS = 60  # 1 minute timeout for suggestions
+
+
+def property_suggestions_user(request: Request) -> str:
+    """Authenticated user ID of a property suggestions request (raises 401 otherwise)."""
     auth_header = request.headers.get('Authorization')
     logger.info(f"Property suggestions request - Auth header present: {auth_header is not None}")
     logger.info(f"Auth header preview: {auth_header[:50] if auth_header else 'None'}...")
@@ -591,94 +631,99 @@ async def get_property_suggestions(request: Request):
         raise HTTPException(status_code=401, detail="Invalid token: missing sub claim")
     
     logger.info(f"Property suggestions request authenticated for user: {user_id}")
-    
+    return user_id
+
+
+def property_suggestions_limit(request: Request) -> int:
     # Get limit from query params
     limit = int(request.query_params.get('limit', '5'))
-    limit = min(limit, 5)  # Cap at 5
+    return min(limit, 5)  # Cap at 5
+
+
+def property_suggestions_agent(user_id: str, preferences: dict, limit: int):
+    """
+    Build the suggestions agent and its search prompt from the user's preferences.
+
+    Returns:
+        Tuple of (agent, prompt)
+    """
+    # Extract search criteria from preferences
+    zip_codes = preferences.get('zipCodes', [])
+    price_range = preferences.get('priceRange', {})
+    bedrooms = preferences.get('bedrooms', {})
+    bathrooms = preferences.get('bathrooms', {})
+
+    accounting = TurnAccounting(endpoint="property-suggestions", session_id=user_id, user_id=user_id)
+    suggestions_agent = Agent(
+        model=get_bedrock_model(suggestions_model_id),  # Use Google Gemma model for faster suggestions
+        system_prompt=PROPERTY_SUGGESTIONS_SYSTEM_PROMPT,
+        tools=[search_properties],  # Only search tool - no get_user_preferences needed
+        hooks=[accounting],
+        callback_handler=accounting,
+    )
+    
+    logger.info(f"Creating suggestions agent with model: {suggestions_model_id}")
+    
+    # Generate suggestions with specific search instructions
+    if zip_codes:
+        zip_instruction = f"Search for properties in zip codes: {', '.join(zip_codes)}"
+    else:
+        zip_instruction = "Search for properties in the San Francisco Bay Area"
+    
+    prompt = f"""{zip_instruction}
+Price range: ${price_range.get('min', 0)} - ${price_range.get('max', 10000000)}
+Bedrooms: {bedrooms.get('min', 1)}-{bedrooms.get('max', 10)}
+Bathrooms: {bathrooms.get('min', 1)}-{bathrooms.get('max', 10)}
+
+Find {limit} properties. Use the search_properties tool and return the results as a JSON array."""
+    return suggestions_agent, prompt
+
+
+def with_source_url(suggestion: dict) -> dict:
+    """Add/fix the Zillow URL of a suggestion."""
+    if 'sourceUrl' not in suggestion or not suggestion['sourceUrl'] or 'zillow.com' not in suggestion.get('sourceUrl', ''):
+        address = suggestion.get('address', '')
+        if address:
+            url_address = address.replace(' ', '-').replace(',', '').replace('.', '')
+            suggestion['sourceUrl'] = f"https://www.zillow.com/homes/{url_address}_rb/"
+        else:
+            suggestion['sourceUrl'] = "https://www.zillow.com"
+    return suggestion
+
+
+NO_PREFERENCES_MESSAGE = "Please set your preferences to receive property suggestions"
+TIMEOUT_MESSAGE = "Request timed out. Please try again."
+AGENT_ERROR_MESSAGE = "Unable to generate suggestions at this time. Please try again."
+
+
+@app.get('/api/property-suggestions')
+async def get_property_suggestions(request: Request):
+    """
+    Generate personalized property suggestions based on user preferences.
+    Requires authentication.
+    """
+    # Check for authentication
+    user_id = property_suggestions_user(request)
+    limit = property_suggestions_limit(request)
     
     try:
         # Get user preferences
-        prefs_manager = PreferencesManager()
-        preferences = prefs_manager.get_preferences(user_id)
+        prefs_manager = get_preferences_manager()
+        preferences = prefs_manager.get_preferences(user_id, min_version=preferences_min_version(request))
         
         if not preferences:
             # No preferences set
-            return Response(
-                content=json.dumps({
+            return FastJSONResponse(
+                content={
                     "suggestions": [],
                     "count": 0,
                     "hasPreferences": False,
-                    "message": "Please set your preferences to receive property suggestions"
-                }),
-                media_type="application/json",
+                    "message": NO_PREFERENCES_MESSAGE
+                }
             )
         
         logger.info(f"Retrieved preferences for user {user_id}, searching for properties...")
-        
-        # Extract search criteria from preferences
-        zip_codes = preferences.get('zipCodes', [])
-        price_range = preferences.get('priceRange', {})
-        bedrooms = preferences.get('bedrooms', {})
-        bathrooms = preferences.get('bathrooms', {})
-        sqft = preferences.get('sqft', {})
-        property_type = preferences.get('propertyType')
-        
-        # Build search criteria text for Agent
-        criteria_text = f"""
-User's search preferences:
-- Zip codes: {', '.join(zip_codes) if zip_codes else 'Not specified'}
-- Price range: ${price_range.get('min', 'Any')} - ${price_range.get('max', 'Any')}
-- Bedrooms: {bedrooms.get('min', 'Any')} - {bedrooms.get('max', 'Any')}
-- Bathrooms: {bathrooms.get('min', 'Any')} - {bathrooms.get('max', 'Any')}
-- Square feet: {sqft.get('min', 'Any')} - {sqft.get('max', 'Any')}
-- Property type: {property_type or 'Any'}
-"""
-        
-        # Create a simpler, faster suggestions prompt
-        SUGGESTIONS_SYSTEM_PROMPT = """You are a property search assistant.
-Your job: Use the search_properties tool to find properties, then return them as a JSON array.
-
-IMPORTANT: 
-1. Call search_properties with the user's criteria
-2. Take the results and return them as a JSON array
-3. Return ONLY the JSON array, nothing else
-
-JSON format:
-[
-  {
-    "id": "property-id",
-    "address": "Full address",
-    "price": 750000,
-    "beds": 3,
-    "baths": 2.5,
-    "sqft": 1800,
-    "daysOnMarket": 15,
-    "source": "RentCast",
-    "sourceUrl": "https://www.zillow.com/homes/..."
-  }
-]"""
-
-        suggestions_agent = Agent(
-            model=suggestions_bedrock_model,  # Use Google Gemma model for faster suggestions
-            system_prompt=SUGGESTIONS_SYSTEM_PROMPT,
-            tools=[search_properties]  # Only search tool - no get_user_preferences needed
-        )
-        
-        logger.info(f"Creating suggestions agent with model: {suggestions_model_id}")
-        
-        # Generate suggestions with specific search instructions
-        if zip_codes:
-            zip_instruction = f"Search for properties in zip codes: {', '.join(zip_codes)}"
-        else:
-            zip_instruction = "Search for properties in the San Francisco Bay Area"
-        
-        prompt = f"""{zip_instruction}
-Price range: ${price_range.get('min', 0)} - ${price_range.get('max', 10000000)}
-Bedrooms: {bedrooms.get('min', 1)}-{bedrooms.get('max', 10)}
-Bathrooms: {bathrooms.get('min', 1)}-{bathrooms.get('max', 10)}
-
-Find {limit} properties. Use the search_properties tool and return the results as a JSON array."""
-        
+        suggestions_agent, prompt = property_suggestions_agent(user_id, preferences, limit)
         
         response_text = ""
         try:
@@ -686,7 +731,7 @@ Find {limit} properties. Use the search_properties tool and return the results a
             async def stream_with_timeout():
                 nonlocal response_text
                 start_time = asyncio.get_event_loop().time()
-                timeout_seconds = 60  # 1 minute timeout for suggestions
+                timeout_seconds = PROPERTY_SUGGESTIONS_TIMEOUT_SECONDS
                 
                 async for event in suggestions_agent.stream_async(prompt):
                     # Check timeout
@@ -702,26 +747,24 @@ Find {limit} properties. Use the search_properties tool and return the results a
         except asyncio.TimeoutError:
             logger.error("Agent timed out generating suggestions")
             # Fallback to empty results
-            return Response(
-                content=json.dumps({
+            return FastJSONResponse(
+                content={
                     "suggestions": [],
                     "count": 0,
                     "hasPreferences": True,
-                    "message": "Request timed out. Please try again."
-                }),
-                media_type="application/json",
+                    "message": TIMEOUT_MESSAGE
+                }
             )
         except Exception as agent_error:
             logger.error(f"Agent error: {str(agent_error)}")
             # Fallback to empty results
-            return Response(
-                content=json.dumps({
+            return FastJSONResponse(
+                content={
                     "suggestions": [],
                     "count": 0,
                     "hasPreferences": True,
-                    "message": "Unable to generate suggestions at this time. Please try again."
-                }),
-                media_type="application/json",
+                    "message": AGENT_ERROR_MESSAGE
+                }
             )
         
         logger.info(f"Suggestions agent raw response length: {len(response_text)}")
@@ -743,41 +786,29 @@ Find {limit} properties. Use the search_properties tool and return the results a
                 suggestions = []
             
             # Limit suggestions
-            suggestions = suggestions[:limit]
-            
-            # Add/fix Zillow URLs
-            for suggestion in suggestions:
-                if 'sourceUrl' not in suggestion or not suggestion['sourceUrl'] or 'zillow.com' not in suggestion.get('sourceUrl', ''):
-                    address = suggestion.get('address', '')
-                    if address:
-                        url_address = address.replace(' ', '-').replace(',', '').replace('.', '')
-                        suggestion['sourceUrl'] = f"https://www.zillow.com/homes/{url_address}_rb/"
-                    else:
-                        suggestion['sourceUrl'] = "https://www.zillow.com"
+            suggestions = [with_source_url(suggestion) for suggestion in suggestions[:limit]]
             
             logger.info(f"Returning {len(suggestions)} property suggestions for user {user_id}")
             
-            return Response(
-                content=json.dumps({
+            return FastJSONResponse(
+                content={
                     "suggestions": suggestions,
                     "count": len(suggestions),
                     "hasPreferences": True
-                }),
-                media_type="application/json",
+                }
             )
             
         except (json.JSONDecodeError, ValueError) as e:
             logger.error(f"Failed to parse suggestions JSON: {str(e)}")
             logger.error(f"Response was: {response_text[:1000]}")
             # Return empty suggestions on parse error
-            return Response(
-                content=json.dumps({
+            return FastJSONResponse(
+                content={
                     "suggestions": [],
                     "count": 0,
                     "hasPreferences": True,
                     "error": "Unable to parse property suggestions"
-                }),
-                media_type="application/json",
+                }
             )
     
     except Exception as e:
@@ -785,6 +816,75 @@ Find {limit} properties. Use the search_properties tool and return the results a
         raise HTTPException(status_code=500, detail="Failed to generate suggestions")
 
 
+@app.get('/api/property-suggestions/stream')
+async def stream_property_suggestions(request: Request):
+    """
+    Server-sent events variant of /api/property-suggestions.
+
+    Each property card is sent as a "suggestion" event as soon as the model has
+    finished writing it, followed by one "summary" event with the same fields as
+    the JSON endpoint minus the suggestions. Requires authentication.
+    """
+    user_id = property_suggestions_user(request)
+    limit = property_suggestions_limit(request)
+
+    try:
+        preferences = get_preferences_manager().get_preferences(user_id, min_version=preferences_min_version(request))
+    except Exception as e:
+        logger.error(f"Error loading preferences for suggestions: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to generate suggestions")
+
+    return StreamingResponse(
+        generate_property_suggestions(user_id, preferences, limit),
+        media_type="text/event-stream"
+    )
+
+
+async def generate_property_suggestions(user_id: str, preferences: Optional[dict], limit: int):
+    def sse(event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+    if not preferences:
+        yield sse("summary", {"count": 0, "hasPreferences": False, "message": NO_PREFERENCES_MESSAGE})
+        return
+
+    count = 0
+    parser = JSONArrayStreamParser()
+    try:
+        suggestions_agent, prompt = property_suggestions_agent(user_id, preferences, limit)
+        start_time = asyncio.get_event_loop().time()
+        async for event in suggestions_agent.stream_async(prompt):
+            if asyncio.get_event_loop().time() - start_time > PROPERTY_SUGGESTIONS_TIMEOUT_SECONDS:
+                logger.warning(f"Suggestions agent timed out after {PROPERTY_SUGGESTIONS_TIMEOUT_SECONDS}s")
+                yield sse("summary", {"count": count, "hasPreferences": True, "message": TIMEOUT_MESSAGE})
+                return
+            if "data" not in event:
+                continue
+            for suggestion in parser.feed(event["data"]):
+                if not isinstance(suggestion, dict):
+                    continue
+                yield sse("suggestion", {"index": count, "suggestion": with_source_url(suggestion)})
+                count += 1
+                if count >= limit:
+                    break
+            if parser.done and not count:
+                # An array without a single card (e.g. a list of zip codes): keep looking
+                parser.reset()
+            if count >= limit or parser.done:
+                # The rest of the response is not needed
+                break
+    except Exception as e:
+        logger.error(f"Agent error: {str(e)}")
+        yield sse("summary", {"count": count, "hasPreferences": True, "message": AGENT_ERROR_MESSAGE})
+        return
+
+    logger.info(f"Streamed {count} property suggestions for user {user_id}")
+    summary = {"count": count, "hasPreferences": True}
+    if not parser.started:
+        summary["error"] = "Unable to parse property suggestions"
+    yield sse("summary", summary)
+
+
 # --- Favorites API Endpoints ---
 
 @app.get("/api/saved-properties")
@@ -804,10 +904,9 @@ async def get_saved_properties(request: Request, visit_only: bool = False):
         raise HTTPException(status_code=401, detail="Invalid token: missing sub")
 
     try:
-        favorites = favorites_manager.get_user_favorites(user_id, visit_only)
-        return Response(
-            content=json.dumps(favorites),
-            media_type="application/json"
+        favorites = get_favorites_manager().get_user_favorites(user_id, visit_only)
+        return FastJSONResponse(
+            content=favorites
         )
     except Exception as e:
         logger.error(f"Error getting favorites: {str(e)}")
@@ -827,10 +926,9 @@ async def get_favorites_count(request: Request):
     user_id = claims.get('sub')
     
     try:
-        counts = favorites_manager.get_favorites_count(user_id)
-        return Response(
-            content=json.dumps(counts),
-            media_type="application/json"
+        counts = get_favorites_manager().get_favorites_count(user_id)
+        return FastJSONResponse(
+            content=counts
         )
     except Exception as e:
         logger.error(f"Error getting counts: {str(e)}")
@@ -855,10 +953,10 @@ async def save_property(request: Request, body: SavePropertyRequest):
     user_id = claims.get('sub')
     
     try:
-        result = favorites_manager.add_to_favorites(user_id, body.property_data, body.is_visit)
-        return Response(
-            content=json.dumps(result),
-            media_type="application/json",
+        result = get_favorites_manager().add_to_favorites(user_id, body.property_data, body.is_visit)
+        toolmemo.invalidate_tags(f"favorites:{user_id}")
+        return FastJSONResponse(
+            content=result,
             status_code=201
         )
     except Exception as e:
@@ -879,10 +977,10 @@ async def delete_property(request: Request, property_id: str):
     user_id = claims.get('sub')
     
     try:
-        favorites_manager.remove_from_favorites(user_id, property_id)
-        return Response(
-            content=json.dumps({"message": "Property removed"}),
-            media_type="application/json"
+        get_favorites_manager().remove_from_favorites(user_id, property_id)
+        toolmemo.invalidate_tags(f"favorites:{user_id}")
+        return FastJSONResponse(
+            content={"message": "Property removed"}
         )
     except Exception as e:
         logger.error(f"Error deleting property: {str(e)}")
@@ -913,10 +1011,11 @@ async def toggle_visit(request: Request, property_id: str, body: ToggleVisitRequ
             # But if we just want to promote existing favorite:
             
             # Helper to check existence
-            existing = favorites_manager.get_favorite_by_id(user_id, property_id)
+            existing = get_favorites_manager().get_favorite_by_id(user_id, property_id)
             if existing:
-                result = favorites_manager.add_to_visit_list(user_id, property_id) # No data needed if exists
-                return Response(content=json.dumps(result), media_type="application/json")
+                result = get_favorites_manager().add_to_visit_list(user_id, property_id) # No data needed if exists
+                toolmemo.invalidate_tags(f"favorites:{user_id}")
+                return FastJSONResponse(content=result)
             else:
                 # Need data to add new.
                 # Try fetching from DB cache
@@ -929,10 +1028,11 @@ async def toggle_visit(request: Request, property_id: str, body: ToggleVisitRequ
                 # Let's return 404 if not found for strict PATCH semantics.
                 raise HTTPException(status_code=404, detail="Property not found in favorites. Use POST to add new property.")
         else:
-            favorites_manager.remove_from_visit_list(user_id, property_id)
+            get_favorites_manager().remove_from_visit_list(user_id, property_id)
+            toolmemo.invalidate_tags(f"favorites:{user_id}")
             # return updated item? 
-            existing = favorites_manager.get_favorite_by_id(user_id, property_id)
-            return Response(content=json.dumps(existing), media_type="application/json")
+            existing = get_favorites_manager().get_favorite_by_id(user_id, property_id)
+            return FastJSONResponse(content=existing)
             
     except HTTPException:
         raise
@@ -940,6 +1040,196 @@ async def toggle_visit(request: Request, property_id: str, body: ToggleVisitRequ
         logger.error(f"Error toggling visit: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update visit status")
 
+@app.get("/api/saved-properties/price-alerts")
+async def get_price_alerts(request: Request, limit: int = 50):
+    """Get price drops on the user's saved properties, most recent first"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+         raise HTTPException(status_code=401, detail="Authentication required")
+    
+    claims = verify_cognito_token(auth_header)
+    if not claims:
+        raise HTTPException(status_code=401, detail="Invalid token")
+        
+    user_id = claims.get('sub')
+    
+    try:
+        alerts = get_price_history_manager().get_price_alerts(user_id, limit=max(1, min(limit, 200)))
+        return FastJSONResponse(
+            content={"alerts": alerts}
+        )
+    except Exception as e:
+        logger.error(f"Error getting price alerts: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get price alerts")
+
+@app.get("/api/new-matches")
+async def get_new_matches(request: Request, limit: int = 50):
+    """Get new cached listings matching the user's preferences, most recent first"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+         raise HTTPException(status_code=401, detail="Authentication required")
+    
+    claims = verify_cognito_token(auth_header)
+    if not claims:
+        raise HTTPException(status_code=401, detail="Invalid token")
+        
+    user_id = claims.get('sub')
+    
+    try:
+        matches = get_new_matches_manager().get_new_matches(user_id, limit=max(1, min(limit, 200)))
+        return FastJSONResponse(
+            content={"matches": matches, "count": len(matches)}
+        )
+    except Exception as e:
+        logger.error(f"Error getting new matches: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get new matches")
+
+@app.delete("/api/new-matches")
+async def dismiss_new_matches(request: Request, property_id: Optional[str] = None):
+    """Dismiss one new match (property_id) or clear the user's inbox"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+         raise HTTPException(status_code=401, detail="Authentication required")
+    
+    claims = verify_cognito_token(auth_header)
+    if not claims:
+        raise HTTPException(status_code=401, detail="Invalid token")
+        
+    user_id = claims.get('sub')
+    
+    try:
+        removed = get_new_matches_manager().dismiss_new_matches(user_id, [property_id] if property_id else None)
+        return FastJSONResponse(content={"success": True, "removed": removed})
+    except Exception as e:
+        logger.error(f"Error dismissing new matches: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to dismiss new matches")
+
+@app.get("/api/saved-properties/export")
+async def export_saved_properties(request: Request, fmt: str = Query("csv", alias="format"),
+                                  visit_only: bool = False, destination: str = "download"):
+    """
+    Export saved properties (or the visit list) as CSV or Parquet.
+
+    The list is read and encoded page by page, so memory use does not grow with its
+    size. destination=download streams the file; destination=s3 uploads it to the
+    state bucket and returns a presigned URL.
+    """
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+         raise HTTPException(status_code=401, detail="Authentication required")
+    
+    claims = verify_cognito_token(auth_header)
+    if not claims:
+        raise HTTPException(status_code=401, detail="Invalid token")
+        
+    user_id = claims.get('sub')
+
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format; use one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export is not available")
+    if destination not in ("download", "s3"):
+        raise HTTPException(status_code=400, detail="destination must be 'download' or 's3'")
+
+    rows = get_favorites_manager().iter_user_favorites(user_id, visit_only, page_size=EXPORT_PAGE_SIZE)
+    chunks = export_chunks(rows, fmt)
+    filename = export_filename(fmt, visit_only)
+
+    if destination == "s3":
+        if not state_bucket_name:
+            raise HTTPException(status_code=501, detail="Export storage is not configured")
+        key = f"exports/{user_id}/{uuid.uuid4()}/{filename}"
+        try:
+            result = await asyncio.to_thread(upload_export, chunks, state_bucket_name, key, EXPORT_FORMATS[fmt])
+            return FastJSONResponse(content=result)
+        except Exception as e:
+            logger.error(f"Error exporting saved properties: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to export saved properties")
+
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/api/market-stats")
+async def get_market_stats(zipCode: Optional[str] = None, city: Optional[str] = None, state: str = "CA",
+                           propertyType: Optional[str] = None):
+    """Get market statistics of the cached listings in a zip code or city"""
+    if not zipCode and not city:
+        raise HTTPException(status_code=400, detail="Either zipCode or city is required")
+    try:
+        stats = get_market_stats_manager().get_stats(zip_code=zipCode, city=city, state=state,
+                                                     property_type=propertyType)
+    except Exception as e:
+        logger.error(f"Error getting market stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get market statistics")
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No market statistics for this area")
+    return FastJSONResponse(content=stats)
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Get property cache and tool memoization counts of this execution environment"""
+    return FastJSONResponse(content={**get_property_cache().stats(), "tool_memo": toolmemo.stats()})
+
+@app.get("/api/autocomplete")
+async def autocomplete(q: str = Query(..., max_length=200), limit: int = Query(8, ge=1, le=25)):
+    """Complete a partial address, city or zip code from the cached listings"""
+    try:
+        suggestions = await asyncio.to_thread(get_autocomplete_index().search, q, limit)
+        return FastJSONResponse(content={"query": q, "suggestions": suggestions})
+    except Exception as e:
+        logger.error(f"Error completing {q!r}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to complete query")
+
+@app.get("/api/properties/map")
+async def get_properties_map(south: float = Query(..., ge=-90, le=90), west: float = Query(..., ge=-180, le=180),
+                             north: float = Query(..., ge=-90, le=90), east: float = Query(..., ge=-180, le=180),
+                             zoom: int = Query(..., ge=0, le=22), propertyType: Optional[str] = None,
+                             minPrice: Optional[float] = None, maxPrice: Optional[float] = None):
+    """
+    Get the cached listings in a map viewport, clustered on a grid at the given zoom level
+    (individual listings at high zoom)
+    """
+    if north < south:
+        raise HTTPException(status_code=422, detail="north must be greater than or equal to south")
+    try:
+        result = await asyncio.to_thread(get_map_index().query, south, west, north, east, zoom,
+                                         propertyType, minPrice, maxPrice)
+        return FastJSONResponse(content=result)
+    except Exception as e:
+        logger.error(f"Error clustering map listings: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get map listings")
+
+@app.get("/api/properties/{property_id}/similar")
+async def get_similar_properties(property_id: str, limit: int = Query(5, ge=1, le=50),
+                                 max_distance_km: Optional[float] = Query(None, gt=0),
+                                 same_property_type: bool = True):
+    """Get the cached listings most similar to a property"""
+    try:
+        similar = await asyncio.to_thread(get_similarity_index().find_similar, property_id, limit,
+                                          max_distance_km, same_property_type)
+        return FastJSONResponse(content={"property_id": property_id, "similar": similar})
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error finding similar properties: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to find similar properties")
+
+@app.get("/api/properties/{property_id}/price-history")
+async def get_price_history(property_id: str):
+    """Get the recorded price history of a cached property"""
+    try:
+        history = get_price_history_manager().get_price_history(property_id)
+        return FastJSONResponse(
+            content={"property_id": property_id, "history": history}
+        )
+    except Exception as e:
+        logger.error(f"Error getting price history: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get price history")
+
 class MergeSessionRequest(BaseModel):
     sessionId: str
 
@@ -957,10 +1247,10 @@ async def merge_session(request: Request, body: MergeSessionRequest):
     user_id = claims.get('sub')
     
     try:
-        count = favorites_manager.merge_session_favorites(body.sessionId, user_id)
-        return Response(
-            content=json.dumps({"merged_count": count}),
-            media_type="application/json"
+        count = get_favorites_manager().merge_session_favorites(body.sessionId, user_id)
+        toolmemo.invalidate_tags(f"favorites:{user_id}")
+        return FastJSONResponse(
+            content={"merged_count": count}
         )
     except Exception as e:
         logger.error(f"Error merging session: {str(e)}")
@@ -969,10 +1259,10 @@ async def merge_session(request: Request, body: MergeSessionRequest):
 # Called by the Lambda Adapter to check liveness
 @app.get("/")
 async def root():
-    return Response(
-        content=json.dumps({"message": "OK"}),
-        media_type="application/json",
+    return FastJSONResponse(
+        content={"message": "OK"}
     )
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "8080")))
@@ -1,7 +1,6 @@
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from strands.agent.conversation_manager import SlidingWindowConversationManager
 from strands import Agent
 from strands.models import BedrockModel
 from strands.session.s3_session_manager import S3SessionManager
@@ -21,6 +20,9 @@ except ModuleNotFoundError:
 
 # Import all tools from the tools module
 from tools import ALL_TOOLS
+from accounting import TurnAccounting
+from conversation import RollingSummaryConversationManager
+from executor import LimitedConcurrentToolExecutor
 
 realtor_team_name="Monika Realty Team"
 realtor_name="Monika Trivedi"
@@ -52,10 +54,6 @@ bedrock_model = BedrockModel(
 llm_as_a_judge_model = None
 
 
-conversation_manager = SlidingWindowConversationManager(
-    window_size=10,  # Maximum number of messages to keep
-    should_truncate_results=True, # Enable truncating the tool result when a message is too large for the model's context window 
-)
 SYSTEM_PROMPT = f"""
 You are a digital avatar representative of {realtor_name} their dre id is{realltor_dre_number}
 and their website is {realter_website}, and their email is {realtor_email} and their phone is {realtor_phone}.
@@ -84,13 +82,20 @@ def session(id: str) -> Agent:
         bucket=state_bucket_name,
         session_id=id,
     )
-    return Agent(
-        conversation_manager=conversation_manager,
+    accounting = TurnAccounting(endpoint="chat", session_id=id)
+    agent = Agent(
+        conversation_manager=RollingSummaryConversationManager(),
         model=bedrock_model,
         session_manager=session_manager,
         system_prompt=SYSTEM_PROMPT,
         tools=ALL_TOOLS,
+        tool_executor=LimitedConcurrentToolExecutor(),
+        hooks=[accounting],
+        callback_handler=accounting,
     )
+    # The session store keeps full tool results; collapse old ones before the first model call
+    agent.conversation_manager.apply_management(agent)
+    return agent
 
 class ChatRequest(BaseModel):
     prompt: str
@@ -112,10 +117,13 @@ async def rate_response_with_llm_as_a_judge(prompt: str, response: str, session_
     """
     # Don't use a session manager for the judge agent - it's a one-off rating and doesn't need conversation history
     # This avoids inheriting tool use/result blocks from the main conversation
+    accounting = TurnAccounting(endpoint="judge", session_id=session_id)
     judge_agent = Agent(
         model=llm_as_a_judge_model,
         system_prompt=judge_system_prompt,
         tools=[],  # Explicitly set empty tools list to avoid tool-related errors
+        hooks=[accounting],
+        callback_handler=accounting,
     )
     rating_response = ""
     async for event in judge_agent.stream_async(f"{prompt}\n\nResponse: {response}"):
@@ -263,9 +271,12 @@ Return ONLY the 3 questions as a JSON array, nothing else. Format: ["question 1"
     
     try:
         # Use an Agent with the model for simple generation
+        accounting = TurnAccounting(endpoint="suggestions", session_id=session_id)
         suggestion_agent = Agent(
             model=bedrock_model,
-            system_prompt="You are a helpful assistant that generates relevant real estate questions. Always respond with valid JSON only."
+            system_prompt="You are a helpful assistant that generates relevant real estate questions. Always respond with valid JSON only.",
+            hooks=[accounting],
+            callback_handler=accounting,
         )
         response_text = ""
         async for event in suggestion_agent.stream_async(suggestion_prompt):
@@ -0,0 +1,213 @@
+"""
+Map clustering of the cached listings for viewport queries.
+
+Rather than shipping every listing in view to the browser, the map asks for a bounding
+box and zoom level and gets back clusters: the listings are binned into a grid of
+MAP_CELLS_PER_TILE x MAP_CELLS_PER_TILE cells per Web Mercator tile (so a cell covers
+about the same number of screen pixels at every zoom), and each non-empty cell returns
+its count, centroid and price statistics. Everything is computed on NumPy arrays of the
+cached listings' coordinates and prices, without a per-listing Python loop.
+
+Individual listings are returned instead when the zoom is at least MAP_EXPAND_ZOOM and
+no more than MAP_MAX_LISTINGS are in view. A response never holds more than
+MAP_MAX_CLUSTERS clusters (the largest are kept, "truncated" is set) or MAP_MAX_LISTINGS
+listings, however many listings are cached.
+
+The arrays are built from one payload-free query of the PROPERTY_INFO partition, marked
+stale by cache writes of this execution environment (QuestionManager write listeners)
+and rebuilt on the next request after MAP_REBUILD_MIN_SECONDS, and in any case every
+MAP_INDEX_TTL_SECONDS.
+"""
+
+import os
+import logging
+import math
+import numbers
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+MAP_INDEX_TTL_SECONDS = int(os.environ.get("MAP_INDEX_TTL_SECONDS", "900"))
+MAP_REBUILD_MIN_SECONDS = int(os.environ.get("MAP_REBUILD_MIN_SECONDS", "60"))
+MAP_CELLS_PER_TILE = int(os.environ.get("MAP_CELLS_PER_TILE", "4"))
+MAP_EXPAND_ZOOM = int(os.environ.get("MAP_EXPAND_ZOOM", "16"))
+MAP_MAX_LISTINGS = int(os.environ.get("MAP_MAX_LISTINGS", "200"))
+MAP_MAX_CLUSTERS = int(os.environ.get("MAP_MAX_CLUSTERS", "400"))
+MAX_ZOOM = 22
+
+# Fields read for each listing (top-level attributes, no compressed payload)
+MAP_FIELDS = [
+    "property_id", "formattedAddress", "propertyType", "price", "bedrooms", "bathrooms",
+    "squareFootage", "latitude", "longitude", "ttl",
+]
+
+
+class PriceStats(BaseModel):
+    """Price statistics of the listings in a cluster (those with a price)"""
+    min: int
+    max: int
+    mean: int
+    median: int
+
+
+class MapCluster(BaseModel):
+    """Listings of one grid cell"""
+    id: str
+    latitude: float
+    longitude: float
+    count: int
+    price: Optional[PriceStats] = None
+    # The listing, when the cluster has only one
+    property_id: Optional[str] = None
+
+
+def _number(value: Any) -> float:
+    return float(value) if isinstance(value, numbers.Number) else np.nan
+
+
+def mercator_y(latitudes: np.ndarray) -> np.ndarray:
+    """Web Mercator y of latitudes, 0 (north edge) to 1 (south edge)."""
+    radians = np.radians(np.clip(latitudes, -85.05112878, 85.05112878))
+    return (1 - np.log(np.tan(radians) + 1 / np.cos(radians)) / math.pi) / 2
+
+
+class MapIndex:
+    """Coordinate and price arrays of the cached listings, clustered per viewport"""
+
+    def __init__(self, questions: Any, ttl_seconds: int = MAP_INDEX_TTL_SECONDS):
+        """
+        Args:
+            questions: QuestionManager the listings are read from (and whose writes are followed)
+            ttl_seconds: Age after which the arrays are rebuilt
+        """
+        self.questions = questions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._arrays: Optional[Dict[str, Any]] = None
+        self._built_at = 0.0
+        self._stale = False
+        questions.write_listeners.append(self._mark_stale)
+
+    def _mark_stale(self, items: List[Dict[str, Any]]) -> None:
+        self._stale = True
+
+    def arrays(self) -> Dict[str, Any]:
+        """Current arrays (listings, latitude, longitude, price, type), rebuilt when expired or stale."""
+        with self._lock:
+            age = time.monotonic() - self._built_at
+            if self._arrays is None or age > self.ttl_seconds or (self._stale and age > MAP_REBUILD_MIN_SECONDS):
+                self._stale = False
+                now = time.time()
+                listings = [item for item in self.questions.iter_property_items(MAP_FIELDS)
+                            if (item.get('ttl') or now) >= now
+                            and isinstance(item.get('latitude'), numbers.Number)
+                            and isinstance(item.get('longitude'), numbers.Number)]
+                self._arrays = {
+                    'listings': listings,
+                    'latitude': np.array([item['latitude'] for item in listings], dtype=np.float64),
+                    'longitude': np.array([item['longitude'] for item in listings], dtype=np.float64),
+                    'price': np.array([_number(item.get('price')) for item in listings], dtype=np.float64),
+                    'type': np.array([item.get('propertyType') for item in listings], dtype=object),
+                }
+                self._built_at = time.monotonic()
+                logger.info(f"Built map index of {len(listings)} listings")
+            return self._arrays
+
+    def query(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        zoom: int,
+        property_type: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Clusters (or listings) of the cached listings in a viewport.
+
+        Args:
+            south, west, north, east: Bounding box in degrees (west > east crosses the antimeridian)
+            zoom: Map zoom level (0-22)
+            property_type: Optional property type filter
+            min_price, max_price: Optional price filter
+
+        Returns:
+            Dictionary with the zoom, the number of listings in view, and either
+            "clusters" (MapCluster dictionaries) or "listings"
+        """
+        zoom = max(0, min(int(zoom), MAX_ZOOM))
+        arrays = self.arrays()
+        latitude, longitude, price = arrays['latitude'], arrays['longitude'], arrays['price']
+
+        in_view = (latitude >= south) & (latitude <= north)
+        in_view &= ((longitude >= west) & (longitude <= east)) if west <= east else ((longitude >= west) | (longitude <= east))
+        if property_type:
+            in_view &= arrays['type'] == property_type
+        if min_price is not None:
+            in_view &= price >= min_price
+        if max_price is not None:
+            in_view &= price <= max_price
+        rows = np.flatnonzero(in_view)
+        total = int(rows.size)
+
+        if zoom >= MAP_EXPAND_ZOOM and total <= MAP_MAX_LISTINGS:
+            listings = [{key: value for key, value in arrays['listings'][row].items() if key != 'ttl'}
+                        for row in rows.tolist()]
+            return {'zoom': zoom, 'total': total, 'listings': listings}
+        return {'zoom': zoom, 'total': total, **self._cluster(arrays, rows, zoom)}
+
+    def _cluster(self, arrays: Dict[str, Any], rows: np.ndarray, zoom: int) -> Dict[str, Any]:
+        if rows.size == 0:
+            return {'clusters': [], 'truncated': False}
+        latitude, longitude, price = arrays['latitude'][rows], arrays['longitude'][rows], arrays['price'][rows]
+        cells = (2 ** zoom) * MAP_CELLS_PER_TILE
+        x = np.clip(((longitude + 180) / 360 * cells).astype(np.int64), 0, cells - 1)
+        y = np.clip((mercator_y(latitude) * cells).astype(np.int64), 0, cells - 1)
+        keys, cell_of, counts = np.unique(y * cells + x, return_inverse=True, return_counts=True)
+        cell_of = cell_of.ravel()
+
+        sum_latitude = np.bincount(cell_of, weights=latitude)
+        sum_longitude = np.bincount(cell_of, weights=longitude)
+        priced = ~np.isnan(price)
+        priced_counts = np.bincount(cell_of, weights=priced, minlength=keys.size).astype(np.int64)
+        sum_price = np.bincount(cell_of[priced], weights=price[priced], minlength=keys.size)
+        # One sort by (cell, price), missing prices last in each cell: the first, last and
+        # middle priced entries of a cell are its min, max and median
+        spread = (np.nanmax(price) - np.nanmin(price) + 1) if priced.any() else 1.0
+        fraction = np.where(priced, (price - (np.nanmin(price) if priced.any() else 0)) / spread, 1.0)
+        order = np.argsort(cell_of * 2.0 + fraction)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sorted_price = price[order]
+        min_price = sorted_price[starts]
+        max_price = sorted_price[starts + np.maximum(priced_counts - 1, 0)]
+        middle_low = sorted_price[starts + np.maximum(priced_counts - 1, 0) // 2]
+        middle_high = sorted_price[starts + priced_counts // 2]
+        median_price = (middle_low + middle_high) / 2
+        # Single listing of a cell, for clusters of one
+        first_row = rows[order[starts]]
+
+        largest = np.argsort(-counts, kind='stable')[:MAP_MAX_CLUSTERS]
+        clusters = []
+        for cell in largest.tolist():
+            count = int(counts[cell])
+            stats = None
+            if priced_counts[cell] > 0:
+                stats = PriceStats(min=int(min_price[cell]), max=int(max_price[cell]),
+                                   mean=int(round(sum_price[cell] / priced_counts[cell])),
+                                   median=int(round(median_price[cell])))
+            clusters.append(MapCluster(
+                id=f"{zoom}/{int(keys[cell] % cells)}/{int(keys[cell] // cells)}",
+                latitude=round(float(sum_latitude[cell] / count), 6),
+                longitude=round(float(sum_longitude[cell] / count), 6),
+                count=count,
+                price=stats,
+                property_id=arrays['listings'][first_row[cell]]['property_id'] if count == 1 else None,
+            ).model_dump(exclude_none=True))
+        return {'clusters': clusters, 'truncated': keys.size > len(clusters)}
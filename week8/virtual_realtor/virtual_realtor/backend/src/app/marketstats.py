@@ -0,0 +1,364 @@
+"""
+Materialized market statistics per zip code and city.
+
+Each cached listing (PROPERTY_INFO item) contributes to the statistics of its zip code
+(MARKET_STATS / ZIP#{zipCode}) and city (MARKET_STATS / CITY#{state}#{city}), overall
+and for its property type: listing count, price, price per square foot and days on
+market. Distributions are kept as QuantileSketch histograms (log-spaced buckets with
+bounded relative error), which merge by adding bucket counts. That makes every update
+a single UpdateItem of ADD operations: concurrent writers merge without read-modify-
+write, and a replaced or expired listing is removed by adding negative counts.
+
+Statistics are maintained from property change events (see changes.py) and read with
+one GetItem, so a market question is a single key lookup.
+"""
+
+import math
+import os
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from clients import get_dynamodb_resource, get_dynamodb_client
+from serialization import deserialize_item
+
+logger = logging.getLogger(__name__)
+
+# Relative accuracy of the percentile sketches (0.01 -> quantiles within 1%)
+MARKET_STATS_RELATIVE_ACCURACY = float(os.environ.get("MARKET_STATS_RELATIVE_ACCURACY", "0.01"))
+MARKET_STATS_PK = "MARKET_STATS"
+ALL_TYPES = "all"
+# Metrics with a percentile sketch (see listing_metrics)
+METRICS = ("price", "price_per_sqft", "days_on_market")
+# Bucket key for values <= 0 (e.g. 0 days on market)
+ZERO_BUCKET = "z"
+QUANTILES = (0.25, 0.5, 0.75, 0.9)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees (DDSketch-style).
+
+    Positive values are counted in buckets whose boundaries grow geometrically by
+    gamma = (1 + a) / (1 - a); every value in a bucket is within a relative error a of
+    the bucket's representative value. Sketches merge (and un-merge) by adding
+    (subtracting) bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = MARKET_STATS_RELATIVE_ACCURACY,
+                 counts: Optional[Dict[Any, int]] = None):
+        """
+        Args:
+            relative_accuracy: Maximum relative error of the returned quantiles
+            counts: Initial bucket counts (bucket key -> count)
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts: Counter = Counter(counts or {})
+
+    def key(self, value: float) -> Any:
+        """Bucket key of a value."""
+        if value <= 0:
+            return ZERO_BUCKET
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def value(self, key: Any) -> float:
+        """Representative value of a bucket."""
+        if key == ZERO_BUCKET:
+            return 0.0
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add (or with a negative count, remove) a value."""
+        key = self.key(value)
+        self.counts[key] += count
+        if self.counts[key] <= 0:
+            del self.counts[key]
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Add the counts of another sketch with the same accuracy."""
+        for key, count in other.counts.items():
+            self.counts[key] += count
+            if self.counts[key] <= 0:
+                del self.counts[key]
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile.
+
+        Args:
+            q: Quantile between 0 and 1 (0.5 for the median)
+
+        Returns:
+            Estimated value, or None if the sketch is empty
+        """
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        keys = sorted(self.counts, key=lambda k: -math.inf if k == ZERO_BUCKET else k)
+        for key in keys:
+            seen += self.counts[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(keys[-1])
+
+
+class MarketStats(BaseModel):
+    """Summary statistics of the cached listings in an area"""
+    area: str
+    propertyType: str = ALL_TYPES
+    count: int = 0
+    price: Dict[str, Optional[float]] = {}
+    price_per_sqft: Dict[str, Optional[float]] = {}
+    days_on_market: Dict[str, Optional[float]] = {}
+    by_property_type: Dict[str, int] = {}
+    relative_accuracy: float = MARKET_STATS_RELATIVE_ACCURACY
+
+
+def zip_key(zip_code: str) -> str:
+    """Sort key of a zip code's statistics."""
+    return f"ZIP#{str(zip_code).strip()}"
+
+
+def city_key(city: str, state: Optional[str] = None) -> str:
+    """Sort key of a city's statistics."""
+    return f"CITY#{(state or '').strip().upper()}#{city.strip().lower()}"
+
+
+def area_keys(listing: Dict[str, Any]) -> List[str]:
+    """Sort keys of the areas a listing counts towards."""
+    keys = []
+    if listing.get('zipCode'):
+        keys.append(zip_key(listing['zipCode']))
+    if listing.get('city'):
+        keys.append(city_key(listing['city'], listing.get('state')))
+    return keys
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def listing_metrics(listing: Dict[str, Any]) -> Dict[str, float]:
+    """Metric values of a listing (metrics it lacks are left out)."""
+    metrics = {}
+    price = _number(listing.get('price'))
+    if price and price > 0:
+        metrics['price'] = price
+        sqft = _number(listing.get('squareFootage'))
+        if sqft and sqft > 0:
+            metrics['price_per_sqft'] = price / sqft
+    days = _number(listing.get('daysOnMarket'))
+    if days is not None and days >= 0:
+        metrics['days_on_market'] = days
+    return metrics
+
+
+def contribution(listing: Dict[str, Any], sign: int = 1,
+                 relative_accuracy: float = MARKET_STATS_RELATIVE_ACCURACY) -> Counter:
+    """
+    Counter updates a listing makes to its areas' statistics items.
+
+    Attribute names are "{type}|count" and "{type}|{metric}|{bucket}", for the "all"
+    group and the listing's property type.
+
+    Args:
+        listing: Listing fields
+        sign: 1 to add the listing, -1 to remove it
+        relative_accuracy: Accuracy of the sketches
+
+    Returns:
+        Attribute name -> increment
+    """
+    sketch = QuantileSketch(relative_accuracy)
+    metrics = listing_metrics(listing)
+    groups = [ALL_TYPES]
+    if listing.get('propertyType'):
+        groups.append(str(listing['propertyType']))
+    updates: Counter = Counter()
+    for group in groups:
+        updates[f"{group}|count"] += sign
+        for metric, value in metrics.items():
+            updates[f"{group}|{metric}|{sketch.key(value)}"] += sign
+    return updates
+
+
+class MarketStatsManager:
+    """Maintains and reads per-zip and per-city market statistics in DynamoDB"""
+
+    def __init__(self, relative_accuracy: float = MARKET_STATS_RELATIVE_ACCURACY):
+        self.dynamodb = get_dynamodb_resource()
+        self.table_name = os.environ.get('DDB_TABLE')
+        if not self.table_name:
+            logger.error("DDB_TABLE environment variable is not set")
+            raise ValueError("DDB_TABLE environment variable is required.")
+        self.table = self.dynamodb.Table(self.table_name)
+        self.client = get_dynamodb_client()
+        self.relative_accuracy = relative_accuracy
+        logger.info(f"MarketStatsManager initialized with table: {self.table_name}")
+
+    def apply_change(self, new_item: Optional[Dict[str, Any]], old_item: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Update the statistics for a listing write, replacement or removal.
+
+        Args:
+            new_item: Listing after the change (None when it was removed)
+            old_item: Listing before the change (None when it is new)
+        """
+        per_area: Dict[str, Counter] = {}
+        for item, sign in ((old_item, -1), (new_item, 1)):
+            if not item:
+                continue
+            updates = contribution(item, sign, self.relative_accuracy)
+            for area in area_keys(item):
+                per_area.setdefault(area, Counter()).update(updates)
+
+        for area, updates in per_area.items():
+            # An unchanged rewrite cancels out
+            updates = {name: count for name, count in updates.items() if count}
+            if updates:
+                self._add(area, updates)
+
+    def _add(self, area: str, updates: Dict[str, int]) -> None:
+        names, values, clauses = {}, {}, []
+        for index, (name, count) in enumerate(updates.items()):
+            names[f"#a{index}"] = name
+            values[f":v{index}"] = {'N': str(count)}
+            clauses.append(f"#a{index} :v{index}")
+        self.client.update_item(
+            TableName=self.table_name,
+            Key={'PK': {'S': MARKET_STATS_PK}, 'SK': {'S': area}},
+            UpdateExpression="ADD " + ", ".join(clauses),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+
+    def rebuild(self) -> int:
+        """
+        Recompute every area's statistics from the cached listings (one query of the
+        PROPERTY_INFO partition).
+
+        Areas are overwritten with fresh totals and area items without any cached
+        listing left are deleted. Pause the change stream (disable the event source
+        mapping) while this runs: ADD updates applied between the query and the
+        overwrite would be lost, and ones for listings already counted would be
+        counted twice.
+
+        Returns:
+            Number of listings counted
+        """
+        totals: Dict[str, Counter] = {}
+        count = 0
+        paginator = self.client.get_paginator('query')
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            KeyConditionExpression='PK = :pk',
+            ExpressionAttributeValues={':pk': {'S': 'PROPERTY_INFO'}},
+        ):
+            for raw_item in page.get('Items', []):
+                item = deserialize_item(raw_item)
+                updates = contribution(item, 1, self.relative_accuracy)
+                for area in area_keys(item):
+                    totals.setdefault(area, Counter()).update(updates)
+                count += 1
+
+        stale = [area for area in self._stored_areas() if area not in totals]
+        with self.table.batch_writer() as batch:
+            for area, counts in totals.items():
+                batch.put_item(Item={'PK': MARKET_STATS_PK, 'SK': area, **dict(counts)})
+            for area in stale:
+                batch.delete_item(Key={'PK': MARKET_STATS_PK, 'SK': area})
+        logger.info(f"Rebuilt market statistics for {len(totals)} areas from {count} listings, "
+                    f"deleted {len(stale)} areas without listings")
+        return count
+
+    def _stored_areas(self) -> List[str]:
+        """Sort keys of the stored area statistics."""
+        areas = []
+        paginator = self.client.get_paginator('query')
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            KeyConditionExpression='PK = :pk',
+            ExpressionAttributeValues={':pk': {'S': MARKET_STATS_PK}},
+            ProjectionExpression='SK',
+        ):
+            areas.extend(raw_item['SK']['S'] for raw_item in page.get('Items', []))
+        return areas
+
+    def get_stats(self, zip_code: Optional[str] = None, city: Optional[str] = None, state: Optional[str] = None,
+                  property_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Read the statistics of a zip code or city.
+
+        Args:
+            zip_code: 5-digit zip code (takes precedence over city)
+            city: City name
+            state: 2-letter state of the city
+            property_type: Optional property type (e.g. "Condo"); all types by default
+
+        Returns:
+            MarketStats dictionary, or None if no listings were seen in the area
+        """
+        if not zip_code and not city:
+            raise ValueError("Either zip_code or city must be provided")
+        area = zip_key(zip_code) if zip_code else city_key(city, state)
+        response = self.client.get_item(TableName=self.table_name,
+                                        Key={'PK': {'S': MARKET_STATS_PK}, 'SK': {'S': area}})
+        if 'Item' not in response:
+            return None
+        return self.summarize(area, deserialize_item(response['Item']), property_type)
+
+    def summarize(self, area: str, item: Dict[str, Any], property_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Summarize a statistics item.
+
+        Args:
+            area: Sort key of the item
+            item: Statistics item with native values
+            property_type: Property type group to summarize (all types by default)
+
+        Returns:
+            MarketStats dictionary, or None if the group has no listings
+        """
+        group = property_type or ALL_TYPES
+        sketches = {metric: QuantileSketch(self.relative_accuracy) for metric in METRICS}
+        by_type = {}
+        for name, value in item.items():
+            parts = name.split("|")
+            if len(parts) == 2 and parts[1] == "count" and parts[0] != ALL_TYPES and value > 0:
+                by_type[parts[0]] = value
+            if len(parts) != 3 or parts[0] != group or parts[1] not in sketches or value <= 0:
+                continue
+            bucket = parts[2] if parts[2] == ZERO_BUCKET else int(parts[2])
+            sketches[parts[1]].counts[bucket] += value
+
+        count = item.get(f"{group}|count", 0)
+        if count <= 0:
+            return None
+
+        def summary(sketch: QuantileSketch) -> Dict[str, Optional[float]]:
+            if not sketch.count:
+                return {}
+            return {"median" if q == 0.5 else f"p{int(q * 100)}": round(sketch.quantile(q), 2) for q in QUANTILES}
+
+        return MarketStats(
+            area=area.split("#", 1)[1],
+            propertyType=group,
+            count=count,
+            price=summary(sketches['price']),
+            price_per_sqft=summary(sketches['price_per_sqft']),
+            days_on_market=summary(sketches['days_on_market']),
+            by_property_type=by_type if group == ALL_TYPES else {},
+            relative_accuracy=self.relative_accuracy,
+        ).model_dump()
@@ -0,0 +1,351 @@
+"""
+Reverse matching of new listings against saved user preferences ("new matches" inbox).
+
+Property suggestions start from one user's preferences; this module goes the other way
+and finds, for a listing that just entered the cache, every user whose preferences it
+satisfies, without looking at the users interested in other areas:
+
+- PreferencesManager keeps an inverted zip -> users index (PREF_ZIP#{zip} / USER#{user_id},
+  one item per zip code of each profile, carrying the profile's ranges), like the
+  property -> users index of price alerts.
+- A new listing (an INSERT change event, see changes.py) reads the index partition of
+  its zip code once and builds an interval tree over the users' price ranges, cached for
+  NEW_MATCH_INDEX_TTL_SECONDS so a batch of listings in the same area reuses it. The tree
+  returns the users whose price range contains the listing's price in O(log n + k); the
+  few candidates are then checked for bedrooms, bathrooms, square footage and type.
+- Each matching user gets a NEW_MATCH#{property_id} item in their inbox. Writes are
+  conditional, so a redelivered event or a listing re-entering the cache after expiry
+  does not show up twice. Dismissing a match keeps its item as a dismissed marker for
+  NEW_MATCH_DISMISSED_TTL_DAYS, so the listing does not come back either.
+
+Profiles without zip codes are not indexed (they would match every listing).
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+from botocore.exceptions import ClientError
+from clients import get_dynamodb_resource, get_dynamodb_client
+from serialization import deserialize_item, serialize_item, to_dynamodb
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+NEW_MATCH_TTL_DAYS = int(os.environ.get("NEW_MATCH_TTL_DAYS", "30"))
+# How long a dismissed match keeps the listing out of the inbox
+NEW_MATCH_DISMISSED_TTL_DAYS = int(os.environ.get("NEW_MATCH_DISMISSED_TTL_DAYS", "180"))
+NEW_MATCH_INDEX_TTL_SECONDS = float(os.environ.get("NEW_MATCH_INDEX_TTL_SECONDS", "60"))
+
+# Preference ranges checked against listing fields: (preference field, listing field)
+RANGE_FIELDS = (("bedrooms", "bedrooms"), ("bathrooms", "bathrooms"), ("sqft", "squareFootage"))
+UNBOUNDED = float("inf")
+
+
+def preference_index_key(zip_code: str) -> str:
+    """Partition key of the users interested in a zip code."""
+    return f"PREF_ZIP#{zip_code}"
+
+
+def preference_index_items(preferences: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Inverted index items of a preferences profile, one per zip code.
+
+    Args:
+        preferences: Profile as saved (userId, zipCodes, priceRange, bedrooms, ...)
+
+    Returns:
+        Items with native values
+    """
+    criteria = {field: preferences[field] for field in ("priceRange", "propertyType", *(f for f, _ in RANGE_FIELDS))
+                if preferences.get(field)}
+    return [{'PK': preference_index_key(zip_code), 'SK': f"USER#{preferences['userId']}",
+             'user_id': preferences['userId'], **criteria}
+            for zip_code in preferences.get('zipCodes') or []]
+
+
+def _bounds(value_range: Optional[Dict[str, Any]]) -> Tuple[float, float]:
+    value_range = value_range or {}
+    low, high = value_range.get('min'), value_range.get('max')
+    return (float(low) if low is not None else -UNBOUNDED, float(high) if high is not None else UNBOUNDED)
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class IntervalTree:
+    """
+    Static centered interval tree answering "which intervals contain x" (stabbing queries).
+
+    Each node keeps the intervals containing its center, sorted by low and by high end,
+    and the intervals entirely left or right of it in its subtrees.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[float, float, Any]]):
+        """
+        Args:
+            intervals: (low, high, value) triples, bounds inclusive
+        """
+        self._root = self._build(list(intervals))
+
+    @classmethod
+    def _build(cls, intervals: List[Tuple[float, float, Any]]) -> Optional[tuple]:
+        if not intervals:
+            return None
+        ends = sorted(bound for low, high, _ in intervals for bound in (low, high) if abs(bound) != UNBOUNDED)
+        center = ends[len(ends) // 2] if ends else 0.0
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        return (center, sorted(here, key=lambda i: i[0]), sorted(here, key=lambda i: -i[1]),
+                cls._build(left), cls._build(right))
+
+    def stab(self, x: float) -> List[Any]:
+        """Values of the intervals containing x."""
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_low, by_high, left, right = node
+            if x < center:
+                for low, _, value in by_low:
+                    if low > x:
+                        break
+                    found.append(value)
+                node = left
+            else:
+                for _, high, value in by_high:
+                    if high < x:
+                        break
+                    found.append(value)
+                node = right
+        return found
+
+
+class NewMatch(BaseModel):
+    """A new listing matching a user's preferences, as stored in their inbox"""
+    property_id: str
+    formattedAddress: Optional[str] = None
+    price: Optional[int] = None
+    bedrooms: Optional[float] = None
+    bathrooms: Optional[float] = None
+    squareFootage: Optional[int] = None
+    propertyType: Optional[str] = None
+    zipCode: Optional[str] = None
+    matched_at: str
+
+
+class ZipPreferences:
+    """Preferences of the users interested in one zip code, indexed by price range"""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        """
+        Args:
+            entries: Index items of the zip code (user_id and criteria)
+        """
+        self.entries = entries
+        self.tree = IntervalTree((*_bounds(entry.get('priceRange')), entry) for entry in entries)
+
+    def match(self, listing: Dict[str, Any]) -> List[str]:
+        """
+        IDs of the users whose preferences the listing satisfies.
+
+        Fields the listing does not report do not exclude it.
+
+        Args:
+            listing: PROPERTY_INFO item
+
+        Returns:
+            User IDs
+        """
+        price = _number(listing.get('price'))
+        candidates = self.tree.stab(price) if price is not None else self.entries
+        matched = []
+        for entry in candidates:
+            if entry.get('propertyType') and listing.get('propertyType') and entry['propertyType'] != listing['propertyType']:
+                continue
+            if all(self._within(entry.get(field), listing.get(listing_field)) for field, listing_field in RANGE_FIELDS):
+                matched.append(entry['user_id'])
+        return matched
+
+    @staticmethod
+    def _within(value_range: Optional[Dict[str, Any]], value: Any) -> bool:
+        value = _number(value)
+        if value is None or not value_range:
+            return True
+        low, high = _bounds(value_range)
+        return low <= value <= high
+
+
+class NewMatchesManager:
+    """Matches new listings to users through the zip -> preferences index and keeps their inboxes"""
+
+    def __init__(self):
+        self.dynamodb = get_dynamodb_resource()
+        self.table_name = os.environ.get('DDB_TABLE')
+        if not self.table_name:
+            logger.error("DDB_TABLE environment variable is not set")
+            raise ValueError("DDB_TABLE environment variable is required.")
+        self.table = self.dynamodb.Table(self.table_name)
+        self.client = get_dynamodb_client()
+        self.zip_cache = TTLCache(ttl_seconds=NEW_MATCH_INDEX_TTL_SECONDS)
+        logger.info(f"NewMatchesManager initialized with table: {self.table_name}")
+
+    # --- Zip -> preferences index ---
+
+    def zip_preferences(self, zip_code: str) -> ZipPreferences:
+        """
+        Interval index of the users interested in a zip code (cached per container).
+
+        Args:
+            zip_code: 5-digit zip code
+
+        Returns:
+            ZipPreferences of the zip code
+        """
+        cached = self.zip_cache.get(zip_code)
+        if cached is not None:
+            return cached
+        entries = []
+        paginator = self.client.get_paginator('query')
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            KeyConditionExpression='PK = :pk',
+            ExpressionAttributeValues={':pk': {'S': preference_index_key(zip_code)}},
+        ):
+            entries.extend(deserialize_item(raw_item) for raw_item in page.get('Items', []))
+        index = ZipPreferences(entries)
+        self.zip_cache.set(zip_code, index)
+        return index
+
+    def invalidate(self, *zip_codes: str) -> None:
+        """Drop cached zip indexes in this container (after a preferences change)."""
+        for zip_code in zip_codes:
+            self.zip_cache.delete(zip_code)
+
+    def rebuild_index(self) -> int:
+        """
+        Backfill the zip -> preferences index from existing profiles (one-off table scan).
+
+        Returns:
+            Number of index items written
+        """
+        count = 0
+        paginator = self.client.get_paginator('scan')
+        with self.table.batch_writer() as batch:
+            for page in paginator.paginate(
+                TableName=self.table_name,
+                FilterExpression='begins_with(PK, :pk) AND SK = :sk',
+                ExpressionAttributeValues={':pk': {'S': 'USER_PREF#'}, ':sk': {'S': 'PROFILE'}},
+            ):
+                for raw_item in page.get('Items', []):
+                    for index_item in preference_index_items(deserialize_item(raw_item)):
+                        batch.put_item(Item=to_dynamodb(index_item))
+                        count += 1
+        self.zip_cache.clear()
+        logger.info(f"Rebuilt {count} preference index entries")
+        return count
+
+    # --- Change processing ---
+
+    def process_new_listing(self, listing: Dict[str, Any]) -> List[str]:
+        """
+        Add a listing that just entered the cache to the inbox of every matching user.
+
+        Args:
+            listing: PROPERTY_INFO item
+
+        Returns:
+            IDs of the users it was added for (users already notified of it, or who
+            dismissed it, excluded)
+        """
+        zip_code = listing.get('zipCode')
+        if not zip_code:
+            return []
+        user_ids = self.zip_preferences(str(zip_code)).match(listing)
+        if not user_ids:
+            return []
+
+        match = NewMatch(
+            property_id=listing.get('property_id') or listing['SK'],
+            matched_at=listing.get('created_at') or datetime.utcnow().isoformat(),
+            **{field: listing.get(field) for field in NewMatch.model_fields
+               if field not in ('property_id', 'matched_at') and listing.get(field) is not None},
+        )
+        expires_at = int((datetime.utcnow() + timedelta(days=NEW_MATCH_TTL_DAYS)).timestamp())
+        notified = []
+        for user_id in user_ids:
+            try:
+                self.client.put_item(
+                    TableName=self.table_name,
+                    Item=serialize_item({'PK': f'USER#{user_id}', 'SK': f'NEW_MATCH#{match.property_id}',
+                                         'ttl': expires_at, **match.model_dump(exclude_none=True)}),
+                    ConditionExpression='attribute_not_exists(SK)',
+                )
+                notified.append(user_id)
+            except ClientError as e:
+                # Already in the user's inbox, or dismissed
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+        if notified:
+            logger.info(f"New listing {match.property_id} matched {len(notified)} users")
+        return notified
+
+    # --- Inbox ---
+
+    def get_new_matches(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Retrieve a user's new matches, most recent first.
+
+        Args:
+            user_id: The user's Cognito sub
+            limit: Maximum number of matches
+
+        Returns:
+            NewMatch dictionaries
+        """
+        matches = []
+        paginator = self.client.get_paginator('query')
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            KeyConditionExpression='PK = :pk AND begins_with(SK, :sk)',
+            FilterExpression='attribute_not_exists(dismissed)',
+            ExpressionAttributeValues={':pk': {'S': f'USER#{user_id}'}, ':sk': {'S': 'NEW_MATCH#'}},
+        ):
+            matches.extend(NewMatch(**deserialize_item(raw_item)).model_dump(exclude_none=True)
+                           for raw_item in page.get('Items', []))
+        matches.sort(key=lambda match: match['matched_at'], reverse=True)
+        return matches[:limit]
+
+    def dismiss_new_matches(self, user_id: str, property_ids: Optional[List[str]] = None) -> int:
+        """
+        Remove matches from a user's inbox.
+
+        The items are replaced by dismissed markers, so the listings are not matched again
+        when they re-enter the cache.
+
+        Args:
+            user_id: The user's Cognito sub
+            property_ids: Matches to remove (all when omitted)
+
+        Returns:
+            Number of matches removed
+        """
+        if property_ids is None:
+            property_ids = [match['property_id'] for match in self.get_new_matches(user_id, limit=10000)]
+        expires_at = int((datetime.utcnow() + timedelta(days=NEW_MATCH_DISMISSED_TTL_DAYS)).timestamp())
+        with self.table.batch_writer() as batch:
+            for property_id in property_ids:
+                batch.put_item(Item={'PK': f'USER#{user_id}', 'SK': f'NEW_MATCH#{property_id}',
+                                     'dismissed': True, 'ttl': expires_at})
+        return len(property_ids)
@@ -1,14 +1,21 @@
 import os
-import boto3
+import copy
+import time
 import logging
 from datetime import datetime
-from decimal import Decimal
 from typing import Dict, Any, Optional, List
 from pydantic import BaseModel, Field, field_validator, model_validator
 from botocore.exceptions import ClientError
+from clients import get_dynamodb_resource, get_dynamodb_client, get_new_matches_manager
+from serialization import deserialize_item, to_dynamodb
+from cache import TTLCache
+from newmatches import preference_index_items, preference_index_key
 
 logger = logging.getLogger(__name__)
 
+# How long a container re-uses preferences before re-checking the version stamp
+PREFERENCES_CACHE_TTL_SECONDS = float(os.environ.get("PREFERENCES_CACHE_TTL_SECONDS", "30"))
+
 
 class PriceRange(BaseModel):
     """Price range for property search"""
@@ -128,24 +135,73 @@ class UserPreferences(BaseModel):
 
 
 class PreferencesManager:
-    """Manages user preferences in DynamoDB"""
+    """
+    Manages user preferences in DynamoDB.
+
+    Reads are served through a per-container read-through cache keyed by user ID. Every
+    saved profile carries a `version` stamp; the cache stores (version, preferences) and
+    is updated on save_preferences / cleared on delete_preferences, so the container that
+    handled a write never serves the old profile. Other containers re-check the stamp once
+    their entry is older than PREFERENCES_CACHE_TTL_SECONDS, and callers that know the
+    version they just wrote can pass min_version to bypass an older cached copy.
+    """
 
     def __init__(self):
         """Initialize the PreferencesManager with DynamoDB connection"""
-        self.dynamodb = boto3.resource('dynamodb')
+        self.dynamodb = get_dynamodb_resource()
         self.table_name = os.environ.get('DDB_TABLE')
         if not self.table_name:
             logger.error("DDB_TABLE environment variable is not set")
             raise ValueError("DDB_TABLE environment variable is required.")
         self.table = self.dynamodb.Table(self.table_name)
+        # Reads go through the low-level client so items decode straight to native types
+        self.client = get_dynamodb_client()
+        self.cache = TTLCache(ttl_seconds=PREFERENCES_CACHE_TTL_SECONDS)
         logger.info(f"PreferencesManager initialized with table: {self.table_name}")
 
-    def get_preferences(self, user_id: str) -> Optional[Dict[str, Any]]:
+    def _key(self, user_id: str) -> Dict[str, Dict[str, str]]:
+        return {
+            'PK': {'S': f'USER_PREF#{user_id}'},
+            'SK': {'S': 'PROFILE'}
+        }
+
+    def _read_preferences(self, user_id: str, consistent: bool = False) -> Optional[Dict[str, Any]]:
+        """Read the full preferences item from DynamoDB (strongly consistent when asked)."""
+        response = self.client.get_item(TableName=self.table_name, Key=self._key(user_id),
+                                        ConsistentRead=consistent)
+        if 'Item' not in response:
+            return None
+        # Decode straight to native types for JSON serialization
+        item = deserialize_item(response['Item'])
+        # Remove DynamoDB-specific fields
+        item.pop('PK', None)
+        item.pop('SK', None)
+        return item
+
+    def _read_version(self, user_id: str) -> int:
+        """Read only the version stamp of the preferences item (0 if missing or unversioned)."""
+        # Strongly consistent, or a revalidation could confirm a copy that was just replaced
+        response = self.client.get_item(
+            TableName=self.table_name,
+            Key=self._key(user_id),
+            ConsistentRead=True,
+            ProjectionExpression='#version',
+            ExpressionAttributeNames={'#version': 'version'}
+        )
+        version = response.get('Item', {}).get('version')
+        return int(version['N']) if version else 0
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the cached preferences for a user in this container."""
+        self.cache.delete(user_id)
+
+    def get_preferences(self, user_id: str, min_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """
-        Retrieve user preferences from DynamoDB.
+        Retrieve user preferences, from the cache when possible.
 
         Args:
             user_id: Cognito sub (user ID)
+            min_version: Optional version stamp the returned preferences must be at least as new as
 
         Returns:
             Dictionary containing user preferences or None if not found
@@ -153,29 +209,33 @@ class PreferencesManager:
         try:
             # Mask user ID in logs (show only first 8 chars)
             masked_user_id = f"{user_id[:8]}..." if len(user_id) > 8 else user_id
-            logger.info(f"Retrieving preferences for user: {masked_user_id}")
 
-            response = self.table.get_item(
-                Key={
-                    'PK': f'USER_PREF#{user_id}',
-                    'SK': 'PROFILE'
-                }
-            )
+            # Set when the stored copy is known to be newer than what an eventually
+            # consistent read might still return
+            consistent = min_version is not None
+            entry = self.cache.peek(user_id)
+            if entry is not None:
+                (version, item), fresh = entry
+                if min_version is None or version >= min_version:
+                    if fresh:
+                        logger.debug(f"Preferences cache hit for user: {masked_user_id}")
+                        return copy.deepcopy(item)
+                    if self._read_version(user_id) == version:
+                        logger.debug(f"Preferences cache revalidated for user: {masked_user_id}")
+                        self.cache.set(user_id, (version, item))
+                        return copy.deepcopy(item)
+                    consistent = True
 
-            if 'Item' in response:
-                item = response['Item']
-                # Remove DynamoDB-specific fields
-                item.pop('PK', None)
-                item.pop('SK', None)
-                
-                # Convert Decimals back to floats for JSON serialization
-                item = self._convert_decimals_to_float(item)
+            logger.info(f"Retrieving preferences for user: {masked_user_id}")
+            item = self._read_preferences(user_id, consistent=consistent)
+            version = int(item.get('version', 0)) if item else 0
+            self.cache.set(user_id, (version, item))
 
+            if item:
                 logger.info(f"Retrieved preferences for user: {masked_user_id}")
-                return item
             else:
                 logger.info(f"No preferences found for user: {masked_user_id}")
-                return None
+            return copy.deepcopy(item)
 
         except ClientError as e:
             logger.error(f"DynamoDB error retrieving preferences: {e.response['Error']['Message']}")
@@ -184,25 +244,28 @@ class PreferencesManager:
             logger.error(f"Unexpected error retrieving preferences: {str(e)}", exc_info=True)
             raise
 
-    def _convert_decimals_to_float(self, obj: Any) -> Any:
+    def _update_index(self, user_id: str, new_prefs: Optional[Dict[str, Any]], old_prefs: Optional[Dict[str, Any]]) -> None:
         """
-        Recursively convert Decimal values to float for JSON serialization.
-        
-        Args:
-            obj: Object to convert (can be dict, list, Decimal, or other types)
-            
-        Returns:
-            Converted object with Decimals replaced by floats
+        Keep the zip -> preferences index used to match new listings in step with a profile.
+
+        The profile write already succeeded, so a failure is logged rather than raised; the
+        index is repaired by NewMatchesManager.rebuild_index.
         """
-        if isinstance(obj, dict):
-            return {k: self._convert_decimals_to_float(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_decimals_to_float(item) for item in obj]
-        elif isinstance(obj, Decimal):
-            # Convert Decimal to float for JSON
-            return float(obj)
-        else:
-            return obj
+        try:
+            self._write_index(user_id, new_prefs, old_prefs)
+        except Exception as e:
+            logger.error(f"Failed to update the preferences index, run rebuild_index to repair it: {str(e)}")
+
+    def _write_index(self, user_id: str, new_prefs: Optional[Dict[str, Any]], old_prefs: Optional[Dict[str, Any]]) -> None:
+        new_items = preference_index_items({**new_prefs, 'userId': user_id}) if new_prefs else []
+        old_zips = set((old_prefs or {}).get('zipCodes') or [])
+        removed = old_zips - set((new_prefs or {}).get('zipCodes') or [])
+        with self.table.batch_writer() as batch:
+            for zip_code in removed:
+                batch.delete_item(Key={'PK': preference_index_key(zip_code), 'SK': f'USER#{user_id}'})
+            for index_item in new_items:
+                batch.put_item(Item=to_dynamodb(index_item))
+        get_new_matches_manager().invalidate(*old_zips, *(new_prefs or {}).get('zipCodes', []))
 
     def save_preferences(self, preferences: UserPreferences) -> Dict[str, Any]:
         """
@@ -212,7 +275,7 @@ class PreferencesManager:
             preferences: UserPreferences object to save
 
         Returns:
-            Dictionary with success status and updated timestamp
+            Dictionary with success status, updated timestamp and version stamp
         """
         try:
             # Mask user ID and email in logs
@@ -220,28 +283,32 @@ class PreferencesManager:
             masked_email = "<masked-email>" if preferences.email else None
             logger.info(f"Saving preferences for user: {masked_user_id}, email: {masked_email}")
 
-            # Convert to dict and prepare for DynamoDB
+            # Convert to dict and stamp a new version (microseconds since epoch)
             prefs_dict = preferences.model_dump(exclude_none=True)
+            version = time.time_ns() // 1000
+            prefs_dict['version'] = version
             
-            # Convert floats to Decimal for DynamoDB compatibility
-            prefs_dict = self._convert_floats_to_decimal(prefs_dict)
-            
-            # Add DynamoDB keys
+            # Add DynamoDB keys (floats converted to Decimal for DynamoDB compatibility)
             item_data = {
                 'PK': f'USER_PREF#{preferences.userId}',
                 'SK': 'PROFILE',
-                **prefs_dict
+                **to_dynamodb(prefs_dict)
             }
 
             # Save to DynamoDB
-            self.table.put_item(Item=item_data)
+            response = self.table.put_item(Item=item_data, ReturnValues='ALL_OLD')
+
+            # Write through so this container never serves the previous profile
+            self.cache.set(preferences.userId, (version, prefs_dict))
+            self._update_index(preferences.userId, prefs_dict, response.get('Attributes'))
 
             logger.info(f"Successfully saved preferences for user: {masked_user_id}")
 
             return {
                 'success': True,
                 'userId': preferences.userId,
-                'updatedAt': preferences.updatedAt
+                'updatedAt': preferences.updatedAt,
+                'version': version
             }
 
         except ClientError as e:
@@ -251,26 +318,6 @@ class PreferencesManager:
             logger.error(f"Unexpected error saving preferences: {str(e)}", exc_info=True)
             raise
 
-    def _convert_floats_to_decimal(self, obj: Any) -> Any:
-        """
-        Recursively convert float values to Decimal for DynamoDB compatibility.
-        
-        Args:
-            obj: Object to convert (can be dict, list, float, or other types)
-            
-        Returns:
-            Converted object with floats replaced by Decimals
-        """
-        if isinstance(obj, dict):
-            return {k: self._convert_floats_to_decimal(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_floats_to_decimal(item) for item in obj]
-        elif isinstance(obj, float):
-            # Convert float to Decimal
-            return Decimal(str(obj))
-        else:
-            return obj
-
     def delete_preferences(self, user_id: str) -> bool:
         """
         Delete user preferences from DynamoDB.
@@ -285,12 +332,15 @@ class PreferencesManager:
             masked_user_id = f"{user_id[:8]}..." if len(user_id) > 8 else user_id
             logger.info(f"Deleting preferences for user: {masked_user_id}")
 
-            self.table.delete_item(
+            response = self.table.delete_item(
                 Key={
                     'PK': f'USER_PREF#{user_id}',
                     'SK': 'PROFILE'
-                }
+                },
+                ReturnValues='ALL_OLD'
             )
+            self.cache.set(user_id, (0, None))
+            self._update_index(user_id, None, response.get('Attributes'))
 
             logger.info(f"Successfully deleted preferences for user: {masked_user_id}")
             return True
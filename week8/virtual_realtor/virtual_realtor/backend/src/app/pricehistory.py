@@ -0,0 +1,314 @@
+"""
+Price history and price-drop alerts for cached properties.
+
+Every change to a cached listing (PROPERTY_INFO item) is processed as a change event
+(see changes.py):
+
+- A compact, append-only price-history point (date, price, status) is written under
+  PRICE_HISTORY#{property_id} whenever the price or status differs from the last
+  known value.
+- When the price went down, the users who saved the property are looked up in an
+  inverted property -> users index (PROPERTY_WATCHERS#{property_id}, maintained by
+  FavoritesManager) and each gets a PRICE_ALERT item and a current price on their
+  favorite, instead of scanning every user's favorites.
+
+Processing is idempotent: history points are keyed by the write's created_at
+timestamp and recorded last, after the watchers were alerted, so a redelivered event
+is skipped once its point exists and a retried one that failed half-way alerts again
+(alerts are keyed by the same timestamp and overwrite themselves).
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+from botocore.exceptions import ClientError
+from clients import get_dynamodb_resource, get_dynamodb_client
+from serialization import deserialize_item, serialize_item, to_dynamodb
+
+logger = logging.getLogger(__name__)
+
+# Smallest drop, in percent of the previous price, that alerts watchers
+PRICE_DROP_MIN_PERCENT = float(os.environ.get("PRICE_DROP_MIN_PERCENT", "0"))
+PRICE_ALERT_TTL_DAYS = int(os.environ.get("PRICE_ALERT_TTL_DAYS", "90"))
+
+
+def history_key(property_id: str) -> str:
+    """Partition key of a property's price history."""
+    return f"PRICE_HISTORY#{property_id}"
+
+
+def watchers_key(property_id: str) -> str:
+    """Partition key of the users who saved a property."""
+    return f"PROPERTY_WATCHERS#{property_id}"
+
+
+def watcher_item(user_id: str, property_id: str) -> Dict[str, Any]:
+    """Inverted index item linking a property to a user who saved it."""
+    return {'PK': watchers_key(property_id), 'SK': f'USER#{user_id}', 'user_id': user_id, 'property_id': property_id}
+
+
+class PricePoint(BaseModel):
+    """One entry of a property's price history"""
+    date: str
+    price: Optional[int] = None
+    status: Optional[str] = None
+
+
+class PriceDrop(BaseModel):
+    """A detected price drop, as stored in each watcher's alerts"""
+    property_id: str
+    formattedAddress: Optional[str] = None
+    old_price: int
+    new_price: int
+    drop: int
+    drop_percent: float
+    detected_at: str
+
+
+def _price(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class PriceHistoryManager:
+    """Manages price history, the property -> users index and price-drop alerts in DynamoDB"""
+
+    def __init__(self):
+        self.dynamodb = get_dynamodb_resource()
+        self.table_name = os.environ.get('DDB_TABLE')
+        if not self.table_name:
+            logger.error("DDB_TABLE environment variable is not set")
+            raise ValueError("DDB_TABLE environment variable is required.")
+        self.table = self.dynamodb.Table(self.table_name)
+        self.client = get_dynamodb_client()
+        logger.info(f"PriceHistoryManager initialized with table: {self.table_name}")
+
+    # --- Property -> users index ---
+
+    def iter_watchers(self, property_id: str) -> Iterator[str]:
+        """
+        Stream the IDs of the users who saved a property.
+
+        Args:
+            property_id: The property ID
+
+        Yields:
+            User IDs
+        """
+        paginator = self.client.get_paginator('query')
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            KeyConditionExpression='PK = :pk',
+            ExpressionAttributeValues={':pk': {'S': watchers_key(property_id)}},
+            ProjectionExpression='user_id',
+        ):
+            for item in page.get('Items', []):
+                yield item['user_id']['S']
+
+    def rebuild_watchers(self) -> int:
+        """
+        Backfill the property -> users index from existing favorites (one-off table scan).
+
+        Returns:
+            Number of index items written
+        """
+        count = 0
+        paginator = self.client.get_paginator('scan')
+        with self.table.batch_writer() as batch:
+            for page in paginator.paginate(
+                TableName=self.table_name,
+                FilterExpression='begins_with(PK, :pk) AND begins_with(SK, :sk)',
+                ExpressionAttributeValues={':pk': {'S': 'USER#'}, ':sk': {'S': 'FAVORITE#'}},
+                ProjectionExpression='user_id, property_id',
+            ):
+                for raw_item in page.get('Items', []):
+                    item = deserialize_item(raw_item)
+                    batch.put_item(Item=watcher_item(item['user_id'], item['property_id']))
+                    count += 1
+        logger.info(f"Rebuilt {count} property watcher entries")
+        return count
+
+    # --- Price history ---
+
+    def get_price_history(self, property_id: str, limit: Optional[int] = None, newest_first: bool = False) -> List[Dict[str, Any]]:
+        """
+        Retrieve a property's price history.
+
+        Args:
+            property_id: The property ID
+            limit: Optional maximum number of points
+            newest_first: If True, return the most recent points first
+
+        Returns:
+            Price points ({date, price, status}), oldest first unless newest_first
+        """
+        query_kwargs = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': 'PK = :pk',
+            'ExpressionAttributeValues': {':pk': {'S': history_key(property_id)}},
+            'ScanIndexForward': not newest_first,
+        }
+        points = []
+        paginator = self.client.get_paginator('query')
+        for page in paginator.paginate(**query_kwargs, PaginationConfig={'MaxItems': limit, 'PageSize': limit} if limit else {}):
+            for raw_item in page.get('Items', []):
+                item = deserialize_item(raw_item)
+                points.append(PricePoint(date=item['SK'], price=item.get('price'), status=item.get('status')).model_dump())
+        return points
+
+    def has_price_point(self, property_id: str, date: str) -> bool:
+        """Whether a property's history already has a point for a date (strongly consistent)."""
+        response = self.client.get_item(
+            TableName=self.table_name,
+            Key={'PK': {'S': history_key(property_id)}, 'SK': {'S': date}},
+            ProjectionExpression='SK',
+            ConsistentRead=True,
+        )
+        return 'Item' in response
+
+    def append_price_point(self, property_id: str, point: PricePoint) -> bool:
+        """
+        Append a point to a property's price history.
+
+        Args:
+            property_id: The property ID
+            point: Price point; its date is the sort key
+
+        Returns:
+            False if a point with the same date already exists (event already processed)
+        """
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item=serialize_item({'PK': history_key(property_id), 'SK': point.date,
+                                     **point.model_dump(exclude={'date'}, exclude_none=True)}),
+                ConditionExpression='attribute_not_exists(SK)',
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    # --- Change processing ---
+
+    def process_change(self, new_item: Dict[str, Any], old_item: Optional[Dict[str, Any]] = None) -> Optional[PriceDrop]:
+        """
+        Record a cached listing's price change and alert its watchers on a drop.
+
+        Args:
+            new_item: PROPERTY_INFO item after the write
+            old_item: Item before the write; when missing (e.g. the cached item had
+                expired) the last history point is used instead
+
+        Returns:
+            The price drop, if the price went down by at least PRICE_DROP_MIN_PERCENT
+        """
+        property_id = new_item.get('property_id') or new_item['SK']
+        new_price, new_status = _price(new_item.get('price')), new_item.get('status')
+
+        if old_item is not None:
+            previous = PricePoint(date='', price=_price(old_item.get('price')), status=old_item.get('status'))
+        else:
+            latest = self.get_price_history(property_id, limit=1, newest_first=True)
+            previous = PricePoint(**latest[0]) if latest else None
+
+        if previous is not None and (previous.price, previous.status) == (new_price, new_status):
+            return None
+
+        point = PricePoint(date=new_item.get('created_at') or datetime.utcnow().isoformat(),
+                           price=new_price, status=new_status)
+        if self.has_price_point(property_id, point.date):
+            logger.info(f"Price point {point.date} for {property_id} already recorded")
+            return None
+
+        drop = None
+        if previous is not None and previous.price is not None and new_price is not None and new_price < previous.price:
+            drop_percent = round((previous.price - new_price) * 100 / previous.price, 2)
+            if drop_percent >= PRICE_DROP_MIN_PERCENT:
+                drop = PriceDrop(
+                    property_id=property_id,
+                    formattedAddress=new_item.get('formattedAddress'),
+                    old_price=previous.price,
+                    new_price=new_price,
+                    drop=previous.price - new_price,
+                    drop_percent=drop_percent,
+                    detected_at=point.date,
+                )
+                # Before the point is recorded: if this fails, the retried event finds no
+                # point and fans out again (alert keys are deterministic, so no duplicates)
+                notified = self.fan_out(drop)
+                logger.info(f"Price drop on {property_id}: {drop.old_price} -> {drop.new_price}, notified {notified} users")
+
+        self.append_price_point(property_id, point)
+        return drop
+
+    def fan_out(self, drop: PriceDrop) -> int:
+        """
+        Alert every user who saved the property and update their favorite's price.
+
+        Args:
+            drop: The price drop
+
+        Returns:
+            Number of users notified
+        """
+        user_ids = list(self.iter_watchers(drop.property_id))
+        if not user_ids:
+            return 0
+
+        expires_at = int((datetime.utcnow() + timedelta(days=PRICE_ALERT_TTL_DAYS)).timestamp())
+        with self.table.batch_writer() as batch:
+            for user_id in user_ids:
+                batch.put_item(Item=to_dynamodb({
+                    'PK': f'USER#{user_id}',
+                    'SK': f'PRICE_ALERT#{drop.detected_at}#{drop.property_id}',
+                    'ttl': expires_at,
+                    **drop.model_dump(exclude_none=True),
+                }))
+
+        for user_id in user_ids:
+            try:
+                self.client.update_item(
+                    TableName=self.table_name,
+                    Key={'PK': {'S': f'USER#{user_id}'}, 'SK': {'S': f'FAVORITE#{drop.property_id}'}},
+                    UpdateExpression='SET price = :price, last_refreshed_at = :now',
+                    ConditionExpression='attribute_exists(PK)',
+                    ExpressionAttributeValues={':price': {'N': str(drop.new_price)},
+                                               ':now': {'S': datetime.utcnow().isoformat()}},
+                )
+            except ClientError as e:
+                # The favorite was removed after the index was read
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+        return len(user_ids)
+
+    def get_price_alerts(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Retrieve a user's price-drop alerts, most recent first.
+
+        Args:
+            user_id: The user's Cognito sub
+            limit: Maximum number of alerts
+
+        Returns:
+            Price drop dictionaries
+        """
+        response = self.client.query(
+            TableName=self.table_name,
+            KeyConditionExpression='PK = :pk AND begins_with(SK, :sk)',
+            ExpressionAttributeValues={':pk': {'S': f'USER#{user_id}'}, ':sk': {'S': 'PRICE_ALERT#'}},
+            ScanIndexForward=False,
+            Limit=limit,
+        )
+        alerts = []
+        for raw_item in response.get('Items', []):
+            item = deserialize_item(raw_item)
+            alerts.append(PriceDrop(**item).model_dump())
+        return alerts
+
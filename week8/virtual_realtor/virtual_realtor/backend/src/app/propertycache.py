@@ -0,0 +1,217 @@
+"""
+Stale-while-revalidate reads of the PROPERTY_INFO cache.
+
+Cached listings carry two expiry times:
+
+- soft_expires_at (PROPERTY_SOFT_TTL_HOURS after the write): past it, the listing is
+  still returned immediately, and one background refresh from RentCast is started.
+- ttl, the hard expiry (PROPERTY_TTL_HOURS, also DynamoDB's TTL attribute): past it,
+  the listing is refreshed before it is returned. DynamoDB deletes expired items
+  lazily, so such items are still read regardless.
+
+Only one refresh per listing runs at a time across all Lambda instances: a refresher
+first takes a short lease on the item with a conditional update; a refresh cut short
+(e.g. by Lambda freezing the execution environment) is retried by the first stale read
+after the lease expires. Listings that are not cached at all are not fetched here (a
+miss returns None). Lookups are counted per result (hit, stale, hard_expired, miss) and
+written as CloudWatch EMF metrics.
+
+Usage:
+    item, status = get_property_cache().get(property_id="3821-Hargis-St-Austin-TX-78723")
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from accounting import ACCOUNTING_EMF_ENABLED, ACCOUNTING_NAMESPACE, ACCOUNTING_SERVICE
+
+logger = logging.getLogger(__name__)
+
+PROPERTY_REFRESH_LEASE_SECONDS = int(os.environ.get("PROPERTY_REFRESH_LEASE_SECONDS", "60"))
+PROPERTY_REFRESH_WORKERS = int(os.environ.get("PROPERTY_REFRESH_WORKERS", "2"))
+
+HIT = "hit"
+STALE = "stale"
+HARD_EXPIRED = "hard_expired"
+MISS = "miss"
+ERROR = "error"
+
+
+class PropertyCache:
+    """
+    Stale-while-revalidate wrapper around QuestionManager's PROPERTY_INFO reads and writes.
+    """
+
+    def __init__(self, question_manager: Any, lease_seconds: int = PROPERTY_REFRESH_LEASE_SECONDS,
+                 workers: int = PROPERTY_REFRESH_WORKERS):
+        """
+        Args:
+            question_manager: QuestionManager used to read, fetch and store listings
+            lease_seconds: How long a refresher holds a listing before another may retry
+            workers: Number of background refresh threads
+        """
+        self.questions = question_manager
+        self.lease_seconds = lease_seconds
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="property-refresh")
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._counts: Counter = Counter()
+
+    def get(self, property_id: Optional[str] = None,
+            property_address: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Look up a cached listing, refreshing it as its expiry requires.
+
+        Args:
+            property_id: The unique property ID
+            property_address: The formatted property address
+
+        Returns:
+            (listing or None, lookup result: "hit", "stale", "hard_expired" or "miss");
+            on a read failure, ({"error": message}, "error")
+        """
+        started_at = time.perf_counter()
+        item = self.questions.get_property_info_from_db(property_id=property_id, property_address=property_address)
+        if item is not None and 'error' in item:
+            return item, ERROR
+        now = time.time()
+
+        if item is None:
+            # Not cached: finding the listing on RentCast is left to search_properties
+            status = MISS
+        else:
+            hard_expires_at = item.get('ttl') or 0
+            soft_expires_at = item.get('soft_expires_at') or hard_expires_at
+            address = item.get('formattedAddress') or property_address
+            if now >= hard_expires_at:
+                status = HARD_EXPIRED
+                # Serve the expired copy if RentCast is unavailable
+                item = (self._refresh(address, item.get('property_id')) if address else None) or item
+            elif now >= soft_expires_at:
+                status = STALE
+                if address:
+                    self.refresh_in_background(item.get('property_id') or property_id, address)
+            else:
+                status = HIT
+
+        self._record(status, (time.perf_counter() - started_at) * 1000)
+        return item, status
+
+    def refresh_in_background(self, property_id: str, address: str) -> bool:
+        """
+        Start a background refresh of a listing unless one is already running.
+
+        Args:
+            property_id: The property ID
+            address: The listing's formatted address
+
+        Returns:
+            True if a refresh was started
+        """
+        with self._lock:
+            if property_id in self._refreshing:
+                return False
+            self._refreshing.add(property_id)
+        if not self._acquire_lease(property_id):
+            # Another instance is refreshing it
+            with self._lock:
+                self._refreshing.discard(property_id)
+            return False
+
+        def run() -> None:
+            try:
+                self._refresh(address, property_id)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(property_id)
+
+        self._pool.submit(run)
+        return True
+
+    def _acquire_lease(self, property_id: str) -> bool:
+        now = int(time.time())
+        try:
+            self.questions.client.update_item(
+                TableName=self.questions.table_name,
+                Key={'PK': {'S': 'PROPERTY_INFO'}, 'SK': {'S': property_id}},
+                UpdateExpression='SET refresh_started_at = :now',
+                ConditionExpression='attribute_exists(PK) AND '
+                                    '(attribute_not_exists(refresh_started_at) OR refresh_started_at < :expired)',
+                ExpressionAttributeValues={':now': {'N': str(now)},
+                                           ':expired': {'N': str(now - self.lease_seconds)}},
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def _refresh(self, address: str, property_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Fetch a listing from RentCast and store it; None if it could not be fetched."""
+        try:
+            listing = self.questions.fetch_listing(address, property_id)
+        except Exception as e:
+            logger.error(f"Failed to refresh property {property_id or address}: {str(e)}")
+            listing = None
+        if listing is None:
+            self._record("refresh_failed")
+            return None
+        result = self.questions.add_property_info_to_db(listing)
+        if not result.get('success'):
+            self._record("refresh_failed")
+            return listing
+        self._record("refreshed")
+        # Read back the stored item so callers see the same fields as on a hit
+        stored = self.questions.get_property_info_from_db(property_id=result['property_id'])
+        return stored if stored and 'error' not in stored else listing
+
+    def _record(self, result: str, latency_ms: Optional[float] = None) -> None:
+        with self._lock:
+            self._counts[result] += 1
+        if latency_ms is None or not ACCOUNTING_EMF_ENABLED:
+            return
+        line = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": ACCOUNTING_NAMESPACE,
+                    "Dimensions": [["Service", "Result"]],
+                    "Metrics": [{"Name": "PropertyCacheLookups", "Unit": "Count"},
+                                {"Name": "PropertyCacheLatencyMs", "Unit": "Milliseconds"}],
+                }],
+            },
+            "Service": ACCOUNTING_SERVICE,
+            "Result": result,
+            "PropertyCacheLookups": 1,
+            "PropertyCacheLatencyMs": round(latency_ms, 2),
+        }
+        # EMF lines must be bare JSON, so they bypass the logging formatter
+        sys.stdout.write(json.dumps(line) + "\n")
+        sys.stdout.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Lookup counts of this execution environment.
+
+        Returns:
+            Counts per result, refresh outcomes and the hit ratio (fresh or stale)
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = sum(counts.get(result, 0) for result in (HIT, STALE, HARD_EXPIRED, MISS))
+        served = counts.get(HIT, 0) + counts.get(STALE, 0)
+        return {
+            "lookups": lookups,
+            **{result: counts.get(result, 0) for result in (HIT, STALE, HARD_EXPIRED, MISS)},
+            "refreshed": counts.get("refreshed", 0),
+            "refresh_failed": counts.get("refresh_failed", 0),
+            "hit_ratio": round(served / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,133 @@
+"""
+Compact storage format of cached listings (PROPERTY_INFO items).
+
+A RentCast listing carries nested data (listingAgent, listingOffice, hoa, history, ...)
+that is only read when a single property is shown in full. Storing every field as a
+top-level attribute makes each item several KB, and DynamoDB charges capacity by item
+size (1 KB per write unit, 4 KB per read unit, for queries and scans as well).
+
+pack_property_item() keeps the keys, expiry times and the fields that are filtered,
+indexed or aggregated on (PROPERTY_INDEXED_FIELDS) as top-level attributes, and stores
+everything else as one compressed JSON blob (payload, with its codec in payload_codec).
+The blob is only decoded by readers that need the full listing (unpack_property_item);
+change processing, statistics and location searches use the top-level fields alone.
+Items written before this format have no payload and are read unchanged.
+
+zstd is used when the optional zstandard package is installed (pip install
+".[compression]"), zlib otherwise; PROPERTY_PAYLOAD_CODEC selects one explicitly.
+"""
+
+import base64
+import json
+import logging
+import os
+import zlib
+from typing import Any, Dict
+
+from serialization import dumps_bytes
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ModuleNotFoundError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PROPERTY_PAYLOAD_CODEC = os.environ.get("PROPERTY_PAYLOAD_CODEC", "zstd" if ZSTD_AVAILABLE else "zlib").lower()
+PROPERTY_PAYLOAD_LEVEL = int(os.environ.get("PROPERTY_PAYLOAD_LEVEL", "6"))
+
+# Attributes kept top-level: keys, cache bookkeeping and the fields that are searched,
+# filtered or aggregated on
+PROPERTY_KEY_FIELDS = ("PK", "SK", "property_id", "ttl", "soft_expires_at", "refresh_started_at", "created_at")
+PROPERTY_INDEXED_FIELDS = (
+    "id", "formattedAddress", "addressLine1", "city", "state", "zipCode", "county",
+    "latitude", "longitude", "propertyType", "bedrooms", "bathrooms", "squareFootage",
+    "lotSize", "yearBuilt", "status", "price", "daysOnMarket", "listedDate",
+)
+_TOP_LEVEL = set(PROPERTY_KEY_FIELDS) | set(PROPERTY_INDEXED_FIELDS)
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstd payloads require the zstandard package")
+        return zstandard.ZstdCompressor(level=PROPERTY_PAYLOAD_LEVEL).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, PROPERTY_PAYLOAD_LEVEL)
+    raise ValueError(f"Unsupported payload codec: {codec}")
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstd payloads require the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unsupported payload codec: {codec}")
+
+
+def pack_property_item(item: Dict[str, Any], codec: str = PROPERTY_PAYLOAD_CODEC) -> Dict[str, Any]:
+    """
+    Convert a PROPERTY_INFO item to the stored format.
+
+    Args:
+        item: Item with native values (keys, bookkeeping and all listing fields)
+        codec: "zstd" or "zlib"
+
+    Returns:
+        Item with the indexed fields top-level and the rest in a compressed payload;
+        None values are dropped
+    """
+    packed = {key: value for key, value in item.items() if key in _TOP_LEVEL and value is not None}
+    details = {key: value for key, value in item.items()
+               if key not in _TOP_LEVEL and key not in ("payload", "payload_codec") and value is not None}
+    if details:
+        packed["payload"] = _compress(dumps_bytes(details), codec)
+        packed["payload_codec"] = codec
+    return packed
+
+
+def payload_details(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Decode the compressed payload of a stored item.
+
+    Args:
+        item: Stored item (payload as bytes, boto3 Binary or base64 string)
+
+    Returns:
+        The listing fields kept in the payload (empty if it has none)
+    """
+    payload = item.get("payload")
+    if payload is None:
+        return {}
+    data = getattr(payload, "value", payload)
+    if isinstance(data, str):
+        # Binary attributes arrive base64 encoded in DynamoDB Streams events
+        data = base64.b64decode(data)
+    return json.loads(_decompress(bytes(data), item.get("payload_codec", "zlib")))
+
+
+def unpack_property_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a stored PROPERTY_INFO item back to the full listing.
+
+    Args:
+        item: Stored item with native values
+
+    Returns:
+        Item with the payload fields merged in and the payload attributes removed
+    """
+    if "payload" not in item:
+        return item
+    full = {key: value for key, value in item.items() if key not in ("payload", "payload_codec")}
+    for key, value in payload_details(item).items():
+        full.setdefault(key, value)
+    return full
+
+
+def strip_payload(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the undecoded payload of a stored item, keeping its top-level fields."""
+    return {key: value for key, value in item.items() if key not in ("payload", "payload_codec")}
@@ -1,19 +1,28 @@
 import uuid
 import os
-import boto3
 import logging
 import json
 import requests
-from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from botocore.exceptions import ClientError
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Iterator, Optional, List
 import time
+from clients import get_dynamodb_resource, get_dynamodb_client, get_sns_client
+from serialization import deserialize_item, dumps, to_dynamodb
+from changes import PROPERTY_CHANGES_PROCESSING, process_records, stream_record
+from propertystore import PROPERTY_INDEXED_FIELDS, PROPERTY_KEY_FIELDS, pack_property_item, strip_payload, unpack_property_item
 
 
 logger = logging.getLogger(__name__)
-load_dotenv()
+
+# .env files are only used for local runs; skip the lookup inside Lambda
+if not os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ModuleNotFoundError:
+        pass
 
 # Configuration: Use mock API for testing
 USE_MOCK_API = os.environ.get("USE_MOCK_RENTCAST_API", "true").lower() == "true"
@@ -34,6 +43,9 @@ else:
 url = api_url 
 logger.info(f"API URL: {url}")
 
+# Cache bookkeeping set on every PROPERTY_INFO write (never copied from the listing)
+CACHE_FIELDS = {'ttl', 'soft_expires_at', 'refresh_started_at', 'created_at'}
+
 
 def generate_mock_properties(
     city: str = None,
@@ -43,11 +55,13 @@ def generate_mock_properties(
     bedrooms: str = None,
     bathrooms: str = None,
     price: str = None,
+    address: str = None,
     **kwargs
 ) -> List[Dict[str, Any]]:
     """
     Generate mock property data for testing.
-    Returns realistic property listings based on search criteria.
+    Returns realistic property listings based on search criteria; an address lookup
+    returns a single listing at that address.
     """
     # Sample California cities and zip codes
     mock_locations = {
@@ -58,7 +72,13 @@ def generate_mock_properties(
         "94041": {"city": "Mountain View", "state": "CA"},
     }
     
-    # Determine location
+    # Determine location (an address is "Street, City, ST Zip")
+    address_parts = [part.strip() for part in address.split(",")] if address else []
+    if len(address_parts) >= 3:
+        city = address_parts[1]
+        state_zip = address_parts[2].split()
+        state = state_zip[0] if state_zip else state
+        zipCode = state_zip[1] if len(state_zip) > 1 else zipCode
     if zipCode and zipCode in mock_locations:
         location = mock_locations[zipCode]
     elif city:
@@ -95,9 +115,9 @@ def generate_mock_properties(
     
     properties = []
     import random
-    random.seed(hash(zipCode or city or "default"))  # Consistent results for same search
+    random.seed(hash(address or zipCode or city or "default"))  # Consistent results for same search
     
-    for i in range(min(limit, 10)):
+    for i in range(1 if address else min(limit, 10)):
         prop_type = random.choice(property_types)
         beds = random.randint(max(min_beds, 1), min(max_beds, 6))
         baths = random.choice([1.5, 2, 2.5, 3, 3.5, 4]) if beds >= 3 else random.choice([1, 1.5, 2])
@@ -110,13 +130,14 @@ def generate_mock_properties(
         
         street_num = random.randint(100, 9999)
         street = random.choice(streets)
-        address = f"{street_num} {street}, {location['city']}, {location['state']} {zipCode}"
-        property_id = address.replace(" ", "-").replace(",", "")
+        address_line1 = address_parts[0] if address_parts else f"{street_num} {street}"
+        formatted_address = address or f"{address_line1}, {location['city']}, {location['state']} {zipCode}"
+        property_id = formatted_address.replace(" ", "-").replace(",", "")
         
         property_data = {
             "id": property_id,
-            "formattedAddress": address,
-            "addressLine1": f"{street_num} {street}",
+            "formattedAddress": formatted_address,
+            "addressLine1": address_line1,
             "addressLine2": None,
             "city": location["city"],
             "state": location["state"],
@@ -184,14 +205,16 @@ class QuestionManager:
         - Gets table name from environment variables.
         """
         logger.info("Initialising QuestionManager")
-        self.dynamodb = boto3.resource('dynamodb')
-        self.sns_client = boto3.client('sns')
+        self.dynamodb = get_dynamodb_resource()
+        self.sns_client = get_sns_client()
 
         self.table_name = os.environ.get('DDB_TABLE')
         if not self.table_name:
             logger.error("DDB_TABLE environment variable is not set")
             raise ValueError("DDB_TABLE environment variable is required.")
         self.table = self.dynamodb.Table(self.table_name)
+        # Property reads go through the low-level client so items decode straight to native types
+        self.client = get_dynamodb_client()
         logger.info(f"DynamoDB table name: {self.table_name}")
 
         self.notification_topic_arn = os.environ.get('NOTIFICATION_TOPIC_ARN')
@@ -200,6 +223,10 @@ class QuestionManager:
         else:
             logger.warning("NOTIFICATION_TOPIC_ARN environment variable is not set. SNS notifications will be disabled.")
 
+        # Callables given the list of property items after each successful cache write
+        # (in-memory indexes of this execution environment follow the cache through them)
+        self.write_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
     def add_question(self, question: str, answer: str | None = None) -> Question:
         """
         Adds a new question to DynamoDB. The processed flag is set to False.
@@ -330,6 +357,13 @@ class QuestionManager:
         if USE_MOCK_API:
             logger.info("Using MOCK RentCast API")
             try:
+                if offset is not None:
+                    # Paginated requests page through a fixed-size mock market, so each
+                    # offset returns different listings and the last page is short
+                    from snapshot import mock_page
+                    listings, _ = mock_page({"city": city, "state": state, "zipCode": zipCode,
+                                             "offset": offset, "limit": limit})
+                    return dumps(listings)
                 mock_properties = generate_mock_properties(
                     city=city,
                     state=state,
@@ -338,9 +372,10 @@ class QuestionManager:
                     bedrooms=bedrooms,
                     bathrooms=bathrooms,
                     price=price,
+                    address=address,
                     propertyType=propertyType
                 )
-                return json.dumps(mock_properties, indent=2)
+                return dumps(mock_properties)
             except Exception as e:
                 error_msg = f"Error generating mock properties: {str(e)}"
                 logger.error(error_msg, exc_info=True)
@@ -401,7 +436,7 @@ class QuestionManager:
             
             data = response.json()
             logger.info(f"Successfully retrieved {len(data) if isinstance(data, list) else 'unknown'} properties")
-            return json.dumps(data, indent=2)
+            return dumps(data)
         except requests.exceptions.RequestException as e:
             error_msg = f"Error fetching properties from RentCast API: {str(e)}"
             logger.error(error_msg, exc_info=True)
@@ -411,6 +446,84 @@ class QuestionManager:
             logger.error(error_msg, exc_info=True)
             return json.dumps({"error": error_msg})
 
+    def fetch_listing(self, address: str, property_id: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Fetch the current listing at an address from RentCast (or the mock API).
+
+        Args:
+            address: Full address of the property (Street, City, State, Zip)
+            property_id: Optional ID the listing must have
+
+        Returns:
+            The listing, or None if RentCast has no listing at the address
+
+        Raises:
+            RuntimeError: If the RentCast request failed
+        """
+        data = json.loads(self.search_properties(address=address, limit=1))
+        if isinstance(data, dict):
+            raise RuntimeError(data.get('error', 'Unexpected RentCast response'))
+        for listing in data:
+            listing_id = listing.get('id') or (listing.get('formattedAddress') or '').replace(' ', '-').replace(',', '')
+            if property_id is None or listing_id == property_id:
+                return listing
+        return None
+
+    def property_item(self, property_data: Dict[str, Any], ttl_hours: int = None) -> Dict[str, Any]:
+        """
+        Build the PROPERTY_INFO item caching a listing.
+
+        Args:
+            property_data: Dictionary containing property information.
+                          Must include either 'id' or 'formattedAddress'.
+            ttl_hours: Time-to-live in hours (default from env var PROPERTY_TTL_HOURS or 12)
+
+        Returns:
+            Item with native values (keys, expiry times and the property data)
+
+        Raises:
+            ValueError: If the property data has neither 'id' nor 'formattedAddress'
+        """
+        # Get TTL from parameter, environment, or default to 12 hours
+        if ttl_hours is None:
+            ttl_hours = int(os.environ.get('PROPERTY_TTL_HOURS', '12'))
+        
+        # Calculate TTL timestamp (current time + ttl_hours)
+        ttl_timestamp = int(time.time()) + (ttl_hours * 3600)
+        # Past the soft expiry the listing is still served, but refreshed in the background
+        soft_ttl_hours = min(float(os.environ.get('PROPERTY_SOFT_TTL_HOURS', '6')), ttl_hours)
+        soft_expires_at = int(time.time() + soft_ttl_hours * 3600)
+        
+        # Extract property ID or generate from address
+        property_id = property_data.get('id')
+        if not property_id:
+            # Generate ID from formatted address if not provided
+            formatted_address = property_data.get('formattedAddress')
+            if not formatted_address:
+                raise ValueError("Property data must include 'id' or 'formattedAddress'")
+            # Create ID from address (replace spaces and commas)
+            property_id = formatted_address.replace(' ', '-').replace(',', '')
+        
+        # Prepare item for DynamoDB
+        item_data = {
+            'PK': 'PROPERTY_INFO',
+            'SK': property_id,
+            'property_id': property_id,
+            'ttl': ttl_timestamp,
+            'soft_expires_at': soft_expires_at,
+            'created_at': datetime.utcnow().isoformat(),
+            **{key: value for key, value in property_data.items() if key not in CACHE_FIELDS}  # Include all property data
+        }
+        
+        # Add indexes for searching
+        if 'zipCode' in property_data:
+            item_data['zipCode'] = property_data['zipCode']
+        if 'city' in property_data:
+            item_data['city'] = property_data['city']
+        if 'formattedAddress' in property_data:
+            item_data['formattedAddress'] = property_data['formattedAddress']
+        return item_data
+
     def add_property_info_to_db(
         self,
         property_data: Dict[str, Any],
@@ -431,48 +544,27 @@ class QuestionManager:
             # Get TTL from parameter, environment, or default to 12 hours
             if ttl_hours is None:
                 ttl_hours = int(os.environ.get('PROPERTY_TTL_HOURS', '12'))
-            
-            # Calculate TTL timestamp (current time + ttl_hours)
-            ttl_timestamp = int(time.time()) + (ttl_hours * 3600)
-            
-            # Extract property ID or generate from address
-            property_id = property_data.get('id')
-            if not property_id:
-                # Generate ID from formatted address if not provided
-                formatted_address = property_data.get('formattedAddress')
-                if not formatted_address:
-                    raise ValueError("Property data must include 'id' or 'formattedAddress'")
-                # Create ID from address (replace spaces and commas)
-                property_id = formatted_address.replace(' ', '-').replace(',', '')
-            
-            # Prepare item for DynamoDB
-            item_data = {
-                'PK': 'PROPERTY_INFO',
-                'SK': property_id,
-                'property_id': property_id,
-                'ttl': ttl_timestamp,
-                'created_at': datetime.utcnow().isoformat(),
-                **property_data  # Include all property data
-            }
-            
-            # Add indexes for searching
-            if 'zipCode' in property_data:
-                item_data['zipCode'] = property_data['zipCode']
-            if 'city' in property_data:
-                item_data['city'] = property_data['city']
-            if 'formattedAddress' in property_data:
-                item_data['formattedAddress'] = property_data['formattedAddress']
-            
-            # Store in DynamoDB
-            self.table.put_item(Item=item_data)
-            
+            item_data = self.property_item(property_data, ttl_hours)
+            property_id = item_data['property_id']
+            
+            # Store in DynamoDB, details compressed (floats such as bathrooms/latitude must be Decimals)
+            response = self.table.put_item(Item=to_dynamodb(pack_property_item(item_data)), ReturnValues='ALL_OLD')
+            if PROPERTY_CHANGES_PROCESSING == 'inline':
+                # Local stand-in for the table's DynamoDB Stream (change processing only reads top-level fields)
+                try:
+                    old_item = response.get('Attributes')
+                    process_records([stream_record(item_data, strip_payload(old_item) if old_item else None)])
+                except Exception as e:
+                    logger.error(f"Failed to process property change for {property_id}: {str(e)}", exc_info=True)
+            
+            self._notify_write_listeners([item_data])
             logger.info(f"Added property info for {property_id} with TTL of {ttl_hours} hours")
             
             return {
                 'success': True,
                 'property_id': property_id,
                 'ttl_hours': ttl_hours,
-                'expires_at': datetime.fromtimestamp(ttl_timestamp).isoformat()
+                'expires_at': datetime.fromtimestamp(item_data['ttl']).isoformat()
             }
             
         except Exception as e:
@@ -483,6 +575,114 @@ class QuestionManager:
                 'error': error_msg
             }
 
+    def add_properties_to_db(
+        self,
+        properties: List[Dict[str, Any]],
+        ttl_hours: int = None
+    ) -> Dict[str, Any]:
+        """
+        Add or update many properties with batched writes (25 items per BatchWriteItem).
+
+        Listings with the same ID are written once (the last one wins). With inline
+        change processing the replaced items are batch-read first, so price history and
+        market statistics see the same old images as with single writes.
+
+        Args:
+            properties: Property dictionaries (each with 'id' or 'formattedAddress')
+            ttl_hours: Time-to-live in hours (default from env var PROPERTY_TTL_HOURS or 12)
+
+        Returns:
+            Dictionary with success status, the number of items written and their IDs
+        """
+        items: Dict[str, Dict[str, Any]] = {}
+        skipped = 0
+        for property_data in properties:
+            try:
+                item_data = self.property_item(property_data, ttl_hours)
+            except ValueError:
+                skipped += 1
+                continue
+            items[item_data['SK']] = item_data
+
+        try:
+            old_items = self.get_property_items(list(items)) if PROPERTY_CHANGES_PROCESSING == 'inline' else {}
+            with self.table.batch_writer(overwrite_by_pkeys=['PK', 'SK']) as batch:
+                for item_data in items.values():
+                    batch.put_item(Item=to_dynamodb(pack_property_item(item_data)))
+        except Exception as e:
+            error_msg = f"Error adding properties: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            return {'success': False, 'error': error_msg}
+
+        self.after_property_writes(items, old_items)
+        logger.info(f"Added {len(items)} properties in batches ({skipped} without an ID skipped)")
+        return {'success': True, 'written': len(items), 'skipped': skipped, 'property_ids': list(items)}
+
+    def after_property_writes(self, items: Dict[str, Dict[str, Any]], old_items: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Follow-up of a batch of PROPERTY_INFO writes: inline change processing and write listeners.
+
+        Args:
+            items: Written items with native values, by property ID
+            old_items: Replaced items (top-level fields) by property ID, read before the
+                writes with get_property_items (only needed for inline change processing)
+        """
+        if PROPERTY_CHANGES_PROCESSING == 'inline':
+            for property_id, item_data in items.items():
+                try:
+                    process_records([stream_record(item_data, old_items.get(property_id))])
+                except Exception as e:
+                    logger.error(f"Failed to process property change for {property_id}: {str(e)}", exc_info=True)
+        self._notify_write_listeners(list(items.values()))
+
+    def _notify_write_listeners(self, items: List[Dict[str, Any]]) -> None:
+        for listener in self.write_listeners:
+            try:
+                listener(items)
+            except Exception as e:
+                logger.error(f"Property write listener failed: {str(e)}", exc_info=True)
+
+    def iter_property_items(self, fields: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Read every cached listing (all pages of the PROPERTY_INFO partition), projected to a few fields.
+
+        Args:
+            fields: Attributes to read (leaving out the compressed payload keeps the query cheap)
+
+        Returns:
+            Iterator over items with native values
+        """
+        query_kwargs = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': 'PK = :pk',
+            'ExpressionAttributeValues': {':pk': {'S': 'PROPERTY_INFO'}},
+            'ExpressionAttributeNames': {f'#f{index}': field for index, field in enumerate(fields)},
+            'ProjectionExpression': ', '.join(f'#f{index}' for index in range(len(fields))),
+        }
+        while True:
+            response = self.client.query(**query_kwargs)
+            for raw_item in response.get('Items', []):
+                yield deserialize_item(raw_item)
+            if 'LastEvaluatedKey' not in response:
+                return
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def get_property_items(self, property_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Batch-read PROPERTY_INFO items (100 keys per BatchGetItem) by property ID."""
+        found = {}
+        for start in range(0, len(property_ids), 100):
+            request = {self.table_name: {'Keys': [
+                {'PK': {'S': 'PROPERTY_INFO'}, 'SK': {'S': property_id}}
+                for property_id in property_ids[start:start + 100]
+            ]}}
+            while request:
+                response = self.client.batch_get_item(RequestItems=request)
+                for raw_item in response.get('Responses', {}).get(self.table_name, []):
+                    item = strip_payload(deserialize_item(raw_item))
+                    found[item['SK']] = item
+                request = response.get('UnprocessedKeys') or None
+        return found
+
     def get_property_info_from_db(
         self,
         property_id: str = None,
@@ -507,15 +707,16 @@ class QuestionManager:
                 property_id = property_address.replace(' ', '-').replace(',', '')
             
             # Query DynamoDB
-            response = self.table.get_item(
+            response = self.client.get_item(
+                TableName=self.table_name,
                 Key={
-                    'PK': 'PROPERTY_INFO',
-                    'SK': property_id
+                    'PK': {'S': 'PROPERTY_INFO'},
+                    'SK': {'S': property_id}
                 }
             )
             
             if 'Item' in response:
-                item = response['Item']
+                item = unpack_property_item(deserialize_item(response['Item']))
                 # Remove DynamoDB-specific fields
                 item.pop('PK', None)
                 item.pop('SK', None)
@@ -535,7 +736,8 @@ class QuestionManager:
         self,
         zipCode: str = None,
         city: str = None,
-        limit: int = 50
+        limit: int = 50,
+        details: bool = True
     ) -> List[Dict[str, Any]]:
         """
         Search for properties in DynamoDB by zipCode or city name.
@@ -544,6 +746,8 @@ class QuestionManager:
             zipCode: The 5-digit zip code to search for
             city: The city name to search for
             limit: Maximum number of results to return (default: 50)
+            details: If False, return only the top-level (indexed) fields without
+                     reading or decoding the compressed details
             
         Returns:
             List of property dictionaries matching the search criteria
@@ -559,12 +763,12 @@ class QuestionManager:
             
             if zipCode:
                 filter_expressions.append('#zipCode = :zipCode')
-                expression_attribute_values[':zipCode'] = zipCode
+                expression_attribute_values[':zipCode'] = {'S': zipCode}
                 expression_attribute_names['#zipCode'] = 'zipCode'
             
             if city:
                 filter_expressions.append('#city = :city')
-                expression_attribute_values[':city'] = city
+                expression_attribute_values[':city'] = {'S': city}
                 expression_attribute_names['#city'] = 'city'
             
             # Combine filter expressions
@@ -572,23 +776,31 @@ class QuestionManager:
             
             # Query parameters
             scan_kwargs = {
+                'TableName': self.table_name,
                 'FilterExpression': filter_expression,
                 'ExpressionAttributeValues': expression_attribute_values,
                 'ExpressionAttributeNames': expression_attribute_names,
                 'Limit': limit
             }
+            if not details:
+                # Leave the compressed payload out of the response
+                fields = (*PROPERTY_KEY_FIELDS, *PROPERTY_INDEXED_FIELDS)
+                expression_attribute_names.update({f'#f{index}': field for index, field in enumerate(fields)})
+                scan_kwargs['ProjectionExpression'] = ', '.join(f'#f{index}' for index in range(len(fields)))
             
             # Add condition to only get PROPERTY_INFO items
             scan_kwargs['FilterExpression'] = f'PK = :pk AND ({filter_expression})'
-            scan_kwargs['ExpressionAttributeValues'][':pk'] = 'PROPERTY_INFO'
+            scan_kwargs['ExpressionAttributeValues'][':pk'] = {'S': 'PROPERTY_INFO'}
             
-            response = self.table.scan(**scan_kwargs)
+            response = self.client.scan(**scan_kwargs)
             
             items = response.get('Items', [])
             
-            # Clean up DynamoDB-specific fields
+            # Decode and clean up DynamoDB-specific fields
             cleaned_items = []
-            for item in items:
+            for raw_item in items:
+                item = deserialize_item(raw_item)
+                item = unpack_property_item(item) if details else strip_payload(item)
                 item.pop('PK', None)
                 item.pop('SK', None)
                 cleaned_items.append(item)
@@ -677,7 +889,7 @@ class QuestionManager:
                 }
             
             logger.info(f"Web search completed successfully with {len(results['organic_results'])} results")
-            return json.dumps(results, indent=2)
+            return dumps(results)
             
         except requests.exceptions.Timeout:
             logger.error(f"Web search timed out for query: {query}")
@@ -0,0 +1,215 @@
+"""
+Shared serialization helpers for DynamoDB items and API responses.
+
+- deserialize_item / serialize_item convert between low-level DynamoDB attribute
+  values ({"S": ...}, {"N": ...}) and native Python types in a single pass, so numbers
+  come back as int/float instead of Decimal and no second conversion walk is needed.
+- to_dynamodb converts floats to Decimal for writes through the boto3 resource API.
+- dumps encodes JSON with orjson (Decimal aware) and falls back to the standard
+  library when orjson is not installed.
+- FastJSONResponse is a FastAPI response class built on dumps.
+"""
+
+import base64
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Dict
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ModuleNotFoundError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _decode_number(value: str) -> int | float:
+    """Decode a DynamoDB number string to int when integral, otherwise float."""
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def deserialize_value(attribute: Dict[str, Any]) -> Any:
+    """
+    Convert a single low-level DynamoDB attribute value to a native Python value.
+
+    Args:
+        attribute: Attribute value dictionary, e.g. {"N": "3"} or {"M": {...}}
+
+    Returns:
+        Native Python value (str, int, float, bool, None, dict, list, set or bytes)
+    """
+    (type_code, value), = attribute.items()
+    if type_code == 'S':
+        return value
+    if type_code == 'N':
+        return _decode_number(value)
+    if type_code == 'BOOL':
+        return value
+    if type_code == 'NULL':
+        return None
+    if type_code == 'M':
+        return {k: deserialize_value(v) for k, v in value.items()}
+    if type_code == 'L':
+        return [deserialize_value(v) for v in value]
+    if type_code == 'SS':
+        return set(value)
+    if type_code == 'NS':
+        return {_decode_number(v) for v in value}
+    if type_code == 'B':
+        return value
+    if type_code == 'BS':
+        return set(value)
+    raise TypeError(f"Unsupported DynamoDB attribute type: {type_code}")
+
+
+def deserialize_item(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert a low-level DynamoDB item (as returned by the client API) to a native dict.
+
+    Args:
+        item: Item with attribute value dictionaries as values
+
+    Returns:
+        Dictionary with native Python values
+    """
+    return {k: deserialize_value(v) for k, v in item.items()}
+
+
+def serialize_value(value: Any) -> Dict[str, Any]:
+    """
+    Convert a native Python value to a low-level DynamoDB attribute value.
+
+    Args:
+        value: Native Python value
+
+    Returns:
+        Attribute value dictionary
+    """
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, dict):
+        return {'M': {k: serialize_value(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize_value(v) for v in value]}
+    if isinstance(value, (set, frozenset)):
+        if all(isinstance(v, str) for v in value):
+            return {'SS': list(value)}
+        return {'NS': [str(v) for v in value]}
+    raise TypeError(f"Cannot serialize {type(value).__name__} to a DynamoDB attribute")
+
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Convert a native dict to a low-level DynamoDB item for the client API.
+
+    Args:
+        item: Dictionary with native Python values
+
+    Returns:
+        Item with attribute value dictionaries as values
+    """
+    return {k: serialize_value(v) for k, v in item.items()}
+
+
+def to_dynamodb(obj: Any) -> Any:
+    """
+    Recursively convert float values to Decimal for writes through the boto3 resource API.
+
+    Args:
+        obj: Object to convert (can be dict, list, float, or other types)
+
+    Returns:
+        Converted object with floats replaced by Decimals
+    """
+    if isinstance(obj, dict):
+        return {k: to_dynamodb(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [to_dynamodb(item) for item in obj]
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    return obj
+
+
+def from_dynamodb(obj: Any) -> Any:
+    """
+    Recursively convert Decimal values returned by the boto3 resource API to int/float.
+
+    Prefer reading with the client API and deserialize_item; this is for items that
+    have already been read (or built) through the resource API.
+
+    Args:
+        obj: Object to convert (can be dict, list, Decimal, or other types)
+
+    Returns:
+        Converted object with Decimals replaced by ints or floats
+    """
+    if isinstance(obj, dict):
+        return {k: from_dynamodb(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [from_dynamodb(item) for item in obj]
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    return obj
+
+
+def _default(obj: Any) -> Any:
+    """Encode types that are not natively JSON serializable."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode('ascii')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Encode obj as compact UTF-8 JSON bytes.
+
+    Args:
+        obj: Object to encode (Decimal, set and bytes values are supported)
+
+    Returns:
+        JSON bytes
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps(obj: Any) -> str:
+    """
+    Encode obj as a compact JSON string.
+
+    Args:
+        obj: Object to encode (Decimal, set and bytes values are supported)
+
+    Returns:
+        JSON string
+    """
+    return dumps_bytes(obj).decode('utf-8')
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with dumps_bytes (orjson when available)."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
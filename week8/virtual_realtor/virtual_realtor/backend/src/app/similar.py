@@ -0,0 +1,263 @@
+"""
+Similar-homes search over the cached listings.
+
+Every cached listing is turned into a numeric feature vector:
+
+- price, squareFootage and lotSize on a log scale (a 100k difference matters more at
+  500k than at 3M), bedrooms, bathrooms and yearBuilt as they are; each standardized
+  to zero mean and unit variance over the cached listings and multiplied by its weight
+  (SIMILAR_FEATURE_WEIGHTS)
+- latitude/longitude projected to kilometres and divided by SIMILAR_DISTANCE_SCALE_KM,
+  so one unit of distance is "that many km away"
+
+Missing values are imputed with the mean (they neither attract nor repel). The k
+nearest neighbours of a listing are found by a vectorized NumPy brute-force scan, a
+few milliseconds for tens of thousands of listings; with scikit-learn installed
+(pip install ".[similar]") and at least SIMILAR_BALL_TREE_MIN_LISTINGS listings, a
+ball tree is used instead.
+
+The matrix is built from one payload-free query of the PROPERTY_INFO partition on first
+use, marked stale by cache writes of this execution environment (QuestionManager write
+listeners) and rebuilt on the next search after SIMILAR_REBUILD_MIN_SECONDS, and in any
+case every SIMILAR_INDEX_TTL_SECONDS to pick up expiries and other instances' writes.
+"""
+
+import os
+import logging
+import math
+import numbers
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+try:
+    from sklearn.neighbors import BallTree
+    SKLEARN_AVAILABLE = True
+except ModuleNotFoundError:
+    SKLEARN_AVAILABLE = False
+    BallTree = None
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_INDEX_TTL_SECONDS = int(os.environ.get("SIMILAR_INDEX_TTL_SECONDS", "900"))
+SIMILAR_REBUILD_MIN_SECONDS = int(os.environ.get("SIMILAR_REBUILD_MIN_SECONDS", "60"))
+SIMILAR_DISTANCE_SCALE_KM = float(os.environ.get("SIMILAR_DISTANCE_SCALE_KM", "5"))
+SIMILAR_BALL_TREE_MIN_LISTINGS = int(os.environ.get("SIMILAR_BALL_TREE_MIN_LISTINGS", "20000"))
+
+# Listing field -> weight in the distance
+SIMILAR_FEATURE_WEIGHTS = {
+    "price": 2.0,
+    "bedrooms": 1.0,
+    "bathrooms": 1.0,
+    "squareFootage": 1.5,
+    "lotSize": 0.5,
+    "yearBuilt": 0.5,
+}
+LOG_SCALED_FEATURES = {"price", "squareFootage", "lotSize"}
+LOCATION_WEIGHT = float(os.environ.get("SIMILAR_LOCATION_WEIGHT", "1.0"))
+
+# Fields read for each listing (top-level attributes, no compressed payload)
+INDEX_FIELDS = [
+    "property_id", "formattedAddress", "city", "state", "zipCode", "propertyType", "status",
+    "latitude", "longitude", "ttl", *SIMILAR_FEATURE_WEIGHTS,
+]
+KM_PER_DEGREE = 111.32
+
+
+class SimilarProperty(BaseModel):
+    """A listing similar to the query listing"""
+    property_id: str
+    formattedAddress: Optional[str] = None
+    city: Optional[str] = None
+    zipCode: Optional[str] = None
+    propertyType: Optional[str] = None
+    price: Optional[int] = None
+    bedrooms: Optional[int] = None
+    bathrooms: Optional[float] = None
+    squareFootage: Optional[int] = None
+    lotSize: Optional[int] = None
+    yearBuilt: Optional[int] = None
+    distance_km: Optional[float] = None
+    similarity: float
+
+
+def _column(listings: List[Dict[str, Any]], field: str) -> np.ndarray:
+    values = np.array([listing.get(field) if isinstance(listing.get(field), numbers.Number) else np.nan
+                       for listing in listings], dtype=np.float64)
+    if field in LOG_SCALED_FEATURES:
+        values = np.log1p(np.where(values > 0, values, np.nan))
+    return values
+
+
+class FeatureSpace:
+    """Standardized feature vectors of a set of listings"""
+
+    def __init__(self, listings: List[Dict[str, Any]]):
+        """
+        Args:
+            listings: Listings with the fields of INDEX_FIELDS
+        """
+        self.listings = listings
+        self.ids = {listing["property_id"]: row for row, listing in enumerate(listings)}
+        self.types = np.array([listing.get("propertyType") for listing in listings], dtype=object)
+        columns, self.means, self.scales = [], {}, {}
+        for field, weight in SIMILAR_FEATURE_WEIGHTS.items():
+            values = _column(listings, field)
+            mean = float(np.nanmean(values)) if np.isfinite(values).any() else 0.0
+            std = float(np.nanstd(values)) if np.isfinite(values).any() else 0.0
+            self.means[field], self.scales[field] = mean, (weight / std if std > 0 else 0.0)
+            columns.append((np.where(np.isnan(values), mean, values) - mean) * self.scales[field])
+
+        # Equirectangular projection around the listings' mean latitude
+        latitudes, longitudes = _column(listings, "latitude"), _column(listings, "longitude")
+        self.lat0 = float(np.nanmean(latitudes)) if np.isfinite(latitudes).any() else 0.0
+        self.lon0 = float(np.nanmean(longitudes)) if np.isfinite(longitudes).any() else 0.0
+        self.km = np.column_stack(self._project(latitudes, longitudes))
+        self.matrix = np.column_stack(
+            [*columns, np.nan_to_num(self.km, nan=0.0) * (LOCATION_WEIGHT / SIMILAR_DISTANCE_SCALE_KM)]
+        ).astype(np.float32)
+        self.tree = BallTree(self.matrix) if SKLEARN_AVAILABLE and len(listings) >= SIMILAR_BALL_TREE_MIN_LISTINGS else None
+
+    def _project(self, latitudes: np.ndarray, longitudes: np.ndarray) -> tuple:
+        north = (latitudes - self.lat0) * KM_PER_DEGREE
+        east = (longitudes - self.lon0) * KM_PER_DEGREE * math.cos(math.radians(self.lat0))
+        return north, east
+
+    def vector(self, listing: Dict[str, Any]) -> np.ndarray:
+        """Feature vector of any listing, in this space's normalization."""
+        values = []
+        for field in SIMILAR_FEATURE_WEIGHTS:
+            value = _column([listing], field)[0]
+            values.append(((self.means[field] if np.isnan(value) else value) - self.means[field]) * self.scales[field])
+        north, east = self._project(_column([listing], "latitude"), _column([listing], "longitude"))
+        location = np.nan_to_num(np.array([north[0], east[0]]), nan=0.0) * (LOCATION_WEIGHT / SIMILAR_DISTANCE_SCALE_KM)
+        return np.array([*values, *location], dtype=np.float32)
+
+    def nearest(self, query: np.ndarray, candidates: Optional[np.ndarray], count: int) -> List[tuple]:
+        """
+        Rows nearest to a query vector.
+
+        Args:
+            query: Feature vector
+            candidates: Boolean mask of the eligible rows (None for all)
+            count: Number of rows
+
+        Returns:
+            (row, distance) pairs, nearest first
+        """
+        if self.tree is not None:
+            # Over-fetch, then drop ineligible rows; fall back to the scan if too few remain
+            distances, rows = self.tree.query(query.reshape(1, -1), k=min(count * 4 + 1, len(self.listings)))
+            found = [(row, distance) for row, distance in zip(rows[0].tolist(), distances[0].tolist())
+                     if candidates is None or candidates[row]]
+            if len(found) >= count:
+                return found[:count]
+        differences = self.matrix - query
+        squared = np.einsum("ij,ij->i", differences, differences)
+        if candidates is not None:
+            squared = np.where(candidates, squared, np.inf)
+        count = min(count, int(np.isfinite(squared).sum()))
+        if count == 0:
+            return []
+        rows = np.argpartition(squared, count - 1)[:count]
+        rows = rows[np.argsort(squared[rows])]
+        return [(int(row), float(math.sqrt(squared[row]))) for row in rows]
+
+
+class SimilarityIndex:
+    """k-nearest-neighbour search over the cached listings"""
+
+    def __init__(self, questions: Any, ttl_seconds: int = SIMILAR_INDEX_TTL_SECONDS):
+        """
+        Args:
+            questions: QuestionManager the listings are read from (and whose writes are followed)
+            ttl_seconds: Age after which the feature matrix is rebuilt
+        """
+        self.questions = questions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._space: Optional[FeatureSpace] = None
+        self._built_at = 0.0
+        self._stale = False
+        questions.write_listeners.append(self._mark_stale)
+
+    def _mark_stale(self, items: List[Dict[str, Any]]) -> None:
+        self._stale = True
+
+    def space(self) -> FeatureSpace:
+        """Current feature space, rebuilt when expired or stale."""
+        with self._lock:
+            age = time.monotonic() - self._built_at
+            if self._space is None or age > self.ttl_seconds or (self._stale and age > SIMILAR_REBUILD_MIN_SECONDS):
+                self._stale = False
+                started = time.perf_counter()
+                now = time.time()
+                listings = [item for item in self.questions.iter_property_items(INDEX_FIELDS)
+                            if (item.get('ttl') or now) >= now]
+                self._space = FeatureSpace(listings)
+                self._built_at = time.monotonic()
+                logger.info(f"Built similarity index of {len(listings)} listings in "
+                            f"{(time.perf_counter() - started) * 1000:.0f} ms")
+            return self._space
+
+    def find_similar(
+        self,
+        property_id: str,
+        limit: int = 5,
+        max_distance_km: Optional[float] = None,
+        same_property_type: bool = True,
+        listing: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Cached listings most similar to a property.
+
+        Args:
+            property_id: The property to compare with
+            limit: Maximum number of listings
+            max_distance_km: Optional radius around the property
+            same_property_type: Only return listings of the property's type
+            listing: The property's fields, when it may not be cached (e.g. a saved favorite)
+
+        Returns:
+            SimilarProperty dictionaries, most similar first
+
+        Raises:
+            ValueError: If the property is neither cached nor given
+        """
+        space = self.space()
+        row = space.ids.get(property_id)
+        if listing is None:
+            if row is not None:
+                listing = space.listings[row]
+            else:
+                listing = self.questions.get_property_info_from_db(property_id=property_id)
+                if not listing or 'error' in listing:
+                    raise ValueError(f"Property {property_id} is not in the cache")
+        if not space.listings:
+            return []
+
+        candidates = np.ones(len(space.listings), dtype=bool)
+        if row is not None:
+            candidates[row] = False
+        if same_property_type and listing.get('propertyType'):
+            candidates &= space.types == listing['propertyType']
+        north, east = space._project(_column([listing], "latitude"), _column([listing], "longitude"))
+        distances_km = np.hypot(space.km[:, 0] - north[0], space.km[:, 1] - east[0])
+        if max_distance_km is not None and np.isfinite(distances_km).any():
+            candidates &= distances_km <= max_distance_km
+        if candidates.all():
+            candidates = None
+
+        similar = []
+        for other_row, distance in space.nearest(space.vector(listing), candidates, limit):
+            other = space.listings[other_row]
+            distance_km = distances_km[other_row]
+            similar.append(SimilarProperty(
+                **{field: other.get(field) for field in SimilarProperty.model_fields if field in other},
+                distance_km=round(float(distance_km), 2) if np.isfinite(distance_km) else None,
+                similarity=round(1 / (1 + distance), 4),
+            ).model_dump(exclude_none=True))
+        return similar
@@ -0,0 +1,331 @@
+"""
+Concurrent, paginated market snapshots from RentCast.
+
+search_properties fetches a single page (at most 500 listings), so covering a whole zip
+code or city takes many calls. iter_snapshot() fetches every page of a search and yields
+the listings as an async stream:
+
+1. The first page is requested with includeTotalCount, whose X-Total-Count header gives
+   the number of pages to plan.
+2. The remaining pages are fetched by SNAPSHOT_CONCURRENCY workers (blocking requests in
+   threads) and handed over through a bounded queue. Workers wait while the consumer is
+   behind, so at most about twice SNAPSHOT_CONCURRENCY pages are held in memory however
+   large the market is.
+
+Downstream stages consume the stream, e.g. load_snapshot() writes it into the
+PROPERTY_INFO cache in batches, from which change processing updates market statistics
+and the other derived indexes. load_snapshot() also summarizes the area's statistics
+from the listings it streamed, so callers need not wait for change processing.
+
+Each snapshot spends at most SNAPSHOT_MAX_REQUESTS RentCast requests, and the snapshots
+of one conversation session at most SNAPSHOT_SESSION_REQUEST_BUDGET in all. With
+USE_MOCK_RENTCAST_API the same pipeline pages through a deterministic mock market of
+MOCK_SNAPSHOT_TOTAL listings.
+
+Usage:
+    async for listing in iter_snapshot(zipCode="94539"):
+        ...
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import requests
+from pydantic import BaseModel
+from cache import TTLCache
+from clients import get_or_create, get_market_stats_manager, get_question_manager
+from marketstats import city_key, contribution, zip_key
+from questions import USE_MOCK_API, api_key, generate_mock_properties, url as rentcast_url
+
+logger = logging.getLogger(__name__)
+
+# Listings per request (RentCast allows up to 500)
+SNAPSHOT_PAGE_SIZE = min(500, int(os.environ.get("SNAPSHOT_PAGE_SIZE", "500")))
+SNAPSHOT_CONCURRENCY = int(os.environ.get("SNAPSHOT_CONCURRENCY", "4"))
+# Upper bound on listings per snapshot (also bounds the RentCast requests it costs)
+SNAPSHOT_MAX_LISTINGS = int(os.environ.get("SNAPSHOT_MAX_LISTINGS", "5000"))
+# RentCast requests per snapshot, and per conversation session across its snapshots
+SNAPSHOT_MAX_REQUESTS = int(os.environ.get("SNAPSHOT_MAX_REQUESTS", "10"))
+SNAPSHOT_SESSION_REQUEST_BUDGET = int(os.environ.get("SNAPSHOT_SESSION_REQUEST_BUDGET", "20"))
+SNAPSHOT_SESSION_TTL_SECONDS = float(os.environ.get("SNAPSHOT_SESSION_TTL_SECONDS", "86400"))
+SNAPSHOT_REQUEST_ATTEMPTS = int(os.environ.get("SNAPSHOT_REQUEST_ATTEMPTS", "3"))
+SNAPSHOT_WRITE_BATCH_SIZE = int(os.environ.get("SNAPSHOT_WRITE_BATCH_SIZE", "100"))
+# Size of the mock market paged through when USE_MOCK_RENTCAST_API is set
+MOCK_SNAPSHOT_TOTAL = int(os.environ.get("MOCK_SNAPSHOT_TOTAL", "250"))
+
+# Fetches one page for the given query parameters: (listings, total count if reported)
+PageFetcher = Callable[[Dict[str, Any]], Tuple[List[Dict[str, Any]], Optional[int]]]
+
+_DONE = object()
+
+# Session ID -> RentCast requests its snapshots spent
+_session_requests = TTLCache(SNAPSHOT_SESSION_TTL_SECONDS, max_entries=4096)
+_session_lock = threading.Lock()
+
+
+class SnapshotReport(BaseModel):
+    """Outcome of loading a market snapshot into the cache"""
+    area: Dict[str, str] = {}
+    listings: int = 0
+    written: int = 0
+    requests: int = 0
+    # The request cap (per snapshot or left in the session) was reached
+    budget_exhausted: bool = False
+    market_stats: Optional[Dict[str, Any]] = None
+    duration_seconds: float = 0.0
+
+
+def _session() -> requests.Session:
+    # Pooled connections for the concurrent page requests
+    def _create():
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, SNAPSHOT_CONCURRENCY))
+        session.mount("https://", adapter)
+        return session
+    return get_or_create("rentcast_session", _create)
+
+
+def rentcast_page(params: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Fetch one page of listings from RentCast.
+
+    Args:
+        params: Query parameters (limit, offset, includeTotalCount and search filters)
+
+    Returns:
+        (listings, total count from X-Total-Count, or None if not reported)
+
+    Raises:
+        requests.exceptions.RequestException: After SNAPSHOT_REQUEST_ATTEMPTS failed attempts
+    """
+    headers = {"accept": "application/json", "X-Api-Key": api_key}
+    for attempt in range(1, SNAPSHOT_REQUEST_ATTEMPTS + 1):
+        try:
+            response = _session().get(rentcast_url, headers=headers, params=params, timeout=30)
+            response.raise_for_status()
+            total = response.headers.get("X-Total-Count")
+            return response.json(), int(total) if total is not None else None
+        except requests.exceptions.RequestException as e:
+            status = getattr(e.response, "status_code", None)
+            retryable = status is None or status == 429 or status >= 500
+            if not retryable or attempt == SNAPSHOT_REQUEST_ATTEMPTS:
+                raise
+            logger.warning(f"RentCast page at offset {params.get('offset')} failed ({e}), retrying")
+            time.sleep(0.5 * 2 ** (attempt - 1))
+
+
+def mock_page(params: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Fetch one page of a deterministic mock market of MOCK_SNAPSHOT_TOTAL listings.
+
+    Args:
+        params: Query parameters as for rentcast_page
+
+    Returns:
+        (listings, total count if includeTotalCount was requested)
+    """
+    mock = generate_mock_properties(city=params.get("city"), state=params.get("state") or "CA",
+                                    zipCode=params.get("zipCode"), limit=1)[0]
+    city, state, zip_code = mock["city"], mock["state"], mock["zipCode"]
+    offset = int(params.get("offset") or 0)
+    limit = int(params.get("limit") or SNAPSHOT_PAGE_SIZE)
+    listings = [
+        generate_mock_properties(address=f"{100 + index} Snapshot Way, {city}, {state} {zip_code}")[0]
+        for index in range(offset, min(offset + limit, MOCK_SNAPSHOT_TOTAL))
+    ]
+    return listings, MOCK_SNAPSHOT_TOTAL if params.get("includeTotalCount") else None
+
+
+async def iter_snapshot(
+    zipCode: str = None,
+    city: str = None,
+    state: str = None,
+    status: str = "Active",
+    page_size: int = SNAPSHOT_PAGE_SIZE,
+    concurrency: int = SNAPSHOT_CONCURRENCY,
+    max_listings: int = SNAPSHOT_MAX_LISTINGS,
+    max_requests: Optional[int] = None,
+    fetch_page: Optional[PageFetcher] = None,
+    **filters: Any
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream every listing of a search, fetching its pages concurrently.
+
+    Args:
+        zipCode: The 5-digit zip code
+        city: The city name (case-sensitive)
+        state: The 2-character state abbreviation
+        status: Listing status (default: "Active")
+        page_size: Listings per request (at most 500)
+        concurrency: Maximum number of requests in flight
+        max_listings: Stop after this many listings
+        max_requests: Optional limit on the page requests
+        fetch_page: Page fetcher (default: RentCast, or the mock market if enabled)
+        **filters: Further RentCast search filters (propertyType, price, bedrooms, ...)
+
+    Yields:
+        Listings, first page first; later pages in completion order
+
+    Raises:
+        ValueError: If neither zipCode nor city is given
+    """
+    if not zipCode and not city:
+        raise ValueError("Either zipCode or city must be provided")
+    fetch_page = fetch_page or (mock_page if USE_MOCK_API else rentcast_page)
+    page_size = min(page_size, max_listings)
+    if max_requests is not None:
+        max_listings = min(max_listings, max(1, max_requests) * page_size)
+    params = {key: value for key, value in dict(zipCode=zipCode, city=city, state=state, status=status,
+                                                **filters).items() if value is not None}
+
+    first, total = await asyncio.to_thread(fetch_page, {**params, "limit": page_size, "offset": 0,
+                                                        "includeTotalCount": "true"})
+    for listing in first[:max_listings]:
+        yield listing
+    if len(first) < page_size or len(first) >= max_listings:
+        return
+
+    if total is None:
+        # No count to plan with: page sequentially until a short page
+        offset = len(first)
+        while offset < max_listings:
+            page, _ = await asyncio.to_thread(fetch_page, {**params, "limit": page_size, "offset": offset})
+            for listing in page[:max_listings - offset]:
+                yield listing
+            offset += len(page)
+            if len(page) < page_size:
+                return
+        return
+
+    offsets = asyncio.Queue()
+    for offset in range(page_size, min(total, max_listings), page_size):
+        offsets.put_nowait(offset)
+    pages: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    workers_count = min(concurrency, offsets.qsize())
+
+    async def worker() -> None:
+        try:
+            while not offsets.empty():
+                offset = offsets.get_nowait()
+                page, _ = await asyncio.to_thread(fetch_page, {**params, "limit": page_size, "offset": offset})
+                await pages.put((offset, page))
+        except Exception as e:
+            await pages.put((_DONE, e))
+            return
+        await pages.put((_DONE, None))
+
+    workers = [asyncio.create_task(worker()) for _ in range(workers_count)]
+    try:
+        finished = 0
+        while finished < workers_count:
+            offset, page = await pages.get()
+            if offset is _DONE:
+                if isinstance(page, Exception):
+                    raise page
+                finished += 1
+                continue
+            for listing in page[:max(0, max_listings - offset)]:
+                yield listing
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def batched(listings: AsyncIterator[Dict[str, Any]],
+                  size: int = SNAPSHOT_WRITE_BATCH_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Group a listing stream into lists of up to size listings."""
+    batch = []
+    async for listing in listings:
+        batch.append(listing)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def session_requests_left(session_id: Optional[str]) -> int:
+    """RentCast requests a session's snapshots may still spend."""
+    if session_id is None:
+        return SNAPSHOT_SESSION_REQUEST_BUDGET
+    return max(0, SNAPSHOT_SESSION_REQUEST_BUDGET - _session_requests.get(session_id, 0))
+
+
+def _reserve(session_id: Optional[str], wanted: int) -> int:
+    # Concurrent snapshots of a session cannot overdraw its budget
+    if session_id is None:
+        return wanted
+    with _session_lock:
+        granted = min(wanted, session_requests_left(session_id))
+        _session_requests.set(session_id, _session_requests.get(session_id, 0) + granted)
+    return granted
+
+
+def _refund(session_id: Optional[str], unused: int) -> None:
+    if session_id is None or unused <= 0:
+        return
+    with _session_lock:
+        _session_requests.set(session_id, max(0, _session_requests.get(session_id, 0) - unused))
+
+
+async def load_snapshot(zipCode: str = None, city: str = None, state: str = None, session_id: Optional[str] = None,
+                        **kwargs: Any) -> SnapshotReport:
+    """
+    Fetch a market snapshot, write it into the PROPERTY_INFO cache in batches and
+    summarize its market statistics.
+
+    Args:
+        zipCode: The 5-digit zip code
+        city: The city name (case-sensitive)
+        state: The 2-character state abbreviation
+        session_id: Conversation session whose request budget the snapshot spends
+        **kwargs: Further iter_snapshot arguments (filters, concurrency, max_listings, ...)
+
+    Returns:
+        SnapshotReport with the number of listings fetched and cached, the requests spent
+        and the area's statistics computed from the fetched listings
+    """
+    started_at = time.perf_counter()
+    report = SnapshotReport(area={key: value for key, value in
+                                  dict(zipCode=zipCode, city=city, state=state).items() if value})
+    max_requests = _reserve(session_id, kwargs.pop("max_requests", SNAPSHOT_MAX_REQUESTS))
+    if max_requests <= 0:
+        report.budget_exhausted = True
+        logger.warning(f"Snapshot request budget of session {session_id} is used up")
+        return report
+
+    fetch_page = kwargs.pop("fetch_page", None) or (mock_page if USE_MOCK_API else rentcast_page)
+    lock = threading.Lock()
+
+    def counted_fetch(params: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        with lock:
+            report.requests += 1
+        return fetch_page(params)
+
+    stats_manager = get_market_stats_manager()
+    counts: Counter = Counter()
+    questions = get_question_manager()
+    try:
+        async for batch in batched(iter_snapshot(zipCode=zipCode, city=city, state=state, max_requests=max_requests,
+                                                 fetch_page=counted_fetch, **kwargs)):
+            result = await asyncio.to_thread(questions.add_properties_to_db, batch)
+            report.listings += len(batch)
+            report.written += result.get("written", 0)
+            for listing in batch:
+                counts.update(contribution(listing, 1, stats_manager.relative_accuracy))
+    finally:
+        _refund(session_id, max_requests - report.requests)
+
+    # From the streamed listings: the stored statistics lag behind change processing
+    area = zip_key(zipCode) if zipCode else city_key(city, state)
+    report.market_stats = stats_manager.summarize(area, counts, kwargs.get("propertyType"))
+    report.budget_exhausted = report.requests >= max_requests
+    report.duration_seconds = round(time.perf_counter() - started_at, 2)
+    logger.info(f"Loaded snapshot of {report.area}: {report.written} listings cached with {report.requests} "
+                f"requests in {report.duration_seconds}s")
+    return report
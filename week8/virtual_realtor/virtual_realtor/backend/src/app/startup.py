@@ -0,0 +1,85 @@
+"""
+Cold start instrumentation for the Virtual Realtor Lambda.
+
+The profiler records named spans (module imports, lazily created clients) relative
+to the moment this module was first imported, and emits a single JSON report once
+the application has finished starting. Spans recorded after the report (lazy
+initialisation triggered by the first requests) are logged individually so the full
+INIT cost remains visible in CloudWatch.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+STARTUP_REPORT_ENABLED = os.environ.get("STARTUP_REPORT", "true").lower() == "true"
+
+
+class StartupProfiler:
+    """
+    Collects timing spans for the cold start of the execution environment.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.modules_at_start = len(sys.modules)
+        self.spans: List[Dict[str, Any]] = []
+        self.reported = False
+
+    def _elapsed_ms(self, since: float) -> float:
+        return round((time.perf_counter() - since) * 1000, 2)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """
+        Time a block of code and record it under the given name.
+
+        Args:
+            name: Span name, prefixed by phase by convention (e.g. "import:strands", "init:dynamodb")
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            span = {
+                "name": name,
+                "offset_ms": round((start - self.started_at) * 1000, 2),
+                "duration_ms": self._elapsed_ms(start),
+            }
+            self.spans.append(span)
+            if self.reported and STARTUP_REPORT_ENABLED:
+                logger.info(f"Lazy {name} took {span['duration_ms']}ms")
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Emit the startup report once per execution environment.
+
+        Returns:
+            Dictionary with the import-time breakdown and init spans recorded so far
+        """
+        imports = [s for s in self.spans if s["name"].startswith("import:")]
+        inits = [s for s in self.spans if not s["name"].startswith("import:")]
+        summary = {
+            "event": "startup_report",
+            "total_ms": self._elapsed_ms(self.started_at),
+            "import_ms": round(sum(s["duration_ms"] for s in imports), 2),
+            "modules_loaded": len(sys.modules) - self.modules_at_start,
+            "imports": sorted(imports, key=lambda s: s["duration_ms"], reverse=True),
+            "init_spans": inits,
+            "lambda_init_type": os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE", "local"),
+        }
+        if not self.reported and STARTUP_REPORT_ENABLED:
+            logger.info(json.dumps(summary))
+        self.reported = True
+        return summary
+
+
+# Single profiler per execution environment
+profiler = StartupProfiler()
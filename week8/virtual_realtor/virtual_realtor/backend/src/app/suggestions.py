@@ -0,0 +1,265 @@
+"""
+Follow-up question suggestions for the chat UI.
+
+Suggestions only depend on the last few text turns of a conversation, so they are
+cached per session under a hash of those turns and most requests are answered
+without a model call:
+
+- A conversation with no text turns yet gets a sample from a precomputed pool.
+- A repeated request for the same context is served from the cache.
+- A request for a newer context cancels the generation still running for an older
+  context of the same session, whose result would be discarded anyway.
+- The chat stream prefetches suggestions as soon as an answer is complete, so the
+  follow-up /api/suggestions request usually finds them cached (or still running).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from accounting import TurnAccounting
+from cache import TTLCache
+from clients import get_bedrock_model
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent text turns that make up the suggestion context
+SUGGESTION_CONTEXT_TURNS = int(os.environ.get("SUGGESTION_CONTEXT_TURNS", "4"))
+SUGGESTIONS_CACHE_TTL_SECONDS = float(os.environ.get("SUGGESTIONS_CACHE_TTL_SECONDS", "900"))
+SUGGESTION_COUNT = 4
+# How long the chat stream waits for prefetched suggestions before closing (0 = don't wait)
+SUGGESTIONS_STREAM_WAIT_SECONDS = float(os.environ.get("SUGGESTIONS_STREAM_WAIT_SECONDS", "4"))
+
+# Questions for a conversation that has not started yet (same prompt for every visitor)
+SUGGESTION_POOL = [
+    "What homes are currently for sale in the Bay Area?",
+    "What can I get for under $1.5M in San Jose?",
+    "Which neighborhoods have the best schools?",
+    "How much do I need for a down payment?",
+    "Are there any condos for sale in San Francisco?",
+    "What are the current market trends in the East Bay?",
+    "Can you find 3 bedroom homes in Fremont?",
+    "How does the home buying process work in California?",
+    "What are property taxes like in Santa Clara County?",
+    "Can you help me find a townhouse near Caltrain?",
+    "What services does Monika Realty offer?",
+    "How competitive are offers right now?",
+]
+
+FALLBACK_SUGGESTIONS = [
+    "What properties are currently available in the area?",
+    "Can you tell me about the price range of homes?",
+    "What are the features of properties in this neighborhood?",
+    "How is the local school district?"
+]
+
+SUGGESTION_SYSTEM_PROMPT = "You are a helpful real estate advising assistant that generates relevant real estate questions. Always respond with valid JSON only."
+
+
+def conversation_context(messages: List[Dict[str, Any]], turns: int = SUGGESTION_CONTEXT_TURNS) -> str:
+    """
+    Build the suggestion context from the last text turns of a conversation.
+
+    Tool use and tool result messages carry no text and are skipped.
+
+    Args:
+        messages: Agent messages
+        turns: Number of most recent text turns to include
+
+    Returns:
+        "role: text" lines, or an empty string if the conversation has no text turns
+    """
+    lines = []
+    for message in reversed(messages):
+        content = message.get("content")
+        if content and "text" in content[0]:
+            lines.append(f"{message.get('role', '')}: {content[0]['text']}")
+            if len(lines) >= turns:
+                break
+    return "\n".join(reversed(lines))
+
+
+def context_hash(context: str) -> str:
+    """Stable cache key for a suggestion context."""
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+def pool_suggestions() -> List[str]:
+    """Sample suggestions for an empty conversation from the precomputed pool."""
+    return random.sample(SUGGESTION_POOL, SUGGESTION_COUNT)
+
+
+def parse_suggestions(response_text: str) -> List[str]:
+    """
+    Extract the JSON array of questions from a model response.
+
+    Args:
+        response_text: Raw model output
+
+    Returns:
+        Up to SUGGESTION_COUNT questions, or FALLBACK_SUGGESTIONS if none could be parsed
+    """
+    json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+    if json_match:
+        try:
+            suggestions = [str(s) for s in json.loads(json_match.group()) if s]
+            if suggestions:
+                return suggestions[:SUGGESTION_COUNT]
+        except json.JSONDecodeError:
+            pass
+    logger.warning("Could not parse suggestions from model response, using fallback")
+    return list(FALLBACK_SUGGESTIONS)
+
+
+class SuggestionService:
+    """
+    Generates follow-up question suggestions, cached per session and context.
+    """
+
+    def __init__(self, model_id: str, ttl_seconds: float = SUGGESTIONS_CACHE_TTL_SECONDS):
+        """
+        Args:
+            model_id: Bedrock model ID used to generate suggestions
+            ttl_seconds: How long generated suggestions are re-used
+        """
+        self.model_id = model_id
+        self.cache = TTLCache(ttl_seconds=ttl_seconds)
+        # session_id -> (context hash, running generation)
+        self._inflight: Dict[str, Tuple[str, asyncio.Task]] = {}
+
+    async def _generate(self, session_id: str, context: str) -> List[str]:
+        """Run the question generator model for a conversation context."""
+        from strands import Agent
+
+        prompt = f"""Based on this conversation history:
+
+{context}
+
+Generate exactly {SUGGESTION_COUNT} relevant and short follow-up questions that the user might want to ask about properties for sale.
+These should be natural questions a potential home buyer would ask.
+Return ONLY the {SUGGESTION_COUNT} questions as a JSON array, no other information necessary. Format: ["question 1", "question 2", "question 3", "question 4"]"""
+
+        accounting = TurnAccounting(endpoint="suggestions", session_id=session_id)
+        suggestion_agent = Agent(
+            model=get_bedrock_model(self.model_id),
+            system_prompt=SUGGESTION_SYSTEM_PROMPT,
+            hooks=[accounting],
+            callback_handler=accounting,
+        )
+        logger.info(f"Generating suggestions with model: {self.model_id}")
+
+        response_text = ""
+        async for event in suggestion_agent.stream_async(prompt):
+            if "data" in event:
+                response_text += event["data"]
+        return parse_suggestions(response_text)
+
+    async def get_suggestions(self, session_id: str, messages: List[Dict[str, Any]]) -> List[str]:
+        """
+        Return suggestions for the conversation, generating them only on a cache miss.
+
+        A generation already running for the same session and context is shared; one
+        running for an older context of the session is cancelled.
+
+        Args:
+            session_id: Chat session ID
+            messages: Agent messages of the session
+
+        Returns:
+            List of suggested questions
+        """
+        context = conversation_context(messages)
+        if not context:
+            return pool_suggestions()
+
+        key = context_hash(context)
+        suggestions = self.cache.get((session_id, key))
+        if suggestions is not None:
+            logger.info(f"Suggestions cache hit for session: {session_id[:8]}...")
+            return list(suggestions)
+
+        task = self._start(session_id, key, context)
+        try:
+            # Shielded so a disconnecting client does not throw away a generation others can use
+            return list(await asyncio.shield(task))
+        except asyncio.CancelledError:
+            if task.cancelled():
+                # Superseded by a request for a newer context of the same session
+                logger.info(f"Suggestion generation superseded for session: {session_id[:8]}...")
+                return list(FALLBACK_SUGGESTIONS)
+            raise
+
+    async def prefetch(self, session_id: str, messages: List[Dict[str, Any]],
+                       wait_seconds: float = 0) -> Optional[List[str]]:
+        """
+        Start generating suggestions for a conversation that just received an answer.
+
+        The generation keeps running after this returns and its result is cached under
+        the session and the new context, so a later get_suggestions call re-uses it.
+        Lambda freezes the execution environment once a response has completed, so
+        callers streaming a response should pass wait_seconds to finish it in-stream.
+
+        Args:
+            session_id: Chat session ID
+            messages: Agent messages of the session, including the latest answer
+            wait_seconds: How long to wait for the suggestions (0 returns immediately)
+
+        Returns:
+            Suggestions if available within wait_seconds, otherwise None
+        """
+        context = conversation_context(messages)
+        if not context:
+            return pool_suggestions()
+
+        key = context_hash(context)
+        suggestions = self.cache.get((session_id, key))
+        if suggestions is not None:
+            return list(suggestions)
+
+        task = self._start(session_id, key, context)
+        if wait_seconds <= 0:
+            return None
+        try:
+            return list(await asyncio.wait_for(asyncio.shield(task), timeout=wait_seconds))
+        except asyncio.TimeoutError:
+            logger.info(f"Suggestions not ready after {wait_seconds}s for session: {session_id[:8]}...")
+            return None
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None
+            raise
+        except Exception:
+            # Already logged by the generation's done callback
+            return None
+
+    def _start(self, session_id: str, key: str, context: str) -> asyncio.Task:
+        """Return the generation for (session, context), starting it and cancelling a stale one if needed."""
+        running = self._inflight.get(session_id)
+        if running is not None:
+            running_key, running_task = running
+            if running_key == key and not running_task.done():
+                return running_task
+            if not running_task.done():
+                logger.info(f"Cancelling stale suggestion generation for session: {session_id[:8]}...")
+                running_task.cancel()
+
+        task = asyncio.create_task(self._generate(session_id, context))
+        self._inflight[session_id] = (key, task)
+
+        def _done(finished: asyncio.Task) -> None:
+            if self._inflight.get(session_id, (None, None))[1] is finished:
+                del self._inflight[session_id]
+            if finished.cancelled():
+                return
+            if finished.exception() is not None:
+                logger.error(f"Error generating suggestions: {finished.exception()}")
+                return
+            self.cache.set((session_id, key), finished.result())
+
+        task.add_done_callback(_done)
+        return task
@@ -0,0 +1,230 @@
+"""
+Per-session memoization of read-only agent tools.
+
+Within a conversation the agent re-calls tools such as get_user_saved_properties with the
+same arguments many times; each call reads DynamoDB and serializes JSON again. Tools are
+memoized declaratively:
+
+    @tool
+    @memoize(ttl_seconds=60, tags=["favorites:{user_id}"])
+    def get_user_saved_properties(user_id: str, visit_only: bool = False) -> str: ...
+
+    @tool
+    @invalidates("favorites:{user_id}")
+    def add_property_to_favorites(user_id: str, property_id: str) -> str: ...
+
+- Results are cached per session: ToolMemoScope (an agent hook) sets the session of the
+  running invocation, and tools called outside any session are not memoized.
+- Tags are formatted with the call's arguments. Every call of an @invalidates tool
+  drops every cached result with a matching tag, in all sessions of the container;
+  invalidate_tags() does the same for writes made outside the tools (REST endpoints).
+  A result whose tags were invalidated while it was computed is returned but not
+  cached, so a read racing a write (concurrent tool execution) cannot keep stale data.
+- Identical calls running at the same time (concurrent tool execution) run the tool once.
+- Results reporting an error ({"error": ...}) and exceptions are not cached.
+"""
+
+import functools
+import inspect
+import itertools
+import logging
+import os
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+from strands.hooks import BeforeInvocationEvent, HookProvider, HookRegistry
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+TOOL_MEMO_TTL_SECONDS = float(os.environ.get("TOOL_MEMO_TTL_SECONDS", "60"))
+TOOL_MEMO_MAX_ENTRIES = int(os.environ.get("TOOL_MEMO_MAX_ENTRIES", "2048"))
+
+_session: ContextVar[Optional[str]] = ContextVar("tool_memo_session", default=None)
+_results = TTLCache(TOOL_MEMO_TTL_SECONDS, max_entries=TOOL_MEMO_MAX_ENTRIES)
+_lock = threading.Lock()
+# tag -> cache keys of the results carrying it
+_tagged: Dict[str, Set[Hashable]] = {}
+# tag -> stamp of its last invalidation (unique across tags, so a pruned tag never repeats one)
+_generations: Dict[str, int] = {}
+_stamps = itertools.count(1)
+# cache key -> lock held while the result is computed
+_in_flight: Dict[Hashable, threading.Lock] = {}
+_counts = {"hits": 0, "misses": 0, "invalidated": 0}
+
+
+class ToolMemoScope(HookProvider):
+    """
+    Agent hook that scopes memoized tool results to a session.
+
+    Register it on the agent (hooks=[ToolMemoScope(session_id)]); the session applies to
+    every tool call of the agent's invocations.
+    """
+
+    def __init__(self, session_id: str):
+        """
+        Args:
+            session_id: Conversation session ID
+        """
+        self.session_id = session_id
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: Any) -> None:
+        registry.add_callback(BeforeInvocationEvent, self._enter)
+
+    def _enter(self, event: BeforeInvocationEvent) -> None:
+        # Tools run in the invocation's context (asyncio.to_thread copies it)
+        _session.set(self.session_id)
+
+
+def _arguments(signature: inspect.Signature, args: tuple, kwargs: dict) -> Dict[str, Any]:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def _format_tags(templates: Iterable[str], arguments: Dict[str, Any]) -> List[str]:
+    return [template.format(**arguments) for template in templates]
+
+
+def _is_error(result: Any) -> bool:
+    return isinstance(result, str) and result.lstrip().startswith('{"error"')
+
+
+def memoize(ttl_seconds: float = TOOL_MEMO_TTL_SECONDS, tags: Iterable[str] = ()) -> Callable:
+    """
+    Memoize a tool function per session.
+
+    Apply it below @tool so the tool spec is built from the original signature.
+
+    Args:
+        ttl_seconds: How long a result is reused
+        tags: Invalidation tags, formatted with the call's arguments (e.g. "favorites:{user_id}")
+
+    Returns:
+        Decorator
+    """
+    tag_templates = list(tags)
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            session_id = _session.get()
+            if session_id is None:
+                return func(*args, **kwargs)
+            arguments = _arguments(signature, args, kwargs)
+            key = (session_id, func.__name__, repr(sorted(arguments.items())))
+
+            cached = _results.get(key, _MISSING)
+            if cached is _MISSING:
+                with _lock:
+                    key_lock = _in_flight.setdefault(key, threading.Lock())
+                try:
+                    with key_lock:
+                        # A concurrent identical call may have stored it meanwhile
+                        cached = _results.get(key, _MISSING)
+                        if cached is _MISSING:
+                            tags = _format_tags(tag_templates, arguments)
+                            with _lock:
+                                _counts["misses"] += 1
+                                generations = [_generations.get(tag) for tag in tags]
+                            result = func(*args, **kwargs)
+                            if not _is_error(result):
+                                with _lock:
+                                    # Skipped if a write invalidated a tag while the tool ran
+                                    if generations == [_generations.get(tag) for tag in tags]:
+                                        _results.set(key, result, ttl_seconds)
+                                        for tag in tags:
+                                            _tagged.setdefault(tag, set()).add(key)
+                                    if len(_tagged) > TOOL_MEMO_MAX_ENTRIES:
+                                        _prune_tags()
+                            return result
+                finally:
+                    with _lock:
+                        if _in_flight.get(key) is key_lock:
+                            del _in_flight[key]
+            with _lock:
+                _counts["hits"] += 1
+            return cached
+
+        return wrapper
+
+    return decorator
+
+
+def _prune_tags() -> None:
+    # Forget expired and evicted results (caller holds _lock)
+    for tag in list(_tagged):
+        live = {key for key in _tagged[tag] if key in _results}
+        if live:
+            _tagged[tag] = live
+        else:
+            del _tagged[tag]
+    if len(_generations) > TOOL_MEMO_MAX_ENTRIES:
+        # A call in flight for a forgotten tag only skips caching its result
+        for tag in [tag for tag in _generations if tag not in _tagged]:
+            del _generations[tag]
+
+
+def invalidates(*tags: str) -> Callable:
+    """
+    Declare the memoized results a tool's writes make stale.
+
+    Args:
+        *tags: Tags to invalidate after each call, formatted with its arguments
+
+    Returns:
+        Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            result = func(*args, **kwargs)
+            invalidate_tags(*_format_tags(tags, _arguments(signature, args, kwargs)))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate_tags(*tags: str) -> int:
+    """
+    Drop every memoized result carrying one of the tags, in all sessions.
+
+    Args:
+        *tags: Formatted tags (e.g. "favorites:<user id>")
+
+    Returns:
+        Number of results dropped
+    """
+    with _lock:
+        keys = set().union(*(_tagged.pop(tag, set()) for tag in tags)) if tags else set()
+        for tag in tags:
+            _generations[tag] = next(_stamps)
+    dropped = 0
+    for key in keys:
+        if key in _results:
+            dropped += 1
+        _results.delete(key)
+    with _lock:
+        _counts["invalidated"] += dropped
+    return dropped
+
+
+def current_session() -> Optional[str]:
+    """Session of the running agent invocation (None outside any session)."""
+    return _session.get()
+
+
+def stats() -> Dict[str, int]:
+    """Memoization counts of this execution environment."""
+    with _lock:
+        return {**_counts, "entries": len(_results)}
+
+
+_MISSING = object()
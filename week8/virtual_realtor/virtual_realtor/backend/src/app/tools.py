@@ -6,24 +6,18 @@ the property database, knowledge base, and visitor management system.
 """
 
 from strands import tool
-from strands_tools import retrieve
+import asyncio
 import json
 import logging
-from questions import QuestionManager
-from preferences import PreferencesManager
-from favorites import FavoritesManager
+from serialization import dumps
+from toolmemo import current_session, invalidates, memoize
+from clients import (
+    get_question_manager, get_preferences_manager, get_favorites_manager, get_price_history_manager,
+    get_market_stats_manager, get_property_cache, get_similarity_index,
+)
 
 logger = logging.getLogger(__name__)
 
-# Initialize the question manager
-question_manager = QuestionManager()
-
-# Initialize the preferences manager
-preferences_manager = PreferencesManager()
-
-# Initialize the favorites manager
-favorites_manager = FavoritesManager()
-
 
 @tool
 def save_unanswered_question(question: str) -> str:
@@ -39,7 +33,7 @@ def save_unanswered_question(question: str) -> str:
         A confirmation message with the question ID
     """
     try:
-        saved_question = question_manager.add_question(question=question)
+        saved_question = get_question_manager().add_question(question=question)
         logger.info(f"Saved unanswered question with ID: {saved_question.question_id}")
         return f"Successfully saved the unanswered question to the database with ID: {saved_question.question_id}"
     except Exception as e:
@@ -61,7 +55,7 @@ def capture_visitor_info(name: str, email: str) -> str:
         A confirmation message with the visitor ID
     """
     try:
-        visitor = question_manager.add_visitor(name=name, email=email)
+        visitor = get_question_manager().add_visitor(name=name, email=email)
         logger.info(f"Captured visitor info for {name} ({email}) with ID: {visitor.visitor_id}")
         return f"Successfully captured visitor information for {name} with ID: {visitor.visitor_id}"
     except Exception as e:
@@ -119,7 +113,7 @@ def search_properties(
     Returns:
         JSON string containing property listings with details like address, price, bedrooms, bathrooms, etc.
     """
-    return question_manager.search_properties(
+    return get_question_manager().search_properties(
         city=city,
         state=state,
         status=status,
@@ -143,6 +137,7 @@ def search_properties(
 
 
 @tool
+@invalidates("properties")
 def add_property_info_to_db(property_data: dict, ttl_hours: int = None) -> str:
     """
     Add or update property information in the database with configurable TTL (time-to-live).
@@ -157,11 +152,12 @@ def add_property_info_to_db(property_data: dict, ttl_hours: int = None) -> str:
     Returns:
         JSON string with success status, property ID, and expiration time
     """
-    result = question_manager.add_property_info(property_data=property_data, ttl_hours=ttl_hours)
-    return json.dumps(result, indent=2)
+    result = get_question_manager().add_property_info(property_data=property_data, ttl_hours=ttl_hours)
+    return dumps(result)
 
 
 @tool
+@memoize(tags=["properties"])
 def get_property_info_from_db(property_id: str = None, property_address: str = None) -> str:
     """
     Retrieve property information from the database by property ID or address.
@@ -175,10 +171,129 @@ def get_property_info_from_db(property_id: str = None, property_address: str = N
     Returns:
         JSON string containing property information or None if not found
     """
-    result = question_manager.get_property_info_from_db(property_id=property_id, property_address=property_address)
+    result, _ = get_property_cache().get(property_id=property_id, property_address=property_address)
     if result is None:
         return json.dumps({"message": "Property not found"})
-    return json.dumps(result, indent=2)
+    return dumps(result)
+
+
+@tool
+def get_property_price_history(property_id: str) -> str:
+    """
+    Retrieve the recorded price history of a property (every price or status change
+    seen since it was first cached).
+
+    Args:
+        property_id: The unique property ID (e.g., "3821-Hargis-St-Austin-TX-78723")
+
+    Returns:
+        JSON string containing the price points (date, price, status), oldest first
+    """
+    try:
+        history = get_price_history_manager().get_price_history(property_id)
+        if not history:
+            return json.dumps({"message": "No price history recorded for this property"})
+        return dumps({"property_id": property_id, "history": history})
+    except Exception as e:
+        logger.error(f"Error retrieving price history for {property_id}: {str(e)}")
+        return json.dumps({"error": f"Failed to retrieve price history: {str(e)}"})
+
+
+@tool
+def get_market_stats(zipCode: str = None, city: str = None, state: str = "CA", propertyType: str = None) -> str:
+    """
+    Get market statistics for a zip code or city: number of listings, price percentiles
+    (p25, median, p75, p90), price per square foot and days on market, computed from
+    the listings cached in the database. Use this for questions like "what's the median
+    price in 94539?" or "how long do condos in Fremont stay on the market?".
+
+    Args:
+        zipCode: The 5-digit zip code (takes precedence over city)
+        city: The city name
+        state: The 2-character state abbreviation (default: "CA")
+        propertyType: Optional property type (Single Family, Condo, Townhouse, ...)
+
+    Note: Either zipCode or city must be provided.
+
+    Returns:
+        JSON string containing the market statistics or a message if none are available
+    """
+    try:
+        stats = get_market_stats_manager().get_stats(zip_code=zipCode, city=city, state=state,
+                                                     property_type=propertyType)
+        if stats is None:
+            return json.dumps({"message": "No market statistics available for this area yet"})
+        return dumps(stats)
+    except Exception as e:
+        logger.error(f"Error retrieving market stats: {str(e)}")
+        return json.dumps({"error": f"Failed to retrieve market statistics: {str(e)}"})
+
+
+@tool
+@invalidates("properties")
+def load_market_snapshot(zipCode: str = None, city: str = None, state: str = "CA", propertyType: str = None) -> str:
+    """
+    Fetch every active listing in a zip code or city from RentCast into the database
+    (all result pages at once) and return the area's market statistics. Use this when
+    get_market_stats has no statistics for an area, or the user asks about a whole market.
+    Each conversation has a limited RentCast request budget, so load an area only once.
+
+    Args:
+        zipCode: The 5-digit zip code
+        city: The city name (case-sensitive)
+        state: The 2-character state abbreviation (default: "CA")
+        propertyType: Optional property type (Single Family, Condo, Townhouse, ...)
+
+    Note: Either zipCode or city must be provided.
+
+    Returns:
+        JSON string with the number of listings loaded and the market statistics
+    """
+    from snapshot import load_snapshot
+    try:
+        report = asyncio.run(load_snapshot(zipCode=zipCode, city=city, state=state, propertyType=propertyType,
+                                           session_id=current_session()))
+        if report.budget_exhausted and not report.requests:
+            return json.dumps({"error": "The RentCast request budget of this conversation is used up"})
+        # Computed from the loaded listings: the stored statistics are updated asynchronously
+        return dumps({"listings_loaded": report.written, "market_stats": report.market_stats,
+                      "request_cap_reached": report.budget_exhausted})
+    except Exception as e:
+        logger.error(f"Error loading market snapshot: {str(e)}")
+        return json.dumps({"error": f"Failed to load market snapshot: {str(e)}"})
+
+
+@tool
+@memoize(tags=["properties"])
+def find_similar_properties(property_id: str, limit: int = 5, max_distance_km: float = None,
+                            same_property_type: bool = True) -> str:
+    """
+    Find cached listings similar to a property (price, bedrooms, bathrooms, square footage,
+    lot size, year built and location), most similar first. Use this for requests like
+    "show me homes like this one" or "anything similar to my favorite?" instead of
+    guessing search ranges.
+
+    Args:
+        property_id: The property to compare with (e.g. from search results or saved properties)
+        limit: Maximum number of listings to return (default: 5)
+        max_distance_km: Optional radius in kilometres around the property
+        same_property_type: Only return listings of the same type (default: True)
+
+    Returns:
+        JSON string containing the similar listings with their distance and a similarity score
+    """
+    try:
+        similar = get_similarity_index().find_similar(property_id, limit=max(1, min(limit, 20)),
+                                                      max_distance_km=max_distance_km,
+                                                      same_property_type=same_property_type)
+        if not similar:
+            return json.dumps({"message": "No similar listings are cached yet"})
+        return dumps(similar)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+    except Exception as e:
+        logger.error(f"Error finding similar properties: {str(e)}")
+        return json.dumps({"error": f"Failed to find similar properties: {str(e)}"})
 
 
 @tool
@@ -197,8 +312,8 @@ def search_properties_by_location_from_db(zipCode: str = None, city: str = None,
     Returns:
         JSON string containing list of properties matching the search criteria
     """
-    result = question_manager.search_properties_by_location_from_db(zipCode=zipCode, city=city, limit=limit)
-    return json.dumps(result, indent=2)
+    result = get_question_manager().search_properties_by_location_from_db(zipCode=zipCode, city=city, limit=limit)
+    return dumps(result)
 
 
 @tool
@@ -216,10 +331,11 @@ def search_web(query: str, num_results: int = 5) -> str:
     Returns:
         JSON string containing search results with titles, links, and snippets
     """
-    return question_manager.search_web(query=query, num_results=num_results)
+    return get_question_manager().search_web(query=query, num_results=num_results)
 
 
 @tool
+@memoize(tags=["preferences:{user_id}"])
 def get_user_preferences(user_id: str) -> str:
     """
     Retrieve user's property search preferences from the database.
@@ -233,9 +349,9 @@ def get_user_preferences(user_id: str) -> str:
         or a message if no preferences are found
     """
     try:
-        preferences = preferences_manager.get_preferences(user_id)
+        preferences = get_preferences_manager().get_preferences(user_id)
         if preferences:
-            return json.dumps(preferences, indent=2)
+            return dumps(preferences)
         else:
             return json.dumps({"message": "No preferences found for this user"})
     except Exception as e:
@@ -244,6 +360,7 @@ def get_user_preferences(user_id: str) -> str:
 
 
 @tool
+@invalidates("favorites:{user_id}")
 def add_property_to_favorites(user_id: str, property_id: str, property_address: str = None) -> str:
     """
     Add a property to the user's favorites list.
@@ -262,20 +379,22 @@ def add_property_to_favorites(user_id: str, property_id: str, property_address:
             return "You must be logged in to save properties."
 
         # Fetch full property data
-        # Try retrieving from DB first
-        property_data = question_manager.get_property_info_from_db(property_id=property_id)
-        
+        # Try the cache first (refreshing expired listings)
+        property_data, status = get_property_cache().get(property_id=property_id)
+        if status == "error":
+            property_data = None
+
         # If not found in DB, try to fetch from API if address is provided
         if not property_data and property_address:
             logger.info(f"Property {property_id} not in DB, searching API for address: {property_address}")
             # Search by address
-            search_results_json = question_manager.search_properties(address=property_address, limit=1)
+            search_results_json = get_question_manager().search_properties(address=property_address, limit=1)
             try:
                 search_results = json.loads(search_results_json)
                 if isinstance(search_results, list) and len(search_results) > 0:
                     property_data = search_results[0]
                     # Save context to DB so we have it next time
-                    question_manager.add_property_info_to_db(property_data)
+                    get_question_manager().add_property_info_to_db(property_data)
                     logger.info(f"Fetched and cached property data for {property_address}")
             except Exception as search_error:
                 logger.error(f"Error fetching property details: {search_error}")
@@ -283,7 +402,7 @@ def add_property_to_favorites(user_id: str, property_id: str, property_address:
         if not property_data:
              return "Property not found in our database. Please ensure you have searched for this property first or provide the full address."
 
-        favorites_manager.add_to_favorites(user_id, property_data, is_visit=False)
+        get_favorites_manager().add_to_favorites(user_id, property_data, is_visit=False)
         address = property_data.get('formattedAddress', property_address or 'the property')
         return f"Added {address} to your favorites!"
     except Exception as e:
@@ -293,6 +412,7 @@ def add_property_to_favorites(user_id: str, property_id: str, property_address:
 
 
 @tool
+@invalidates("favorites:{user_id}")
 def add_property_to_visit_list(user_id: str, property_id: str) -> str:
     """
     Add a property to the visit list (and favorites if not already saved).
@@ -311,7 +431,7 @@ def add_property_to_visit_list(user_id: str, property_id: str) -> str:
 
         # Check if already in favorites to skip fetch if permissible, 
         # but manager needs data if new.
-        property_data = question_manager.get_property_info_from_db(property_id=property_id)
+        property_data = get_question_manager().get_property_info_from_db(property_id=property_id)
         
         # If in favorites but not in cache? FavoritesManager usually handles basic data.
         # But if completely new, fetch it.
@@ -328,12 +448,12 @@ def add_property_to_visit_list(user_id: str, property_id: str) -> str:
              probable_address = property_id.replace("-", " ")
              # This is a bit risky but better than failing
              logger.info(f"Property {property_id} not in DB, trying to search by inferred address: {probable_address}")
-             search_results_json = question_manager.search_properties(address=probable_address, limit=1)
+             search_results_json = get_question_manager().search_properties(address=probable_address, limit=1)
              try:
                 search_results = json.loads(search_results_json)
                 if isinstance(search_results, list) and len(search_results) > 0:
                     property_data = search_results[0]
-                    question_manager.add_property_info_to_db(property_data)
+                    get_question_manager().add_property_info_to_db(property_data)
              except:
                 pass
 
@@ -344,7 +464,7 @@ def add_property_to_visit_list(user_id: str, property_id: str) -> str:
             # If it's already a favorite, favorites_manager might handle it.
             pass
 
-        result = favorites_manager.add_to_visit_list(user_id, property_id, property_data)
+        result = get_favorites_manager().add_to_visit_list(user_id, property_id, property_data)
         
         address = result.get('formattedAddress', 'the property')
         return f"Added {address} to your visit list!"
@@ -354,6 +474,7 @@ def add_property_to_visit_list(user_id: str, property_id: str) -> str:
 
 
 @tool
+@memoize(tags=["favorites:{user_id}"])
 def get_user_saved_properties(user_id: str, visit_only: bool = False) -> str:
     """
     Retrieve user's saved properties or visit list.
@@ -369,18 +490,19 @@ def get_user_saved_properties(user_id: str, visit_only: bool = False) -> str:
         if not user_id:
             return json.dumps({"message": "User not authenticated"})
             
-        items = favorites_manager.get_user_favorites(user_id, visit_only)
+        items = get_favorites_manager().get_user_favorites(user_id, visit_only)
         if not items:
             msg = "You haven't saved any properties yet." if not visit_only else "Your visit list is empty."
             return json.dumps({"message": msg, "items": []})
             
-        return json.dumps(items, indent=2)
+        return dumps(items)
     except Exception as e:
         logger.error(f"Error getting saved properties: {str(e)}")
         return json.dumps({"error": str(e)})
 
 
 @tool
+@invalidates("favorites:{user_id}")
 def remove_property_from_favorites(user_id: str, property_id: str) -> str:
     """
     Remove a property completely from favorites and visit list.
@@ -396,7 +518,7 @@ def remove_property_from_favorites(user_id: str, property_id: str) -> str:
         if not user_id:
             return "Unauthorized"
         
-        favorites_manager.remove_from_favorites(user_id, property_id)
+        get_favorites_manager().remove_from_favorites(user_id, property_id)
         return "Property removed from favorites."
     except Exception as e:
         logger.error(f"Error removing from favorites: {str(e)}")
@@ -404,6 +526,7 @@ def remove_property_from_favorites(user_id: str, property_id: str) -> str:
 
 
 @tool
+@invalidates("favorites:{user_id}")
 def remove_property_from_visit_list(user_id: str, property_id: str) -> str:
     """
     Remove a property from the visit list but keep it in favorites.
@@ -419,7 +542,7 @@ def remove_property_from_visit_list(user_id: str, property_id: str) -> str:
         if not user_id:
              return "Unauthorized"
 
-        success = favorites_manager.remove_from_visit_list(user_id, property_id)
+        success = get_favorites_manager().remove_from_visit_list(user_id, property_id)
         if success:
             return "Property removed from visit list (still in favorites)."
         else:
@@ -429,14 +552,17 @@ def remove_property_from_visit_list(user_id: str, property_id: str) -> str:
         return f"Error updating list: {str(e)}"
 
 
-# Export all tools as a list for easy import
-ALL_TOOLS = [
-    retrieve,
+# Custom tools defined in this module
+CUSTOM_TOOLS = [
     save_unanswered_question,
     capture_visitor_info,
     search_properties,
     add_property_info_to_db,
     get_property_info_from_db,
+    get_property_price_history,
+    get_market_stats,
+    load_market_snapshot,
+    find_similar_properties,
     search_properties_by_location_from_db,
     search_web,
     get_user_preferences,
@@ -446,3 +572,21 @@ ALL_TOOLS = [
     remove_property_from_favorites,
     remove_property_from_visit_list
 ]
+
+
+def get_all_tools() -> list:
+    """
+    Return every tool available to the realtor agent.
+
+    strands_tools is imported here rather than at module level because it pulls in a
+    large dependency tree that only the chat agent needs.
+    """
+    from strands_tools import retrieve
+    return [retrieve, *CUSTOM_TOOLS]
+
+
+def __getattr__(name: str):
+    # Keep `from tools import ALL_TOOLS` working without importing strands_tools eagerly
+    if name == "ALL_TOOLS":
+        return get_all_tools()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
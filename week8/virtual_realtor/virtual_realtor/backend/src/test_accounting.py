@@ -0,0 +1,92 @@
+import sys
+import os
+import json
+import logging
+import tempfile
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from strands import Agent, tool
+from strands.models import Model
+
+import accounting
+from accounting import TurnAccounting, usage_totals
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ScriptedModel(Model):
+    """Model stub that asks for one tool call, then answers with text."""
+
+    def __init__(self):
+        self.config = {"model_id": "scripted-model"}
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        wants_tool = not any("toolResult" in block for block in messages[-1]["content"])
+        yield {"messageStart": {"role": "assistant"}}
+        if wants_tool:
+            yield {"contentBlockStart": {"start": {"toolUse": {"toolUseId": "t1", "name": "lookup"}}}}
+            yield {"contentBlockDelta": {"delta": {"toolUse": {"input": "{}"}}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "tool_use"}}
+        else:
+            yield {"contentBlockDelta": {"delta": {"text": "Done"}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+        yield {"metadata": {
+            "usage": {"inputTokens": 10, "outputTokens": 5, "totalTokens": 15, "cacheReadInputTokens": 100},
+            "metrics": {"latencyMs": 20},
+        }}
+
+
+@tool
+def lookup() -> str:
+    """Look something up."""
+    return "found"
+
+
+def test_turn_record():
+    with tempfile.TemporaryDirectory() as tmp:
+        accounting.ACCOUNTING_JSONL_PATH = os.path.join(tmp, "turns.jsonl")
+        hook = TurnAccounting(endpoint="test", session_id="session-1", user_id="user-1")
+        agent = Agent(model=ScriptedModel(), tools=[lookup], hooks=[hook], callback_handler=hook)
+
+        agent("first")
+        agent("second")
+
+        with open(accounting.ACCOUNTING_JSONL_PATH) as f:
+            records = [json.loads(line) for line in f]
+
+    assert len(records) == 2
+    record = records[-1]
+    # Usage is per turn, not the agent's running total
+    assert record["model_calls"] == 2
+    assert record["input_tokens"] == 20
+    assert record["output_tokens"] == 10
+    assert record["cache_read_input_tokens"] == 200
+    assert record["model_latency_ms"] == 40
+    assert record["tool_calls"] == 1
+    assert record["tools"][0]["name"] == "lookup"
+    assert record["tools"][0]["status"] == "success"
+    assert record["time_to_first_token_ms"] is not None
+    assert record["model_id"] == "scripted-model"
+    assert record["session_totals"]["turns"] == 2
+    assert usage_totals.get("user", "user-1")["input_tokens"] == 40
+    print("Turn record test passed")
+
+
+if __name__ == "__main__":
+    test_turn_record()
@@ -0,0 +1,90 @@
+import sys
+import os
+import logging
+import threading
+import time
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from autocomplete import AutocompleteIndex
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LISTINGS = [
+    {"property_id": "123-Oak-St-Fremont-CA-94539", "formattedAddress": "123 Oak St, Fremont, CA 94539",
+     "city": "Fremont", "state": "CA", "zipCode": "94539"},
+    {"property_id": "9-Oakwood-Ave-Fremont-CA-94538", "formattedAddress": "9 Oakwood Ave, Fremont, CA 94538",
+     "city": "Fremont", "state": "CA", "zipCode": "94538"},
+    {"property_id": "5-Main-St-Oakland-CA-94607", "formattedAddress": "5 Main St, Oakland, CA 94607",
+     "city": "Oakland", "state": "CA", "zipCode": "94607"},
+]
+
+
+class StubQuestionManager:
+    """Stand-in for QuestionManager serving listings from memory."""
+
+    def __init__(self, listings):
+        self.listings = listings
+        self.write_listeners = []
+
+    def iter_property_items(self, fields):
+        return iter([{key: listing[key] for key in fields if key in listing} for listing in self.listings])
+
+
+def test_autocomplete():
+    questions = StubQuestionManager(LISTINGS[:2])
+    index = AutocompleteIndex(questions)
+
+    # Street names match without the house number; the city ranks first
+    suggestions = index.search("Oak")
+    assert [s["type"] for s in suggestions] == ["address", "address"]
+    assert suggestions[0]["property_id"] == "123-Oak-St-Fremont-CA-94539"
+    assert index.search("fre")[0] == {"type": "city", "label": "Fremont, CA", "city": "Fremont",
+                                      "state": "CA", "count": 2}
+    assert [s["label"] for s in index.search("9453")] == ["94538", "94539"]
+
+    # Cache writes are indexed incrementally and removals update the area counts
+    for listener in questions.write_listeners:
+        listener([LISTINGS[2]])
+    assert index.search("oakland", types=["city"])[0]["count"] == 1
+    index.remove_listing("9-Oakwood-Ave-Fremont-CA-94538")
+    assert index.search("fremont", types=["city"])[0]["count"] == 1
+    assert index.search("94538") == []
+    assert index.search("o") == []
+    print("Autocomplete test passed")
+
+
+class SlowQuestionManager(StubQuestionManager):
+    """Counts the index builds, each taking a while."""
+
+    def __init__(self, listings):
+        super().__init__(listings)
+        self.builds = 0
+
+    def iter_property_items(self, fields):
+        self.builds += 1
+        time.sleep(0.05)
+        return super().iter_property_items(fields)
+
+
+def test_concurrent_first_searches_build_once():
+    questions = SlowQuestionManager(LISTINGS)
+    index = AutocompleteIndex(questions)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index.search("oak"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert questions.builds == 1
+    assert len(results) == 4 and all(result == results[0] for result in results) and results[0]
+    print("Autocomplete first build test passed")
+
+
+if __name__ == "__main__":
+    test_autocomplete()
+    test_concurrent_first_searches_build_once()
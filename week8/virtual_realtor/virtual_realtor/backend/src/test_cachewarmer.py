@@ -0,0 +1,92 @@
+import sys
+import os
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+os.environ.setdefault("DDB_TABLE", "test-table")
+os.environ.setdefault("USE_MOCK_RENTCAST_API", "true")
+
+import clients
+from cachewarmer import rank_zip_codes, warm, zip_code_demand
+from questions import QuestionManager
+from snapshot import MOCK_SNAPSHOT_TOTAL
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROFILE_ZIP_CODES = [["94539", "94102"], ["94539"], ["94539", "94301"], ["94102", "94301"], ["94025"]]
+
+
+class FakeProfileScan:
+    """Low-level client stand-in whose scan returns saved profiles' zipCodes."""
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, **kwargs):
+        for zip_codes in PROFILE_ZIP_CODES:
+            yield {'Items': [{'zipCodes': {'L': [{'S': zip_code} for zip_code in zip_codes]}}]}
+
+
+class WarmingQuestionManager(QuestionManager):
+    """QuestionManager on the mock RentCast API, caching listings in memory."""
+
+    def __init__(self):
+        self.requests = []
+        self.cached = {}
+
+    def search_properties(self, **kwargs):
+        self.requests.append((kwargs["zipCode"], kwargs["offset"]))
+        return super().search_properties(**kwargs)
+
+    def add_properties_to_db(self, properties, ttl_hours=None):
+        self.cached.update((listing["id"], listing) for listing in properties)
+        return {'success': True, 'written': len(properties)}
+
+
+def make_questions():
+    questions = WarmingQuestionManager()
+    clients._registry.update(dynamodb_client=FakeProfileScan(), question_manager=questions)
+    return questions
+
+
+def test_zip_code_ranking():
+    make_questions()
+    demand = zip_code_demand()
+    assert demand == {"94539": 3, "94102": 2, "94301": 2, "94025": 1}
+    # Most users first, ties by zip code
+    assert rank_zip_codes(demand) == [("94539", 3), ("94102", 2), ("94301", 2), ("94025", 1)]
+    assert rank_zip_codes(demand, max_zips=2) == [("94539", 3), ("94102", 2)]
+    print("Zip code ranking test passed")
+
+
+def test_pages_stop_on_short_page():
+    questions = make_questions()
+    report = warm(budget=50, max_zips=1, max_pages_per_zip=10, page_size=100)
+    # 100 + 100 + 50 listings: the short third page ends the zip code
+    assert questions.requests == [("94539", 0), ("94539", 100), ("94539", 200)]
+    assert report.requests == 3 and report.listings == report.written == MOCK_SNAPSHOT_TOTAL
+    # Every page holds different listings
+    assert len(questions.cached) == MOCK_SNAPSHOT_TOTAL
+    assert not report.budget_exhausted
+    print("Short page test passed")
+
+
+def test_budget_and_page_cap():
+    questions = make_questions()
+    report = warm(budget=5, max_zips=4, max_pages_per_zip=2, page_size=100)
+    # Two pages per zip code at most, five requests in all
+    assert questions.requests == [("94539", 0), ("94539", 100), ("94102", 0), ("94102", 100), ("94301", 0)]
+    assert report.zip_codes == ["94539", "94102", "94301"]
+    assert report.requests == 5 and report.budget_exhausted
+    assert report.listings == 500
+    print("Budget and page cap test passed")
+
+
+if __name__ == "__main__":
+    test_zip_code_ranking()
+    test_pages_stop_on_short_page()
+    test_budget_and_page_cap()
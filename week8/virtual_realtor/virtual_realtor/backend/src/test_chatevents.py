@@ -0,0 +1,105 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from strands import Agent, tool
+from strands.models import Model
+
+from chatevents import ChatEventStream
+from executor import LimitedConcurrentToolExecutor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LISTING = [
+    {"id": f"{n}-Main-St,-San-Jose,-CA-95112", "formattedAddress": f"{n} Main St, San Jose, CA 95112",
+     "price": 1000000, "bedrooms": 3, "description": "Not part of the card"}
+    for n in (100, 200)
+]
+NARRATIVE_SECONDS = 0.3
+
+
+class SearchThenDescribeModel(Model):
+    """Model stub that calls search_properties and web_lookup, then slowly describes the results."""
+
+    def __init__(self):
+        self.config = {"model_id": "search-model"}
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        yield {"messageStart": {"role": "assistant"}}
+        if not any("toolResult" in block for block in messages[-1]["content"]):
+            for index, (name, tool_input) in enumerate([("search_properties", {"city": "San Jose"}),
+                                                        ("web_lookup", {"user_id": "u1"})]):
+                yield {"contentBlockStart": {"start": {"toolUse": {"toolUseId": f"t{index}", "name": name}}}}
+                yield {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps(tool_input)}}}}
+                yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "tool_use"}}
+        else:
+            for word in ["Here ", "are ", "two ", "homes"]:
+                await asyncio.sleep(NARRATIVE_SECONDS / 4)
+                yield {"contentBlockDelta": {"delta": {"text": word}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+
+
+@tool
+def search_properties(city: str) -> str:
+    """Search listings."""
+    time.sleep(0.1)
+    return json.dumps(LISTING)
+
+
+@tool
+def web_lookup(user_id: str) -> str:
+    """Look something up."""
+    return "nothing"
+
+
+async def collect():
+    agent = Agent(model=SearchThenDescribeModel(), tools=[search_properties, web_lookup],
+                  tool_executor=LimitedConcurrentToolExecutor(), callback_handler=None)
+    events = ChatEventStream()
+    agent.hooks.add_hook(events)
+    return [(name, payload) async for name, payload in events.stream(agent, "find homes")]
+
+
+def test_chat_events():
+    events = asyncio.run(collect())
+    names = [name for name, _ in events]
+    # Listing cards arrive before any of the narrative
+    assert names.index("listings") < names.index("text")
+    assert "".join(payload for name, payload in events if name == "text") == "Here are two homes"
+
+    starts = {payload["id"]: payload for name, payload in events if name == "tool_start"}
+    ends = {payload["id"]: payload for name, payload in events if name == "tool_end"}
+    assert set(starts) == set(ends) == {"t0", "t1"}
+    assert starts["t0"]["input"] == {"city": "San Jose"}
+    assert starts["t1"]["input"] == {}
+    assert ends["t0"]["status"] == "success" and ends["t0"]["durationMs"] >= 100
+
+    listings = [payload for name, payload in events if name == "listings"]
+    assert len(listings) == 1 and listings[0]["tool"] == "search_properties"
+    assert [card["id"] for card in listings[0]["properties"]] == [record["id"] for record in LISTING]
+    assert "description" not in listings[0]["properties"][0]
+    print(f"Chat events: {names}")
+
+
+if __name__ == "__main__":
+    test_chat_events()
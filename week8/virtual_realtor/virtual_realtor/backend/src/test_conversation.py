@@ -0,0 +1,132 @@
+import sys
+import os
+import json
+import logging
+import tempfile
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from strands import Agent, tool
+from strands.models import Model
+from strands.session.file_session_manager import FileSessionManager
+
+from conversation import RollingSummaryConversationManager, COLLAPSED_PREFIX, SUMMARY_ACK, SUMMARY_HEADER
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SearchingModel(Model):
+    """Model stub that searches once per turn, then answers; records the size of every request."""
+
+    def __init__(self):
+        self.config = {"model_id": "searching-model"}
+        self.request_sizes = []
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        self.request_sizes.append(len(json.dumps(messages)))
+        yield {"messageStart": {"role": "assistant"}}
+        if not any("toolResult" in block for block in messages[-1]["content"]):
+            turn = sum(1 for m in messages if m["role"] == "user")
+            yield {"contentBlockStart": {"start": {"toolUse": {"toolUseId": f"t{turn}", "name": "search_properties"}}}}
+            yield {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps({"city": "San Jose", "bedrooms": "3"})}}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "tool_use"}}
+        else:
+            yield {"contentBlockDelta": {"delta": {"text": "Here are some homes in San Jose."}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+
+
+@tool
+def search_properties(city: str = None, bedrooms: str = None) -> str:
+    """Search for properties."""
+    return json.dumps([
+        {"id": f"{n}-Main-St", "formattedAddress": f"{n} Main St, San Jose, CA 95112", "price": 1000000 + n,
+         "bedrooms": 3, "description": "Lovely home " * 20}
+        for n in range(10)
+    ])
+
+
+def chat_history(agent):
+    """Messages returned by GET /api/chat for the agent's session."""
+    os.environ.setdefault("STATE_BUCKET", "test-bucket")
+    os.environ.setdefault("DDB_TABLE", "test-table")
+    import main
+
+    class ChatRequest:
+        headers = {}
+        cookies = {"session_id": "s1"}
+
+    original = main.session
+    main.session = lambda session_id, user_id=None: agent
+    try:
+        response = main.chat_get(ChatRequest())
+    finally:
+        main.session = original
+    return json.loads(response.body)["messages"]
+
+
+def test_constant_context():
+    with tempfile.TemporaryDirectory() as tmp:
+        model = SearchingModel()
+        agent = Agent(
+            model=model,
+            tools=[search_properties],
+            conversation_manager=RollingSummaryConversationManager(window_turns=2, summary_max_chars=600),
+            session_manager=FileSessionManager(session_id="s1", storage_dir=tmp),
+            callback_handler=None,
+        )
+        for turn in range(12):
+            agent(f"Show me 3 bedroom homes under $1.5M in San Jose, round {turn}")
+
+        # Requests stop growing once the window and the summary are full
+        first_answers = model.request_sizes[1::2]
+        assert max(first_answers[6:]) - min(first_answers[6:]) < 300, first_answers
+
+        summary = agent.messages[0]["content"][0]["text"]
+        assert summary.startswith(SUMMARY_HEADER)
+        assert "Cities: San Jose" in summary
+        assert "under $1.5m" in summary
+        assert "9-Main-St" in summary
+        # Tool results before the last turn are collapsed
+        results = [block["toolResult"] for m in agent.messages for block in m["content"] if "toolResult" in block]
+        assert results[0]["content"][0]["text"].startswith(COLLAPSED_PREFIX)
+        assert not results[-1]["content"][0]["text"].startswith(COLLAPSED_PREFIX)
+
+        # A new agent for the same session gets the summary back and the same window
+        restored = Agent(
+            model=SearchingModel(),
+            tools=[search_properties],
+            conversation_manager=RollingSummaryConversationManager(window_turns=2, summary_max_chars=600),
+            session_manager=FileSessionManager(session_id="s1", storage_dir=tmp),
+            callback_handler=None,
+        )
+        restored.conversation_manager.apply_management(restored)
+        assert restored.messages == agent.messages
+
+        # The chat history shown after a reload leaves out the summary exchange
+        visible = restored.conversation_manager.visible_messages(restored.messages)
+        assert visible == restored.messages[2:]
+        assert visible[0]["content"][0]["text"].startswith("Show me 3 bedroom homes")
+        history = chat_history(restored)
+        assert [message["role"] for message in history[:2]] == ["user", "assistant"]
+        assert not any(message["content"][0]["text"].startswith(SUMMARY_HEADER)
+                       or message["content"][0]["text"] == SUMMARY_ACK for message in history)
+    print("Constant context test passed")
+
+
+if __name__ == "__main__":
+    test_constant_context()
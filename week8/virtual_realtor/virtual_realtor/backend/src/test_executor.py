@@ -0,0 +1,112 @@
+import sys
+import os
+import json
+import time
+import logging
+import threading
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from strands import Agent, tool
+from strands.models import Model
+
+from executor import LimitedConcurrentToolExecutor, ToolLimiter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TOOL_SECONDS = 0.3
+
+
+class FanOutModel(Model):
+    """Model stub that requests several tools in one message, then answers."""
+
+    def __init__(self, tool_names):
+        self.config = {"model_id": "fan-out-model"}
+        self.tool_names = tool_names
+        self.tool_results = None
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        yield {"messageStart": {"role": "assistant"}}
+        if not any("toolResult" in block for block in messages[-1]["content"]):
+            for index, name in enumerate(self.tool_names):
+                yield {"contentBlockStart": {"start": {"toolUse": {"toolUseId": f"t{index}", "name": name}}}}
+                yield {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps({"tag": f"t{index}"})}}}}
+                yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "tool_use"}}
+        else:
+            self.tool_results = [block["toolResult"] for block in messages[-1]["content"]]
+            yield {"contentBlockDelta": {"delta": {"text": "Done"}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+
+
+running = {"now": 0, "max": 0}
+running_lock = threading.Lock()
+
+
+def blocking_call(tag: str, seconds: float) -> str:
+    with running_lock:
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+    time.sleep(seconds)
+    with running_lock:
+        running["now"] -= 1
+    return tag
+
+
+@tool
+def slow_lookup(tag: str) -> str:
+    """Blocking lookup that finishes slowly."""
+    return blocking_call(tag, TOOL_SECONDS)
+
+
+@tool
+def fast_lookup(tag: str) -> str:
+    """Blocking lookup that finishes quickly."""
+    return blocking_call(tag, TOOL_SECONDS / 3)
+
+
+def run_turn(tool_names, limiter):
+    model = FanOutModel(tool_names)
+    agent = Agent(model=model, tools=[slow_lookup, fast_lookup],
+                  tool_executor=LimitedConcurrentToolExecutor(limiter), callback_handler=None)
+    running["max"] = 0
+    started = time.perf_counter()
+    agent("go")
+    return time.perf_counter() - started, model.tool_results
+
+
+def test_concurrent_tools():
+    elapsed, results = run_turn(["slow_lookup", "slow_lookup", "fast_lookup"], ToolLimiter(max_concurrency=8, tool_limits={}))
+    # Slowest tool, not the sum
+    assert elapsed < TOOL_SECONDS * 2, elapsed
+    # Request order, although fast_lookup finished first
+    assert [r["toolUseId"] for r in results] == ["t0", "t1", "t2"]
+    assert [r["content"][0]["text"] for r in results] == ["t0", "t1", "t2"]
+    print(f"Concurrent turn took {elapsed:.2f}s")
+
+
+def test_tool_limit():
+    elapsed, results = run_turn(["slow_lookup"] * 3, ToolLimiter(max_concurrency=8, tool_limits={"slow_lookup": 1}))
+    assert running["max"] == 1
+    assert elapsed >= TOOL_SECONDS * 3
+    assert [r["toolUseId"] for r in results] == ["t0", "t1", "t2"]
+    print(f"Limited turn took {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    test_concurrent_tools()
+    test_tool_limit()
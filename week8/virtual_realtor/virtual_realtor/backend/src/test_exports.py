@@ -0,0 +1,56 @@
+import sys
+import os
+import io
+import csv
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from exports import PYARROW_AVAILABLE, iter_csv, iter_parquet
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def favorites(count):
+    """Generate favorite records lazily, like FavoritesManager.iter_user_favorites."""
+    for n in range(count):
+        yield {"property_id": f"p{n}", "formattedAddress": f"{n} Main St, San Jose, CA", "price": 1000000 + n,
+               "bathrooms": 2.5, "is_visit_candidate": n % 2 == 0, "description": "not exported"}
+
+
+def test_csv_export():
+    chunks = list(iter_csv(favorites(450), rows_per_chunk=200))
+    # Header with the first 200 rows, 200 rows, then the remaining 50
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert len(rows) == 450
+    assert rows[1]["formattedAddress"] == "1 Main St, San Jose, CA"
+    assert "description" not in rows[0]
+    print("CSV export test passed")
+
+
+def test_parquet_export():
+    if not PYARROW_AVAILABLE:
+        print("pyarrow not installed, skipping Parquet export test")
+        return
+    import pyarrow.parquet as pq
+
+    chunks = list(iter_parquet(favorites(1200), row_group_size=500))
+    # One chunk per full row group, then the last row group with the footer
+    assert len(chunks) == 3
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet_file.metadata.num_rows == 1200
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read(columns=["property_id", "price", "is_visit_candidate"])
+    assert table.column("price")[1199].as_py() == 1001199
+    assert table.column("is_visit_candidate")[1].as_py() is False
+    print("Parquet export test passed")
+
+
+if __name__ == "__main__":
+    test_csv_export()
+    test_parquet_export()
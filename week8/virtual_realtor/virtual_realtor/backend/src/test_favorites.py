@@ -3,9 +3,15 @@ import os
 import logging
 import boto3
 
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
 
+from botocore.exceptions import ClientError
 
+import clients
 from app.favorites import FavoritesManager
+from serialization import deserialize_item
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +25,55 @@ def find_table_name():
              return name
     return None
 
+class FakeTransactClient:
+    """Table and low-level client stand-in applying transact_write_items all or nothing."""
+
+    def __init__(self, fail=False):
+        self.items = {}
+        self.fail = fail
+
+    def Table(self, name):
+        return self
+
+    def transact_write_items(self, TransactItems):
+        if self.fail:
+            raise ClientError({"Error": {"Code": "TransactionCanceledException", "Message": "Transaction cancelled"}},
+                              "TransactWriteItems")
+        for request in TransactItems:
+            if 'Put' in request:
+                item = deserialize_item(request['Put']['Item'])
+                self.items[(item['PK'], item['SK'])] = item
+            else:
+                key = deserialize_item(request['Delete']['Key'])
+                self.items.pop((key['PK'], key['SK']), None)
+
+
+def test_favorite_and_watcher_written_together():
+    os.environ.setdefault('DDB_TABLE', 'test-table')
+    client = FakeTransactClient()
+    clients._registry.update(dynamodb=client, dynamodb_client=client)
+    manager = FavoritesManager()
+    prop_data = {"id": "prop-001", "formattedAddress": "123 Test St, Test City, CA 90210", "price": 1000000,
+                 "bathrooms": 2.5}
+
+    manager.add_to_favorites("test-user-123", prop_data)
+    assert set(client.items) == {('USER#test-user-123', 'FAVORITE#prop-001'),
+                                 ('PROPERTY_WATCHERS#prop-001', 'USER#test-user-123')}
+    assert client.items[('USER#test-user-123', 'FAVORITE#prop-001')]['bathrooms'] == 2.5
+    manager.remove_from_favorites("test-user-123", "prop-001")
+    assert client.items == {}
+
+    # A failed write leaves neither item behind
+    client.fail = True
+    try:
+        manager.add_to_favorites("test-user-123", prop_data)
+        assert False, "expected the transaction to fail"
+    except ClientError:
+        pass
+    assert client.items == {}
+    print("Favorite and watcher transaction test passed")
+
+
 def test_manager():
     table_name = find_table_name()
     if not table_name:
@@ -80,4 +135,5 @@ def test_manager():
     print("\n✅ All tests passed!")
 
 if __name__ == "__main__":
+    test_favorite_and_watcher_written_together()
     test_manager()
@@ -0,0 +1,118 @@
+import sys
+import os
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+os.environ.setdefault("DDB_TABLE", "test-table")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
+
+import clients
+from ingest import BatchWriter, ingest_rows, iter_feed_rows, normalize_row
+from propertystore import pack_property_item
+from questions import QuestionManager
+from serialization import deserialize_item, serialize_item
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ThrottlingClient:
+    """DynamoDB client stub leaving the last item of each request unprocessed a few times."""
+
+    def __init__(self, throttles):
+        self.throttles = throttles
+        self.written = []
+
+    def batch_write_item(self, RequestItems):
+        [(table, requests)] = RequestItems.items()
+        if self.throttles and len(requests) > 0:
+            self.throttles -= 1
+            self.written.extend(requests[:-1])
+            return {"UnprocessedItems": {table: requests[-1:]}}
+        self.written.extend(requests)
+        return {"UnprocessedItems": {}}
+
+
+class CachedQuestionManager(QuestionManager):
+    """QuestionManager on an in-memory PROPERTY_INFO partition, also serving as the low-level client."""
+
+    def __init__(self):
+        self.table_name = "test-table"
+        self.client = self
+        self.write_listeners = []
+        self.items = {}
+
+    def batch_write_item(self, RequestItems):
+        for request in RequestItems[self.table_name]:
+            item = deserialize_item(request["PutRequest"]["Item"])
+            self.items[item["SK"]] = item
+        return {"UnprocessedItems": {}}
+
+    def batch_get_item(self, RequestItems):
+        keys = [key["SK"]["S"] for key in RequestItems[self.table_name]["Keys"]]
+        return {"Responses": {self.table_name: [serialize_item(self.items[key]) for key in keys if key in self.items]}}
+
+    def after_property_writes(self, items, old_items):
+        pass
+
+
+def test_normalize_rows():
+    csv_lines = [
+        "Street Address,City,State,Postal Code,List Price,Beds,Baths\n",
+        "12 north oak street,fremont,ca,94539-1234,\"$1,250,000\",3,2.5\n",
+        "12 N Oak St.,Fremont,CA,94539,1200000,3,2\n",
+        ",Fremont,CA,94539,1,1,1\n",
+    ]
+    rows = [normalize_row(row) for row in iter_feed_rows(csv_lines, "csv")]
+    (first, _), (second, _), (invalid, error) = rows
+    assert first["formattedAddress"] == "12 N Oak St, Fremont, CA 94539"
+    assert first["price"] == 1250000 and first["bathrooms"] == 2.5 and first["zipCode"] == "94539"
+    # Same canonical address, so the same property ID
+    assert first["id"] == second["id"] == "12-N-Oak-St,-Fremont,-CA-94539"
+    assert invalid is None and error.startswith("missing address")
+
+    [unit] = iter_feed_rows(['{"formattedAddress": "5500 grand lake drive, apt 1111, san antonio, tx 78244"}\n'], "jsonl")
+    listing, _ = normalize_row(unit)
+    assert listing["formattedAddress"] == "5500 Grand Lake Dr, Apt 1111, San Antonio, TX 78244"
+    assert listing["city"] == "San Antonio" and listing["id"] == "5500-Grand-Lake-Dr,-Apt-1111,-San-Antonio,-TX-78244"
+
+    [row, bad] = iter_feed_rows(['{"formattedAddress": "5 Elm Ave, Fremont, CA 94538", "price": "abc"}\n', "{oops\n"], "jsonl")
+    assert normalize_row(row) == (None, "invalid price: 'abc'")
+    assert bad["_error"].startswith("invalid JSON")
+    print("Feed normalization test passed")
+
+
+def test_batch_writer_retries_unprocessed_items():
+    writer = BatchWriter(workers=2, max_attempts=4)
+    writer.client = ThrottlingClient(throttles=2)
+    items = [{"PK": {"S": "PROPERTY_INFO"}, "SK": {"S": f"p{index}"}} for index in range(30)]
+    results = [future.result() for future in writer.submit(items)]
+    writer.close()
+    assert sum(failed for failed, _ in results) == 0 and any(retried for _, retried in results)
+    assert sorted(request["PutRequest"]["Item"]["SK"]["S"] for request in writer.client.written) == sorted(f"p{index}" for index in range(30))
+    print("Batch writer retry test passed")
+
+
+def test_ingest_updates_listing_cached_from_rentcast():
+    questions = CachedQuestionManager()
+    clients._registry.update(dynamodb_client=questions, question_manager=questions)
+    # As cached by search_properties: RentCast's ID keeps the commas of the address
+    cached = questions.property_item({"id": "3821-Hargis-St,-Austin,-TX-78723",
+                                      "formattedAddress": "3821 Hargis St, Austin, TX 78723", "price": 450000})
+    questions.items[cached["SK"]] = deserialize_item(serialize_item(pack_property_item(cached)))
+
+    rows = [{"address": "3821 hargis street", "city": "austin", "state": "tx", "zip": "78723", "price": "439000"}]
+    report = ingest_rows(rows, "feed.csv", workers=1)
+    assert report.written == 1 and report.failed == 0
+    assert list(questions.items) == ["3821-Hargis-St,-Austin,-TX-78723"]
+    assert questions.get_property_items(list(questions.items))["3821-Hargis-St,-Austin,-TX-78723"]["price"] == 439000
+    print("Ingest of a listing cached from RentCast test passed")
+
+
+if __name__ == "__main__":
+    test_normalize_rows()
+    test_batch_writer_retries_unprocessed_items()
+    test_ingest_updates_listing_cached_from_rentcast()
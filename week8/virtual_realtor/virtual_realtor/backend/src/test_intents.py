@@ -0,0 +1,156 @@
+import sys
+import os
+import json
+import logging
+import contextvars
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+import toolmemo
+from intents import (
+    Intent, IntentRouter, classify, conversation_listings, exchange_messages, INTENT_ROUTER_MIN_CONFIDENCE
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LISTING = [
+    {"id": f"{n}-Main-St,-San-Jose,-CA-95112", "formattedAddress": f"{n} Main St, San Jose, CA 95112", "price": 1000000,
+     "bedrooms": 3}
+    for n in (100, 200, 300)
+]
+
+ANAPHORIC_NON_COMMANDS = [
+    "keep it under 1.2M please",
+    "add a pool to it",
+    "add 2 more bedrooms to it",
+    "keep it in mind that I like pools",
+    "I love it, keep going",
+]
+
+
+class FakeFavoritesManager:
+    """In-memory stand-in for FavoritesManager."""
+
+    def __init__(self):
+        self.items = {}
+
+    def get_user_favorites(self, user_id, visit_only=False):
+        return [item for item in self.items.values() if item["is_visit_candidate"] or not visit_only]
+
+    def add_to_favorites(self, user_id, property_data, is_visit=False):
+        item = {"property_id": property_data["id"], "formattedAddress": property_data["formattedAddress"],
+                "is_visit_candidate": is_visit}
+        self.items[item["property_id"]] = item
+        return item
+
+    def add_to_visit_list(self, user_id, property_id, property_data=None):
+        if property_id in self.items:
+            self.items[property_id]["is_visit_candidate"] = True
+            return self.items[property_id]
+        return self.add_to_favorites(user_id, property_data, is_visit=True)
+
+    def remove_from_favorites(self, user_id, property_id):
+        self.items.pop(property_id, None)
+        return True
+
+    def remove_from_visit_list(self, user_id, property_id):
+        self.items[property_id]["is_visit_candidate"] = False
+        return True
+
+
+def test_classify():
+    confident = {
+        "save this one": Intent.SAVE_FAVORITE,
+        "Show my visit list": Intent.LIST_VISITS,
+        "What have I saved?": Intent.LIST_FAVORITES,
+        "Add the second one to my visit list": Intent.ADD_VISIT,
+        "remove 123 Main St from favorites": Intent.REMOVE_FAVORITE,
+        "take the last one off my visit list": Intent.REMOVE_VISIT,
+        "add it to my favorites": Intent.SAVE_FAVORITE,
+        "keep this one in my favorites": Intent.SAVE_FAVORITE,
+    }
+    for prompt, intent in confident.items():
+        match = classify(prompt)
+        assert match.intent == intent, prompt
+        assert match.confidence >= INTENT_ROUTER_MIN_CONFIDENCE, prompt
+
+    # Left to the agent
+    assert classify("Find 3 bedroom homes in Fremont") is None
+    for prompt in ["Can you save this property and tell me about the schools nearby?",
+                   "I don't want to save this one",
+                   "How do I add a property to favorites?"]:
+        assert classify(prompt).confidence < INTENT_ROUTER_MIN_CONFIDENCE, prompt
+    # "add"/"keep" without a list object, constraints and trailing clauses are not save commands
+    for prompt in ANAPHORIC_NON_COMMANDS + ["save the one with the pool", "save it and tell me more about it"]:
+        match = classify(prompt)
+        assert match is None or match.confidence < INTENT_ROUTER_MIN_CONFIDENCE, prompt
+    print("Classification test passed")
+
+
+def test_route():
+    manager = FakeFavoritesManager()
+    router = IntentRouter(favorites_manager=manager)
+    messages = exchange_messages("find homes", "search_properties", {}, json.dumps(LISTING), "Here are 3 homes")
+    assert conversation_listings(messages) == [LISTING]
+
+    routed = router.route("save the second one", messages, "user-1")
+    assert routed.intent == Intent.SAVE_FAVORITE
+    assert "200 Main St" in routed.reply
+    assert list(manager.items) == [LISTING[1]["id"]]
+    # Recorded as the equivalent tool call
+    assert routed.messages[1]["content"][0]["toolUse"]["name"] == "add_property_to_favorites"
+
+    routed = router.route("Add 300 Main Street to my visit list", messages, "user-1")
+    assert manager.items[LISTING[2]["id"]]["is_visit_candidate"] is True
+
+    routed = router.route("remove 200 main st from favorites", messages, "user-1")
+    assert LISTING[1]["id"] not in manager.items
+
+    # Ambiguous target and anonymous users go to the agent
+    assert router.route("save this one", messages, "user-1") is None
+    assert router.route("show my favorites", messages, None) is None
+
+    # With a single listing "it" resolves, so only real commands may write
+    single = exchange_messages("tell me about 100 main st", "get_property_info_from_db", {},
+                               json.dumps(LISTING[0]), "Here it is")
+    for prompt in ANAPHORIC_NON_COMMANDS:
+        assert router.route(prompt, single, "user-1") is None, prompt
+    assert LISTING[0]["id"] not in manager.items
+    print("Routing test passed")
+
+
+def test_routed_writes_invalidate_memoized_favorites():
+    manager = FakeFavoritesManager()
+    router = IntentRouter(favorites_manager=manager)
+    messages = exchange_messages("find homes", "search_properties", {}, json.dumps(LISTING), "Here are 3 homes")
+
+    @toolmemo.memoize(tags=["favorites:{user_id}"])
+    def get_saved(user_id):
+        return json.dumps([item["property_id"] for item in manager.get_user_favorites(user_id)])
+
+    def in_session():
+        toolmemo.ToolMemoScope("session-1")._enter(None)
+        assert get_saved("user-1") == "[]"
+        router.route("save the first one", messages, "user-1")
+        assert get_saved("user-1") == json.dumps([LISTING[0]["id"]])
+
+        # Listing commands write nothing and keep the memoized result
+        dropped = toolmemo.stats()["invalidated"]
+        assert router.route("show my favorites", messages, "user-1") is not None
+        assert toolmemo.stats()["invalidated"] == dropped
+        router.route("remove 100 main st from favorites", messages, "user-1")
+        assert get_saved("user-1") == "[]"
+
+    # The session is set in a copied context so it does not leak into other tests
+    contextvars.copy_context().run(in_session)
+    print("Routed write invalidation test passed")
+
+
+if __name__ == "__main__":
+    test_classify()
+    test_route()
+    test_routed_writes_invalidate_memoized_favorites()
@@ -0,0 +1,56 @@
+import sys
+import os
+import json
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from jsonstream import JSONArrayStreamParser
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_incremental_elements():
+    cards = [{"id": f"p{i}", "address": f"{i} Main St", "note": 'tricky "] }, [" text', "tags": [1, {"a": 2}]}
+             for i in range(3)]
+    text = "Here you go:\n```json\n" + json.dumps(cards, indent=2) + "\n```\nEnjoy!"
+
+    parser = JSONArrayStreamParser()
+    seen = []
+    for start in range(0, len(text), 5):
+        for item in parser.feed(text[start:start + 5]):
+            seen.append((start, item))
+
+    assert [item for _, item in seen] == cards
+    # Each card is returned as soon as its closing brace arrives, not at the end
+    first_card_end = len("Here you go:\n```json\n") + len(json.dumps(cards, indent=2).split("\n  },")[0]) + 4
+    assert seen[0][0] <= first_card_end < seen[1][0]
+    assert parser.done
+
+
+def test_invalid_element_is_skipped():
+    parser = JSONArrayStreamParser()
+    items = parser.feed('[{"id": 1}, {"id": oops}, 3, "x"]')
+    assert items == [{"id": 1}, 3, "x"]
+    assert parser.skipped == 1
+
+
+def test_bracketed_prose_is_not_the_array():
+    parser = JSONArrayStreamParser()
+    items = parser.feed("Let me check [searching 94539]")
+    assert items == [] and not parser.started and not parser.done
+    items = parser.feed(' done. []\n[{"id": "p1"},')
+    assert items == [{"id": "p1"}] and not parser.done
+    assert parser.feed(' {"id": "p2"}] [{"id": "p3"}]') == [{"id": "p2"}]
+    assert parser.done
+    print("JSON stream parser tests passed")
+
+
+if __name__ == "__main__":
+    test_incremental_elements()
+    test_invalid_element_is_skipped()
+    test_bracketed_prose_is_not_the_array()
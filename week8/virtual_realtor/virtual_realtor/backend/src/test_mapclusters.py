@@ -0,0 +1,63 @@
+import sys
+import os
+import random
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+import mapclusters
+from mapclusters import MapIndex
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StubQuestionManager:
+    """Stand-in for QuestionManager serving listings from memory."""
+
+    def __init__(self, listings):
+        self.listings = listings
+        self.write_listeners = []
+
+    def iter_property_items(self, fields):
+        return iter(self.listings)
+
+
+def test_map_clusters():
+    rng = random.Random(3)
+    listings = [{"property_id": f"p{index}", "latitude": 37.5 + rng.random() * 0.2,
+                 "longitude": -122.0 + rng.random() * 0.2, "price": rng.randrange(500_000, 2_000_000),
+                 "propertyType": "Condo" if index % 2 else "Single Family"}
+                for index in range(5000)]
+    listings.append({"property_id": "no-price", "latitude": 37.55, "longitude": -121.95})
+    listings.append({"property_id": "no-location", "price": 1_000_000})
+    index = MapIndex(StubQuestionManager(listings))
+
+    # Low zoom: every listing in view, in a bounded number of clusters
+    result = index.query(37.0, -123.0, 38.0, -121.0, zoom=10)
+    assert result["total"] == 5001 and "listings" not in result
+    assert sum(cluster["count"] for cluster in result["clusters"]) == 5001
+    assert len(result["clusters"]) <= mapclusters.MAP_MAX_CLUSTERS
+    for cluster in result["clusters"]:
+        stats = cluster["price"]
+        assert stats["min"] <= stats["median"] <= stats["max"] and stats["min"] <= stats["mean"] <= stats["max"]
+
+    # One cell holding everything: exact statistics
+    result = index.query(37.0, -123.0, 38.0, -121.0, zoom=0, property_type="Condo")
+    [cluster] = result["clusters"]
+    prices = sorted(listing["price"] for listing in listings if listing.get("propertyType") == "Condo")
+    assert cluster["count"] == 2500 and cluster["price"]["min"] == prices[0]
+    assert cluster["price"]["median"] == round((prices[1249] + prices[1250]) / 2)
+
+    # High zoom with few listings in view: individual listings
+    result = index.query(37.5495, -121.9505, 37.5505, -121.9495, zoom=18)
+    assert "no-price" in [listing["property_id"] for listing in result["listings"]]
+    assert index.query(10.0, 10.0, 11.0, 11.0, zoom=5) == {"zoom": 5, "total": 0, "clusters": [], "truncated": False}
+    print("Map clusters test passed")
+
+
+if __name__ == "__main__":
+    test_map_clusters()
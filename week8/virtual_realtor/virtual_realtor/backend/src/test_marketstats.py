@@ -0,0 +1,121 @@
+import sys
+import os
+import random
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+os.environ.setdefault("DDB_TABLE", "test-table")
+
+import clients
+from marketstats import MARKET_STATS_PK, MarketStatsManager, QuantileSketch, contribution
+from serialization import serialize_item
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+def test_sketch_accuracy_and_merge():
+    rng = random.Random(7)
+    prices = [rng.lognormvariate(13.8, 0.5) for _ in range(5000)]
+
+    # Two halves sketched separately and merged equal one sketch of everything
+    left, right, whole = QuantileSketch(0.01), QuantileSketch(0.01), QuantileSketch(0.01)
+    for index, price in enumerate(prices):
+        (left if index % 2 else right).add(price)
+        whole.add(price)
+    left.merge(right)
+    assert left.counts == whole.counts
+
+    for q in (0.25, 0.5, 0.9):
+        exact = exact_quantile(prices, q)
+        assert abs(whole.quantile(q) - exact) / exact <= 0.01, q
+
+    # Removing values undoes adding them
+    for price in prices[:2500]:
+        whole.add(price, -1)
+    assert whole.count == 2500
+    print("Sketch test passed")
+
+
+def test_contribution_cancels_on_unchanged_rewrite():
+    listing = {"price": 1250000, "squareFootage": 1800, "daysOnMarket": 0, "propertyType": "Condo"}
+    updates = contribution(listing, 1)
+    assert updates["all|count"] == 1 and updates["Condo|count"] == 1
+    assert "all|days_on_market|z" in updates
+    updates.update(contribution(listing, -1))
+    assert not any(updates.values())
+    print("Contribution test passed")
+
+
+class FakeStatsTable:
+    """In-memory table for MarketStatsManager: partition queries, batch writes and ADD updates."""
+
+    def __init__(self):
+        self.items = {}
+
+    def Table(self, name):
+        return self
+
+    def batch_writer(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def put_item(self, Item):
+        self.items[(Item['PK'], Item['SK'])] = dict(Item)
+
+    def delete_item(self, Key):
+        self.items.pop((Key['PK'], Key['SK']), None)
+
+    def update_item(self, Key, ExpressionAttributeNames, ExpressionAttributeValues, **kwargs):
+        item = self.items.setdefault((Key['PK']['S'], Key['SK']['S']), {'PK': Key['PK']['S'], 'SK': Key['SK']['S']})
+        for alias, name in ExpressionAttributeNames.items():
+            item[name] = item.get(name, 0) + int(ExpressionAttributeValues[alias.replace('#a', ':v')]['N'])
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, ExpressionAttributeValues, **kwargs):
+        pk = ExpressionAttributeValues[':pk']['S']
+        yield {'Items': [serialize_item(item) for (item_pk, _), item in self.items.items() if item_pk == pk]}
+
+
+def test_rebuild_replaces_and_deletes_areas():
+    table = FakeStatsTable()
+    clients._registry.update(dynamodb=table, dynamodb_client=table)
+    manager = MarketStatsManager()
+    fremont = {"PK": "PROPERTY_INFO", "SK": "1-Oak-St", "zipCode": "94539", "city": "Fremont", "state": "CA",
+               "price": 1500000, "squareFootage": 2000, "propertyType": "Single Family"}
+    oakland = {"PK": "PROPERTY_INFO", "SK": "2-Elm-St", "zipCode": "94610", "city": "Oakland", "state": "CA",
+               "price": 900000, "squareFootage": 1200, "propertyType": "Condo"}
+    for listing in (fremont, oakland):
+        table.put_item(listing)
+        manager.apply_change(listing)
+    # Drifted counts, and an Oakland listing gone without a REMOVE event
+    manager._add("ZIP#94539", {"all|count": 5})
+    table.delete_item({"PK": "PROPERTY_INFO", "SK": "2-Elm-St"})
+
+    assert manager.rebuild() == 1
+    areas = {sk: item for (pk, sk), item in table.items.items() if pk == MARKET_STATS_PK}
+    assert sorted(areas) == ["CITY#CA#fremont", "ZIP#94539"]
+    assert areas["ZIP#94539"]["all|count"] == 1
+    print("Rebuild test passed")
+
+
+if __name__ == "__main__":
+    test_sketch_accuracy_and_merge()
+    test_contribution_cancels_on_unchanged_rewrite()
+    test_rebuild_replaces_and_deletes_areas()
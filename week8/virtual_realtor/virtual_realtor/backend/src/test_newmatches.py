@@ -0,0 +1,117 @@
+import sys
+import os
+import random
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+os.environ.setdefault("DDB_TABLE", "test-table")
+
+from botocore.exceptions import ClientError
+
+import clients
+from newmatches import UNBOUNDED, IntervalTree, ZipPreferences, preference_index_items
+from serialization import deserialize_item, serialize_item
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for index in range(500):
+        low = rng.choice([-UNBOUNDED, rng.randrange(0, 3_000_000, 50_000)])
+        high = rng.choice([UNBOUNDED, (low if low != -UNBOUNDED else 0) + rng.randrange(0, 2_000_000, 50_000)])
+        intervals.append((low, high, index))
+    tree = IntervalTree(intervals)
+    for x in [0, 50_000, 999_999, 1_000_000, 2_500_000, 10_000_000]:
+        assert sorted(tree.stab(x)) == sorted(value for low, high, value in intervals if low <= x <= high)
+    print("Interval tree test passed")
+
+
+def test_zip_preferences_match():
+    profiles = [
+        {"userId": "a", "zipCodes": ["94539"], "priceRange": {"min": 1_000_000, "max": 2_000_000}, "bedrooms": {"min": 3}},
+        {"userId": "b", "zipCodes": ["94539", "94538"], "priceRange": {"max": 900_000}},
+        {"userId": "c", "zipCodes": ["94539"], "propertyType": "Condo"},
+    ]
+    entries = [item for profile in profiles for item in preference_index_items(profile) if item["PK"] == "PREF_ZIP#94539"]
+    index = ZipPreferences(entries)
+
+    assert index.match({"price": 1_500_000, "bedrooms": 4, "propertyType": "Single Family"}) == ["a"]
+    assert sorted(index.match({"price": 800_000, "bedrooms": 2, "propertyType": "Condo"})) == ["b", "c"]
+    # Fields the listing does not report do not exclude it
+    assert sorted(index.match({"propertyType": "Condo"})) == ["a", "b", "c"]
+    print("Zip preferences match test passed")
+
+
+class FakeInboxTable:
+    """In-memory single table for the calls NewMatchesManager makes."""
+
+    def __init__(self):
+        self.items = {}
+
+    def Table(self, name):
+        return self
+
+    def batch_writer(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def put_item(self, Item, TableName=None, ConditionExpression=None, **kwargs):
+        item = deserialize_item(Item) if TableName else dict(Item)
+        key = (item['PK'], item['SK'])
+        if ConditionExpression == 'attribute_not_exists(SK)' and key in self.items:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        self.items[key] = item
+        return {}
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, ExpressionAttributeValues, FilterExpression=None, **kwargs):
+        pk = ExpressionAttributeValues[':pk']['S']
+        prefix = ExpressionAttributeValues.get(':sk', {}).get('S', '')
+        items = [item for (item_pk, sk), item in self.items.items() if item_pk == pk and sk.startswith(prefix)]
+        if FilterExpression == 'attribute_not_exists(dismissed)':
+            items = [item for item in items if 'dismissed' not in item]
+        yield {'Items': [serialize_item(item) for item in items]}
+
+
+def test_dismissed_match_stays_dismissed():
+    table = FakeInboxTable()
+    clients._registry.update(dynamodb=table, dynamodb_client=table)
+    clients._registry.pop("new_matches_manager", None)
+    manager = clients.get_new_matches_manager()
+    for item in preference_index_items({"userId": "a", "zipCodes": ["94539"], "priceRange": {"max": 2_000_000}}):
+        table.items[(item['PK'], item['SK'])] = item
+
+    listings = [{'PK': 'PROPERTY_INFO', 'SK': f'{n}-Oak-St', 'property_id': f'{n}-Oak-St', 'zipCode': '94539',
+                 'price': 1_000_000, 'created_at': f'2026-01-0{n}T00:00:00'} for n in (1, 2)]
+    assert [manager.process_new_listing(listing) for listing in listings] == [["a"], ["a"]]
+    assert manager.dismiss_new_matches("a", ["1-Oak-St"]) == 1
+    assert [match['property_id'] for match in manager.get_new_matches("a")] == ["2-Oak-St"]
+
+    # The dismissed listing re-enters the cache (its cached item expired): not matched again
+    assert manager.process_new_listing({**listings[0], 'created_at': '2026-01-05T00:00:00'}) == []
+    assert [match['property_id'] for match in manager.get_new_matches("a")] == ["2-Oak-St"]
+
+    assert manager.dismiss_new_matches("a") == 1
+    assert manager.get_new_matches("a") == []
+    assert manager.process_new_listing(listings[1]) == []
+    print("Dismissed match test passed")
+
+
+if __name__ == "__main__":
+    test_interval_tree_matches_brute_force()
+    test_zip_preferences_match()
+    test_dismissed_match_stays_dismissed()
@@ -0,0 +1,171 @@
+import sys
+import os
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+os.environ.setdefault("DDB_TABLE", "test-table")
+
+from botocore.exceptions import ClientError
+
+import clients
+from serialization import serialize_item
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+USER_ID = "user-1234567890"
+
+
+class FakeReplicatedTable:
+    """
+    Single-table stand-in whose eventually consistent reads lag behind until sync().
+
+    Serves as the DynamoDB resource, its Table and the low-level client at once.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.replica = {}
+        self.gets = []
+        self.fail_batches = False
+
+    def Table(self, name):
+        return self
+
+    def _write(self, key, item):
+        self.replica.setdefault(key, self.items.get(key))
+        self.items[key] = item
+
+    def sync(self):
+        self.replica.clear()
+
+    def put_item(self, Item, ReturnValues=None, **kwargs):
+        key = (Item['PK'], Item['SK'])
+        old = self.items.get(key)
+        self._write(key, dict(Item))
+        return {'Attributes': old} if old and ReturnValues == 'ALL_OLD' else {}
+
+    def delete_item(self, Key, ReturnValues=None, **kwargs):
+        key = (Key['PK'], Key['SK'])
+        old = self.items.get(key)
+        self._write(key, None)
+        return {'Attributes': old} if old and ReturnValues == 'ALL_OLD' else {}
+
+    def get_item(self, TableName, Key, ConsistentRead=False, ProjectionExpression=None, **kwargs):
+        key = (Key['PK']['S'], Key['SK']['S'])
+        self.gets.append((ProjectionExpression, ConsistentRead))
+        item = self.items.get(key) if ConsistentRead else self.replica.get(key, self.items.get(key))
+        if item is None:
+            return {}
+        if ProjectionExpression:
+            item = {'version': item['version']} if 'version' in item else {}
+        return {'Item': serialize_item(item)}
+
+    def batch_writer(self):
+        return self
+
+    def __enter__(self):
+        if self.fail_batches:
+            raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "BatchWriteItem")
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeNewMatchesManager:
+    def invalidate(self, *zip_codes):
+        pass
+
+
+def make_manager():
+    table = FakeReplicatedTable()
+    clients._registry.update(dynamodb=table, dynamodb_client=table, new_matches_manager=FakeNewMatchesManager())
+    from preferences import PreferencesManager
+    return PreferencesManager(), table
+
+
+def test_version_stamp_and_write_through():
+    from preferences import UserPreferences
+    manager, table = make_manager()
+    first = manager.save_preferences(UserPreferences(userId=USER_ID, zipCodes=["94539"]))
+    second = manager.save_preferences(UserPreferences(userId=USER_ID, zipCodes=["94538"]))
+    assert second['version'] > first['version']
+    assert table.items[(f"USER_PREF#{USER_ID}", "PROFILE")]['version'] == second['version']
+
+    # The container that wrote serves its own write without reading DynamoDB
+    table.gets.clear()
+    prefs = manager.get_preferences(USER_ID)
+    assert prefs['zipCodes'] == ["94538"] and prefs['version'] == second['version']
+    assert table.gets == []
+    print("Version stamp test passed")
+
+
+def test_min_version_bypasses_older_copy():
+    from preferences import UserPreferences
+    writer, table = make_manager()
+    old = writer.save_preferences(UserPreferences(userId=USER_ID, zipCodes=["94539"]))
+    table.sync()
+    from preferences import PreferencesManager
+    reader = PreferencesManager()
+    assert reader.get_preferences(USER_ID)['version'] == old['version']
+
+    new = writer.save_preferences(UserPreferences(userId=USER_ID, zipCodes=["94538"]))
+    # Without min_version the fresh cached copy is served
+    assert reader.get_preferences(USER_ID)['version'] == old['version']
+    # With it, the re-read is strongly consistent, so the lagging replica is not returned
+    prefs = reader.get_preferences(USER_ID, min_version=new['version'])
+    assert prefs['version'] == new['version'] and prefs['zipCodes'] == ["94538"]
+    assert table.gets[-1] == (None, True)
+    print("min_version bypass test passed")
+
+
+def test_revalidation_of_expired_entry():
+    from preferences import UserPreferences
+    writer, table = make_manager()
+    saved = writer.save_preferences(UserPreferences(userId=USER_ID, zipCodes=["94539"]))
+    table.sync()
+    from preferences import PreferencesManager
+    reader = PreferencesManager()
+    reader.cache.ttl_seconds = 0
+    reader.get_preferences(USER_ID)
+
+    # Unchanged: only the version stamp is read (strongly consistent) and the copy re-used
+    table.gets.clear()
+    assert reader.get_preferences(USER_ID)['version'] == saved['version']
+    assert table.gets == [('#version', True)]
+
+    # Changed: the stamp differs and the full profile is read again
+    newer = writer.save_preferences(UserPreferences(userId=USER_ID, zipCodes=["94538"]))
+    table.gets.clear()
+    prefs = reader.get_preferences(USER_ID)
+    assert table.gets[0] == ('#version', True) and len(table.gets) == 2
+    assert prefs['version'] == newer['version'] and table.gets[1] == (None, True)
+    print("Revalidation test passed")
+
+
+def test_index_failure_keeps_write_through():
+    from preferences import UserPreferences
+    manager, table = make_manager()
+    manager.save_preferences(UserPreferences(userId=USER_ID, zipCodes=["94539"]))
+
+    # The profile is saved and cached even though the zip index write fails
+    table.fail_batches = True
+    saved = manager.save_preferences(UserPreferences(userId=USER_ID, zipCodes=["94538"]))
+    assert table.items[(f"USER_PREF#{USER_ID}", "PROFILE")]['version'] == saved['version']
+    table.gets.clear()
+    assert manager.get_preferences(USER_ID)['zipCodes'] == ["94538"] and table.gets == []
+
+    assert manager.delete_preferences(USER_ID)
+    assert manager.get_preferences(USER_ID) is None and table.gets == []
+    print("Index failure test passed")
+
+
+if __name__ == "__main__":
+    test_version_stamp_and_write_through()
+    test_min_version_bypasses_older_copy()
+    test_revalidation_of_expired_entry()
+    test_index_failure_keeps_write_through()
@@ -0,0 +1,167 @@
+import sys
+import os
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+os.environ.setdefault("DDB_TABLE", "test-table")
+
+from botocore.exceptions import ClientError
+
+import clients
+from changes import process_records, stream_record
+from serialization import deserialize_item, serialize_item, from_dynamodb
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROPERTY_ID = "123-Oak-St,-Fremont,-CA-94539"
+
+
+class FakeTable:
+    """
+    In-memory single table for the calls PriceHistoryManager makes.
+
+    Serves as the DynamoDB resource, its Table, its batch writer and the low-level
+    client. fail_updates makes the next update_item calls raise.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.fail_updates = 0
+
+    def Table(self, name):
+        return self
+
+    def batch_writer(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def put_item(self, Item, TableName=None, ConditionExpression=None, **kwargs):
+        item = deserialize_item(Item) if TableName else from_dynamodb(Item)
+        key = (item['PK'], item['SK'])
+        if ConditionExpression == 'attribute_not_exists(SK)' and key in self.items:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        self.items[key] = item
+        return {}
+
+    def get_item(self, TableName, Key, **kwargs):
+        item = self.items.get((Key['PK']['S'], Key['SK']['S']))
+        return {'Item': serialize_item(item)} if item else {}
+
+    def update_item(self, TableName, Key, ExpressionAttributeValues, ConditionExpression=None, **kwargs):
+        if self.fail_updates:
+            self.fail_updates -= 1
+            raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "UpdateItem")
+        key = (Key['PK']['S'], Key['SK']['S'])
+        if key not in self.items:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+        self.items[key]['price'] = int(ExpressionAttributeValues[':price']['N'])
+        return {}
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, ExpressionAttributeValues, ScanIndexForward=True, PaginationConfig=None, **kwargs):
+        pk = ExpressionAttributeValues[':pk']['S']
+        prefix = ExpressionAttributeValues.get(':sk', {}).get('S', '')
+        items = sorted((item for (item_pk, sk), item in self.items.items() if item_pk == pk and sk.startswith(prefix)),
+                       key=lambda item: item['SK'], reverse=not ScanIndexForward)
+        limit = (PaginationConfig or {}).get('MaxItems')
+        yield {'Items': [serialize_item(item) for item in items[:limit]]}
+
+    def query(self, **kwargs):
+        return next(self.paginate(**kwargs))
+
+
+class NoOpManager:
+    def process_new_listing(self, listing):
+        return []
+
+    def apply_change(self, new_item, old_item):
+        pass
+
+
+def listing(price, created_at, status="Active"):
+    return {'PK': 'PROPERTY_INFO', 'SK': PROPERTY_ID, 'property_id': PROPERTY_ID, 'price': price, 'status': status,
+            'formattedAddress': "123 Oak St, Fremont, CA 94539", 'created_at': created_at}
+
+
+def make_manager():
+    table = FakeTable()
+    clients._registry.update(dynamodb=table, dynamodb_client=table, market_stats_manager=NoOpManager(),
+                             new_matches_manager=NoOpManager())
+    clients._registry.pop("price_history_manager", None)
+    manager = clients.get_price_history_manager()
+    for user_id in ("alice", "bob"):
+        table.put_item(Item={'PK': f'USER#{user_id}', 'SK': f'FAVORITE#{PROPERTY_ID}', 'price': 1_000_000})
+        manager.table.put_item(Item={'PK': f'PROPERTY_WATCHERS#{PROPERTY_ID}', 'SK': f'USER#{user_id}',
+                                     'user_id': user_id, 'property_id': PROPERTY_ID})
+    return manager, table
+
+
+def test_price_drop_fan_out():
+    manager, table = make_manager()
+    first = listing(1_000_000, "2026-01-01T00:00:00")
+    cut = listing(950_000, "2026-02-01T00:00:00")
+    # Inline stand-in for the stream: the INSERT, then a price cut
+    process_records([stream_record(first), stream_record(cut, first)])
+
+    assert [point['price'] for point in manager.get_price_history(PROPERTY_ID)] == [1_000_000, 950_000]
+    for user_id in ("alice", "bob"):
+        alerts = manager.get_price_alerts(user_id)
+        assert len(alerts) == 1
+        assert (alerts[0]['old_price'], alerts[0]['new_price'], alerts[0]['drop_percent']) == (1_000_000, 950_000, 5.0)
+        assert table.items[(f'USER#{user_id}', f'FAVORITE#{PROPERTY_ID}')]['price'] == 950_000
+
+    # A rise, and an unchanged re-cache, are recorded or skipped without alerts
+    rise = listing(990_000, "2026-03-01T00:00:00")
+    assert manager.process_change(rise, cut) is None
+    assert manager.process_change(listing(990_000, "2026-03-02T00:00:00"), rise) is None
+    assert len(manager.get_price_history(PROPERTY_ID)) == 3
+    assert len(manager.get_price_alerts("alice")) == 1
+
+    # Without the old image the last history point is the previous price
+    drop = manager.process_change(listing(900_000, "2026-04-01T00:00:00"))
+    assert (drop.old_price, drop.new_price) == (990_000, 900_000)
+    print("Price drop fan-out test passed")
+
+
+def test_retried_record_alerts_again():
+    manager, table = make_manager()
+    first = listing(1_000_000, "2026-01-01T00:00:00")
+    cut = listing(800_000, "2026-02-01T00:00:00")
+    manager.process_change(first)
+
+    # The fan-out fails half-way: the point is not recorded, so the retry alerts again
+    table.fail_updates = 1
+    try:
+        manager.process_change(cut, first)
+        assert False, "fan-out failure should propagate"
+    except ClientError:
+        pass
+    assert len(manager.get_price_history(PROPERTY_ID)) == 1
+
+    drop = manager.process_change(cut, first)
+    assert drop is not None and drop.new_price == 800_000
+    assert len(manager.get_price_history(PROPERTY_ID)) == 2
+    for user_id in ("alice", "bob"):
+        assert len(manager.get_price_alerts(user_id)) == 1
+        assert table.items[(f'USER#{user_id}', f'FAVORITE#{PROPERTY_ID}')]['price'] == 800_000
+
+    # Redelivered after success: skipped
+    assert manager.process_change(cut, first) is None
+    assert len(manager.get_price_alerts("alice")) == 1
+    print("Retried record test passed")
+
+
+if __name__ == "__main__":
+    test_price_drop_fan_out()
+    test_retried_record_alerts_again()
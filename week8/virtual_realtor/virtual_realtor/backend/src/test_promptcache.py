@@ -0,0 +1,64 @@
+import sys
+import os
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+os.environ.setdefault("STATE_BUCKET", "test-bucket")
+os.environ.setdefault("DDB_TABLE", "test-table")
+
+import main
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RecordingAgent:
+    """Agent stand-in that records its configuration."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.conversation_manager = kwargs["conversation_manager"]
+
+    @property
+    def messages(self):
+        return []
+
+
+def build_sessions():
+    models = []
+    originals = {name: getattr(main, name) for name in ("Agent", "S3SessionManager", "get_bedrock_model")}
+    main.Agent = RecordingAgent
+    main.S3SessionManager = lambda **kwargs: None
+    main.get_bedrock_model = lambda model_id, **config: models.append(config) or object()
+    try:
+        agents = [main.session("session-a", user_id="user-a"), main.session("session-b", user_id="user-b"),
+                  main.session("session-c")]
+    finally:
+        for name, value in originals.items():
+            setattr(main, name, value)
+    return agents, models
+
+
+def test_static_prefix_shared_across_sessions():
+    agents, models = build_sessions()
+    prompts = [agent.kwargs["system_prompt"] for agent in agents]
+
+    # Identical static prefix ending in a cache point, whoever the user is
+    prefix = prompts[0][:2]
+    assert prefix == [{"text": main.SYSTEM_PROMPT}, {"cachePoint": {"type": "default"}}]
+    assert all(prompt[:2] == prefix for prompt in prompts)
+    # Per-user context only after the cache point
+    assert prompts[0][2:] == [{"text": main.USER_CONTEXT_PROMPT.format(user_id="user-a")}]
+    assert prompts[1][2:] == [{"text": main.USER_CONTEXT_PROMPT.format(user_id="user-b")}]
+    assert prompts[2][2:] == []
+
+    # Tool specs are cached too, with the same model configuration for every session
+    assert models == [{"cache_tools": "default"}] * 3
+    print("Prompt cache prefix test passed")
+
+
+if __name__ == "__main__":
+    test_static_prefix_shared_across_sessions()
@@ -0,0 +1,96 @@
+import sys
+import os
+import time
+import threading
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from propertycache import PropertyCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ADDRESS = "123 Oak St, Fremont, CA 94539"
+PROPERTY_ID = "123-Oak-St-Fremont-CA-94539"
+
+
+class FakeLeaseClient:
+    """Grants a refresh lease once until released."""
+
+    def __init__(self):
+        self.leased = False
+
+    def update_item(self, **kwargs):
+        from botocore.exceptions import ClientError
+        if self.leased:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+        self.leased = True
+
+
+class FakeQuestionManager:
+    """In-memory PROPERTY_INFO cache with a slow RentCast fetch."""
+
+    def __init__(self):
+        self.items = {}
+        self.fetches = 0
+        self.fetched = threading.Event()
+        self.client = FakeLeaseClient()
+        self.table_name = "t"
+
+    def get_property_info_from_db(self, property_id=None, property_address=None):
+        property_id = property_id or property_address.replace(' ', '-').replace(',', '')
+        item = self.items.get(property_id)
+        return dict(item) if item else None
+
+    def fetch_listing(self, address, property_id=None):
+        self.fetches += 1
+        time.sleep(0.05)
+        return {"id": PROPERTY_ID, "formattedAddress": address, "price": 1000000 + self.fetches}
+
+    def add_property_info_to_db(self, listing):
+        now = time.time()
+        self.items[listing["id"]] = {**listing, "property_id": listing["id"],
+                                     "soft_expires_at": now + 60, "ttl": now + 120}
+        self.client.leased = False
+        self.fetched.set()
+        return {"success": True, "property_id": listing["id"]}
+
+
+def test_stale_while_revalidate():
+    questions = FakeQuestionManager()
+    cache = PropertyCache(questions)
+
+    # A miss is not fetched from RentCast (search_properties does that)
+    assert cache.get(property_address=ADDRESS) == (None, "miss")
+    assert questions.fetches == 0
+    questions.add_property_info_to_db(questions.fetch_listing(ADDRESS))
+    assert cache.get(property_id=PROPERTY_ID)[1] == "hit"
+
+    # Stale reads are served at once and trigger a single background refresh
+    questions.items[PROPERTY_ID]["soft_expires_at"] = time.time() - 1
+    questions.fetched.clear()
+    for _ in range(5):
+        item, status = cache.get(property_id=PROPERTY_ID)
+        assert status == "stale" and item["price"] == 1000001
+    assert questions.fetched.wait(2)
+    assert questions.fetches == 2
+    item, status = cache.get(property_id=PROPERTY_ID)
+    assert status == "hit" and item["price"] == 1000002
+
+    # Past the hard expiry the listing is refreshed before it is returned
+    questions.items[PROPERTY_ID]["ttl"] = time.time() - 1
+    item, status = cache.get(property_id=PROPERTY_ID)
+    assert status == "hard_expired" and item["price"] == 1000003
+
+    stats = cache.stats()
+    assert (stats["hit"], stats["stale"], stats["hard_expired"], stats["miss"]) == (2, 5, 1, 1)
+    assert stats["refreshed"] == 2
+    print("Stale-while-revalidate test passed")
+
+
+if __name__ == "__main__":
+    test_stale_while_revalidate()
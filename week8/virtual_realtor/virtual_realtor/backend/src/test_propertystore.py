@@ -0,0 +1,48 @@
+import sys
+import os
+import base64
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from propertystore import pack_property_item, payload_details, unpack_property_item
+from serialization import serialize_item, deserialize_item, dumps_bytes
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ITEM = {
+    "PK": "PROPERTY_INFO", "SK": "123-Oak-St-Fremont-CA-94539", "property_id": "123-Oak-St-Fremont-CA-94539",
+    "ttl": 1800000000, "created_at": "2025-01-01T00:00:00",
+    "id": "123-Oak-St-Fremont-CA-94539", "formattedAddress": "123 Oak St, Fremont, CA 94539",
+    "city": "Fremont", "state": "CA", "zipCode": "94539", "price": 1250000, "bathrooms": 2.5,
+    "addressLine2": None,
+    "listingAgent": {"name": "Jane Doe", "phone": "5105550100"},
+    "history": {f"2024-0{month}-01": {"event": "Sale Listing", "price": 1300000 - month * 5000}
+                for month in range(1, 8)},
+}
+
+
+def test_pack_round_trip():
+    packed = pack_property_item(ITEM)
+    assert packed["price"] == 1250000 and packed["zipCode"] == "94539"
+    assert "listingAgent" not in packed and "addressLine2" not in packed
+    assert len(dumps_bytes(serialize_item(packed))) < len(dumps_bytes(serialize_item(ITEM)))
+
+    # Low-level round trip, and the base64 form of stream records
+    stored = deserialize_item(serialize_item(packed))
+    full = unpack_property_item(stored)
+    assert full == {key: value for key, value in ITEM.items() if value is not None}
+    encoded = {**stored, "payload": base64.b64encode(stored["payload"]).decode()}
+    assert payload_details(encoded)["listingAgent"] == ITEM["listingAgent"]
+
+    # Items stored before the payload format are read unchanged
+    assert unpack_property_item(ITEM) is ITEM
+    print("Property payload round trip test passed")
+
+
+if __name__ == "__main__":
+    test_pack_round_trip()
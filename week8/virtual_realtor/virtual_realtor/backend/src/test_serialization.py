@@ -0,0 +1,59 @@
+import sys
+import os
+import logging
+from decimal import Decimal
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from app.serialization import deserialize_item, serialize_item, to_dynamodb, from_dynamodb, dumps
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_low_level_round_trip():
+    item = {
+        "PK": "USER#test-user-123",
+        "price": 1000000,
+        "bathrooms": 2.5,
+        "is_visit_candidate": True,
+        "addressLine2": None,
+        "hoa": {"fee": 450},
+        "tags": ["pool", "view"],
+    }
+    raw = serialize_item(item)
+    assert raw["price"] == {"N": "1000000"}
+    assert raw["hoa"] == {"M": {"fee": {"N": "450"}}}
+
+    decoded = deserialize_item(raw)
+    print(f"Decoded: {decoded}")
+    assert decoded == item
+    assert isinstance(decoded["price"], int)
+    assert isinstance(decoded["bathrooms"], float)
+
+
+def test_resource_conversions():
+    native = {"bathrooms": 2.5, "nested": [{"lat": 37.5}]}
+    stored = to_dynamodb(native)
+    assert stored["bathrooms"] == Decimal("2.5")
+    assert stored["nested"][0]["lat"] == Decimal("37.5")
+
+    restored = from_dynamodb({"price": Decimal("500000"), "bathrooms": Decimal("2.5")})
+    assert restored == {"price": 500000, "bathrooms": 2.5}
+    assert isinstance(restored["price"], int)
+
+
+def test_dumps_handles_decimal():
+    encoded = dumps({"price": Decimal("500000"), "bathrooms": Decimal("2.5"), "city": "Fremont"})
+    print(f"Encoded: {encoded}")
+    assert encoded == '{"price":500000,"bathrooms":2.5,"city":"Fremont"}'
+
+
+if __name__ == "__main__":
+    test_low_level_round_trip()
+    test_resource_conversions()
+    test_dumps_handles_decimal()
+    print("\n✅ All serialization tests passed!")
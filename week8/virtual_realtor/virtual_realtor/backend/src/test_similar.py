@@ -0,0 +1,69 @@
+import sys
+import os
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from similar import SimilarityIndex
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def listing(property_id, price, bedrooms, squareFootage, latitude, propertyType="Single Family"):
+    return {"property_id": property_id, "price": price, "bedrooms": bedrooms, "bathrooms": 2,
+            "squareFootage": squareFootage, "yearBuilt": 1990, "latitude": latitude, "longitude": -121.95,
+            "propertyType": propertyType}
+
+
+LISTINGS = [
+    listing("home", 1_200_000, 3, 1800, 37.50),
+    listing("twin", 1_250_000, 3, 1850, 37.51),
+    listing("far-twin", 1_200_000, 3, 1800, 37.58),
+    listing("mansion", 4_500_000, 6, 6000, 37.50),
+    listing("condo", 1_200_000, 3, 1800, 37.50, propertyType="Condo"),
+    listing("starter", 650_000, 2, 900, 37.52),
+]
+
+
+class StubQuestionManager:
+    """Stand-in for QuestionManager serving listings from memory."""
+
+    def __init__(self, listings):
+        self.listings = listings
+        self.write_listeners = []
+
+    def iter_property_items(self, fields):
+        return iter(self.listings)
+
+    def get_property_info_from_db(self, property_id=None):
+        return None
+
+
+def test_find_similar():
+    index = SimilarityIndex(StubQuestionManager(LISTINGS))
+
+    similar = index.find_similar("home", limit=3)
+    assert [s["property_id"] for s in similar] == ["twin", "far-twin", "starter"]
+    assert similar[0]["similarity"] > similar[1]["similarity"]
+
+    # Radius and property type filters
+    assert [s["property_id"] for s in index.find_similar("home", limit=3, max_distance_km=5)] == ["twin", "starter", "mansion"]
+    assert index.find_similar("home", limit=1, same_property_type=False)[0]["property_id"] == "condo"
+
+    # Listings that are not cached can be compared when their fields are given
+    outside = listing("outside", 640_000, 2, 950, 37.52)
+    assert index.find_similar("outside", limit=1, listing=outside)[0]["property_id"] == "starter"
+    try:
+        index.find_similar("missing")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("Similar properties test passed")
+
+
+if __name__ == "__main__":
+    test_find_similar()
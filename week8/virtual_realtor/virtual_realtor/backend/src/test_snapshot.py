@@ -0,0 +1,137 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+os.environ.setdefault("USE_MOCK_RENTCAST_API", "true")
+os.environ.setdefault("DDB_TABLE", "test-table")
+
+import clients
+from snapshot import (iter_snapshot, load_snapshot, mock_page, MOCK_SNAPSHOT_TOTAL,
+                      SNAPSHOT_SESSION_REQUEST_BUDGET)
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+class CountingFetcher:
+    """Mock market page fetcher that records the requests in flight."""
+
+    def __init__(self, report_total=True):
+        self.report_total = report_total
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+
+    def __call__(self, params):
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.02)
+        try:
+            return mock_page(params if self.report_total else {**params, "includeTotalCount": None})
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+async def collect(**kwargs):
+    return [listing["id"] async for listing in iter_snapshot(zipCode="94539", **kwargs)]
+
+
+def test_concurrent_snapshot():
+    fetcher = CountingFetcher()
+    ids = asyncio.run(collect(page_size=20, concurrency=3, fetch_page=fetcher))
+    assert len(ids) == MOCK_SNAPSHOT_TOTAL and len(set(ids)) == MOCK_SNAPSHOT_TOTAL
+    assert fetcher.requests == -(-MOCK_SNAPSHOT_TOTAL // 20)
+    assert 1 < fetcher.peak <= 3
+
+    # max_listings caps both the listings and the requests
+    fetcher = CountingFetcher()
+    ids = asyncio.run(collect(page_size=20, max_listings=50, fetch_page=fetcher))
+    assert len(ids) == 50 and fetcher.requests == 3
+    print("Concurrent snapshot test passed")
+
+
+def test_snapshot_without_total_count():
+    fetcher = CountingFetcher(report_total=False)
+    ids = asyncio.run(collect(page_size=60, fetch_page=fetcher))
+    assert len(set(ids)) == MOCK_SNAPSHOT_TOTAL and fetcher.peak == 1
+    print("Sequential snapshot test passed")
+
+
+class WriteOnlyTable:
+    """DynamoDB stand-in without reads: statistics must come from the streamed listings."""
+
+    def Table(self, name):
+        return self
+
+
+class CachingQuestionManager:
+    def __init__(self):
+        self.cached = []
+
+    def add_properties_to_db(self, properties):
+        self.cached.extend(properties)
+        return {'written': len(properties)}
+
+
+def make_loader():
+    questions = CachingQuestionManager()
+    clients._registry.update(dynamodb=WriteOnlyTable(), dynamodb_client=WriteOnlyTable(),
+                             question_manager=questions)
+    clients._registry.pop("market_stats_manager", None)
+    return questions
+
+
+def test_load_snapshot_statistics():
+    questions = make_loader()
+    report = asyncio.run(load_snapshot(zipCode="94539", page_size=50))
+    assert report.listings == report.written == len(questions.cached) == MOCK_SNAPSHOT_TOTAL
+    assert report.requests == 5 and not report.budget_exhausted
+    stats = report.market_stats
+    assert stats["area"] == "94539" and stats["count"] == MOCK_SNAPSHOT_TOTAL
+    prices = sorted(listing["price"] for listing in questions.cached)
+    assert abs(stats["price"]["median"] - prices[len(prices) // 2]) <= 0.02 * prices[len(prices) // 2]
+
+    # One property type: only its listings are summarized
+    condos = sum(1 for listing in questions.cached if listing.get("propertyType") == "Condo")
+    report = asyncio.run(load_snapshot(zipCode="94539", page_size=50, propertyType="Condo"))
+    assert condos and report.market_stats["count"] == condos and report.market_stats["propertyType"] == "Condo"
+    print("Snapshot statistics test passed")
+
+
+def test_load_snapshot_request_caps():
+    make_loader()
+    # Per snapshot
+    report = asyncio.run(load_snapshot(zipCode="94539", page_size=20, max_requests=3))
+    assert (report.requests, report.listings, report.budget_exhausted) == (3, 60, True)
+
+    # Per session: the snapshots of a session share its budget
+    spent = 0
+    while True:
+        report = asyncio.run(load_snapshot(zipCode="94539", page_size=20, max_requests=8, session_id="s1"))
+        spent += report.requests
+        if not report.requests:
+            break
+    assert spent == SNAPSHOT_SESSION_REQUEST_BUDGET and report.budget_exhausted
+    assert report.listings == 0 and report.market_stats is None
+    # Other sessions are unaffected
+    assert asyncio.run(load_snapshot(zipCode="94539", page_size=20, max_requests=2, session_id="s2")).requests == 2
+    print("Snapshot request cap test passed")
+
+
+if __name__ == "__main__":
+    test_concurrent_snapshot()
+    test_snapshot_without_total_count()
+    test_load_snapshot_statistics()
+    test_load_snapshot_request_caps()
@@ -0,0 +1,187 @@
+import sys
+import os
+import json
+import asyncio
+import logging
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from strands.models import Model
+
+import clients
+from suggestions import FALLBACK_SUGGESTIONS, SUGGESTION_POOL, SuggestionService
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_ID = "stub-suggestions-model"
+
+
+class StubSuggestionModel(Model):
+    """Model stub that answers with numbered questions once released."""
+
+    def __init__(self):
+        self.config = {"model_id": MODEL_ID}
+        self.calls = 0
+        self.cancelled = 0
+        self.release = None
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        self.calls += 1
+        call = self.calls
+        try:
+            if self.release is not None:
+                await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        questions = [f"Question {call}.{index}?" for index in range(1, 5)]
+        yield {"messageStart": {"role": "assistant"}}
+        yield {"contentBlockDelta": {"delta": {"text": json.dumps(questions)}}}
+        yield {"contentBlockStop": {}}
+        yield {"messageStop": {"stopReason": "end_turn"}}
+
+
+def conversation(*texts):
+    return [{"role": "user" if index % 2 == 0 else "assistant", "content": [{"text": text}]}
+            for index, text in enumerate(texts)]
+
+
+def make_service():
+    model = StubSuggestionModel()
+    clients._registry[f"bedrock_model:{MODEL_ID}"] = model
+    return SuggestionService(model_id=MODEL_ID), model
+
+
+def test_empty_conversation_uses_pool():
+    service, model = make_service()
+    tool_only = [{"role": "assistant", "content": [{"toolUse": {"name": "search_properties"}}]}]
+    for messages in ([], tool_only):
+        suggestions = asyncio.run(service.get_suggestions("s1", messages))
+        assert len(suggestions) == 4 and set(suggestions) <= set(SUGGESTION_POOL)
+    assert model.calls == 0
+    print("Empty context pool test passed")
+
+
+def test_cached_per_session_and_context():
+    service, model = make_service()
+    messages = conversation("Homes in Fremont?", "Here are three homes.")
+
+    async def run():
+        first = await service.get_suggestions("s1", messages)
+        again = await service.get_suggestions("s1", messages)
+        # Tool messages do not change the context
+        with_tool = messages + [{"role": "assistant", "content": [{"toolUse": {"name": "x"}}]}]
+        with_tool_again = await service.get_suggestions("s1", with_tool)
+        other_session = await service.get_suggestions("s2", messages)
+        return first, again, with_tool_again, other_session
+
+    first, again, with_tool_again, other_session = asyncio.run(run())
+    assert first == again == with_tool_again == [f"Question 1.{index}?" for index in range(1, 5)]
+    # Same context, different session: generated separately
+    assert other_session[0] == "Question 2.1?"
+    assert model.calls == 2
+
+    # A newer context of the session misses the cache
+    newer = conversation("Homes in Fremont?", "Here are three homes.", "Any condos?", "Two condos.")
+    assert asyncio.run(service.get_suggestions("s1", newer))[0] == "Question 3.1?"
+    print("Per-session cache test passed")
+
+
+def test_inflight_shared_and_stale_cancelled():
+    service, model = make_service()
+    old = conversation("Homes in Fremont?", "Here are three homes.")
+    new = conversation("Homes in Fremont?", "Here are three homes.", "Any condos?", "Two condos.")
+
+    async def run():
+        model.release = asyncio.Event()
+        # Two requests for the same context share one generation
+        first = asyncio.create_task(service.get_suggestions("s1", old))
+        second = asyncio.create_task(service.get_suggestions("s1", old))
+        await asyncio.sleep(0.05)
+        assert model.calls == 1
+        # A request for a newer context cancels the running one
+        newer = asyncio.create_task(service.get_suggestions("s1", new))
+        await asyncio.sleep(0.05)
+        model.release.set()
+        return await first, await second, await newer
+
+    first, second, newer = asyncio.run(run())
+    assert first == second == list(FALLBACK_SUGGESTIONS)
+    assert newer == [f"Question 2.{index}?" for index in range(1, 5)]
+    assert (model.calls, model.cancelled) == (2, 1)
+    assert service._inflight == {}
+    print("In-flight sharing and cancellation test passed")
+
+
+def test_prefetch():
+    service, model = make_service()
+    messages = conversation("Homes in Fremont?", "Here are three homes.")
+
+    async def run():
+        model.release = asyncio.Event()
+        # Without waiting the generation is only started...
+        assert await service.prefetch("s1", messages) is None
+        # ...and a waiting prefetch that times out leaves it running
+        assert await service.prefetch("s1", messages, wait_seconds=0.05) is None
+        assert model.calls == 1
+        # The follow-up request joins the running generation
+        request = asyncio.create_task(service.get_suggestions("s1", messages))
+        await asyncio.sleep(0.01)
+        model.release.set()
+        fetched = await request
+        # Ready now: a prefetch returns the cached suggestions at once
+        cached = await service.prefetch("s1", messages, wait_seconds=1)
+        return fetched, cached
+
+    fetched, cached = asyncio.run(run())
+    assert fetched == cached == [f"Question 1.{index}?" for index in range(1, 5)]
+    assert model.calls == 1
+    print("Prefetch test passed")
+
+
+def test_chat_stream_suggestions_event():
+    os.environ.setdefault("STATE_BUCKET", "test-bucket")
+    os.environ.setdefault("DDB_TABLE", "test-table")
+    import main
+
+    service, model = make_service()
+    main.suggestion_service = service
+
+    class SessionAgent:
+        messages = conversation("Homes in Fremont?", "Here are three homes.")
+
+    async def collect():
+        return [event async for event in main.suggestions_event(SessionAgent(), "s1")]
+
+    events = asyncio.run(collect())
+    assert len(events) == 1 and events[0].startswith("event: suggestions\ndata: ")
+    payload = json.loads(events[0].split("data: ", 1)[1])
+    assert payload == {"suggestions": [f"Question 1.{index}?" for index in range(1, 5)]}
+
+    # Not ready within the wait: the stream ends without the event
+    model.release = asyncio.Event()
+    main.SUGGESTIONS_STREAM_WAIT_SECONDS = 0.05
+    SessionAgent.messages = conversation("Homes in Fremont?", "Here are three homes.", "Condos?", "Two.")
+    assert asyncio.run(collect()) == []
+    print("Chat stream suggestions event test passed")
+
+
+if __name__ == "__main__":
+    test_empty_conversation_uses_pool()
+    test_cached_per_session_and_context()
+    test_inflight_shared_and_stale_cancelled()
+    test_prefetch()
+    test_chat_stream_suggestions_event()
@@ -0,0 +1,137 @@
+import sys
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+
+# Ensure we can import from app and its submodules
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'app'))
+
+from strands import Agent, tool
+from strands.models import Model
+
+from executor import LimitedConcurrentToolExecutor
+from toolmemo import ToolMemoScope, invalidate_tags, invalidates, memoize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tool calls of each model step, by the number of tool results seen so far
+SCRIPT = [
+    [("get_saved", {"user_id": "u1"}), ("get_saved", {"user_id": "u1"})],
+    [("get_saved", {"user_id": "u1"})],
+    [("add_favorite", {"user_id": "u1", "property_id": "p1"})],
+    [("get_saved", {"user_id": "u1"})],
+]
+
+calls = {"get_saved": 0}
+saved = []
+
+
+class ScriptedModel(Model):
+    """Model stub that makes the tool calls of SCRIPT one step at a time."""
+
+    def __init__(self):
+        self.config = {"model_id": "scripted-model"}
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        step = sum(1 for message in messages if any("toolResult" in block for block in message["content"]))
+        yield {"messageStart": {"role": "assistant"}}
+        if step < len(SCRIPT):
+            for index, (name, tool_input) in enumerate(SCRIPT[step]):
+                yield {"contentBlockStart": {"start": {"toolUse": {"toolUseId": f"t{step}-{index}", "name": name}}}}
+                yield {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps(tool_input)}}}}
+                yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "tool_use"}}
+        else:
+            yield {"contentBlockDelta": {"delta": {"text": "Done"}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+
+
+@tool
+@memoize(tags=["favorites:{user_id}"])
+def get_saved(user_id: str) -> str:
+    """List saved properties."""
+    calls["get_saved"] += 1
+    time.sleep(0.1)
+    return json.dumps(saved)
+
+
+@tool
+@invalidates("favorites:{user_id}")
+def add_favorite(user_id: str, property_id: str) -> str:
+    """Save a property."""
+    saved.append(property_id)
+    return "Saved"
+
+
+def test_memoized_tool_calls():
+    agent = Agent(model=ScriptedModel(), tools=[get_saved, add_favorite],
+                  tool_executor=LimitedConcurrentToolExecutor(),
+                  hooks=[ToolMemoScope("session-1")], callback_handler=None)
+    agent("what have I saved?")
+
+    # Two concurrent calls and a repeat ran once; the call after the write ran again
+    assert calls["get_saved"] == 2
+    results = [block["toolResult"]["content"][0]["text"]
+               for message in agent.messages for block in message["content"]
+               if "toolResult" in block and block["toolResult"]["toolUseId"].startswith("t3")]
+    assert results == ['["p1"]']
+
+    # Outside an agent session calls are not memoized
+    get_saved(user_id="u1")
+    assert calls["get_saved"] == 3
+    print("Tool memoization test passed")
+
+
+def test_write_during_read_is_not_cached():
+    inbox = ["p1"]
+    reading, written = threading.Event(), threading.Event()
+    runs = []
+
+    @memoize(tags=["inbox:{user_id}"])
+    def get_inbox(user_id):
+        runs.append(user_id)
+        snapshot = list(inbox)
+        reading.set()
+        written.wait(5)
+        return json.dumps(snapshot)
+
+    def in_session():
+        ToolMemoScope("session-2")._enter(None)
+        # The read starts, a write lands while it runs, then the read finishes
+        stale = []
+        reader = threading.Thread(target=contextvars.copy_context().run,
+                                  args=(lambda: stale.append(get_inbox("u1")),))
+        reader.start()
+        reading.wait(5)
+        inbox.append("p2")
+        invalidate_tags("inbox:u1")
+        written.set()
+        reader.join()
+        assert stale == ['["p1"]']
+        # The pre-write result was not cached: the next read sees the write
+        assert get_inbox("u1") == '["p1", "p2"]' and len(runs) == 2
+        assert get_inbox("u1") == '["p1", "p2"]' and len(runs) == 2
+
+    contextvars.copy_context().run(in_session)
+    print("Write during read test passed")
+
+
+if __name__ == "__main__":
+    test_memoized_tool_calls()
+    test_write_during_read_is_not_cached()
@@ -3,12 +3,24 @@
 import { fetchAuthSession } from "aws-amplify/auth";
 import type {
     UserPreferences,
+    PropertySuggestion,
     PropertySuggestionsResponse,
     PreferencesResponse,
+    AutocompleteSuggestion,
 } from "./types";
 
 const API_BASE = ""; // Relative path (proxied)
 
+// Version stamp of the last preferences saved from this browser. Sent back on reads so the
+// backend skips a cached copy that is older than what the user just saved.
+let preferencesVersion: number | null = null;
+
+function preferencesVersionHeader(): Record<string, string> {
+    return preferencesVersion !== null
+        ? { "X-Preferences-Version": String(preferencesVersion) }
+        : {};
+}
+
 /**
  * Get authentication header with Cognito ID token
  */
@@ -46,7 +58,10 @@ async function getAuthHeader(): Promise<HeadersInit> {
 export async function getUserPreferences(): Promise<UserPreferences | null> {
     try {
         console.log("Fetching user preferences...");
-        const headers = await getAuthHeader();
+        const headers = {
+            ...(await getAuthHeader()),
+            ...preferencesVersionHeader(),
+        };
         const response = await fetch(`${API_BASE}/api/user/preferences`, {
             headers,
         });
@@ -118,6 +133,9 @@ export async function saveUserPreferences(
             throw new Error(errorMsg);
         }
 
+        if (typeof data.version === "number") {
+            preferencesVersion = data.version;
+        }
         return data;
     } catch (error: any) {
         console.error("Error saving user preferences:", error);
@@ -133,7 +151,10 @@ export async function getPropertySuggestions(
 ): Promise<PropertySuggestionsResponse> {
     try {
         console.log(`Fetching property suggestions (limit: ${limit})...`);
-        const headers = await getAuthHeader();
+        const headers = {
+            ...(await getAuthHeader()),
+            ...preferencesVersionHeader(),
+        };
         const url = `${API_BASE}/api/property-suggestions?limit=${limit}`;
         console.log("Request URL:", url);
         
@@ -155,3 +176,96 @@ export async function getPropertySuggestions(
         throw error;
     }
 }
+
+/**
+ * Stream property suggestions based on user preferences.
+ * Each card is passed to onSuggestion as soon as the backend has parsed it; the
+ * returned summary has the same shape as getPropertySuggestions() with all cards.
+ */
+export async function streamPropertySuggestions(
+    limit: number = 5,
+    onSuggestion: (suggestion: PropertySuggestion, index: number) => void
+): Promise<PropertySuggestionsResponse> {
+    const headers = {
+        ...(await getAuthHeader()),
+        ...preferencesVersionHeader(),
+    };
+    const url = `${API_BASE}/api/property-suggestions/stream?limit=${limit}`;
+    const response = await fetch(url, { headers });
+
+    if (!response.ok) {
+        const errorText = await response.text();
+        console.error("Suggestions stream failed:", response.status, errorText);
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+
+    const reader = response.body?.getReader();
+    if (!reader) {
+        throw new Error("No reader available from response body");
+    }
+
+    const decoder = new TextDecoder();
+    const suggestions: PropertySuggestion[] = [];
+    let summary: Omit<PropertySuggestionsResponse, "suggestions"> | null = null;
+    let buffer = "";
+    let eventName = "message";
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop() || "";
+
+        for (const line of lines) {
+            if (line === "") {
+                eventName = "message";
+                continue;
+            }
+            if (line.startsWith("event: ")) {
+                eventName = line.slice(7).trim();
+                continue;
+            }
+            if (!line.startsWith("data: ")) continue;
+            try {
+                const data = JSON.parse(line.slice(6));
+                if (eventName === "suggestion") {
+                    suggestions.push(data.suggestion);
+                    onSuggestion(data.suggestion, data.index);
+                } else if (eventName === "summary") {
+                    summary = data;
+                }
+            } catch (parseError) {
+                console.warn("Invalid suggestions event:", line);
+            }
+        }
+    }
+
+    return {
+        count: suggestions.length,
+        hasPreferences: true,
+        ...(summary || { error: "Suggestions stream ended early" }),
+        suggestions,
+    };
+}
+
+/**
+ * Complete a partial address, city or zip code from the cached listings.
+ * Returns no suggestions on errors (typeahead is best effort).
+ */
+export async function getAutocompleteSuggestions(
+    query: string,
+    limit: number = 6,
+    signal?: AbortSignal
+): Promise<AutocompleteSuggestion[]> {
+    try {
+        const url = `${API_BASE}/api/autocomplete?q=${encodeURIComponent(query)}&limit=${limit}`;
+        const response = await fetch(url, { signal });
+        if (!response.ok) return [];
+        const data = await response.json();
+        return data.suggestions || [];
+    } catch (error) {
+        return [];
+    }
+}
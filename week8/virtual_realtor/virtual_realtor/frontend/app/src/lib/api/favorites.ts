@@ -80,3 +80,18 @@ export async function mergeSession(sessionId: string, authHeaders: HeadersInit):
     });
     return handleResponse<{ merged_count: number }>(response);
 }
+
+export interface ExportResponse {
+    key: string;
+    size: number;
+    url: string;
+    expires_in: number;
+}
+
+export async function exportSavedProperties(visitOnly: boolean, format: 'csv' | 'parquet', authHeaders: HeadersInit): Promise<ExportResponse> {
+    // The backend writes the export to S3 and returns a short-lived download URL
+    const response = await fetch(`${API_BASE}/saved-properties/export?visit_only=${visitOnly}&format=${format}&destination=s3`, {
+        headers: authHeaders
+    });
+    return handleResponse<ExportResponse>(response);
+}
@@ -56,7 +56,18 @@ export interface PreferencesResponse {
   success?: boolean;
   userId?: string;
   updatedAt?: string;
+  version?: number;
   error?: string;
   hasPreferences?: boolean;
 }
 
+
+export interface AutocompleteSuggestion {
+  type: "address" | "city" | "zip";
+  label: string;
+  property_id?: string;
+  city?: string;
+  state?: string;
+  zipCode?: string;
+  count?: number;
+}